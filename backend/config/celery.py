@@ -0,0 +1,26 @@
+"""
+Celery application for config project.
+
+Background work (chapter uploads, translation jobs, publishing and
+notification fan-out) runs as tasks in separate worker processes:
+
+    celery -A config worker -Q uploads,publishing,notifications,default -l info
+    celery -A config worker -Q translation --pool threads --concurrency 2 -l info
+
+docker-compose.yml starts both. A deployment built with build.sh (web
+service only) needs REDIS_URL and the two commands above as background
+worker services next to gunicorn; without workers, queued uploads and
+translations never run.
+
+Settings are read from Django settings with the CELERY_ prefix.
+"""
+
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+app = Celery('config')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+import sys
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -35,8 +36,17 @@ ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS', 'localhost,127.0.0.1').split(',')
 
 # File Upload Settings - Allow large chapter files (up to 500MB)
 DATA_UPLOAD_MAX_MEMORY_SIZE = 524288000  # 500 MB
-FILE_UPLOAD_MAX_MEMORY_SIZE = 524288000  # 500 MB  
+# Larger uploads are streamed to a temp file instead of being held in RAM
+FILE_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10 MB
+FILE_UPLOAD_TEMP_DIR = os.getenv('FILE_UPLOAD_TEMP_DIR') or None
 DATA_UPLOAD_MAX_NUMBER_FIELDS = 10000  # Increase field limit
+# Resumable chunked uploads (manga.services.resumable_upload)
+UPLOAD_CHUNK_MAX_SIZE = int(os.getenv('UPLOAD_CHUNK_MAX_SIZE', 8 * 1024 * 1024))  # 8 MB
+UPLOAD_SESSION_TTL = int(os.getenv('UPLOAD_SESSION_TTL', 24 * 3600))
+# Analyzed archives kept for the upload that follows (manga.services.archive_staging)
+ARCHIVE_STAGING_TTL = int(os.getenv('ARCHIVE_STAGING_TTL', 6 * 3600))
+# Threads decompressing, verifying and writing the pages of an archive
+ARCHIVE_EXTRACT_WORKERS = int(os.getenv('ARCHIVE_EXTRACT_WORKERS', 8))
 
 
 # Application definition
@@ -224,6 +234,75 @@ else:
         }
     }
 
+# Background Tasks (Celery)
+# Uploads, translation jobs, publishing and notifications run in separate
+# worker processes (commands in config/celery.py), which need a broker:
+# CELERY_BROKER_URL or REDIS_URL. Tasks run eagerly in the calling process
+# only under `manage.py test`, or with CELERY_TASK_ALWAYS_EAGER=True for
+# local development without workers (uploads and translations then run
+# inside the HTTP request).
+TESTING = 'test' in sys.argv[1:2]
+CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', REDIS_URL or '')
+CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND', None)
+CELERY_TASK_ALWAYS_EAGER = os.getenv('CELERY_TASK_ALWAYS_EAGER', str(TESTING)) == 'True'
+if not CELERY_BROKER_URL:
+    if not CELERY_TASK_ALWAYS_EAGER:
+        from django.core.exceptions import ImproperlyConfigured
+        raise ImproperlyConfigured(
+            'Background tasks need a broker: set REDIS_URL or CELERY_BROKER_URL '
+            '(or CELERY_TASK_ALWAYS_EAGER=True to run tasks inside requests)'
+        )
+    CELERY_BROKER_URL = 'memory://'
+CELERY_TASK_EAGER_PROPAGATES = False
+CELERY_TASK_IGNORE_RESULT = True
+
+# A task is acknowledged only after it finished; a task of a worker that
+# died is delivered again (every task resumes from its own checkpoints)
+CELERY_TASK_ACKS_LATE = True
+CELERY_TASK_REJECT_ON_WORKER_LOST = True
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+# Should exceed the longest task, or Redis redelivers it while it still
+# runs (a redelivered translation task waits while its job's heartbeat is
+# fresh, see manga/tasks.py)
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    'visibility_timeout': int(os.getenv('CELERY_VISIBILITY_TIMEOUT', 4 * 3600)),
+}
+
+CELERY_TASK_DEFAULT_QUEUE = 'default'
+CELERY_TASK_ROUTES = {
+    'manga.tasks.upload_chapter_archive': {'queue': 'uploads'},
+    'manga.tasks.run_translation_job': {'queue': 'translation'},
+    'manga.tasks.publish_translated_chapter': {'queue': 'publishing'},
+    'manga.tasks.notify_users': {'queue': 'notifications'},
+    'manga.tasks.notify_bookmarked_users': {'queue': 'notifications'},
+}
+CELERY_TIMEZONE = TIME_ZONE
+
+# Shared between web and worker containers (uploaded archives, translated pages)
+MEDIA_ROOT = os.getenv('MEDIA_ROOT', '')
+
+# Chapter page storage: imgbb | local | s3 (pages are deduplicated by SHA-256)
+IMAGE_STORAGE_BACKEND = os.getenv('IMAGE_STORAGE_BACKEND', 'imgbb')
+IMAGE_STORAGE_LOCAL_DIR = os.getenv('IMAGE_STORAGE_LOCAL_DIR', '')
+IMAGE_STORAGE_LOCAL_URL = os.getenv('IMAGE_STORAGE_LOCAL_URL', '/media/images/')
+
+# S3-compatible object storage (AWS S3, or MinIO locally)
+S3_ENDPOINT_URL = os.getenv('S3_ENDPOINT_URL')
+S3_BUCKET = os.getenv('S3_BUCKET', 'mangatk')
+S3_ACCESS_KEY_ID = os.getenv('S3_ACCESS_KEY_ID')
+S3_SECRET_ACCESS_KEY = os.getenv('S3_SECRET_ACCESS_KEY')
+S3_REGION = os.getenv('S3_REGION', 'us-east-1')
+S3_PUBLIC_URL = os.getenv('S3_PUBLIC_URL')
+# Endpoint put in presigned URLs when clients reach the store at another address
+S3_PRESIGN_ENDPOINT_URL = os.getenv('S3_PRESIGN_ENDPOINT_URL')
+
+# Chapter archives uploaded by the client straight to S3 (manga.services.direct_upload)
+DIRECT_UPLOAD_EXPIRES = int(os.getenv('DIRECT_UPLOAD_EXPIRES', 3600))
+DIRECT_UPLOAD_MAX_SIZE = int(os.getenv('DIRECT_UPLOAD_MAX_SIZE', DATA_UPLOAD_MAX_MEMORY_SIZE))
+
+# Modal chapter API; derived from MODAL_ENDPOINT_URL when empty
+MODAL_CHAPTERS_URL = os.getenv('MODAL_CHAPTERS_URL', '')
+
 # ImgBB API Configuration
 IMGBB_API_KEY = os.getenv('IMGBB_API_KEY')
 IMGBB_API_URL = 'https://api.imgbb.com/1/upload'
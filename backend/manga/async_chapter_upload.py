@@ -12,18 +12,48 @@ from rest_framework import status
 from django.core.cache import cache
 import uuid
 import zipfile
-import io
-import os
 from datetime import datetime
 
-from .models import Manga, Chapter, ChapterImage, Notification, UserBookmark
-from .services.imgbb import ImgBBService
-from .services.async_upload import async_upload_service
+from .models import Manga, Chapter
+from .services import direct_upload
+from .services.archive_ingest import chapter_image_members, store_upload
+from .services.async_upload import JOB_TIMEOUT, async_upload_service
+from .services.archive_staging import resolve_upload
+from .tasks import chapter_upload_path, upload_chapter_archive
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+def _prepare_chapter(manga, number, title, release_date_str):
+    """Create the chapter, or clear the pages of an existing one."""
+    release_date = None
+    if release_date_str:
+        try:
+            release_date = datetime.strptime(release_date_str, '%Y-%m-%d').date()
+        except ValueError:
+            pass
+    
+    defaults = {'title': title or f'{manga.title} - الفصل {number}'}
+    if release_date:
+        defaults['release_date'] = release_date
+    
+    chapter, created = Chapter.objects.get_or_create(
+        manga=manga,
+        number=float(number),
+        defaults=defaults
+    )
+    
+    if not created:
+        # Clear existing images
+        chapter.images.all().delete()
+        chapter.title = title or chapter.title
+        if release_date:
+            chapter.release_date = release_date
+        chapter.save()
+    return chapter
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated, IsAdminUser])
 def start_async_chapter_upload(request):
@@ -37,7 +67,8 @@ def start_async_chapter_upload(request):
         - chapter_number: float
         - title: string (optional)
         - release_date: YYYY-MM-DD (optional)
-        - file: ZIP/CBZ
+        - file: ZIP/CBZ (or upload_id of a finalized resumable upload, or
+          staging_id from /api/chapters/analyze-zip/)
     
     Returns:
         - job_id: UUID للعملية
@@ -48,7 +79,7 @@ def start_async_chapter_upload(request):
         number = request.data.get('number')
         title = request.data.get('title', '')
         release_date_str = request.data.get('release_date', '')
-        uploaded_file = request.FILES.get('file')
+        uploaded_file = resolve_upload(request)
         
         # Validation
         if not all([manga_id, number, uploaded_file]):
@@ -70,59 +101,37 @@ def start_async_chapter_upload(request):
                 'error': 'الملف يجب أن يكون ZIP أو CBZ'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Parse release date
-        release_date = None
-        if release_date_str:
-            try:
-                release_date = datetime.strptime(release_date_str, '%Y-%m-%d').date()
-            except ValueError:
-                pass
-        
-        # Create/update chapter
-        defaults = {'title': title or f'{manga.title} - الفصل {number}'}
-        if release_date:
-            defaults['release_date'] = release_date
+        # A staged archive (analyze-zip) was already analyzed
+        staged = getattr(uploaded_file, 'staged', None)
+        if staged and not staged['analysis']['valid']:
+            return Response({
+                'error': staged['analysis']['error']
+            }, status=status.HTTP_400_BAD_REQUEST)
         
-        chapter, created = Chapter.objects.get_or_create(
-            manga=manga,
-            number=float(number),
-            defaults=defaults
-        )
+        chapter = _prepare_chapter(manga, number, title, release_date_str)
         
-        if not created:
-            # Clear existing images
-            chapter.images.all().delete()
-            chapter.title = title or chapter.title
-            if release_date:
-                chapter.release_date = release_date
-            chapter.save()
+        # Generate job ID
+        job_id = str(uuid.uuid4())
         
-        # Extract images from ZIP FIRST
-        image_extensions = ('.jpg', '.jpeg', '.png', '.webp', '.gif')
-        image_data_list = []
+        # Store the archive where the upload worker can read it (large
+        # uploads are already on disk and are moved, not copied)
+        archive_path = store_upload(uploaded_file, chapter_upload_path(job_id))
         
-        try:
-            with zipfile.ZipFile(uploaded_file, 'r') as zip_file:
-                image_files = sorted([
-                    f for f in zip_file.namelist()
-                    if f.lower().endswith(image_extensions) and not f.startswith('__MACOSX')
-                ])
-                
-                for page_num, filename in enumerate(image_files, 1):
-                    file_data = zip_file.read(filename)
-                    image_data_list.append({
-                        'data': file_data,
-                        'filename': os.path.basename(filename),
-                        'page_num': page_num,
-                        'name': f"{manga.title}_ch{int(float(number)):03d}_p{page_num:03d}"
-                    })
-                
-        except zipfile.BadZipFile:
-            return Response({
-                'error': 'Invalid ZIP/CBZ file'
-            }, status=status.HTTP_400_BAD_REQUEST)
+        # Count images from the ZIP directory; pages are read by the worker
+        if staged:
+            total_images = staged['analysis']['image_count']
+        else:
+            try:
+                with zipfile.ZipFile(archive_path, 'r') as zip_file:
+                    total_images = len(chapter_image_members(zip_file))
+            except zipfile.BadZipFile:
+                archive_path.unlink(missing_ok=True)
+                return Response({
+                    'error': 'Invalid ZIP/CBZ file'
+                }, status=status.HTTP_400_BAD_REQUEST)
         
-        if not image_data_list:
+        if not total_images:
+            archive_path.unlink(missing_ok=True)
             return Response({
                 'error': 'لا توجد صور في الملف'
             }, status=status.HTTP_400_BAD_REQUEST)
@@ -130,162 +139,28 @@ def start_async_chapter_upload(request):
         # NOW set upload status with correct count
         chapter.upload_status = 'uploading'
         chapter.uploaded_images_count = 0
-        chapter.total_images_count = len(image_data_list)
+        chapter.total_images_count = total_images
         chapter.save(update_fields=['upload_status', 'uploaded_images_count', 'total_images_count'])
-        logger.info(f"📦 Extracted {len(image_data_list)} images from ZIP, starting upload for chapter {chapter.id}")
+        logger.info(f"📦 Stored ZIP with {total_images} images, starting upload for chapter {chapter.id}")
         
-        # Generate job ID
-        job_id = str(uuid.uuid4())
-        
-        # Store job info in cache
-        cache.set(f'upload_job_{job_id}', {
-            'status': 'started',
-            'total': len(image_data_list),
-            'completed': 0,
-            'failed': 0,
-            'chapter_id': str(chapter.id),
-            'manga_id': str(manga_id),
-            'uploader_id': request.user.id,
-            'results': [],
-            'errors': []
-        }, timeout=3600)  # 1 hour
-        
-        # Upload function for single image
-        def upload_single_image(image_info):
-            try:
-                # Create BytesIO object from binary data
-                file_obj = io.BytesIO(image_info['data'])
-                file_obj.name = image_info['filename']  # Add name attribute
-                file_obj.seek(0)  # Reset pointer to beginning
-                
-                logger.info(f"🔄 Uploading image: {image_info['filename']} (page {image_info['page_num']})")
-                
-                result = ImgBBService.upload_image(file_obj, image_info['name'])
-                
-                if result:
-                    # Create ChapterImage record
-                    ChapterImage.objects.create(
-                        chapter=chapter,
-                        page_number=image_info['page_num'],
-                        image_url=result['url'],
-                        width=result.get('width'),
-                        height=result.get('height'),
-                        original_filename=image_info['filename']
-                    )
-                    
-                    # Update chapter progress - LIKE TRANSLATION!
-                    chapter.uploaded_images_count += 1
-                    chapter.save(update_fields=['uploaded_images_count'])
-                    logger.info(f"✅ Uploaded page {image_info['page_num']} ({chapter.uploaded_images_count}/{chapter.total_images_count})")
-                    
-                    return {
-                        'success': True,
-                        'page_num': image_info['page_num'],
-                        'url': result['url']
-                    }
-                else:
-                    logger.error(f"❌ ImgBB returned None for {image_info['filename']}")
-                    raise Exception(f"فشل رفع الصورة {image_info['filename']}")
-            except Exception as e:
-                logger.error(f"❌ Error uploading {image_info['filename']}: {str(e)}")
-                raise Exception(f"فشل رفع الصورة {image_info['filename']}: {str(e)}")
-        
-        # Progress callback
-        def on_progress(current, total, result):
-            job_data = cache.get(f'upload_job_{job_id}')
-            if job_data:
-                job_data['completed'] = current
-                job_data['status'] = 'uploading'
-                job_data['results'].append(result)
-                cache.set(f'upload_job_{job_id}', job_data, timeout=3600)
-        
-        # Grab variables for async scope
-        user_id = request.user.id if hasattr(request, 'user') and request.user.is_authenticated else None
-        manga_id = chapter.manga.id
-        chapter_title = f"{chapter.manga.title} - Chapter {chapter.number}"
-        
-        # Complete callback
-        def on_complete(results):
-            job_data = cache.get(f'upload_job_{job_id}')
-            if job_data:
-                job_data['status'] = 'completed'
-                job_data['completed'] = results['completed']
-                job_data['failed'] = results['failed']
-                job_data['errors'] = results['errors']
-                cache.set(f'upload_job_{job_id}', job_data, timeout=3600)
-            
-            from django.db import close_old_connections
-            import traceback
-            
-            # Ensure fresh DB connection in this thread
-            close_old_connections()
-            
-            try:
-                # Update chapter status
-                chapter.upload_status = 'completed'
-                chapter.save()
-                logger.info(f"Chapter upload job {job_id} completed")
-            except Exception as e:
-                logger.error(f"Failed to update chapter status: {str(e)}")
-            logger.info(f"Chapter upload job {job_id} completed")
-            
-            try:
-                # Notify Uploader
-                if user_id:
-                    from django.contrib.auth import get_user_model
-                    User = get_user_model()
-                    uploader = User.objects.get(id=user_id)
-                    Notification.objects.create(
-                        user=uploader,
-                        title="اكتمل الرفع",
-                        message=f"تم الانتهاء من رفع {chapter_title} بنجاح",
-                        link=f"/dashboard/manga/{manga_id}",
-                        notification_type='upload'
-                    )
-                
-                # Notify bookmarked users
-                bookmarks = UserBookmark.objects.filter(manga_id=manga_id)
-                for bookmark in bookmarks:
-                    if bookmark.user.id != user_id:
-                        Notification.objects.create(
-                            user=bookmark.user,
-                            title="فصل جديد متاح!",
-                            message=f"يتوفر الآن فصل جديد {chapter_title} من المانجا المفضلة لديك",
-                            link=f"/manga/{manga_id}",
-                            notification_type='chapter'
-                        )
-            except Exception as e:
-                logger.error(f"Notification creation failed: {str(e)}\n{traceback.format_exc()}")
-            finally:
-                # Release DB connection for this thread to avoid leaks
-                close_old_connections()
-                
-        # Error callback
-        def on_error(error):
-            job_data = cache.get(f'upload_job_{job_id}')
-            if job_data:
-                job_data['status'] = 'failed'
-                job_data['error'] = error.get('error', 'Unknown error')
-                cache.set(f'upload_job_{job_id}', job_data, timeout=3600)
-            logger.error(f"Chapter upload job {job_id} failed: {error}")
-        
-        # Start async upload
-        logger.info(f"Starting async upload for job {job_id} with {len(image_data_list)} images")
-        async_upload_service.upload_images_async(
-            job_id=job_id,
-            images=image_data_list,
-            upload_function=upload_single_image,
-            on_progress=on_progress,
-            on_complete=on_complete,
-            on_error=on_error
+        # Store job info in cache (shared by every web and upload worker)
+        async_upload_service.create_job(
+            job_id,
+            total=total_images,
+            chapter_id=str(chapter.id),
+            manga_id=str(manga_id),
+            uploader_id=request.user.id
         )
         
+        # Pages are uploaded by the uploads worker (manga.tasks)
+        upload_chapter_archive.delay(job_id, str(chapter.id), request.user.id)
+        
         logger.info(f"Started async upload job {job_id} for chapter {chapter.id}")
         
         return Response({
             'job_id': job_id,
             'chapter_id': str(chapter.id),
-            'total_images': len(image_data_list),
+            'total_images': total_images,
             'message': 'بدأت عملية الرفع'
         }, status=status.HTTP_201_CREATED)
         
@@ -296,6 +171,154 @@ def start_async_chapter_upload(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def request_direct_upload(request):
+    """
+    طلب رابط رفع مباشر إلى التخزين (S3 / MinIO)
+    
+    POST /api/chapters/direct-upload/
+    
+    The archive goes from the client straight to storage, so the web
+    workers are not tied up by the transfer.
+    
+    Body:
+        - manga: UUID
+        - number: float
+        - title: string (optional)
+        - release_date: YYYY-MM-DD (optional)
+        - filename: اسم ملف ZIP/CBZ
+    
+    Returns:
+        - job_id: UUID للعملية
+        - upload: {url, fields, key, max_size, expires_in}
+          رفع الملف بـ multipart POST إلى url مع fields ثم حقل file
+    """
+    if not direct_upload.is_enabled():
+        return Response({
+            'error': 'الرفع المباشر غير مفعل'
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    
+    manga_id = request.data.get('manga')
+    number = request.data.get('number')
+    filename = request.data.get('filename', '')
+    
+    if not all([manga_id, number, filename]):
+        return Response({
+            'error': 'manga, number, and filename are required'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    if not filename.lower().endswith(('.zip', '.cbz')):
+        return Response({
+            'error': 'الملف يجب أن يكون ZIP أو CBZ'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    if not Manga.objects.filter(id=manga_id).exists():
+        return Response({
+            'error': 'المانجا غير موجودة'
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    job_id = str(uuid.uuid4())
+    try:
+        target = direct_upload.create_upload_target(job_id)
+    except Exception as e:
+        logger.error(f"Failed to create direct upload target: {e}")
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    
+    # The chapter is only touched once the archive is in storage
+    async_upload_service.create_job(
+        job_id,
+        status='awaiting_upload',
+        manga_id=str(manga_id),
+        number=number,
+        title=request.data.get('title', ''),
+        release_date=request.data.get('release_date', ''),
+        uploader_id=request.user.id,
+        storage_key=target['key']
+    )
+    
+    return Response({
+        'job_id': job_id,
+        'upload': target
+    }, status=status.HTTP_201_CREATED)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def complete_direct_upload(request, job_id):
+    """
+    إبلاغ الخادم بانتهاء الرفع المباشر وبدء رفع الصفحات
+    
+    POST /api/chapters/direct-upload/<job_id>/complete/
+    
+    Returns:
+        - job_id, chapter_id
+        - progress via /api/chapters/upload-progress/<job_id>/
+    """
+    job_data = async_upload_service.get_job_status(job_id)
+    if not job_data or not job_data.get('storage_key'):
+        return Response({
+            'error': 'Job not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    if job_data.get('uploader_id') != request.user.id:
+        return Response({
+            'error': 'غير مصرح'
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    if job_data['status'] != 'awaiting_upload':
+        return Response({
+            'error': 'تم بدء هذه العملية بالفعل',
+            'status': job_data['status']
+        }, status=status.HTTP_409_CONFLICT)
+    
+    # Only one complete call starts the upload
+    started_key = f'{async_upload_service.job_key(job_id)}:started'
+    if not cache.add(started_key, 1, timeout=JOB_TIMEOUT):
+        return Response({
+            'error': 'تم بدء هذه العملية بالفعل',
+            'status': 'started'
+        }, status=status.HTTP_409_CONFLICT)
+    
+    size = direct_upload.uploaded_size(job_data['storage_key'])
+    if size is None:
+        cache.delete(started_key)
+        return Response({
+            'error': 'الملف لم يُرفع بعد'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        manga = Manga.objects.get(id=job_data['manga_id'])
+    except Manga.DoesNotExist:
+        direct_upload.delete_upload(job_data['storage_key'])
+        async_upload_service.update_job(job_id, status='failed', error='المانجا غير موجودة')
+        cache.delete(started_key)
+        return Response({
+            'error': 'المانجا غير موجودة'
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    chapter = _prepare_chapter(manga, job_data['number'], job_data['title'], job_data['release_date'])
+    
+    # The page count is set by the upload worker once it has the archive
+    chapter.upload_status = 'uploading'
+    chapter.uploaded_images_count = 0
+    chapter.total_images_count = 0
+    chapter.save(update_fields=['upload_status', 'uploaded_images_count', 'total_images_count'])
+    
+    async_upload_service.update_job(job_id, status='started', chapter_id=str(chapter.id), size=size)
+    upload_chapter_archive.delay(job_id, str(chapter.id), request.user.id, storage_key=job_data['storage_key'])
+    
+    logger.info(f"Direct upload job {job_id} ({size} bytes) queued for chapter {chapter.id}")
+    
+    return Response({
+        'job_id': job_id,
+        'chapter_id': str(chapter.id),
+        'message': 'بدأت عملية الرفع'
+    }, status=status.HTTP_202_ACCEPTED)
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated, IsAdminUser])
 def get_upload_progress(request, job_id):
@@ -311,7 +334,7 @@ def get_upload_progress(request, job_id):
         - failed: عدد الصور الفاشلة
         - percentage: النسبة المئوية
     """
-    job_data = cache.get(f'upload_job_{job_id}')
+    job_data = async_upload_service.get_job_status(job_id)
     
     if not job_data:
         return Response({
@@ -342,16 +365,13 @@ def cancel_upload(request, job_id):
     
     DELETE /api/chapters/cancel-upload/<job_id>/
     """
-    # Try to cancel in async service
-    cancelled = async_upload_service.cancel_job(job_id)
-    
-    # Update cache
-    job_data = cache.get(f'upload_job_{job_id}')
-    if job_data:
-        job_data['status'] = 'cancelled'
-        cache.set(f'upload_job_{job_id}', job_data, timeout=3600)
-    
-    if cancelled or job_data:
+    # The upload worker sees the cancel after its next page and drops the
+    # pages it has not started
+    job_data = async_upload_service.get_job_status(job_id)
+    if async_upload_service.cancel_job(job_id):
+        if job_data and job_data['status'] == 'awaiting_upload' and job_data.get('storage_key'):
+            # No worker will fetch a direct upload that was never completed
+            direct_upload.delete_upload(job_data['storage_key'])
         return Response({
             'message': 'تم إلغاء العملية'
         })
@@ -3,7 +3,8 @@ from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
 from django.utils import timezone
 from datetime import timedelta
-from .models import ImgBBUploadStats
+from .services.imgbb import ImgBBService
+from .services.imgbb_usage import daily_counts, record_upload
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -21,12 +22,11 @@ def track_imgbb_upload(request):
     if count <= 0:
         return Response({'success': True})
         
-    today = timezone.localtime().date()
-    stats, created = ImgBBUploadStats.objects.get_or_create(date=today)
-    stats.count += count
-    stats.save()
+    # Aggregated in the cache and flushed to ImgBBUploadStats in the background
+    record_upload(count)
     
-    return Response({'success': True, 'today_count': stats.count})
+    today = timezone.localdate()
+    return Response({'success': True, 'today_count': daily_counts([today])[today]})
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -34,24 +34,20 @@ def get_imgbb_stats(request):
     """
     Get ImgBB upload stats for today, yesterday, and two days ago.
     """
-    today = timezone.localtime().date()
+    today = timezone.localdate()
     yesterday = today - timedelta(days=1)
     two_days_ago = today - timedelta(days=2)
     
-    stats = ImgBBUploadStats.objects.filter(date__gte=two_days_ago)
+    # Stored counts plus increments not flushed yet
+    counts = daily_counts([today, yesterday, two_days_ago])
     
     data = {
-        'today': 0,
-        'yesterday': 0,
-        'two_days_ago': 0
+        'today': counts[today],
+        'yesterday': counts[yesterday],
+        'two_days_ago': counts[two_days_ago]
     }
     
-    for stat in stats:
-        if stat.date == today:
-            data['today'] = stat.count
-        elif stat.date == yesterday:
-            data['yesterday'] = stat.count
-        elif stat.date == two_days_ago:
-            data['two_days_ago'] = stat.count
+    # Latency / bytes / retries of the uploads made by this worker process
+    data['client'] = ImgBBService.metrics()
             
     return Response(data)
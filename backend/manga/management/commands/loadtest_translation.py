@@ -0,0 +1,126 @@
+"""
+Django Management Command to load-test the Modal translation path.
+Drives ModalTranslationClient at a fixed concurrency and reports
+throughput and latency percentiles.
+"""
+import zipfile
+import io
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+from PIL import Image
+
+from manga.services.archive_ingest import chapter_image_members
+from manga.services.ai.modal_client import ModalTranslationClient
+from manga.services.ai.local_endpoint import run_load_test
+from manga.services.ai.profiles import PIPELINE_PROFILES
+
+
+class Command(BaseCommand):
+    help = 'Send pages to the translation endpoint at fixed concurrency and report latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url',
+            type=str,
+            help='Translate endpoint URL (default: settings.MODAL_ENDPOINT_URL)'
+        )
+        parser.add_argument(
+            '--archive',
+            type=str,
+            help='ZIP/CBZ whose pages are used as the request payloads'
+        )
+        parser.add_argument(
+            '--image',
+            type=str,
+            action='append',
+            default=[],
+            help='Image file to send (repeatable)'
+        )
+        parser.add_argument(
+            '--size',
+            type=str,
+            default='1200x1800',
+            help='Synthetic page size WxH when no image/archive is given (default: 1200x1800)'
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=100,
+            help='Total number of pages to send (default: 100)'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=4,
+            help='Number of in-flight requests (default: 4)'
+        )
+        parser.add_argument('--source-lang', type=str, default='ja')
+        parser.add_argument('--target-lang', type=str, default='ar')
+        parser.add_argument(
+            '--profile',
+            choices=list(PIPELINE_PROFILES),
+            help='Pipeline profile sent with every page (default: endpoint default)'
+        )
+
+    def _load_images(self, options):
+        images = []
+
+        if options['archive']:
+            with zipfile.ZipFile(options['archive'], 'r') as zf:
+                for name in chapter_image_members(zf):
+                    images.append(Image.open(io.BytesIO(zf.read(name))).convert('RGB'))
+
+        for path in options['image']:
+            images.append(Image.open(path).convert('RGB'))
+
+        if not images:
+            try:
+                width, height = (int(v) for v in options['size'].lower().split('x'))
+            except ValueError:
+                raise CommandError('--size must look like 1200x1800')
+            images.append(Image.new('RGB', (width, height), (255, 255, 255)))
+
+        return images
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError('--requests and --concurrency must be positive')
+
+        url = options['url'] or getattr(settings, 'MODAL_ENDPOINT_URL', '')
+        try:
+            client = ModalTranslationClient(url)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        health = client.health_check()
+        self.stdout.write(f"Endpoint: {client.translate_url}")
+        self.stdout.write(f"Health:   {health}")
+
+        images = self._load_images(options)
+        self.stdout.write(
+            f"Sending {options['requests']} pages ({len(images)} distinct) "
+            f"at concurrency {options['concurrency']}..."
+        )
+
+        report = run_load_test(
+            client,
+            images,
+            total_requests=options['requests'],
+            concurrency=options['concurrency'],
+            source_lang=options['source_lang'],
+            target_lang=options['target_lang'],
+            profile=options['profile'],
+        )
+
+        latency = report['latency_ms']
+        self.stdout.write(self.style.SUCCESS(
+            f"\nSucceeded: {report['succeeded']}/{report['requests']} "
+            f"in {report['wall_seconds']:.2f}s → {report['throughput']:.2f} pages/s"
+        ))
+        if report['failed']:
+            self.stdout.write(self.style.ERROR(f"Failed: {report['failed']} {report['errors']}"))
+        self.stdout.write(
+            f"Latency (ms): min {latency['min']:.0f} | mean {latency['mean']:.0f} | "
+            f"p50 {latency['p50']:.0f} | p90 {latency['p90']:.0f} | "
+            f"p95 {latency['p95']:.0f} | p99 {latency['p99']:.0f} | max {latency['max']:.0f}"
+        )
@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+from manga.services.ai import model_bundle
+
+
+class Command(BaseCommand):
+    help = 'Materializes the configured AI models into the local offline bundle (safetensors + checksummed manifest)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--only', nargs='+', choices=sorted(model_bundle.BUNDLED_MODELS),
+            help='Only prepare these models'
+        )
+        parser.add_argument('--force', action='store_true', help='Rebuild models that are already bundled')
+        parser.add_argument('--verify', action='store_true', help='Only verify the checksums of the existing bundle')
+
+    def handle(self, *args, **options):
+        directory = model_bundle.bundle_dir()
+        names = options['only'] or sorted(model_bundle.BUNDLED_MODELS)
+
+        if options['verify']:
+            problems = []
+            for name in names:
+                problems.extend(model_bundle.verify_model(name, directory))
+            for problem in problems:
+                self.stdout.write(self.style.ERROR(problem))
+            if problems:
+                raise CommandError(f"Model bundle at {directory} failed verification")
+            self.stdout.write(self.style.SUCCESS(f"Model bundle at {directory} verified ({len(names)} models)"))
+            return
+
+        sources = model_bundle.configured_sources()
+        manifest = model_bundle.load_manifest(directory)
+
+        for name in names:
+            source = sources.get(name)
+            if not source:
+                self.stdout.write(self.style.WARNING(f"{name}: not configured, skipping"))
+                continue
+
+            if not options['force'] and model_bundle.bundled_model_path(name, source, directory):
+                self.stdout.write(f"{name}: already bundled from {source}")
+                continue
+
+            self.stdout.write(f"{name}: preparing from {source}...")
+            manifest['models'][name] = model_bundle.prepare_model(name, source, directory)
+            # Written after each model so an interrupted run keeps what it finished
+            model_bundle.write_manifest(manifest, directory)
+
+            size_mb = sum(f['size'] for f in manifest['models'][name]['files'].values()) / (1024 * 1024)
+            self.stdout.write(self.style.SUCCESS(f"{name}: bundled ({size_mb:.1f} MB)"))
+
+        self.stdout.write(self.style.SUCCESS(f"Model bundle ready at {directory}"))
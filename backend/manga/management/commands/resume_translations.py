@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from manga.models import TranslationJob
+from manga.services.translation_jobs import TranslationJobRunner
+
+
+class Command(BaseCommand):
+    help = 'Resumes translation jobs interrupted by a worker restart (from their first unfinished page)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--stale-minutes', type=int, default=15,
+            help='Only resume jobs with no page progress for this long (default: 15)'
+        )
+        parser.add_argument('--dry-run', action='store_true', help='List the jobs without running them')
+
+    def handle(self, *args, **options):
+        # updated_at is bumped after every finished page, so a live worker
+        # keeps its job out of this query
+        threshold = timezone.now() - timezone.timedelta(minutes=options['stale_minutes'])
+        stale_jobs = TranslationJob.objects.filter(
+            status='translating',
+            updated_at__lt=threshold
+        ).order_by('created_at')
+
+        self.stdout.write(f"Found {stale_jobs.count()} interrupted translation jobs.")
+
+        count = 0
+        for job in stale_jobs:
+            remaining = job.pages.exclude(status__in=('completed', 'skipped')).count()
+            if not job.pages.exists():
+                self.stdout.write(self.style.WARNING(f"Job {job.id} has no page records, skipping"))
+                continue
+
+            self.stdout.write(f"Job {job.id}: {remaining} of {job.total_pages} pages left")
+            if options['dry_run']:
+                continue
+
+            TranslationJobRunner.run(job.id)
+            job.refresh_from_db()
+            if job.status == 'completed':
+                count += 1
+                self.stdout.write(self.style.SUCCESS(f"Resumed job {job.id}"))
+            else:
+                self.stdout.write(self.style.ERROR(f"Job {job.id} ended as {job.status}: {job.error_message}"))
+
+        self.stdout.write(self.style.SUCCESS(f"Resume complete. {count} jobs finished."))
@@ -0,0 +1,98 @@
+"""
+Django Management Command to serve a local Modal-compatible translation endpoint.
+Point MODAL_ENDPOINT_URL at http://<host>:<port>/translate to use it; the
+chapters API is derived from it (http://<host>:<port>/chapters).
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from manga.services.ai.local_endpoint import (
+    StubTranslationBackend,
+    LocalPipelineBackend,
+    TranslationEndpointServer,
+)
+
+
+class Command(BaseCommand):
+    help = 'Serve the Modal translate/health HTTP contract locally (stub or local pipeline)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--host',
+            type=str,
+            default='127.0.0.1',
+            help='Interface to bind (default: 127.0.0.1)'
+        )
+        parser.add_argument(
+            '--port',
+            type=int,
+            default=8765,
+            help='Port to listen on (default: 8765)'
+        )
+        parser.add_argument(
+            '--backend',
+            choices=['stub', 'local'],
+            default='stub',
+            help='stub = no models, local = MangaTranslationPipeline (default: stub)'
+        )
+        parser.add_argument(
+            '--chapter-workers',
+            type=int,
+            default=4,
+            help='Pages translated in parallel for submitted chapters (default: 4)'
+        )
+        parser.add_argument(
+            '--latency-ms',
+            type=float,
+            default=0,
+            help='Stub: base latency per page in milliseconds'
+        )
+        parser.add_argument(
+            '--jitter-ms',
+            type=float,
+            default=0,
+            help='Stub: uniform +/- jitter added to the latency'
+        )
+        parser.add_argument(
+            '--error-rate',
+            type=float,
+            default=0.0,
+            help='Stub: fraction of requests answered with HTTP 500 (0.0-1.0)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            help='Stub: random seed for reproducible latency/error sequences'
+        )
+
+    def handle(self, *args, **options):
+        if options['backend'] == 'local':
+            backend = LocalPipelineBackend()
+        else:
+            backend = StubTranslationBackend(
+                latency_ms=options['latency_ms'],
+                jitter_ms=options['jitter_ms'],
+                error_rate=options['error_rate'],
+                seed=options['seed'],
+            )
+
+        try:
+            server = TranslationEndpointServer(
+                (options['host'], options['port']),
+                backend,
+                chapter_workers=options['chapter_workers'],
+            )
+        except OSError as e:
+            raise CommandError(f"Could not bind {options['host']}:{options['port']}: {e}")
+
+        host, port = server.server_address[:2]
+        self.stdout.write(self.style.SUCCESS(f'Serving {backend.name} translation endpoint'))
+        self.stdout.write(f'  MODAL_ENDPOINT_URL=http://{host}:{port}/translate')
+        self.stdout.write(f'  Health: http://{host}:{port}/health')
+        self.stdout.write(f'  MODAL_CHAPTERS_URL=http://{host}:{port}/chapters')
+
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            self.stdout.write('\nShutting down...')
+        finally:
+            server.server_close()
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('manga', '0022_user_display_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='translationjob',
+            name='profile',
+            field=models.CharField(choices=[('fast', 'سريع'), ('balanced', 'متوازن'), ('best', 'أفضل جودة')], default='balanced', help_text='إعداد السرعة/الجودة', max_length=20),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('manga', '0023_translationjob_profile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='translationjob',
+            name='prescan',
+            field=models.JSONField(blank=True, default=dict, help_text='الصفحات التي تحتوي نصاً وعدد الفقاعات'),
+        ),
+    ]
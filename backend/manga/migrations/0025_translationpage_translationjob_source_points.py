@@ -0,0 +1,48 @@
+# Generated by Django 5.2.4 on 2026-10-19 11:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('manga', '0024_translationjob_prescan'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='translationjob',
+            name='source',
+            field=models.CharField(choices=[('user', 'مستخدم'), ('dashboard', 'لوحة التحكم')], default='user', help_text='مصدر الطلب', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='translationjob',
+            name='points_charged',
+            field=models.IntegerField(default=0, help_text='النقاط المخصومة (تسترجع عند الفشل)'),
+        ),
+        migrations.CreateModel(
+            name='TranslationPage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('page_number', models.PositiveIntegerField()),
+                ('status', models.CharField(choices=[('pending', 'بالانتظار'), ('completed', 'مكتملة'), ('skipped', 'بدون نص'), ('failed', 'فشلت')], default='pending', max_length=20)),
+                ('filename', models.CharField(blank=True, max_length=500)),
+                ('input_path', models.CharField(blank=True, max_length=500)),
+                ('input_hash', models.CharField(blank=True, help_text='SHA-256 للصورة الأصلية', max_length=64)),
+                ('output_path', models.CharField(blank=True, max_length=500)),
+                ('bubbles_found', models.IntegerField(blank=True, null=True)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('duration_ms', models.IntegerField(blank=True, null=True)),
+                ('error_message', models.TextField(blank=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pages', to='manga.translationjob')),
+            ],
+            options={
+                'verbose_name': 'Translation Page',
+                'verbose_name_plural': 'Translation Pages',
+                'ordering': ['job', 'page_number'],
+                'unique_together': {('job', 'page_number')},
+            },
+        ),
+    ]
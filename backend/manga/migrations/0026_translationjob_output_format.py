@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('manga', '0025_translationpage_translationjob_source_points'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='translationjob',
+            name='output_format',
+            field=models.CharField(blank=True, choices=[('png', 'PNG'), ('webp', 'WebP'), ('avif', 'AVIF'), ('jpeg', 'JPEG')], help_text='صيغة الصفحات المترجمة (فارغ = حسب الإعداد)', max_length=10),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 13:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('manga', '0026_translationjob_output_format'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='translationjob',
+            name='source_language',
+            field=models.CharField(choices=[('japanese', 'اليابانية'), ('chinese', 'الصينية'), ('korean', 'الكورية'), ('english', 'الإنجليزية')], default='japanese', help_text='لغة المصدر', max_length=20),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-19 14:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('manga', '0027_translationjob_source_language'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='subscriptionplan',
+            name='translation_priority',
+            field=models.PositiveSmallIntegerField(default=0, help_text='أولوية الترجمة في قائمة الانتظار (الأعلى أولاً)'),
+        ),
+        migrations.AddField(
+            model_name='translationjob',
+            name='priority',
+            field=models.IntegerField(default=0, help_text='أولوية الجدولة (الأعلى أولاً)'),
+        ),
+        migrations.AddField(
+            model_name='translationjob',
+            name='queued_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='translationjob',
+            name='status',
+            field=models.CharField(choices=[('uploading', 'جاري الرفع'), ('extracting', 'جاري فك الضغط'), ('queued', 'في قائمة الانتظار'), ('translating', 'جاري الترجمة'), ('creating_cbz', 'جاري إنشاء الملف'), ('completed', 'مكتمل'), ('failed', 'فشل')], default='uploading', max_length=20),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.4 on 2026-10-19 15:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('manga', '0028_translation_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='translationjob',
+            name='manga',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='translation_jobs', to='manga.manga'),
+        ),
+        migrations.AddField(
+            model_name='translationjob',
+            name='chapter_number',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='translationjob',
+            name='status',
+            field=models.CharField(choices=[('uploading', 'جاري الرفع'), ('uploaded', 'تم الرفع'), ('extracting', 'جاري فك الضغط'), ('queued', 'في قائمة الانتظار'), ('translating', 'جاري الترجمة'), ('creating_cbz', 'جاري إنشاء الملف'), ('completed', 'مكتمل'), ('failed', 'فشل')], default='uploading', max_length=20),
+        ),
+    ]
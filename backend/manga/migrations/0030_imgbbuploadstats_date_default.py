@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-19 16:00
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('manga', '0029_translationjob_manga_chapter_number'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='imgbbuploadstats',
+            name='date',
+            field=models.DateField(default=django.utils.timezone.localdate, help_text='تاريخ الرفع', unique=True),
+        ),
+    ]
@@ -7,12 +7,22 @@ Models are pre-downloaded into the image at build time for fast cold starts.
 
 Deployment:
     modal deploy modal_app.py
+
+Endpoints:
+    POST .../translate                       single page (+ profile, output_format) → encoded image
+    GET  .../health                          readiness
+    POST .../chapters                        archive upload → {"job_id", "total_pages"}
+    GET  .../chapters/{job_id}               progress + ready page numbers
+    GET  .../chapters/{job_id}/pages/{n}     translated page n (1-based) → encoded image
+    DELETE .../chapters/{job_id}             drop job state and stored pages
 """
 
 import modal
 import io
 import os
+import uuid
 import typing
+import zipfile
 
 try:
     from fastapi import Request
@@ -67,6 +77,7 @@ image = (
         "numpy",
         "huggingface_hub",
         "Pillow",
+        "pillow-avif-plugin",
         "fastapi[standard]",
         "python-multipart",
     )
@@ -77,6 +88,80 @@ image = (
 
 app = modal.App("mangatk-translation", image=image)
 
+# Chapter job state lives in Modal Dicts so the submit/poll endpoints and the
+# fan-out worker can run in different containers.
+#   chapter_jobs[job_id]            -> {"status", "total_pages", "completed_pages", "ready", "failed", "skipped", "error"}
+#   chapter_pages[f"{job_id}:{n}"]  -> translated page bytes (job output_format) for page n
+chapter_jobs = modal.Dict.from_name("mangatk-chapter-jobs", create_if_missing=True)
+chapter_pages = modal.Dict.from_name("mangatk-chapter-pages", create_if_missing=True)
+
+# Keep in sync with manga/services/archive_ingest.py (this app cannot import it)
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.gif')
+
+# Speed/quality presets — keep in sync with manga/services/ai/profiles.py
+PROFILES = {
+    "fast": {"num_beams": 1, "run_sentiment": False, "use_lama": False, "detection_max_side": 1024, "output_format": "jpeg"},
+    "balanced": {"num_beams": 3, "run_sentiment": True, "use_lama": True, "detection_max_side": 1600, "output_format": "webp"},
+    "best": {"num_beams": 5, "run_sentiment": True, "use_lama": True, "detection_max_side": None, "output_format": "png"},
+}
+DEFAULT_PROFILE = "best"  # requests without a profile keep the original behaviour
+
+# output_format → (PIL format, media type, save kwargs) — keep in sync with profiles.OUTPUT_FORMATS
+OUTPUT_FORMATS = {
+    "png": ("PNG", "image/png", {"optimize": True}),
+    "webp": ("WEBP", "image/webp", {"quality": 85, "method": 4}),
+    "avif": ("AVIF", "image/avif", {"quality": 60}),
+    "jpeg": ("JPEG", "image/jpeg", {"quality": 85, "optimize": True, "progressive": True}),
+}
+
+
+# Source language → EasyOCR languages — keep in sync with ocr_service.EASYOCR_LANGUAGES
+EASYOCR_LANGUAGES = {
+    "ja": ("ja", "en"),
+    "zh": ("ch_sim", "en"),
+    "ko": ("ko", "en"),
+    "en": ("en",),
+}
+
+# Written at image build time by modal_init.py (safetensors + manifest.json)
+MODEL_BUNDLE_DIR = "/root/models"
+
+
+def _bundled_model(name):
+    """Path of a model in the image's bundle, or None if it was not bundled."""
+    import json
+    try:
+        with open(os.path.join(MODEL_BUNDLE_DIR, "manifest.json"), encoding="utf-8") as f:
+            entry = json.load(f)["models"].get(name)
+    except (OSError, ValueError, KeyError):
+        return None
+    if not entry:
+        return None
+    model_dir = os.path.join(MODEL_BUNDLE_DIR, entry["path"])
+    if entry.get("weights_file"):
+        return os.path.join(model_dir, entry["weights_file"])
+    return model_dir
+
+
+def _get_profile(name):
+    return PROFILES.get(name or DEFAULT_PROFILE, PROFILES[DEFAULT_PROFILE])
+
+
+def _output_format(profile, output_format=None):
+    """Requested output format if valid, else the profile's default."""
+    if output_format in OUTPUT_FORMATS:
+        return output_format
+    return _get_profile(profile)["output_format"]
+
+
+def _encode_page(image_pil, output_format):
+    if output_format == "avif":
+        import pillow_avif  # noqa: F401  (registers the AVIF encoder)
+    pil_format, _media_type, save_kwargs = OUTPUT_FORMATS[output_format]
+    buf = io.BytesIO()
+    image_pil.save(buf, format=pil_format, **save_kwargs)
+    return buf.getvalue()
+
 # ============================================================
 # 2. Translation Pipeline Class (runs on GPU)
 # ============================================================
@@ -106,24 +191,29 @@ class TranslationPipeline:
 
         # 1. Bubble Detector
         print("  Loading YOLO bubble detector...")
-        from huggingface_hub import hf_hub_download, list_repo_files
-        repo_id = "Bart2277/comic-detector"
-        files = list_repo_files(repo_id)
-        pt_files = [f for f in files if f.endswith('.pt')]
-        weights_path = hf_hub_download(repo_id=repo_id, filename=pt_files[0])
+        weights_path = _bundled_model("bubble_detector")
+        if weights_path is None:
+            from huggingface_hub import hf_hub_download, list_repo_files
+            repo_id = "Bart2277/comic-detector"
+            files = list_repo_files(repo_id)
+            pt_files = [f for f in files if f.endswith('.pt')]
+            weights_path = hf_hub_download(repo_id=repo_id, filename=pt_files[0])
         self.yolo_model = YOLO(weights_path)
 
         # 2. OCR
         print("  Loading OCR models...")
         self.manga_ocr = MangaOcr()
-        self.easyocr_reader = easyocr.Reader(['ja', 'en'], gpu=torch.cuda.is_available())
+        # Other languages' readers are loaded on their first page (_easyocr)
+        self._easyocr_readers = {"ja": easyocr.Reader(['ja', 'en'], gpu=torch.cuda.is_available())}
 
         # 3. Sentiment
         print("  Loading sentiment model...")
+        sentiment_path = _bundled_model("sentiment")
         self.sentiment_analyzer = hf_pipeline(
             "sentiment-analysis",
-            model="Bart2277/sentment_analysis_model_for_comics",
-            device=pt_device
+            model=sentiment_path or "Bart2277/sentment_analysis_model_for_comics",
+            device=pt_device,
+            model_kwargs={"low_cpu_mem_usage": True, "local_files_only": bool(sentiment_path)}
         )
 
         # # 4. Translator
@@ -136,8 +226,13 @@ class TranslationPipeline:
         print("  Loading translation model...")
         # self.translation_model_id = "Helsinki-NLP/opus-mt-ja-ar"
         self.translation_model_id = "Bart2277/JPtoAR_transaltion_model_for_comics"
-        self.tokenizer = AutoTokenizer.from_pretrained(self.translation_model_id, use_fast=False)
-        self.translation_model = AutoModelForSeq2SeqLM.from_pretrained(self.translation_model_id).to(self.device)
+        # Bundled safetensors load offline and memory-mapped
+        translation_path = _bundled_model("translation") or self.translation_model_id
+        local_only = translation_path != self.translation_model_id
+        self.tokenizer = AutoTokenizer.from_pretrained(translation_path, use_fast=False, local_files_only=local_only)
+        self.translation_model = AutoModelForSeq2SeqLM.from_pretrained(
+            translation_path, low_cpu_mem_usage=True, local_files_only=local_only
+        ).to(self.device)
 
         # 5. LaMa Inpainter
         print("  Loading LaMa inpainter...")
@@ -165,6 +260,17 @@ class TranslationPipeline:
 
         print("✅ All models loaded and ready!")
 
+    def _easyocr(self, source_lang):
+        """EasyOCR reader for a source language, loaded on first use."""
+        reader = self._easyocr_readers.get(source_lang)
+        if reader is None:
+            import easyocr
+            import torch
+            languages = EASYOCR_LANGUAGES.get(source_lang, EASYOCR_LANGUAGES["ja"])
+            reader = easyocr.Reader(list(languages), gpu=torch.cuda.is_available())
+            self._easyocr_readers[source_lang] = reader
+        return reader
+
     def _is_valid_source_text(self, text, source_lang):
         if not text or len(text.strip()) == 0:
             return False
@@ -189,7 +295,7 @@ class TranslationPipeline:
     #     except Exception as e:
     #         return "[Translation Error]"
 
-    def _translate(self, text):
+    def _translate(self, text, num_beams=5):
         try:
             # النص الداخل هنا ياباني، والهدف هو العربية
             text = text.strip()
@@ -209,11 +315,11 @@ class TranslationPipeline:
             with self._torch.no_grad():
                 tokens = self.translation_model.generate(
                     **inputs,
-                    num_beams=5,
+                    num_beams=num_beams,
                     repetition_penalty=1.3,
                     no_repeat_ngram_size=3,
                     max_length=128,
-                    early_stopping=True,
+                    early_stopping=num_beams > 1,
                     length_penalty=1.0
                 )
 
@@ -241,7 +347,7 @@ class TranslationPipeline:
         except Exception:
             return "neutral"
 
-    def _inpaint(self, image_pil, mask):
+    def _inpaint(self, image_pil, mask, use_lama=True):
         np = self._np
         cv2 = self._cv2
         from PIL import Image
@@ -254,7 +360,7 @@ class TranslationPipeline:
         dilated = cv2.GaussianBlur(dilated, (5, 5), 0)
         _, dilated = cv2.threshold(dilated, 127, 255, cv2.THRESH_BINARY)
 
-        if self.lama:
+        if use_lama and self.lama:
             try:
                 mask_pil = Image.fromarray(dilated)
                 return self.lama(image_pil, mask_pil)
@@ -473,7 +579,14 @@ class TranslationPipeline:
         return ordered
 
     @modal.method()
-    def translate_page(self, image_bytes: bytes, source_lang: str = "ja", target_lang: str = "ar") -> bytes:
+    def translate_page(
+        self,
+        image_bytes: bytes,
+        source_lang: str = "ja",
+        target_lang: str = "ar",
+        profile: str = DEFAULT_PROFILE,
+        output_format: str = None,
+    ) -> bytes:
         np = self._np
         cv2 = self._cv2
         from PIL import Image
@@ -481,20 +594,33 @@ class TranslationPipeline:
         CROP_PADDING = 4
         MASK_DILATION = 7
 
+        preset = _get_profile(profile)
+        output_format = _output_format(profile, output_format)
         image_pil = Image.open(io.BytesIO(image_bytes)).convert("RGB")
         img_cv = np.array(image_pil)
 
-        results = self.yolo_model(img_cv, conf=0.25, iou=0.4, agnostic_nms=True, verbose=False)
-        raw_boxes = results[0].boxes.xyxy.cpu().numpy().astype(int)
+        # Detection can run on a downscaled copy; boxes are mapped back to full resolution
+        h, w = img_cv.shape[:2]
+        max_side = preset["detection_max_side"]
+        scale = max_side / float(max(h, w)) if max_side and max(h, w) > max_side else 1.0
+        detect_input = img_cv if scale == 1.0 else cv2.resize(
+            img_cv, (max(1, round(w * scale)), max(1, round(h * scale))), interpolation=cv2.INTER_AREA
+        )
+
+        results = self.yolo_model(detect_input, conf=0.25, iou=0.4, agnostic_nms=True, verbose=False)
+        raw_boxes = results[0].boxes.xyxy.cpu().numpy()
+        if scale != 1.0 and len(raw_boxes) > 0:
+            raw_boxes = raw_boxes / scale
+            raw_boxes[:, [0, 2]] = raw_boxes[:, [0, 2]].clip(0, w)
+            raw_boxes[:, [1, 3]] = raw_boxes[:, [1, 3]].clip(0, h)
+        raw_boxes = raw_boxes.astype(int)
         boxes = self._remove_overlapping_boxes(raw_boxes, overlap_threshold=0.4)
         boxes = self._filter_detections(boxes)
         if len(boxes) > 0:
             boxes = self._sort_boxes_manga_order(boxes)
 
         if len(boxes) == 0:
-            buf = io.BytesIO()
-            image_pil.save(buf, format="PNG")
-            return buf.getvalue()
+            return _encode_page(image_pil, output_format)
 
         translations = {}
         sentiments = {}
@@ -513,18 +639,18 @@ class TranslationPipeline:
                 roi_pil = Image.fromarray(bubble_crop)
                 source_text = self.manga_ocr(roi_pil)
             else:
-                detections = self.easyocr_reader.readtext(bubble_crop)
+                detections = self._easyocr(source_lang).readtext(bubble_crop)
                 source_text = " ".join([t[1] for t in detections])
 
             if not self._is_valid_source_text(source_text, source_lang):
                 continue
 
-            target_text = self._translate(source_text)
+            target_text = self._translate(source_text, num_beams=preset["num_beams"])
             if "[Translation Error]" in target_text:
                 continue
 
             translations[i] = target_text
-            sentiments[i] = self._get_sentiment(target_text)
+            sentiments[i] = self._get_sentiment(target_text) if preset["run_sentiment"] else "neutral"
 
             # ===============================================================
             # ✨ THE ULTIMATE MASK FIX (ERASES ORIGINAL TEXT & PUNCTUATION)
@@ -545,7 +671,7 @@ class TranslationPipeline:
 
             # 2. EasyOCR box mask (safety net for known text regions)
             ocr_box_mask = np.zeros_like(gray_crop)
-            for (bbox_pts, _text, _conf) in self.easyocr_reader.readtext(bubble_crop_cv, paragraph=False):
+            for (bbox_pts, _text, _conf) in self._easyocr(source_lang).readtext(bubble_crop_cv, paragraph=False):
                 cv2.fillPoly(ocr_box_mask, [np.array(bbox_pts, dtype=np.int32)], 255)
             ocr_box_mask = cv2.dilate(ocr_box_mask, np.ones((5, 5), np.uint8))
             ocr_ink = cv2.bitwise_and(binary_ink, ocr_box_mask)
@@ -571,12 +697,10 @@ class TranslationPipeline:
                 global_mask[py1:py2, px1:px2], final_text_mask
             )
 
-        cleaned = self._inpaint(image_pil, global_mask)
+        cleaned = self._inpaint(image_pil, global_mask, use_lama=preset["use_lama"])
         final = self._render_text(cleaned, boxes, translations, sentiments, target_lang)
 
-        buf = io.BytesIO()
-        final.save(buf, format="PNG")
-        return buf.getvalue()
+        return _encode_page(final, output_format)
 
     @modal.fastapi_endpoint(method="POST")
     async def translate(self, request: Request):
@@ -585,13 +709,20 @@ class TranslationPipeline:
             image_file = form.get("image")
             source_lang = form.get("source_lang", "ja")
             target_lang = form.get("target_lang", "ar")
+            profile = form.get("profile") or DEFAULT_PROFILE
+            output_format = form.get("output_format") or None
 
             if not image_file:
                 return FastAPIResponse(content='{"error": "No image provided"}', status_code=400, media_type="application/json")
+            if profile not in PROFILES:
+                return FastAPIResponse(content=f'{{"error": "Unknown profile: {profile}"}}', status_code=400, media_type="application/json")
+            if output_format and output_format not in OUTPUT_FORMATS:
+                return FastAPIResponse(content=f'{{"error": "Unknown output format: {output_format}"}}', status_code=400, media_type="application/json")
 
             image_bytes = await image_file.read()
-            translated_bytes = self.translate_page.local(image_bytes, source_lang, target_lang)
-            return FastAPIResponse(content=translated_bytes, media_type="image/png")
+            translated_bytes = self.translate_page.local(image_bytes, source_lang, target_lang, profile, output_format)
+            media_type = OUTPUT_FORMATS[_output_format(profile, output_format)][1]
+            return FastAPIResponse(content=translated_bytes, media_type=media_type)
         except Exception as e:
             return FastAPIResponse(content=f'{{"error": "{str(e)}"}}', status_code=500, media_type="application/json")
 
@@ -601,4 +732,154 @@ class TranslationPipeline:
             "status": "ready",
             "device": self.device,
             "lama_available": self.lama is not None,
+            "profiles": list(PROFILES),
         }
+
+
+# ============================================================
+# 3. Chapter API (submit / poll / fetch, runs on CPU)
+# ============================================================
+
+def _read_archive_pages(archive_bytes: bytes) -> list:
+    """Return the image members of a ZIP/CBZ in reading order."""
+    with zipfile.ZipFile(io.BytesIO(archive_bytes), 'r') as zf:
+        names = sorted([
+            f for f in zf.namelist()
+            if f.lower().endswith(IMAGE_EXTENSIONS)
+            and not f.startswith('__MACOSX')
+            and not f.startswith('.')
+        ])
+        return [zf.read(name) for name in names]
+
+
+@app.function(timeout=3600)
+def run_chapter(
+    job_id: str,
+    pages: list,
+    source_lang: str = "ja",
+    target_lang: str = "ar",
+    profile: str = DEFAULT_PROFILE,
+    output_format: str = None,
+):
+    """
+    Fan the chapter's pages out over TranslationPipeline containers and
+    store each result as soon as it arrives.
+    """
+    state = chapter_jobs[job_id]
+    state["status"] = "processing"
+    chapter_jobs[job_id] = state
+
+    skipped = set(state["skipped"])
+    page_numbers = [n for n in range(1, len(pages) + 1) if n not in skipped]
+    total = len(page_numbers)
+    results = TranslationPipeline().translate_page.map(
+        [pages[n - 1] for n in page_numbers],
+        [source_lang] * total,
+        [target_lang] * total,
+        [profile] * total,
+        [output_format] * total,
+        return_exceptions=True,
+    )
+
+    for page_number, result in zip(page_numbers, results):
+        if isinstance(result, BaseException):
+            state["failed"].append(page_number)
+            print(f"❌ Chapter {job_id}: page {page_number} failed: {result}")
+        else:
+            chapter_pages[f"{job_id}:{page_number}"] = result
+            state["ready"].append(page_number)
+        state["completed_pages"] = len(state["ready"]) + len(state["failed"]) + len(skipped)
+        chapter_jobs[job_id] = state
+
+    state["status"] = "completed" if state["ready"] or not total else "failed"
+    if total and not state["ready"]:
+        state["error"] = "All pages failed"
+    chapter_jobs[job_id] = state
+
+
+@app.function(timeout=600)
+# Fixed label: served at https://USER--mangatk-chapters.modal.run (modal_client.CHAPTERS_LABEL)
+@modal.asgi_app(label="mangatk-chapters")
+def chapters():
+    from fastapi import FastAPI, UploadFile, File, Form
+    from fastapi.responses import JSONResponse, Response
+
+    web_app = FastAPI()
+
+    @web_app.post("/")
+    async def submit_chapter(
+        archive: UploadFile = File(...),
+        source_lang: str = Form("ja"),
+        target_lang: str = Form("ar"),
+        profile: str = Form(DEFAULT_PROFILE),
+        skip_pages: str = Form(""),
+        output_format: str = Form(""),
+    ):
+        if profile not in PROFILES:
+            return JSONResponse({"error": f"Unknown profile: {profile}"}, status_code=400)
+        if output_format and output_format not in OUTPUT_FORMATS:
+            return JSONResponse({"error": f"Unknown output format: {output_format}"}, status_code=400)
+        output_format = _output_format(profile, output_format)
+        try:
+            pages = _read_archive_pages(await archive.read())
+        except zipfile.BadZipFile:
+            return JSONResponse({"error": "Invalid archive"}, status_code=400)
+        if not pages:
+            return JSONResponse({"error": "No images found in archive"}, status_code=400)
+
+        # Text-free pages found by the backend pre-scan are not translated
+        skipped = sorted({
+            int(n) for n in skip_pages.split(",")
+            if n.strip().isdigit() and 1 <= int(n) <= len(pages)
+        })
+
+        job_id = uuid.uuid4().hex
+        all_skipped = len(skipped) == len(pages)
+        chapter_jobs[job_id] = {
+            "status": "completed" if all_skipped else "queued",
+            "total_pages": len(pages),
+            "completed_pages": len(skipped),
+            "ready": [],
+            "failed": [],
+            "skipped": skipped,
+            "error": None,
+            "profile": profile,
+            "output_format": output_format,
+        }
+        if not all_skipped:
+            run_chapter.spawn(job_id, pages, source_lang, target_lang, profile, output_format)
+        return JSONResponse(
+            {"job_id": job_id, "total_pages": len(pages), "skipped": skipped},
+            status_code=202,
+        )
+
+    @web_app.get("/{job_id}")
+    async def chapter_status(job_id: str):
+        state = chapter_jobs.get(job_id)
+        if state is None:
+            return JSONResponse({"error": "Job not found"}, status_code=404)
+        return {"job_id": job_id, **state}
+
+    @web_app.get("/{job_id}/pages/{page_number}")
+    async def chapter_page(job_id: str, page_number: int):
+        content = chapter_pages.get(f"{job_id}:{page_number}")
+        if content is None:
+            return JSONResponse({"error": "Page not ready"}, status_code=404)
+        state = chapter_jobs.get(job_id) or {}
+        output_format = _output_format(state.get("profile"), state.get("output_format"))
+        return Response(content=content, media_type=OUTPUT_FORMATS[output_format][1])
+
+    @web_app.delete("/{job_id}")
+    async def delete_chapter(job_id: str):
+        state = chapter_jobs.get(job_id)
+        if state is None:
+            return JSONResponse({"error": "Job not found"}, status_code=404)
+        for page_number in state["ready"]:
+            try:
+                chapter_pages.pop(f"{job_id}:{page_number}")
+            except KeyError:
+                pass
+        chapter_jobs.pop(job_id)
+        return {"deleted": job_id}
+
+    return web_app
@@ -5,16 +5,63 @@ This script is responsible for downloading and caching all AI models
 required for the MangaTK translation pipeline onto the Modal.com image.
 
 This is separated to allow for a one-time setup/caching process.
+
+The YOLO, translation and sentiment models are also written to
+MODEL_BUNDLE_DIR (safetensors + manifest.json, same layout as
+manga/services/ai/model_bundle.py) so containers load them offline and
+memory-mapped instead of resolving them through the HuggingFace cache.
 """
 
 import os
 import io
+import json
+import shutil
+import hashlib
+
+MODEL_BUNDLE_DIR = "/root/models"
 
 TRANSLATION_MODEL_ID = os.environ.get(
     "TRANSLATION_MODEL_ID",
     "Bart2277/JPtoAR_transaltion_model_for_comics",
     # "Helsinki-NLP/opus-mt-ja-ar"
 )
+SENTIMENT_MODEL_ID = "Bart2277/sentment_analysis_model_for_comics"
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _save_pretrained(name, tokenizer, model):
+    """Write a transformers model into the bundle as safetensors."""
+    target = os.path.join(MODEL_BUNDLE_DIR, name)
+    shutil.rmtree(target, ignore_errors=True)
+    tokenizer.save_pretrained(target)
+    model.save_pretrained(target, safe_serialization=True)
+
+
+def _bundle_entry(name, source, kind, weights_file=None):
+    """Manifest entry for a model already written to MODEL_BUNDLE_DIR/<name>."""
+    model_dir = os.path.join(MODEL_BUNDLE_DIR, name)
+    files = {}
+    for root, _dirs, filenames in os.walk(model_dir):
+        for filename in sorted(filenames):
+            path = os.path.join(root, filename)
+            files[os.path.relpath(path, model_dir)] = {"size": os.path.getsize(path), "sha256": _sha256(path)}
+    entry = {"source": source, "kind": kind, "path": name, "files": files}
+    if weights_file:
+        entry["weights_file"] = weights_file
+    return entry
+
+
+def _write_manifest(models):
+    with open(os.path.join(MODEL_BUNDLE_DIR, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump({"version": 1, "models": models}, f, indent=2, sort_keys=True)
+
 
 def download_models():
     """Pre-download all models at image build time (cached in the image)."""
@@ -38,8 +85,13 @@ def download_models():
     repo_id = "Bart2277/comic-detector"
     files = list_repo_files(repo_id)
     pt_files = [f for f in files if f.endswith('.pt')]
+    bundle = {}
     if pt_files:
-        hf_hub_download(repo_id=repo_id, filename=pt_files[0])
+        weights_path = hf_hub_download(repo_id=repo_id, filename=pt_files[0])
+        detector_dir = os.path.join(MODEL_BUNDLE_DIR, "bubble_detector")
+        os.makedirs(detector_dir, exist_ok=True)
+        shutil.copy2(weights_path, os.path.join(detector_dir, os.path.basename(pt_files[0])))
+        bundle["bubble_detector"] = _bundle_entry("bubble_detector", repo_id, "yolo", weights_file=os.path.basename(pt_files[0]))
         print(f"✅ Downloaded: {pt_files[0]}")
     else:
         print(f"⚠️ No .pt files found in {repo_id}, files: {files}")
@@ -56,15 +108,21 @@ def download_models():
     print("📥 Downloading translation model...")
     from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
 
-    AutoTokenizer.from_pretrained(TRANSLATION_MODEL_ID, use_fast=False)
-    AutoModelForSeq2SeqLM.from_pretrained(TRANSLATION_MODEL_ID)
+    tokenizer = AutoTokenizer.from_pretrained(TRANSLATION_MODEL_ID, use_fast=False)
+    model = AutoModelForSeq2SeqLM.from_pretrained(TRANSLATION_MODEL_ID)
+    _save_pretrained("translation", tokenizer, model)
+    bundle["translation"] = _bundle_entry("translation", TRANSLATION_MODEL_ID, "seq2seq")
 
     print(f"✅ Translation model cached: {TRANSLATION_MODEL_ID}")
 
     # --- Sentiment Model (BERT from HuggingFace) ---
     print("📥 Downloading sentiment model...")
-    from transformers import pipeline as hf_pipeline
-    hf_pipeline("sentiment-analysis", model="Bart2277/sentment_analysis_model_for_comics", device=-1)
+    from transformers import AutoModelForSequenceClassification
+    tokenizer = AutoTokenizer.from_pretrained(SENTIMENT_MODEL_ID)
+    model = AutoModelForSequenceClassification.from_pretrained(SENTIMENT_MODEL_ID)
+    _save_pretrained("sentiment", tokenizer, model)
+    bundle["sentiment"] = _bundle_entry("sentiment", SENTIMENT_MODEL_ID, "sequence_classification")
+    _write_manifest(bundle)
     print("✅ Sentiment model cached.")
 
     # --- OCR Models ---
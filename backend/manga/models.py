@@ -1,6 +1,7 @@
 import uuid
 import os
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import AbstractUser
 from django.utils.text import slugify
 from django.db.models import Avg
@@ -33,6 +34,7 @@ class SubscriptionPlan(models.Model):
     point_multiplier = models.FloatField(default=1.0, help_text="مضاعف النقاط (1.0, 1.5, 2.0)")
     ads_enabled = models.BooleanField(default=True, help_text="هل الإعلانات مفعلة؟")
     monthly_free_translations = models.PositiveIntegerField(default=0, help_text="عدد الترجمات المجانية شهرياً")
+    translation_priority = models.PositiveSmallIntegerField(default=0, help_text="أولوية الترجمة في قائمة الانتظار (الأعلى أولاً)")
     features = models.JSONField(default=list, blank=True, help_text="ميزات إضافية كقائمة نصوص")
     description = models.TextField(blank=True, help_text="وصف الخطة")
     
@@ -247,6 +249,8 @@ class ChapterImage(models.Model):
     
     # تمت الإضافة: لحل مشكلة ChapterImageAdmin
     original_filename = models.CharField(max_length=255, blank=True, null=True)
+    # SHA-256 of the page bytes (see StoredImage)
+    content_hash = models.CharField(max_length=64, blank=True, default='', db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
@@ -254,6 +258,28 @@ class ChapterImage(models.Model):
         unique_together = ['chapter', 'page_number']
 
 
+class StoredImage(models.Model):
+    """
+    صورة مخزنة حسب محتواها (SHA-256) في أحد مخازن الصور
+    
+    Content-addressed index: a page whose bytes were already stored in the
+    active backend reuses the URL instead of being uploaded again.
+    """
+    content_hash = models.CharField(max_length=64)
+    backend = models.CharField(max_length=20)
+    url = models.URLField(max_length=500)
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    size = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        unique_together = ['content_hash', 'backend']
+    
+    def __str__(self):
+        return f"{self.backend}:{self.content_hash[:12]}"
+
+
 # ==================== USER SYSTEM & GAMIFICATION ====================
 
 # class User(AbstractUser):
@@ -750,19 +776,62 @@ class TranslationJob(models.Model):
     """
     STATUS_CHOICES = [
         ('uploading', 'جاري الرفع'),
+        ('uploaded', 'تم الرفع'),
         ('extracting', 'جاري فك الضغط'),
+        ('queued', 'في قائمة الانتظار'),
         ('translating', 'جاري الترجمة'),
         ('creating_cbz', 'جاري إنشاء الملف'),
         ('completed', 'مكتمل'),
         ('failed', 'فشل'),
     ]
+
+    # يجب أن تطابق PIPELINE_PROFILES في services/ai/profiles.py
+    PROFILE_CHOICES = [
+        ('fast', 'سريع'),
+        ('balanced', 'متوازن'),
+        ('best', 'أفضل جودة'),
+    ]
+
+    SOURCE_CHOICES = [
+        ('user', 'مستخدم'),
+        ('dashboard', 'لوحة التحكم'),
+    ]
+
+    # يجب أن تطابق OUTPUT_FORMATS في services/ai/profiles.py
+    OUTPUT_FORMAT_CHOICES = [
+        ('png', 'PNG'),
+        ('webp', 'WebP'),
+        ('avif', 'AVIF'),
+        ('jpeg', 'JPEG'),
+    ]
+
+    # يجب أن تطابق SOURCE_LANGUAGES في services/ai/profiles.py
+    SOURCE_LANGUAGE_CHOICES = [
+        ('japanese', 'اليابانية'),
+        ('chinese', 'الصينية'),
+        ('korean', 'الكورية'),
+        ('english', 'الإنجليزية'),
+    ]
     
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='translation_jobs')
     ai_model = models.ForeignKey(AITranslationModel, on_delete=models.SET_NULL, null=True, blank=True)
     
+    # الفصل المستهدف (واجهة translation/new)
+    manga = models.ForeignKey(Manga, on_delete=models.SET_NULL, null=True, blank=True, related_name='translation_jobs')
+    chapter_number = models.FloatField(null=True, blank=True)
+    
     original_filename = models.CharField(max_length=500)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='uploading')
+    profile = models.CharField(max_length=20, choices=PROFILE_CHOICES, default='balanced', help_text="إعداد السرعة/الجودة")
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES, default='user', help_text="مصدر الطلب")
+    output_format = models.CharField(max_length=10, choices=OUTPUT_FORMAT_CHOICES, blank=True, help_text="صيغة الصفحات المترجمة (فارغ = حسب الإعداد)")
+    source_language = models.CharField(max_length=20, choices=SOURCE_LANGUAGE_CHOICES, default='japanese', help_text="لغة المصدر")
+    points_charged = models.IntegerField(default=0, help_text="النقاط المخصومة (تسترجع عند الفشل)")
+    
+    # قائمة انتظار الترجمة (services/translation_scheduler.py)
+    priority = models.IntegerField(default=0, help_text="أولوية الجدولة (الأعلى أولاً)")
+    queued_at = models.DateTimeField(null=True, blank=True)
     
     # مسارات محلية مؤقتة
     temp_upload_path = models.CharField(max_length=500, blank=True)
@@ -775,6 +844,9 @@ class TranslationJob(models.Model):
     # نتائج الترجمة (JSON: [{page_number, local_path, filename}])
     translation_results = models.JSONField(default=list, blank=True)
     
+    # نتيجة الفحص المسبق (JSON: {total_pages, text_pages, total_bubbles, pass_through_pages, pages})
+    prescan = models.JSONField(default=dict, blank=True, help_text="الصفحات التي تحتوي نصاً وعدد الفقاعات")
+    
     # إحصائيات
     total_pages = models.IntegerField(default=0)
     translated_pages = models.IntegerField(default=0)
@@ -792,6 +864,43 @@ class TranslationJob(models.Model):
     def __str__(self):
         return f"Translation Job {self.original_filename} - {self.status}"
 
+
+class TranslationPage(models.Model):
+    """
+    حالة صفحة واحدة داخل مهمة ترجمة (تسمح بالاستئناف وإعادة الصفحات الفاشلة)
+    """
+    STATUS_CHOICES = [
+        ('pending', 'بالانتظار'),
+        ('completed', 'مكتملة'),
+        ('skipped', 'بدون نص'),
+        ('failed', 'فشلت'),
+    ]
+    
+    job = models.ForeignKey(TranslationJob, on_delete=models.CASCADE, related_name='pages')
+    page_number = models.PositiveIntegerField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    
+    filename = models.CharField(max_length=500, blank=True)
+    input_path = models.CharField(max_length=500, blank=True)
+    input_hash = models.CharField(max_length=64, blank=True, help_text="SHA-256 للصورة الأصلية")
+    output_path = models.CharField(max_length=500, blank=True)
+    
+    bubbles_found = models.IntegerField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    duration_ms = models.IntegerField(null=True, blank=True)
+    error_message = models.TextField(blank=True)
+    
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['job', 'page_number']
+        unique_together = ['job', 'page_number']
+        verbose_name = 'Translation Page'
+        verbose_name_plural = 'Translation Pages'
+    
+    def __str__(self):
+        return f"{self.job_id} p{self.page_number} - {self.status}"
+
 from django.conf import settings
 from django.db import models
 
@@ -810,7 +919,8 @@ class ImgBBUploadStats(models.Model):
     """
     يتتبع إجمالي عدد الصور المرفوعة إلى ImgBB يومياً من جميع المدراء
     """
-    date = models.DateField(unique=True, auto_now_add=True, help_text="تاريخ الرفع")
+    # Not auto_now_add: counters of a past day are flushed after midnight
+    date = models.DateField(unique=True, default=timezone.localdate, help_text="تاريخ الرفع")
     count = models.PositiveIntegerField(default=0, help_text="عدد الصور المرفوعة في هذا اليوم")
     
     class Meta:
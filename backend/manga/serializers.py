@@ -614,13 +614,13 @@ class TranslationJobSerializer(serializers.ModelSerializer):
         model = TranslationJob
         fields = [
             'id', 'user', 'user_name', 'ai_model', 'ai_model_name',
-            'original_filename', 'status', 'status_display',
+            'original_filename', 'status', 'status_display', 'profile', 'output_format', 'source', 'source_language', 'prescan',
             'total_pages', 'translated_pages', 'translation_results',
             'output_file_path', 'error_message',
             'created_at', 'updated_at', 'completed_at'
         ]
         read_only_fields = [
-            'id', 'user', 'status', 'total_pages', 'translated_pages',
+            'id', 'user', 'status', 'source', 'prescan', 'total_pages', 'translated_pages',
             'translation_results', 'output_file_path', 'error_message',
             'created_at', 'updated_at', 'completed_at'
         ]
@@ -0,0 +1,176 @@
+"""
+Inference Batching
+===================
+Collects model calls from all concurrent translation jobs and runs them as
+one batched forward pass.
+
+Each model service owns a `BatchDispatcher`. Callers `submit()` one input
+and get a Future; a worker thread takes the oldest pending request, waits
+up to `max_wait_ms` for more requests with the same key (e.g. the same
+num_beams) until `max_batch_size` is reached, and calls the batch function
+once for all of them.
+
+    dispatcher = BatchDispatcher('translation', translate_batch)
+    future = dispatcher.submit("こんにちは", key=3)
+    text = future.result()
+
+Limits come from settings.AI_INFERENCE_BATCHING:
+    {'MAX_BATCH_SIZE': 16, 'MAX_WAIT_MS': 5}
+A MAX_BATCH_SIZE of 1 runs every request as its own batch.
+
+`dispatcher_stats()` reports queue depth and batch-size counters for every
+dispatcher in the process.
+"""
+
+import time
+import logging
+import threading
+from collections import deque, Counter
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BATCH_SIZE = 16
+DEFAULT_MAX_WAIT_MS = 5
+
+_dispatchers: Dict[str, 'BatchDispatcher'] = {}
+_registry_lock = threading.Lock()
+
+
+def batching_settings() -> Dict:
+    try:
+        from django.conf import settings
+        configured = getattr(settings, 'AI_INFERENCE_BATCHING', {})
+    except Exception:
+        configured = {}
+    return {
+        'max_batch_size': int(configured.get('MAX_BATCH_SIZE', DEFAULT_MAX_BATCH_SIZE)),
+        'max_wait_ms': float(configured.get('MAX_WAIT_MS', DEFAULT_MAX_WAIT_MS)),
+    }
+
+
+def dispatcher_stats() -> Dict[str, Dict]:
+    """Metrics of every dispatcher created in this process."""
+    with _registry_lock:
+        dispatchers = list(_dispatchers.values())
+    return {d.name: d.stats() for d in dispatchers}
+
+
+class BatchDispatcher:
+    """
+    Micro-batches calls to `batch_fn(key, items) -> results` (one result
+    per item, same order). An exception from batch_fn fails every request
+    of that batch.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        batch_fn: Callable[[Hashable, List[Any]], List[Any]],
+        max_batch_size: Optional[int] = None,
+        max_wait_ms: Optional[float] = None
+    ):
+        configured = batching_settings()
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size or configured['max_batch_size'])
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else configured['max_wait_ms']) / 1000.0
+
+        # key -> deque of (enqueued_at, item, future)
+        self._pending: Dict[Hashable, deque] = {}
+        self._cond = threading.Condition()
+        self._worker: Optional[threading.Thread] = None
+
+        self._batches = 0
+        self._items = 0
+        self._batch_sizes = Counter()
+        self._wait_seconds = 0.0
+
+        with _registry_lock:
+            _dispatchers[name] = self
+
+    def submit(self, item: Any, key: Hashable = None) -> Future:
+        """Queue one input; the future resolves to its result."""
+        future = Future()
+        with self._cond:
+            self._pending.setdefault(key, deque()).append((time.monotonic(), item, future))
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run, daemon=True, name=f'batch-{self.name}'
+                )
+                self._worker.start()
+            self._cond.notify()
+        return future
+
+    def __call__(self, item: Any, key: Hashable = None) -> Any:
+        """Submit and wait for the result."""
+        return self.submit(item, key).result()
+
+    def queue_depth(self) -> int:
+        with self._cond:
+            return sum(len(q) for q in self._pending.values())
+
+    def stats(self) -> Dict:
+        with self._cond:
+            depth = sum(len(q) for q in self._pending.values())
+            batches, items = self._batches, self._items
+            sizes = dict(sorted(self._batch_sizes.items()))
+            wait = self._wait_seconds
+        return {
+            'queue_depth': depth,
+            'batches': batches,
+            'items': items,
+            'avg_batch_size': round(items / batches, 2) if batches else 0.0,
+            'batch_sizes': sizes,
+            'avg_queue_wait_ms': round(wait * 1000 / items, 2) if items else 0.0,
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000,
+        }
+
+    def _next_batch(self):
+        """Block until a batch is ready; returns (key, [(enqueued_at, item, future)])."""
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+
+            # Key with the oldest waiting request first, so no key starves
+            key = min(self._pending, key=lambda k: self._pending[k][0][0])
+            queue = self._pending[key]
+            deadline = queue[0][0] + self.max_wait
+            while len(queue) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            batch = [queue.popleft() for _ in range(min(len(queue), self.max_batch_size))]
+            if not queue:
+                del self._pending[key]
+            return key, batch
+
+    def _run(self):
+        while True:
+            key, batch = self._next_batch()
+            started = time.monotonic()
+            items = [item for _, item, _ in batch]
+
+            try:
+                results = self.batch_fn(key, items)
+                if len(results) != len(items):
+                    raise RuntimeError(
+                        f"{self.name}: batch function returned {len(results)} results for {len(items)} inputs"
+                    )
+            except Exception as e:
+                logger.error(f"{self.name}: batch of {len(items)} failed: {e}")
+                for _, _, future in batch:
+                    future.set_exception(e)
+            else:
+                for (_, _, future), result in zip(batch, results):
+                    future.set_result(result)
+
+            with self._cond:
+                self._batches += 1
+                self._items += len(batch)
+                self._batch_sizes[len(batch)] += 1
+                self._wait_seconds += sum(started - enqueued for enqueued, _, _ in batch)
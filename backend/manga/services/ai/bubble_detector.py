@@ -4,15 +4,23 @@ Bubble Detector Service
 Detects speech bubbles in manga/comic pages using YOLOv8.
 
 Model source (checked in order):
-  1. Local weights in 'weights/comic_bubble_yolov8.pt'
-  2. HuggingFace repo from Django settings (AI_TRANSLATION_PIPELINE.BUBBLE_DETECTOR_MODEL)
-  3. Default: Bart2277/comic-detector on HuggingFace
+  1. Model bundle built by `manage.py prepare_models` (offline)
+  2. Local weights in 'weights/comic_bubble_yolov8.pt'
+  3. HuggingFace repo from Django settings (AI_TRANSLATION_PIPELINE.BUBBLE_DETECTOR_MODEL)
+  4. Default: Bart2277/comic-detector on HuggingFace
+
+Detection can run on a reduced-resolution decode of the page
+(`load_detection_image`: JPEG draft mode / `Image.reduce`); boxes are
+mapped back to full-resolution coordinates.
 """
 
 import numpy as np
 import logging
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Tuple, Union, BinaryIO
+from PIL import Image
+
+from .model_bundle import bundled_model_path
 
 logger = logging.getLogger(__name__)
 
@@ -22,11 +30,10 @@ LOCAL_WEIGHTS_PATH = WEIGHTS_DIR / 'comic_bubble_yolov8.pt'
 DEFAULT_HF_REPO = "Bart2277/comic-detector"
 
 
-def _resolve_weights_path() -> str:
-    """Resolve YOLO weights: local file → settings → HuggingFace download."""
+def configured_weights() -> str:
+    """Configured weights source: local file path, or HuggingFace repo from settings / default."""
     # 1. Local weights file
     if LOCAL_WEIGHTS_PATH.exists():
-        logger.info(f"Using local YOLO weights: {LOCAL_WEIGHTS_PATH}")
         return str(LOCAL_WEIGHTS_PATH)
 
     # 2. HuggingFace repo from Django settings
@@ -38,8 +45,11 @@ def _resolve_weights_path() -> str:
             hf_repo = configured
     except Exception:
         pass
+    return hf_repo
 
-    # Download .pt file from HuggingFace
+
+def download_weights(hf_repo: str) -> str:
+    """Download the .pt weights of `hf_repo` into the HuggingFace cache."""
     logger.info(f"Downloading YOLO weights from HuggingFace: {hf_repo}...")
     try:
         from huggingface_hub import hf_hub_download
@@ -77,6 +87,76 @@ def _resolve_weights_path() -> str:
         )
 
 
+def _resolve_weights_path() -> str:
+    """Resolve YOLO weights: model bundle → local file → HuggingFace download."""
+    source = configured_weights()
+    bundled = bundled_model_path('bubble_detector', source)
+    if bundled:
+        logger.info(f"Using bundled YOLO weights: {bundled}")
+        return bundled
+
+    if source == str(LOCAL_WEIGHTS_PATH):
+        logger.info(f"Using local YOLO weights: {LOCAL_WEIGHTS_PATH}")
+        return source
+
+    return download_weights(source)
+
+
+def load_detection_image(
+    source: Union[str, Path, BinaryIO],
+    max_side: int
+) -> Tuple[np.ndarray, Tuple[int, int]]:
+    """
+    Decode a page at reduced scale for detection.
+
+    JPEGs are decoded with `Image.draft`, which lets libjpeg scale by
+    1/2, 1/4 or 1/8 during decoding; other formats use `Image.reduce`
+    (integer box downscale). A final resize brings the long side to at
+    most `max_side`.
+
+    Args:
+        source: File path or file object of the encoded page.
+        max_side: Target longest side in pixels.
+
+    Returns:
+        (rgb_array, (full_width, full_height))
+    """
+    with Image.open(source) as img:
+        full_size = img.size
+        long_side = max(full_size)
+
+        if max_side and long_side > max_side:
+            ratio = max_side / float(long_side)
+            if img.format == 'JPEG':
+                img.draft('RGB', (max(1, int(full_size[0] * ratio)), max(1, int(full_size[1] * ratio))))
+            else:
+                if img.mode not in ('RGB', 'RGBA', 'L'):
+                    img = img.convert('RGB')
+                factor = int(long_side // max_side)
+                if factor > 1:
+                    img = img.reduce(factor)
+
+            img = img.convert('RGB')
+            if max(img.size) > max_side:
+                img.thumbnail((max_side, max_side), Image.BILINEAR)
+        else:
+            img = img.convert('RGB')
+
+        return np.asarray(img), full_size
+
+
+def _rescale_boxes(boxes: np.ndarray, detect_size: Tuple[int, int], full_size: Tuple[int, int]) -> np.ndarray:
+    """Map xyxy boxes from detection-image coordinates to full resolution."""
+    dw, dh = detect_size
+    fw, fh = full_size
+    if len(boxes) == 0 or (dw, dh) == (fw, fh):
+        return boxes
+    boxes = boxes.astype(float)
+    boxes[:, [0, 2]] = (boxes[:, [0, 2]] * (fw / float(dw))).clip(0, fw)
+    boxes[:, [1, 3]] = (boxes[:, [1, 3]] * (fh / float(dh))).clip(0, fh)
+    return boxes
+
+
 class BubbleDetector:
     """Detects speech bubbles in manga pages using YOLOv8."""
 
@@ -97,20 +177,62 @@ class BubbleDetector:
             cls._instance = cls()
         return cls._instance
 
-    def detect(self, image: np.ndarray, confidence: float = 0.25) -> np.ndarray:
+    def detect(
+        self,
+        image: np.ndarray,
+        confidence: float = 0.25,
+        max_side: Optional[int] = None
+    ) -> np.ndarray:
         """
         Detect speech bubbles in a manga page.
 
         Args:
             image: BGR or RGB numpy array of the page.
             confidence: Minimum detection confidence.
+            max_side: If set, the page is downscaled so its longest side is at
+                      most this many pixels before detection. Boxes are
+                      returned in full-resolution coordinates.
 
         Returns:
             np.ndarray of shape (N, 4) with bounding boxes in xyxy format (int).
             Returns empty array if no bubbles found.
         """
+        h, w = image.shape[:2]
+        if max_side and max(h, w) > max_side:
+            import cv2
+            scale = max_side / float(max(h, w))
+            image = cv2.resize(
+                image,
+                (max(1, round(w * scale)), max(1, round(h * scale))),
+                interpolation=cv2.INTER_AREA
+            )
+
         results = self.model(image, conf=confidence, verbose=False)
-        boxes = results[0].boxes.xyxy.cpu().numpy().astype(int)
+        boxes = results[0].boxes.xyxy.cpu().numpy()
+        boxes = _rescale_boxes(boxes, (image.shape[1], image.shape[0]), (w, h)).astype(int)
         logger.info(f"Detected {len(boxes)} bubbles (conf>={confidence})")
         return boxes
 
+    def detect_file(
+        self,
+        source: Union[str, Path, BinaryIO],
+        confidence: float = 0.25,
+        max_side: int = 1024
+    ) -> np.ndarray:
+        """
+        Detect speech bubbles straight from an encoded page, decoding it at
+        reduced scale (see load_detection_image).
+
+        Returns:
+            np.ndarray of shape (N, 4), xyxy boxes in full-resolution coordinates.
+        """
+        small, full_size = load_detection_image(source, max_side)
+        results = self.model(small, conf=confidence, verbose=False)
+        boxes = results[0].boxes.xyxy.cpu().numpy()
+        boxes = _rescale_boxes(boxes, (small.shape[1], small.shape[0]), full_size).astype(int)
+        logger.info(
+            f"Detected {len(boxes)} bubbles (conf>={confidence}, "
+            f"{small.shape[1]}x{small.shape[0]} of {full_size[0]}x{full_size[1]})"
+        )
+        return boxes
+
@@ -11,11 +11,13 @@ This does NOT use any ML model — it uses OpenCV algorithms:
   - Dominant color fill to erase text cleanly
 """
 
+import os
 import cv2
 import numpy as np
 import logging
 from PIL import Image
-from typing import Tuple
+from typing import Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +27,9 @@ LARGE_MARGIN = 14
 SMALL_MARGIN = 2
 SOLIDITY_THRESHOLD = 0.70
 
+# Threads for per-bubble work (independent ROIs only)
+FALLBACK_WORKERS = min(4, os.cpu_count() or 1)
+
 
 def get_dominant_color(image_roi: np.ndarray, mask: np.ndarray = None) -> Tuple[int, int, int]:
     """
@@ -56,110 +61,165 @@ def fallback_inpaint_page(image: Image.Image, boxes: np.ndarray) -> Image.Image:
     Returns:
         PIL Image with text removed from bubbles.
     """
-    original_cv = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
-    H, W = original_cv.shape[:2]
-    final_cv = original_cv.copy()
+    page = np.array(image.convert("RGB") if image.mode != "RGB" else image)
+    fallback_inpaint_array(page, boxes)
+    return Image.fromarray(page)
 
-    for box in boxes:
-        x1, y1, x2, y2 = box
 
+def fallback_inpaint_array(
+    page: np.ndarray,
+    boxes: np.ndarray,
+    max_workers: Optional[int] = None
+) -> None:
+    """
+    In-place variant of fallback_inpaint_page.
+
+    Bubbles are processed in a thread pool (OpenCV releases the GIL). Padded
+    ROIs that overlap are grouped and handled in order by a single worker,
+    so no two threads ever touch the same pixels.
+
+    Args:
+        page: Writable RGB uint8 array (e.g. PageBuffer.array); ROIs are
+              edited as views, no page copy is made.
+        boxes: Array of bubble bounding boxes in xyxy format (int).
+        max_workers: Thread count (default: FALLBACK_WORKERS).
+    """
+    H, W = page.shape[:2]
+
+    rois = []
+    for box in boxes:
+        x1, y1, x2, y2 = (int(v) for v in box[:4])
         # Add padding
-        x1 = max(0, x1 - PADDING)
-        y1 = max(0, y1 - PADDING)
-        x2 = min(W, x2 + PADDING)
-        y2 = min(H, y2 + PADDING)
-
-        roi = final_cv[y1:y2, x1:x2]
-        roi_h, roi_w = roi.shape[:2]
-        gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
-
-        # Detection logic
-        gray_thick = cv2.erode(gray, np.ones((2, 2), np.uint8), iterations=1)
-        blurred = cv2.GaussianBlur(gray_thick, (5, 5), 0)
-        thresh = cv2.adaptiveThreshold(
-            blurred, 255,
-            cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-            cv2.THRESH_BINARY, 15, 3
+        rois.append((
+            max(0, x1 - PADDING), max(0, y1 - PADDING),
+            min(W, x2 + PADDING), min(H, y2 + PADDING),
+        ))
+
+    groups = _group_overlapping(rois)
+
+    def run_group(indices: List[int]):
+        for idx in indices:
+            x1, y1, x2, y2 = rois[idx]
+            if x2 > x1 and y2 > y1:
+                _inpaint_roi(page[y1:y2, x1:x2])
+
+    workers = min(max_workers or FALLBACK_WORKERS, len(groups))
+    if workers <= 1:
+        for indices in groups:
+            run_group(indices)
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        # list() re-raises worker exceptions
+        list(pool.map(run_group, groups))
+
+
+def _group_overlapping(rois: List[Tuple[int, int, int, int]]) -> List[List[int]]:
+    """
+    Partition ROI indices into groups whose members overlap transitively.
+    Different groups are pixel-disjoint; indices keep their original order.
+    """
+    parent = list(range(len(rois)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, a in enumerate(rois):
+        for j in range(i + 1, len(rois)):
+            b = rois[j]
+            if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                parent[find(j)] = find(i)
+
+    groups: Dict[int, List[int]] = {}
+    for i in range(len(rois)):
+        groups.setdefault(find(i), []).append(i)
+    return list(groups.values())
+
+
+def _inpaint_roi(roi: np.ndarray) -> None:
+    """Erase the text inside one padded bubble ROI (view, edited in place)."""
+    roi_h, roi_w = roi.shape[:2]
+    gray = cv2.cvtColor(roi, cv2.COLOR_RGB2GRAY)
+
+    # Detection logic
+    gray_thick = cv2.erode(gray, np.ones((2, 2), np.uint8), iterations=1)
+    blurred = cv2.GaussianBlur(gray_thick, (5, 5), 0)
+    thresh = cv2.adaptiveThreshold(
+        blurred, 255,
+        cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+        cv2.THRESH_BINARY, 15, 3
+    )
+    cnts, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    if not cnts:
+        return
+
+    largest_cnt = max(cnts, key=cv2.contourArea)
+    area = cv2.contourArea(largest_cnt)
+    roi_area = roi_w * roi_h
+
+    # Leaky check: contour covers >90% of the box → detected box, not bubble
+    is_leaky = area > (0.90 * roi_area)
+
+    # =============================================================
+    # PATH A: Leaky/Border Bubbles — general purpose fix
+    # =============================================================
+    if is_leaky:
+        bg_color = np.median(roi, axis=(0, 1)).astype(np.uint8)
+
+        # Difference mask — find "ink" of any color
+        diff = cv2.absdiff(roi, bg_color)
+        diff_gray = cv2.cvtColor(diff, cv2.COLOR_RGB2GRAY)
+        _, ink_mask = cv2.threshold(diff_gray, 30, 255, cv2.THRESH_BINARY)
+
+        # Filter blobs — keep borders, remove text
+        _, labels, stats, _ = cv2.connectedComponentsWithStats(
+            ink_mask, connectivity=8
         )
-        cnts, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-
-        if not cnts:
-            continue
-
-        largest_cnt = max(cnts, key=cv2.contourArea)
-        area = cv2.contourArea(largest_cnt)
-        roi_area = roi_w * roi_h
-
-        # Leaky check: contour covers >90% of the box → detected box, not bubble
-        is_leaky = area > (0.90 * roi_area)
-
-        # =============================================================
-        # PATH A: Leaky/Border Bubbles — general purpose fix
-        # =============================================================
-        if is_leaky:
-            bg_color = np.median(roi, axis=(0, 1)).astype(np.uint8)
-
-            # Difference mask — find "ink" of any color
-            diff = cv2.absdiff(roi, bg_color)
-            diff_gray = cv2.cvtColor(diff, cv2.COLOR_BGR2GRAY)
-            _, ink_mask = cv2.threshold(diff_gray, 30, 255, cv2.THRESH_BINARY)
-
-            # Filter blobs — keep borders, remove text
-            num_labels, labels, stats, _ = cv2.connectedComponentsWithStats(
-                ink_mask, connectivity=8
-            )
-            text_mask = np.zeros_like(gray, dtype=np.uint8)
-
-            for i in range(1, num_labels):
-                x_blob = stats[i, cv2.CC_STAT_LEFT]
-                y_blob = stats[i, cv2.CC_STAT_TOP]
-                w_blob = stats[i, cv2.CC_STAT_WIDTH]
-                h_blob = stats[i, cv2.CC_STAT_HEIGHT]
-
-                # Does it touch the padding edge?
-                touches_edge = (
-                    x_blob <= 1 or y_blob <= 1 or
-                    x_blob + w_blob >= roi_w - 1 or
-                    y_blob + h_blob >= roi_h - 1
-                )
-
-                if not touches_edge:
-                    # Floating inside → it is text → remove it
-                    text_mask[labels == i] = 255
-
-            # Clean & fill
-            text_mask = cv2.dilate(text_mask, np.ones((3, 3), np.uint8), iterations=1)
-            fill_color = get_dominant_color(roi, cv2.bitwise_not(ink_mask))
-            roi[text_mask == 255] = fill_color
-            final_cv[y1:y2, x1:x2] = roi
-            continue
-
-        # =============================================================
-        # PATH B: Normal Bubbles — solidity-based approach
-        # =============================================================
-        if area < 500:
-            continue
-
-        hull = cv2.convexHull(largest_cnt)
-        hull_area = cv2.contourArea(hull)
-        solidity = float(area) / hull_area if hull_area > 0 else 0
-
-        margin = LARGE_MARGIN if solidity < SOLIDITY_THRESHOLD else SMALL_MARGIN
-
-        mask_roi = np.zeros(gray.shape, dtype=np.uint8)
-        cv2.drawContours(mask_roi, [largest_cnt], -1, 255, -1)
-
-        iterations = max(1, margin)
-        mask_eroded = cv2.erode(mask_roi, np.ones((3, 3), np.uint8), iterations=iterations)
-
-        fill_color = get_dominant_color(roi, mask_eroded)
-
-        mask_3ch = cv2.merge([mask_eroded, mask_eroded, mask_eroded])
-        color_block = np.full_like(roi, fill_color)
-        final_roi = np.where(mask_3ch == 255, color_block, roi)
-
-        final_cv[y1:y2, x1:x2] = final_roi
-
-    # Convert back to PIL
-    result_rgb = cv2.cvtColor(final_cv, cv2.COLOR_BGR2RGB)
-    return Image.fromarray(result_rgb)
+        x_blob = stats[:, cv2.CC_STAT_LEFT]
+        y_blob = stats[:, cv2.CC_STAT_TOP]
+        w_blob = stats[:, cv2.CC_STAT_WIDTH]
+        h_blob = stats[:, cv2.CC_STAT_HEIGHT]
+
+        # Does it touch the padding edge? (one row per label)
+        touches_edge = (
+            (x_blob <= 1) | (y_blob <= 1) |
+            (x_blob + w_blob >= roi_w - 1) |
+            (y_blob + h_blob >= roi_h - 1)
+        )
+
+        # Floating inside → it is text → remove it. Label 0 is background.
+        # Lookup table indexed by the label image: one pass over the ROI.
+        lut = np.where(touches_edge, 0, 255).astype(np.uint8)
+        lut[0] = 0
+        text_mask = lut[labels]
+
+        # Clean & fill
+        text_mask = cv2.dilate(text_mask, np.ones((3, 3), np.uint8), iterations=1)
+        fill_color = get_dominant_color(roi, cv2.bitwise_not(ink_mask))
+        roi[text_mask == 255] = fill_color
+        return
+
+    # =============================================================
+    # PATH B: Normal Bubbles — solidity-based approach
+    # =============================================================
+    if area < 500:
+        return
+
+    hull = cv2.convexHull(largest_cnt)
+    hull_area = cv2.contourArea(hull)
+    solidity = float(area) / hull_area if hull_area > 0 else 0
+
+    margin = LARGE_MARGIN if solidity < SOLIDITY_THRESHOLD else SMALL_MARGIN
+
+    mask_roi = np.zeros(gray.shape, dtype=np.uint8)
+    cv2.drawContours(mask_roi, [largest_cnt], -1, 255, -1)
+
+    iterations = max(1, margin)
+    mask_eroded = cv2.erode(mask_roi, np.ones((3, 3), np.uint8), iterations=iterations)
+
+    fill_color = get_dominant_color(roi, mask_eroded)
+    roi[mask_eroded == 255] = fill_color
@@ -49,7 +49,8 @@ class InpainterService:
         self,
         image: Image.Image,
         mask: np.ndarray,
-        boxes: np.ndarray = None
+        boxes: np.ndarray = None,
+        use_lama: bool = True
     ) -> Image.Image:
         """
         Remove text from image using LaMa or fallback.
@@ -59,6 +60,7 @@ class InpainterService:
             mask: Binary mask (numpy uint8 array, same HxW as image).
                   White (255) = areas to inpaint, Black (0) = keep.
             boxes: Bubble bounding boxes (xyxy). Used by fallback method.
+            use_lama: Set False to go straight to the CV fallback.
 
         Returns:
             PIL Image with text removed (inpainted).
@@ -68,7 +70,7 @@ class InpainterService:
             return image.copy()
 
         # Try LaMa first
-        if self._lama_available:
+        if use_lama and self._lama_available:
             try:
                 kernel = np.ones((MASK_DILATION, MASK_DILATION), np.uint8)
                 dilated_mask = cv2.dilate(mask, kernel, iterations=1)
@@ -88,6 +90,41 @@ class InpainterService:
         logger.warning("No inpainting method available. Returning original image.")
         return image.copy()
 
+    def inpaint_buffer(
+        self,
+        page,
+        mask: np.ndarray,
+        boxes: np.ndarray = None,
+        use_lama: bool = True
+    ) -> None:
+        """
+        Same as inpaint(), but edits a PageBuffer in place.
+
+        The CV fallback works directly on the buffer's RGB array; LaMa needs
+        PIL input, so the page is converted only at that boundary and the
+        result copied back into the buffer.
+        """
+        if not np.any(mask):
+            logger.info("Empty mask — skipping inpainting.")
+            return
+
+        if use_lama and self._lama_available:
+            try:
+                kernel = np.ones((MASK_DILATION, MASK_DILATION), np.uint8)
+                dilated_mask = cv2.dilate(mask, kernel, iterations=1)
+                page.replace(self.lama(page.to_pil(), Image.fromarray(dilated_mask)))
+                return
+            except Exception as e:
+                logger.warning(f"⚠️ LaMa inpainting failed: {e}. Using fallback.")
+
+        if boxes is not None and len(boxes) > 0:
+            from .fallback_inpainter import fallback_inpaint_array
+            logger.info("Using CV-based fallback inpainter.")
+            fallback_inpaint_array(page.array, boxes)
+            return
+
+        logger.warning("No inpainting method available. Keeping original image.")
+
     @staticmethod
     def build_text_mask(
         image_shape: tuple,
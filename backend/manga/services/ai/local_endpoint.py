@@ -0,0 +1,484 @@
+"""
+Local Translation Endpoint
+===========================
+A Modal-compatible HTTP endpoint that runs on the local machine, used for
+offline load testing of the Modal path without paying for GPUs.
+
+It serves the same contract as `TranslationPipeline.translate` / `health`
+in `ml_pipeline/modal_app.py`:
+
+    POST .../translate                    multipart (image, source_lang, target_lang, profile) → image
+    GET  .../health                       → {"status": "ready", ...}
+    POST .../chapters                     multipart (archive, source_lang, target_lang, profile) → 202 {"job_id", "total_pages"}
+    GET  .../chapters/{job_id}            → {"status", "completed_pages", "ready", "failed", ...}
+    GET  .../chapters/{job_id}/pages/{n}  → image
+    DELETE .../chapters/{job_id}
+
+Backends:
+  - StubTranslationBackend: re-encodes the page, with configurable latency
+    and error injection (no models needed).
+  - LocalPipelineBackend: runs the local MangaTranslationPipeline.
+
+Usage:
+    python manage.py serve_translation_endpoint --backend stub --latency-ms 800
+    MODAL_ENDPOINT_URL=http://127.0.0.1:8765/translate
+    python manage.py loadtest_translation --requests 200 --concurrency 8
+"""
+
+import io
+import json
+import math
+import time
+import uuid
+import random
+import logging
+import zipfile
+import threading
+from email.parser import BytesParser
+from email.policy import default as default_policy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+from PIL import Image
+
+from ..archive_ingest import chapter_image_members
+from .profiles import get_profile, OUTPUT_MEDIA_TYPES
+from .page_encoder import encode_page, choose_output_format
+from .batching import dispatcher_stats
+
+logger = logging.getLogger(__name__)
+
+
+class InjectedError(Exception):
+    """Raised by the stub backend to simulate a remote failure."""
+
+
+def _encode(image: Image.Image, profile: Optional[str]) -> bytes:
+    return encode_page(image, choose_output_format(get_profile(profile)['output_format']))
+
+
+def _media_type(profile: Optional[str]) -> str:
+    return OUTPUT_MEDIA_TYPES[choose_output_format(get_profile(profile)['output_format'])]
+
+
+# ============================================================
+# Backends
+# ============================================================
+
+class StubTranslationBackend:
+    """
+    Returns the input page re-encoded in the profile's output format after
+    an artificial delay.
+    Used to measure client/transport overhead and failure handling.
+    """
+
+    name = 'stub'
+
+    def __init__(
+        self,
+        latency_ms: float = 0,
+        jitter_ms: float = 0,
+        error_rate: float = 0.0,
+        seed: Optional[int] = None
+    ):
+        self.latency_ms = max(0.0, latency_ms)
+        self.jitter_ms = max(0.0, jitter_ms)
+        self.error_rate = min(max(error_rate, 0.0), 1.0)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _sample(self) -> Tuple[float, bool]:
+        with self._lock:
+            jitter = self._random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+            fail = self._random.random() < self.error_rate
+        return max(0.0, self.latency_ms + jitter) / 1000.0, fail
+
+    def translate(
+        self,
+        image_bytes: bytes,
+        source_lang: str,
+        target_lang: str,
+        profile: Optional[str] = None
+    ) -> bytes:
+        delay, fail = self._sample()
+        if delay:
+            time.sleep(delay)
+        if fail:
+            raise InjectedError("Injected failure")
+
+        return _encode(Image.open(io.BytesIO(image_bytes)).convert("RGB"), profile)
+
+    def health(self) -> Dict:
+        return {
+            'status': 'ready',
+            'device': 'local-stub',
+            'lama_available': False,
+            'backend': self.name,
+            'latency_ms': self.latency_ms,
+            'jitter_ms': self.jitter_ms,
+            'error_rate': self.error_rate,
+        }
+
+
+class LocalPipelineBackend:
+    """Runs pages through the local MangaTranslationPipeline models."""
+
+    name = 'local'
+
+    def __init__(self):
+        from .pipeline import MangaTranslationPipeline
+        self.pipeline = MangaTranslationPipeline.get_instance()
+
+    def translate(
+        self,
+        image_bytes: bytes,
+        source_lang: str,
+        target_lang: str,
+        profile: Optional[str] = None
+    ) -> bytes:
+        image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
+        translated, _page_info = self.pipeline.translate_page(image, profile=profile, source_lang=source_lang)
+        return _encode(translated, profile)
+
+    def health(self) -> Dict:
+        results = self.pipeline.test_models()
+        return {
+            'status': 'ready' if results['overall']['status'] == 'ok' else 'error',
+            'device': 'local',
+            'lama_available': bool(getattr(self.pipeline.inpainter, '_lama_available', False)),
+            'backend': self.name,
+            'details': results,
+            'batching': dispatcher_stats(),
+        }
+
+
+# ============================================================
+# Chapter Jobs
+# ============================================================
+
+class ChapterJobStore:
+    """
+    In-memory equivalent of the Modal chapter Dicts: accepts an archive,
+    fans its pages out over a thread pool and keeps results until deleted.
+    """
+
+    def __init__(self, backend, workers: int = 4):
+        self.backend = backend
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='chapter')
+        self._jobs: Dict[str, Dict] = {}
+        self._pages: Dict[Tuple[str, int], bytes] = {}
+        self._lock = threading.Lock()
+
+    def submit(
+        self,
+        archive_bytes: bytes,
+        source_lang: str,
+        target_lang: str,
+        profile: Optional[str] = None,
+        skip_pages: Optional[List[int]] = None
+    ) -> Dict:
+        profile = get_profile(profile)['name']
+        with zipfile.ZipFile(io.BytesIO(archive_bytes), 'r') as zf:
+            pages = [zf.read(name) for name in chapter_image_members(zf)]
+        if not pages:
+            raise ValueError("No images found in archive")
+
+        skipped = sorted({n for n in (skip_pages or ()) if 1 <= n <= len(pages)})
+
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._jobs[job_id] = {
+                'status': 'completed' if len(skipped) == len(pages) else 'processing',
+                'total_pages': len(pages),
+                'completed_pages': len(skipped),
+                'ready': [],
+                'failed': [],
+                'skipped': skipped,
+                'error': None,
+                'profile': profile,
+            }
+        for page_number, page in enumerate(pages, 1):
+            if page_number not in skipped:
+                self.executor.submit(self._run_page, job_id, page_number, page, source_lang, target_lang, profile)
+        return {'job_id': job_id, 'total_pages': len(pages), 'skipped': skipped}
+
+    def _run_page(
+        self,
+        job_id: str,
+        page_number: int,
+        page: bytes,
+        source_lang: str,
+        target_lang: str,
+        profile: str
+    ):
+        try:
+            result = self.backend.translate(page, source_lang, target_lang, profile)
+        except Exception as e:
+            logger.warning(f"Chapter {job_id}: page {page_number} failed: {e}")
+            result = None
+
+        with self._lock:
+            state = self._jobs.get(job_id)
+            if state is None:  # deleted while running
+                return
+            if result is None:
+                state['failed'].append(page_number)
+            else:
+                self._pages[(job_id, page_number)] = result
+                state['ready'].append(page_number)
+            state['completed_pages'] = len(state['ready']) + len(state['failed']) + len(state['skipped'])
+            if state['completed_pages'] == state['total_pages']:
+                state['status'] = 'completed' if state['ready'] else 'failed'
+                if not state['ready']:
+                    state['error'] = 'All pages failed'
+
+    def status(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            state = self._jobs.get(job_id)
+            if state is None:
+                return None
+            return {
+                'job_id': job_id,
+                **state,
+                'ready': sorted(state['ready']),
+                'failed': sorted(state['failed']),
+            }
+
+    def page(self, job_id: str, page_number: int) -> Tuple[Optional[bytes], Optional[str]]:
+        """Return (page bytes, profile name) for a finished page."""
+        with self._lock:
+            state = self._jobs.get(job_id) or {}
+            return self._pages.get((job_id, page_number)), state.get('profile')
+
+    def delete(self, job_id: str) -> bool:
+        with self._lock:
+            state = self._jobs.pop(job_id, None)
+            if state is None:
+                return False
+            for page_number in state['ready']:
+                self._pages.pop((job_id, page_number), None)
+            return True
+
+
+# ============================================================
+# HTTP Server
+# ============================================================
+
+def _parse_multipart(content_type: str, body: bytes) -> Dict[str, bytes]:
+    """Parse a multipart/form-data body into {field_name: raw bytes}."""
+    header = f"Content-Type: {content_type}\r\nMIME-Version: 1.0\r\n\r\n".encode()
+    message = BytesParser(policy=default_policy).parsebytes(header + body)
+
+    fields = {}
+    if not message.is_multipart():
+        return fields
+    for part in message.iter_parts():
+        name = part.get_param('name', header='content-disposition')
+        if name:
+            fields[name] = part.get_payload(decode=True) or b''
+    return fields
+
+
+class TranslationEndpointHandler(BaseHTTPRequestHandler):
+    """Routes requests to the server's backend using the Modal URL layout."""
+
+    server_version = "MangaTKLocalEndpoint/1.0"
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+    def _send(self, status_code: int, content: bytes, content_type: str):
+        self.send_response(status_code)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def _send_json(self, status_code: int, payload: Dict):
+        self._send(status_code, json.dumps(payload).encode(), 'application/json')
+
+    def _read_fields(self) -> Dict[str, bytes]:
+        length = int(self.headers.get('Content-Length', 0))
+        return _parse_multipart(self.headers.get('Content-Type', ''), self.rfile.read(length))
+
+    def _chapter_route(self) -> Optional[List[str]]:
+        """Split '.../chapters/<job_id>/pages/<n>' into ['<job_id>', 'pages', '<n>']."""
+        path = self.path.split('?', 1)[0].rstrip('/')
+        head, sep, tail = path.rpartition('chapters')
+        if not sep:
+            return None
+        return [p for p in tail.split('/') if p]
+
+    def do_GET(self):
+        route = self._chapter_route()
+        if route is not None:
+            self._get_chapter(route)
+        elif self.path.rstrip('/').endswith('health'):
+            self._send_json(200, self.server.backend.health())
+        else:
+            self._send_json(404, {'error': 'Not found'})
+
+    def _get_chapter(self, route: List[str]):
+        store = self.server.chapters
+        if len(route) == 1:
+            state = store.status(route[0])
+            if state is None:
+                self._send_json(404, {'error': 'Job not found'})
+            else:
+                self._send_json(200, state)
+        elif len(route) == 3 and route[1] == 'pages' and route[2].isdigit():
+            content, profile = store.page(route[0], int(route[2]))
+            if content is None:
+                self._send_json(404, {'error': 'Page not ready'})
+            else:
+                self._send(200, content, _media_type(profile))
+        else:
+            self._send_json(404, {'error': 'Not found'})
+
+    def do_DELETE(self):
+        route = self._chapter_route()
+        if route and len(route) == 1 and self.server.chapters.delete(route[0]):
+            self._send_json(200, {'deleted': route[0]})
+        else:
+            self._send_json(404, {'error': 'Job not found'})
+
+    def do_POST(self):
+        route = self._chapter_route()
+        if route == []:
+            self._submit_chapter()
+            return
+        if not self.path.rstrip('/').endswith('translate'):
+            self._send_json(404, {'error': 'Not found'})
+            return
+
+        try:
+            fields = self._read_fields()
+
+            image_bytes = fields.get('image')
+            if not image_bytes:
+                self._send_json(400, {'error': 'No image provided'})
+                return
+
+            source_lang = fields.get('source_lang', b'ja').decode() or 'ja'
+            target_lang = fields.get('target_lang', b'ar').decode() or 'ar'
+            profile = fields.get('profile', b'').decode() or None
+            get_profile(profile)
+
+            translated = self.server.backend.translate(image_bytes, source_lang, target_lang, profile)
+            self._send(200, translated, _media_type(profile))
+        except ValueError as e:
+            self._send_json(400, {'error': str(e)})
+        except Exception as e:
+            self._send_json(500, {'error': str(e)})
+
+    def _submit_chapter(self):
+        try:
+            fields = self._read_fields()
+            archive = fields.get('archive')
+            if not archive:
+                self._send_json(400, {'error': 'No archive provided'})
+                return
+
+            source_lang = fields.get('source_lang', b'ja').decode() or 'ja'
+            target_lang = fields.get('target_lang', b'ar').decode() or 'ar'
+            profile = fields.get('profile', b'').decode() or None
+            skip_pages = [
+                int(n) for n in fields.get('skip_pages', b'').decode().split(',')
+                if n.strip().isdigit()
+            ]
+            job = self.server.chapters.submit(archive, source_lang, target_lang, profile, skip_pages)
+            self._send_json(202, job)
+        except (zipfile.BadZipFile, ValueError) as e:
+            self._send_json(400, {'error': str(e)})
+        except Exception as e:
+            self._send_json(500, {'error': str(e)})
+
+
+class TranslationEndpointServer(ThreadingHTTPServer):
+    """Threaded HTTP server bound to a single translation backend."""
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], backend, chapter_workers: int = 4):
+        super().__init__(address, TranslationEndpointHandler)
+        self.backend = backend
+        self.chapters = ChapterJobStore(backend, workers=chapter_workers)
+
+    def server_close(self):
+        super().server_close()
+        self.chapters.executor.shutdown(wait=False, cancel_futures=True)
+
+
+# ============================================================
+# Load Generator
+# ============================================================
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile over an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def run_load_test(
+    client,
+    images: List[Image.Image],
+    total_requests: int,
+    concurrency: int,
+    source_lang: str = 'ja',
+    target_lang: str = 'ar',
+    profile: Optional[str] = None
+) -> Dict:
+    """
+    Drive `client.translate_page` at a fixed concurrency.
+
+    Args:
+        client: ModalTranslationClient (or anything with translate_page).
+        images: Sample pages, sent round-robin.
+        total_requests: Number of pages to send in total.
+        concurrency: Number of in-flight requests.
+        profile: Pipeline profile sent with every page.
+
+    Returns:
+        Dict with counts, throughput (pages/s) and latency percentiles (ms).
+    """
+    latencies = []
+    errors = {}
+
+    def send(i: int) -> float:
+        started = time.perf_counter()
+        client.translate_page(images[i % len(images)], source_lang, target_lang, profile)
+        return (time.perf_counter() - started) * 1000.0
+
+    wall_started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(send, i) for i in range(total_requests)]
+        for future in as_completed(futures):
+            try:
+                latencies.append(future.result())
+            except Exception as e:
+                key = type(e).__name__
+                errors[key] = errors.get(key, 0) + 1
+    wall_seconds = time.perf_counter() - wall_started
+
+    latencies.sort()
+    return {
+        'requests': total_requests,
+        'concurrency': concurrency,
+        'profile': profile,
+        'succeeded': len(latencies),
+        'failed': total_requests - len(latencies),
+        'errors': errors,
+        'wall_seconds': wall_seconds,
+        'throughput': len(latencies) / wall_seconds if wall_seconds > 0 else 0.0,
+        'latency_ms': {
+            'min': latencies[0] if latencies else 0.0,
+            'mean': sum(latencies) / len(latencies) if latencies else 0.0,
+            'p50': percentile(latencies, 50),
+            'p90': percentile(latencies, 90),
+            'p95': percentile(latencies, 95),
+            'p99': percentile(latencies, 99),
+            'max': latencies[-1] if latencies else 0.0,
+        },
+    }
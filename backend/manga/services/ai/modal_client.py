@@ -6,22 +6,35 @@ running AI models locally.
 
 Setup:
     1. Deploy modal_app.py: `modal deploy modal_app.py`
-    2. Set MODAL_ENDPOINT_URL in .env or settings.py
+    2. Set MODAL_ENDPOINT_URL in .env or settings.py (and MODAL_CHAPTERS_URL
+       if the chapters app is not at https://USER--mangatk-chapters.modal.run)
     3. The pipeline will automatically use Modal instead of local models.
+
+Chapters are submitted once to the `chapters` endpoint and polled; the remote
+side fans the pages out and the client downloads each page as it becomes
+ready. Set MODAL_CHAPTER_API=False to fall back to one request per page.
 """
 
 import io
 import os
+import time
 import zipfile
 import shutil
 import logging
 import requests
 from pathlib import Path
-from typing import List, Optional, Callable
+from urllib.parse import urlparse
+from typing import Dict, List, Optional, Callable, Iterable, Tuple
 from PIL import Image
 
+from ..archive_ingest import chapter_image_members
+from .profiles import get_profile, output_extension, resolve_output_format, extension_for_media_type
+
 logger = logging.getLogger(__name__)
 
+# Label of the `chapters` ASGI app in modal_app.py (fixes its URL)
+CHAPTERS_LABEL = 'mangatk-chapters'
+
 
 class ModalTranslationClient:
     """
@@ -29,7 +42,7 @@ class ModalTranslationClient:
     Drop-in replacement for the local MangaTranslationPipeline.
     """
 
-    def __init__(self, endpoint_url: str = None):
+    def __init__(self, endpoint_url: str = None, chapter_api: Optional[bool] = None):
         if endpoint_url:
             self.base_url = endpoint_url.rstrip('/')
         else:
@@ -46,15 +59,62 @@ class ModalTranslationClient:
                 "or settings.py (e.g. 'https://YOUR_USER--mangatk-translation-translate.modal.run')"
             )
 
-        # Derive health endpoint from translate endpoint
+        # Derive the health endpoint from the translate endpoint (same class)
         self.translate_url = self.base_url
         parts = self.base_url.rsplit('translate', 1)
         if len(parts) == 2:
             self.health_url = parts[0] + 'health' + parts[1]
         else:
             self.health_url = self.base_url
+        self.chapters_url = self._chapters_url(self.base_url)
         self.timeout = 120  # 2 minutes per page
 
+        if chapter_api is None:
+            try:
+                from django.conf import settings
+                chapter_api = getattr(settings, 'MODAL_CHAPTER_API', True)
+            except Exception:
+                chapter_api = os.getenv('MODAL_CHAPTER_API', 'True') == 'True'
+        if chapter_api and not self.chapters_url:
+            logger.warning(
+                "Modal chapter API enabled but its URL could not be determined; "
+                "set MODAL_CHAPTERS_URL. Using one request per page."
+            )
+        self.chapter_api = bool(chapter_api) and bool(self.chapters_url)
+        self.poll_interval = 2.0    # seconds between status polls
+        self.chapter_timeout = 3600  # give up on a remote chapter after 1 hour
+
+    @staticmethod
+    def _chapters_url(translate_url: str) -> Optional[str]:
+        """
+        URL of the app-level `chapters` ASGI app.
+
+        MODAL_CHAPTERS_URL wins. Otherwise it is built from the workspace of
+        the translate endpoint and the app's fixed label:
+        https://USER--mangatk-translation-translationpipeline-translate.modal.run
+        -> https://USER--mangatk-chapters.modal.run
+        Any other host (serve_translation_endpoint) serves it next to
+        translate: http://127.0.0.1:8765/translate -> http://127.0.0.1:8765/chapters
+        """
+        try:
+            from django.conf import settings
+            explicit = getattr(settings, 'MODAL_CHAPTERS_URL', '')
+        except Exception:
+            explicit = os.getenv('MODAL_CHAPTERS_URL', '')
+        if explicit:
+            return explicit.rstrip('/')
+
+        parsed = urlparse(translate_url)
+        if not parsed.netloc.endswith('.modal.run'):
+            base = translate_url.rstrip('/')
+            if base.endswith('/translate'):
+                base = base[:-len('/translate')]
+            return f"{base}/chapters"
+        if '--' not in parsed.netloc:
+            return None
+        workspace = parsed.netloc.split('--', 1)[0]
+        return f"{parsed.scheme}://{workspace}--{CHAPTERS_LABEL}.modal.run"
+
     def health_check(self) -> dict:
         """Check if the Modal endpoint is healthy."""
         try:
@@ -64,11 +124,39 @@ class ModalTranslationClient:
         except Exception as e:
             return {'status': 'error', 'message': str(e)}
 
+    def _post_page(
+        self,
+        image_bytes: bytes,
+        filename: str,
+        source_lang: str = 'ja',
+        target_lang: str = 'ar',
+        profile: Optional[str] = None,
+        output_format: Optional[str] = None
+    ) -> Tuple[bytes, str]:
+        """POST one encoded page; returns (translated page bytes as sent by Modal, Content-Type)."""
+        files = {'image': (filename, image_bytes, 'application/octet-stream')}
+        data = {'source_lang': source_lang, 'target_lang': target_lang}
+        if profile:
+            data['profile'] = profile
+        if output_format:
+            data['output_format'] = output_format
+
+        logger.info(f"Sending page to Modal: {self.translate_url}")
+        resp = requests.post(
+            self.translate_url,
+            files=files,
+            data=data,
+            timeout=self.timeout
+        )
+        resp.raise_for_status()
+        return resp.content, resp.headers.get('Content-Type', '')
+
     def translate_page(
         self,
         image: Image.Image,
         source_lang: str = 'ja',
-        target_lang: str = 'ar'
+        target_lang: str = 'ar',
+        profile: Optional[str] = None
     ) -> Image.Image:
         """
         Send a single page to Modal for translation.
@@ -77,6 +165,7 @@ class ModalTranslationClient:
             image: PIL Image of the manga page.
             source_lang: Source language code.
             target_lang: Target language code.
+            profile: Pipeline profile name (None = endpoint default).
 
         Returns:
             Translated PIL Image.
@@ -84,23 +173,68 @@ class ModalTranslationClient:
         # Convert PIL to bytes
         buf = io.BytesIO()
         image.save(buf, format='PNG')
-        buf.seek(0)
 
-        # Send to Modal
-        files = {'image': ('page.png', buf, 'image/png')}
-        data = {'source_lang': source_lang, 'target_lang': target_lang}
+        content, _media_type = self._post_page(buf.getvalue(), 'page.png', source_lang, target_lang, profile)
 
-        logger.info(f"Sending page to Modal: {self.translate_url}")
-        resp = requests.post(
-            self.translate_url,
-            files=files,
-            data=data,
-            timeout=self.timeout
-        )
+        # Parse response image
+        return Image.open(io.BytesIO(content)).convert('RGB')
+
+    # --------------------------------------------------------
+    # Chapter API (submit / poll / fetch)
+    # --------------------------------------------------------
+
+    def submit_chapter(
+        self,
+        input_zip_path: str,
+        source_lang: str = 'ja',
+        target_lang: str = 'ar',
+        profile: Optional[str] = None,
+        skip_pages: Optional[Iterable[int]] = None,
+        output_format: Optional[str] = None
+    ) -> dict:
+        """
+        Upload a chapter archive once and start remote translation.
+
+        Args:
+            skip_pages: 1-based page numbers the remote side should not
+                translate (text-free pages from the pre-scan).
+            output_format: Encoding of the translated pages (default: the profile's).
+
+        Returns:
+            {'job_id': str, 'total_pages': int, 'skipped': [int]}
+        """
+        with open(input_zip_path, 'rb') as f:
+            files = {'archive': (Path(input_zip_path).name, f, 'application/zip')}
+            data = {'source_lang': source_lang, 'target_lang': target_lang}
+            if profile:
+                data['profile'] = profile
+            if skip_pages:
+                data['skip_pages'] = ','.join(str(n) for n in sorted(skip_pages))
+            if output_format:
+                data['output_format'] = output_format
+            logger.info(f"Submitting chapter to Modal: {self.chapters_url}")
+            resp = requests.post(self.chapters_url, files=files, data=data, timeout=self.timeout)
         resp.raise_for_status()
+        return resp.json()
 
-        # Parse response image
-        return Image.open(io.BytesIO(resp.content)).convert('RGB')
+    def chapter_status(self, job_id: str) -> dict:
+        """Return remote job state: status, total/completed pages, ready and failed page numbers."""
+        resp = requests.get(f"{self.chapters_url}/{job_id}", timeout=30)
+        resp.raise_for_status()
+        return resp.json()
+
+    def fetch_chapter_page(self, job_id: str, page_number: int) -> Tuple[bytes, str]:
+        """Download translated page `page_number` (1-based) of a remote job: (bytes, Content-Type)."""
+        resp = requests.get(f"{self.chapters_url}/{job_id}/pages/{page_number}", timeout=self.timeout)
+        resp.raise_for_status()
+        return resp.content, resp.headers.get('Content-Type', '')
+
+    def delete_chapter(self, job_id: str):
+        """Drop remote job state and stored pages."""
+        try:
+            requests.delete(f"{self.chapters_url}/{job_id}", timeout=30)
+        except Exception as e:
+            logger.warning(f"Could not delete remote chapter {job_id}: {e}")
 
     def translate_chapter(
         self,
@@ -108,72 +242,262 @@ class ModalTranslationClient:
         output_dir: str,
         on_progress: Optional[Callable[[int, int], None]] = None,
         source_lang: str = 'ja',
-        target_lang: str = 'ar'
+        target_lang: str = 'ar',
+        profile: Optional[str] = None,
+        pass_through_pages: Optional[Iterable[int]] = None,
+        on_page: Optional[Callable[[int, Dict], None]] = None,
+        done_pages: Optional[Iterable[int]] = None,
+        output_format: Optional[str] = None
     ) -> List[str]:
         """
         Translate an entire chapter ZIP/CBZ via Modal.
 
+        Uses the chapter API when available and falls back to one request
+        per page if the chapter endpoint cannot be reached.
+
         Args:
             input_zip_path: Path to ZIP/CBZ file.
             output_dir: Directory to save translated images.
             on_progress: Optional callback(current_page, total_pages).
             source_lang: Source language code.
             target_lang: Target language code.
+            profile: Pipeline profile name (default: BASELINE_PROFILE).
+            pass_through_pages: 1-based page numbers with no text; they are
+                copied from the archive instead of being sent to Modal.
+            on_page: Optional callback(page_number, result); see
+                MangaTranslationPipeline.translate_chapter.
+            done_pages: Page numbers finished by an earlier run; neither
+                sent nor written again.
+            output_format: Encoding of the translated pages (default: the profile's).
+
+        Returns:
+            List of the image file paths written by this run.
+        """
+        profile = get_profile(profile)['name']
+        output_format = resolve_output_format(profile, output_format)
+        pass_through = set(pass_through_pages or ())
+        done = set(done_pages or ())
+
+        if self.chapter_api:
+            try:
+                job = self.submit_chapter(
+                    input_zip_path, source_lang, target_lang, profile, skip_pages=pass_through | done,
+                    output_format=output_format
+                )
+            except Exception as e:
+                logger.warning(f"Chapter API unavailable ({e}), falling back to per-page requests")
+            else:
+                return self._collect_chapter(
+                    job, input_zip_path, output_dir, on_progress, profile, on_page, done, output_format
+                )
+
+        return self._translate_chapter_per_page(
+            input_zip_path, output_dir, on_progress, source_lang, target_lang, profile, pass_through,
+            on_page, done, output_format
+        )
+
+    def _collect_chapter(
+        self,
+        job: dict,
+        input_zip_path: str,
+        output_dir: str,
+        on_progress: Optional[Callable[[int, int], None]] = None,
+        profile: Optional[str] = None,
+        on_page: Optional[Callable[[int, Dict], None]] = None,
+        done: Optional[set] = None,
+        output_format: Optional[str] = None
+    ) -> List[str]:
+        """Poll a submitted job and write each page as soon as it is ready."""
+        job_id = job['job_id']
+        total = job['total_pages']
+        output_path = Path(output_dir)
+        output_path.mkdir(parents=True, exist_ok=True)
+        translated_ext = output_extension(resolve_output_format(profile, output_format))
+
+        with zipfile.ZipFile(input_zip_path, 'r') as zf:
+            image_files = chapter_image_members(zf)
+
+        def out_file(page_number: int, ext: str = translated_ext) -> Path:
+            return output_path / f'page_{page_number:03d}{ext}'
+
+        done = done or set()
+        written = {}
+        failed = {}
+        # Copied from the archive below (pages finished by an earlier run are left alone)
+        skipped = set(job.get('skipped', [])) - done
+        deadline = time.monotonic() + self.chapter_timeout
+        logger.info(f"Modal chapter {job_id}: {total - len(skipped)} of {total} pages submitted")
+        if skipped and on_progress:
+            on_progress(len(skipped), total)
+
+        try:
+            while True:
+                state = self.chapter_status(job_id)
+
+                for page_number in state.get('ready', []):
+                    if page_number in written:
+                        continue
+                    # Pages arrive already encoded; written as-is, named after their Content-Type
+                    content, media_type = self.fetch_chapter_page(job_id, page_number)
+                    target = out_file(page_number, extension_for_media_type(media_type, translated_ext))
+                    target.write_bytes(content)
+                    written[page_number] = str(target)
+                    logger.info(f"✓ Page {page_number}/{total} translated via Modal")
+                    if on_page:
+                        on_page(page_number, {
+                            'status': 'completed', 'output_path': str(target),
+                            'bubbles_found': None, 'duration_ms': None, 'error': '',
+                        })
+                    if on_progress:
+                        on_progress(len(written) + len(failed) + len(skipped), total)
+
+                for page_number in state.get('failed', []):
+                    if page_number not in failed:
+                        failed[page_number] = 'remote error'
+                        logger.error(f"Error translating page {page_number} (remote)")
+                        if on_progress:
+                            on_progress(len(written) + len(failed) + len(skipped), total)
+
+                finished = len(written) + len(failed) + len(skipped) + len(done)
+                if state.get('status') in ('completed', 'failed') or finished >= total:
+                    break
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Modal chapter {job_id} did not finish in {self.chapter_timeout}s")
+                time.sleep(self.poll_interval)
+        finally:
+            self.delete_chapter(job_id)
+
+        # Copy originals for skipped pages and, as a fallback, for pages that failed remotely
+        missing = [n for n in range(1, total + 1) if n not in written and n not in done]
+        if missing:
+            with zipfile.ZipFile(input_zip_path, 'r') as zf:
+                for page_number in missing:
+                    target = None
+                    try:
+                        original = image_files[page_number - 1]
+                        target = out_file(page_number, Path(original).suffix)
+                        target.write_bytes(zf.read(original))
+                        written[page_number] = str(target)
+                    except Exception:
+                        target = None
+                    if on_page:
+                        is_skipped = page_number in skipped
+                        on_page(page_number, {
+                            'status': 'skipped' if is_skipped else 'failed',
+                            'output_path': str(target) if target is not None else '',
+                            'bubbles_found': 0 if is_skipped else None,
+                            'duration_ms': None,
+                            'error': '' if is_skipped else failed.get(page_number, 'page not returned'),
+                        })
+
+        translated_paths = [written[n] for n in sorted(written)]
+        logger.info(f"Chapter translation complete: {len(translated_paths)} pages")
+        return translated_paths
+
+    def _translate_chapter_per_page(
+        self,
+        input_zip_path: str,
+        output_dir: str,
+        on_progress: Optional[Callable[[int, int], None]] = None,
+        source_lang: str = 'ja',
+        target_lang: str = 'ar',
+        profile: Optional[str] = None,
+        pass_through: Optional[set] = None,
+        on_page: Optional[Callable[[int, Dict], None]] = None,
+        done: Optional[set] = None,
+        output_format: Optional[str] = None
+    ) -> List[str]:
+        """
+        Translate a chapter with one synchronous request per page.
+
+        Args:
+            input_zip_path: Path to ZIP/CBZ file.
+            output_dir: Directory to save translated images.
+            on_progress: Optional callback(current_page, total_pages).
+            source_lang: Source language code.
+            target_lang: Target language code.
+            profile: Pipeline profile name (default: BASELINE_PROFILE).
+            pass_through: Page numbers copied without being sent.
+            on_page: Optional callback(page_number, result).
+            done: Page numbers finished by an earlier run (not sent again).
+            output_format: Encoding of the translated pages (default: the profile's).
 
         Returns:
             List of translated image file paths.
         """
+        pass_through = pass_through or set()
+        done = done or set()
         output_path = Path(output_dir)
         output_path.mkdir(parents=True, exist_ok=True)
 
         # Extract images from ZIP
-        image_extensions = ('.jpg', '.jpeg', '.png', '.webp', '.gif', '.bmp')
         extracted = []
 
         with zipfile.ZipFile(input_zip_path, 'r') as zf:
-            image_files = sorted([
-                f for f in zf.namelist()
-                if f.lower().endswith(image_extensions)
-                and not f.startswith('__MACOSX')
-                and not f.startswith('.')
-            ])
+            image_files = chapter_image_members(zf)
 
             temp_dir = output_path / 'temp_extract'
             temp_dir.mkdir(parents=True, exist_ok=True)
 
-            for filename in image_files:
+            for idx, filename in enumerate(image_files, 1):
+                if idx in done:
+                    continue
                 zf.extract(filename, temp_dir)
-                extracted.append(str(temp_dir / filename))
+                extracted.append((idx, str(temp_dir / filename)))
 
-        total = len(extracted)
-        logger.info(f"Sending {total} pages to Modal for translation...")
+        total = len(image_files)
+        logger.info(f"Sending {len(extracted)} pages to Modal for translation...")
 
+        output_format = resolve_output_format(profile, output_format)
+        translated_ext = output_extension(output_format)
         translated_paths = []
-        for idx, img_path in enumerate(extracted, 1):
-            try:
-                image = Image.open(img_path).convert('RGB')
-                translated = self.translate_page(image, source_lang, target_lang)
+        for idx, img_path in extracted:
+            started = time.monotonic()
+            result = {'bubbles_found': None, 'error': ''}
 
-                ext = Path(img_path).suffix
-                out_file = output_path / f'page_{idx:03d}{ext}'
-                translated.save(str(out_file))
+            if idx in pass_through:
+                out_file = output_path / f'page_{idx:03d}{Path(img_path).suffix}'
+                shutil.copy2(img_path, str(out_file))
                 translated_paths.append(str(out_file))
-
-                logger.info(f"✓ Page {idx}/{total} translated via Modal")
-
+                result.update(status='skipped', output_path=str(out_file), bubbles_found=0)
                 if on_progress:
                     on_progress(idx, total)
-
-            except Exception as e:
-                logger.error(f"Error translating page {idx}: {e}")
-                # Fallback: copy original
+            else:
                 try:
-                    ext = Path(img_path).suffix
+                    # Send the original bytes; Modal decodes them and returns the
+                    # page encoded in the requested output format.
+                    content, media_type = self._post_page(
+                        Path(img_path).read_bytes(), Path(img_path).name,
+                        source_lang, target_lang, profile, output_format
+                    )
+
+                    ext = extension_for_media_type(media_type, translated_ext)
                     out_file = output_path / f'page_{idx:03d}{ext}'
-                    shutil.copy2(img_path, str(out_file))
+                    out_file.write_bytes(content)
                     translated_paths.append(str(out_file))
-                except Exception:
-                    pass
+                    result.update(status='completed', output_path=str(out_file))
+
+                    logger.info(f"✓ Page {idx}/{total} translated via Modal")
+
+                    if on_progress:
+                        on_progress(idx, total)
+
+                except Exception as e:
+                    logger.error(f"Error translating page {idx}: {e}")
+                    result.update(status='failed', output_path='', error=str(e))
+                    # Fallback: copy original
+                    try:
+                        ext = Path(img_path).suffix
+                        out_file = output_path / f'page_{idx:03d}{ext}'
+                        shutil.copy2(img_path, str(out_file))
+                        translated_paths.append(str(out_file))
+                        result['output_path'] = str(out_file)
+                    except Exception:
+                        pass
+
+            if on_page:
+                result['duration_ms'] = int((time.monotonic() - started) * 1000)
+                on_page(idx, result)
 
         # Cleanup
         temp_dir = output_path / 'temp_extract'
@@ -0,0 +1,232 @@
+"""
+Model Bundle
+=============
+A local, checksummed directory holding every model the pipeline loads, so
+workers start fully offline and fast.
+
+Layout:
+    <bundle>/manifest.json
+    <bundle>/translation/       save_pretrained() output, model.safetensors
+    <bundle>/sentiment/         save_pretrained() output, model.safetensors
+    <bundle>/bubble_detector/   YOLO .pt weights
+
+Transformers models are stored as safetensors, which `from_pretrained`
+memory-maps: weights are paged in from the OS cache on demand, and several
+worker processes on one host share the same physical pages.
+
+The manifest records the source each model was built from plus the size and
+SHA-256 of every file. At load time only sizes are compared (cheap); the
+full checksum runs in `manage.py prepare_models --verify`. A bundle built
+from a different source than the one currently configured is ignored.
+
+Build it with:
+    python manage.py prepare_models
+
+Bundle location: settings.AI_MODEL_BUNDLE_DIR / env AI_MODEL_BUNDLE_DIR,
+default 'weights/bundle/'.
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import logging
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+WEIGHTS_DIR = Path(__file__).parent / 'weights'
+DEFAULT_BUNDLE_DIR = WEIGHTS_DIR / 'bundle'
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_VERSION = 1
+
+# name -> loader kind
+BUNDLED_MODELS = {
+    'translation': 'seq2seq',
+    'sentiment': 'sequence_classification',
+    'bubble_detector': 'yolo',
+}
+
+_CHUNK = 1024 * 1024
+
+
+def bundle_dir() -> Path:
+    """Directory of the model bundle."""
+    try:
+        from django.conf import settings
+        configured = getattr(settings, 'AI_MODEL_BUNDLE_DIR', os.getenv('AI_MODEL_BUNDLE_DIR', ''))
+    except Exception:
+        configured = os.getenv('AI_MODEL_BUNDLE_DIR', '')
+    return Path(configured) if configured else DEFAULT_BUNDLE_DIR
+
+
+def load_manifest(directory: Optional[Path] = None) -> Dict:
+    """The bundle manifest, or an empty one if there is no bundle."""
+    path = (directory or bundle_dir()) / MANIFEST_NAME
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return {'version': MANIFEST_VERSION, 'models': {}}
+    except (OSError, ValueError) as e:
+        logger.warning(f"Unreadable model bundle manifest {path}: {e}")
+        return {'version': MANIFEST_VERSION, 'models': {}}
+    if manifest.get('version') != MANIFEST_VERSION:
+        logger.warning(f"Model bundle manifest version {manifest.get('version')} not supported, ignoring")
+        return {'version': MANIFEST_VERSION, 'models': {}}
+    return manifest
+
+
+def write_manifest(manifest: Dict, directory: Optional[Path] = None):
+    """Write the manifest atomically."""
+    directory = directory or bundle_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    tmp_path = directory / (MANIFEST_NAME + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, directory / MANIFEST_NAME)
+
+
+def bundled_model_path(name: str, source: str, directory: Optional[Path] = None) -> Optional[str]:
+    """
+    Path of `name` inside the bundle, or None if it is missing, incomplete
+    or was built from a different source than `source`.
+
+    For the YOLO detector this is the weights file, otherwise the model
+    directory to pass to `from_pretrained`.
+    """
+    directory = directory or bundle_dir()
+    entry = load_manifest(directory).get('models', {}).get(name)
+    if not entry:
+        return None
+
+    if entry.get('source') != source:
+        logger.warning(
+            f"Bundled {name} model was built from {entry.get('source')}, "
+            f"configured source is {source}; run `manage.py prepare_models`"
+        )
+        return None
+
+    model_dir = directory / entry['path']
+    for rel_path, info in entry.get('files', {}).items():
+        try:
+            if (model_dir / rel_path).stat().st_size != info['size']:
+                raise OSError('size mismatch')
+        except OSError:
+            logger.warning(f"Bundled {name} model is incomplete ({rel_path}); run `manage.py prepare_models`")
+            return None
+
+    if entry.get('weights_file'):
+        return str(model_dir / entry['weights_file'])
+    return str(model_dir)
+
+
+def verify_model(name: str, directory: Optional[Path] = None) -> List[str]:
+    """Full SHA-256 check of a bundled model. Returns a list of problems."""
+    directory = directory or bundle_dir()
+    entry = load_manifest(directory).get('models', {}).get(name)
+    if not entry:
+        return [f'{name}: not in bundle']
+
+    problems = []
+    model_dir = directory / entry['path']
+    for rel_path, info in entry.get('files', {}).items():
+        file_path = model_dir / rel_path
+        if not file_path.exists():
+            problems.append(f'{name}: missing {rel_path}')
+        elif _sha256(file_path) != info['sha256']:
+            problems.append(f'{name}: checksum mismatch for {rel_path}')
+    return problems
+
+
+def configured_sources() -> Dict[str, str]:
+    """Source (local path or HuggingFace ID) each service would load without a bundle."""
+    from .translator_service import configured_model as translation_source
+    from .sentiment_service import configured_model as sentiment_source
+    from .bubble_detector import configured_weights as detector_source
+
+    sources = {}
+    for name, resolve in (
+        ('translation', translation_source),
+        ('sentiment', sentiment_source),
+        ('bubble_detector', detector_source),
+    ):
+        try:
+            sources[name] = resolve()
+        except FileNotFoundError as e:
+            logger.warning(f"{name} model not configured: {e}")
+    return sources
+
+
+def prepare_model(name: str, source: str, directory: Optional[Path] = None) -> Dict:
+    """
+    Materialize one model into the bundle and return its manifest entry.
+
+    The model is written to a temporary directory first and swapped in, so
+    running workers never see a half-written model.
+    """
+    directory = directory or bundle_dir()
+    kind = BUNDLED_MODELS[name]
+    target = directory / name
+    staging = directory / f'.{name}.tmp'
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+
+    try:
+        weights_file = None
+        if kind == 'yolo':
+            weights_file = _prepare_yolo(source, staging)
+        else:
+            _prepare_transformers(kind, source, staging)
+
+        files = {
+            str(path.relative_to(staging)): {'size': path.stat().st_size, 'sha256': _sha256(path)}
+            for path in sorted(staging.rglob('*')) if path.is_file()
+        }
+
+        shutil.rmtree(target, ignore_errors=True)
+        os.replace(staging, target)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    entry = {
+        'source': source,
+        'kind': kind,
+        'path': name,
+        'files': files,
+        'created_at': datetime.now(timezone.utc).isoformat(),
+    }
+    if weights_file:
+        entry['weights_file'] = weights_file
+    return entry
+
+
+def _prepare_transformers(kind: str, source: str, staging: Path):
+    from transformers import AutoTokenizer, AutoModelForSeq2SeqLM, AutoModelForSequenceClassification
+
+    model_cls = AutoModelForSeq2SeqLM if kind == 'seq2seq' else AutoModelForSequenceClassification
+    logger.info(f"Materializing {source} as safetensors...")
+    tokenizer = AutoTokenizer.from_pretrained(source)
+    model = model_cls.from_pretrained(source, low_cpu_mem_usage=True)
+    tokenizer.save_pretrained(str(staging))
+    model.save_pretrained(str(staging), safe_serialization=True)
+
+
+def _prepare_yolo(source: str, staging: Path) -> str:
+    """Copy the detector weights in. Returns the weights file name."""
+    from .bubble_detector import download_weights
+
+    weights_path = Path(source) if Path(source).exists() else Path(download_weights(source))
+    shutil.copy2(weights_path, staging / weights_path.name)
+    return weights_path.name
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -3,30 +3,164 @@ OCR Service
 ============
 Extracts text from manga speech bubbles using manga-ocr (Japanese)
 and EasyOCR (other languages).
+
+Recognizers are loaded lazily per source language from a pool
+(`OCRReaderPool`) and dropped again after OCR_READER_IDLE_SECONDS without
+use, so a process only holds the weights of the languages it is actually
+translating:
+    ja → manga-ocr (text) + EasyOCR ['ja', 'en'] (text regions)
+    zh → EasyOCR ['ch_sim', 'en']
+    ko → EasyOCR ['ko', 'en']
+    en → EasyOCR ['en']
+
+manga-ocr crops from concurrent jobs are micro-batched (see batching.py).
 """
 
 import re
+import time
+import threading
 import numpy as np
 import logging
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 from PIL import Image
 
+from .batching import BatchDispatcher
+
 logger = logging.getLogger(__name__)
 
+DEFAULT_SOURCE_LANG = 'ja'
+
+# Source language code → EasyOCR language list (EasyOCR only combines
+# some scripts with English)
+EASYOCR_LANGUAGES = {
+    'ja': ('ja', 'en'),
+    'zh': ('ch_sim', 'en'),
+    'ko': ('ko', 'en'),
+    'en': ('en',),
+}
+
+MANGA_OCR_KEY = ('manga-ocr',)
+
+DEFAULT_IDLE_SECONDS = 600
+EVICTION_INTERVAL_SECONDS = 60
+
+
+def _idle_seconds() -> float:
+    try:
+        from django.conf import settings
+        return float(getattr(settings, 'OCR_READER_IDLE_SECONDS', DEFAULT_IDLE_SECONDS))
+    except Exception:
+        return DEFAULT_IDLE_SECONDS
+
+
+class OCRReaderPool:
+    """
+    Recognizers keyed by language set, loaded on first use and evicted when
+    idle. A reader being used by another thread stays alive until that call
+    returns, even if the pool has dropped it.
+    """
+
+    def __init__(self, idle_seconds: Optional[float] = None):
+        self.idle_seconds = idle_seconds if idle_seconds is not None else _idle_seconds()
+        self._readers: Dict[Tuple[str, ...], object] = {}
+        self._last_used: Dict[Tuple[str, ...], float] = {}
+        self._load_locks: Dict[Tuple[str, ...], threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._janitor: Optional[threading.Thread] = None
+
+    def get(self, key: Tuple[str, ...]):
+        """Reader for `key` (a language tuple or MANGA_OCR_KEY), loading it if needed."""
+        with self._lock:
+            reader = self._readers.get(key)
+            if reader is not None:
+                self._last_used[key] = time.monotonic()
+                return reader
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # One loader per key; other keys keep being served meanwhile
+        with load_lock:
+            with self._lock:
+                reader = self._readers.get(key)
+            if reader is None:
+                reader = self._load(key)
+
+            with self._lock:
+                self._readers[key] = reader
+                self._last_used[key] = time.monotonic()
+                self._start_janitor()
+        return reader
+
+    def evict_idle(self) -> int:
+        """Drop readers unused for idle_seconds. Returns how many were dropped."""
+        if not self.idle_seconds:
+            return 0
+        threshold = time.monotonic() - self.idle_seconds
+        with self._lock:
+            idle = [key for key, used in self._last_used.items() if used < threshold]
+            for key in idle:
+                self._readers.pop(key, None)
+                self._last_used.pop(key, None)
+        for key in idle:
+            logger.info(f"Evicted idle OCR reader {'+'.join(key)}")
+        if idle:
+            self._release_memory()
+        return len(idle)
+
+    def loaded(self) -> Tuple[Tuple[str, ...], ...]:
+        with self._lock:
+            return tuple(self._readers)
+
+    @staticmethod
+    def _load(key: Tuple[str, ...]):
+        if key == MANGA_OCR_KEY:
+            from manga_ocr import MangaOcr
+            logger.info("Loading OCR model (manga-ocr)...")
+            reader = MangaOcr()
+        else:
+            import easyocr
+            logger.info(f"Loading OCR model (easyocr {list(key)})...")
+            reader = easyocr.Reader(list(key))
+        logger.info(f"✅ OCR model loaded: {'+'.join(key)}")
+        return reader
+
+    @staticmethod
+    def _release_memory():
+        import gc
+        gc.collect()
+        try:
+            import torch
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except ImportError:
+            pass
+
+    def _start_janitor(self):
+        # Called with self._lock held
+        if not self.idle_seconds or (self._janitor and self._janitor.is_alive()):
+            return
+
+        def run():
+            while True:
+                time.sleep(min(EVICTION_INTERVAL_SECONDS, self.idle_seconds))
+                self.evict_idle()
+                with self._lock:
+                    if not self._readers:
+                        self._janitor = None
+                        return
+
+        self._janitor = threading.Thread(target=run, daemon=True, name='ocr-reader-eviction')
+        self._janitor.start()
+
 
 class OCRService:
     """Extracts text from cropped bubble images."""
 
     _instance: Optional['OCRService'] = None
 
-    def __init__(self):
-        from manga_ocr import MangaOcr
-        import easyocr
-
-        logger.info("Loading OCR models (manga-ocr + easyocr)...")
-        self.manga_ocr = MangaOcr()
-        self.easyocr_reader = easyocr.Reader(['ja', 'en'])
-        logger.info("✅ OCR models loaded.")
+    def __init__(self, pool: Optional[OCRReaderPool] = None):
+        self.pool = pool or OCRReaderPool()
+        # manga-ocr crops from all concurrent jobs share one generate() call
+        self._manga_ocr = BatchDispatcher('manga-ocr', lambda _key, images: self._manga_ocr_batch(images))
 
     @classmethod
     def get_instance(cls) -> 'OCRService':
@@ -34,13 +168,21 @@ class OCRService:
             cls._instance = cls()
         return cls._instance
 
-    def extract_text(self, bubble_crop: np.ndarray, source_lang: str = 'ja') -> str:
+    @staticmethod
+    def easyocr_languages(source_lang: str) -> Tuple[str, ...]:
+        """EasyOCR language set for a source language (unknown → Japanese set)."""
+        return EASYOCR_LANGUAGES.get(source_lang, EASYOCR_LANGUAGES[DEFAULT_SOURCE_LANG])
+
+    def easyocr_reader(self, source_lang: str = DEFAULT_SOURCE_LANG):
+        return self.pool.get(self.easyocr_languages(source_lang))
+
+    def extract_text(self, bubble_crop: np.ndarray, source_lang: str = DEFAULT_SOURCE_LANG) -> str:
         """
         Extract text from a cropped bubble image.
 
         Args:
             bubble_crop: BGR/RGB numpy array of the cropped bubble region.
-            source_lang: Source language code ('ja', 'en', etc.)
+            source_lang: Source language code ('ja', 'zh', 'ko', 'en')
 
         Returns:
             Extracted text string, or empty string if extraction fails.
@@ -48,9 +190,9 @@ class OCRService:
         try:
             if source_lang == 'ja':
                 roi_pil = Image.fromarray(bubble_crop)
-                text = self.manga_ocr(roi_pil)
+                text = self._manga_ocr(roi_pil)
             else:
-                detections = self.easyocr_reader.readtext(bubble_crop)
+                detections = self.easyocr_reader(source_lang).readtext(bubble_crop)
                 text = " ".join([t[1] for t in detections])
 
             return text.strip()
@@ -58,18 +200,37 @@ class OCRService:
             logger.warning(f"OCR extraction failed: {e}")
             return ""
 
-    def get_text_mask_regions(self, bubble_crop: np.ndarray) -> list:
+    def extract_texts(self, bubble_crops: List[np.ndarray], source_lang: str = DEFAULT_SOURCE_LANG) -> List[str]:
+        """
+        extract_text for several crops. Japanese crops are queued together
+        so manga-ocr runs them in shared batches.
+        """
+        if source_lang != 'ja':
+            return [self.extract_text(crop, source_lang) for crop in bubble_crops]
+
+        futures = [self._manga_ocr.submit(Image.fromarray(crop)) for crop in bubble_crops]
+        texts = []
+        for future in futures:
+            try:
+                texts.append(future.result().strip())
+            except Exception as e:
+                logger.warning(f"OCR extraction failed: {e}")
+                texts.append("")
+        return texts
+
+    def get_text_mask_regions(self, bubble_crop: np.ndarray, source_lang: str = DEFAULT_SOURCE_LANG) -> list:
         """
         Get text bounding polygons for mask generation (used by inpainter).
 
         Args:
             bubble_crop: BGR/RGB numpy array of the cropped bubble region.
+            source_lang: Source language code; selects the EasyOCR reader.
 
         Returns:
             List of (bbox_points, text) tuples from EasyOCR paragraph detection.
         """
         try:
-            detections = self.easyocr_reader.readtext(
+            detections = self.easyocr_reader(source_lang).readtext(
                 bubble_crop,
                 paragraph=True,
                 link_threshold=0.3,
@@ -80,6 +241,23 @@ class OCRService:
             logger.warning(f"Text region detection failed: {e}")
             return []
 
+    def _manga_ocr_batch(self, images: List[Image.Image]) -> List[str]:
+        """Run manga-ocr on several crops in one padded generate() call."""
+        reader = self.pool.get(MANGA_OCR_KEY)
+        try:
+            import torch
+            from manga_ocr.ocr import post_process
+            preprocess = reader._preprocess
+        except (ImportError, AttributeError):
+            # Other manga-ocr versions: one crop at a time
+            return [reader(image) for image in images]
+
+        # Same normalisation MangaOcr.__call__ applies before _preprocess
+        pixels = torch.stack([preprocess(image.convert('L').convert('RGB')) for image in images])
+        with torch.no_grad():
+            token_ids = reader.model.generate(pixels.to(reader.model.device), max_length=300).cpu()
+        return [post_process(reader.tokenizer.decode(ids, skip_special_tokens=True)) for ids in token_ids]
+
     @staticmethod
     def is_valid_source_text(text: str, source_lang: str) -> bool:
         """
@@ -113,4 +291,10 @@ class OCRService:
             en_chars = re.findall(r'[a-zA-Z]', text)
             return len(en_chars) > 0
 
+        elif source_lang == 'zh':
+            return len(re.findall(r'[\u4E00-\u9FFF]', text)) > 0
+
+        elif source_lang == 'ko':
+            return len(re.findall(r'[\uAC00-\uD7AF\u1100-\u11FF\u3130-\u318F]', text)) > 0
+
         return True
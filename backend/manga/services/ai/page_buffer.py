@@ -0,0 +1,89 @@
+"""
+Page Buffer
+============
+A single decoded page shared by every pipeline stage.
+
+The page is held as one RGB uint8 ndarray (H x W x 3). Stages take views
+(`crop`) and write into it in place (inpainting); conversions to PIL happen
+only at model/encoder boundaries (LaMa, text rendering, saving).
+
+Usage:
+    page = PageBuffer.open('/path/page.jpg')
+    bubble = page.crop((x1, y1, x2, y2))   # view, no copy
+    page.replace(lama_result)              # swap in a model output
+    final = page.to_pil()                  # one copy for rendering / saving
+"""
+
+import numpy as np
+from typing import Sequence, Union, BinaryIO
+from pathlib import Path
+from PIL import Image
+
+
+class PageBuffer:
+    """Owns the decoded pixels of one page (RGB, uint8, C-contiguous)."""
+
+    __slots__ = ('array',)
+
+    def __init__(self, array: np.ndarray):
+        if array.ndim != 3 or array.shape[2] != 3 or array.dtype != np.uint8:
+            raise ValueError(f"PageBuffer expects an HxWx3 uint8 array, got {array.shape} {array.dtype}")
+        if not array.flags.writeable or not array.flags.c_contiguous:
+            array = np.array(array, dtype=np.uint8, order='C')
+        self.array = array
+
+    @classmethod
+    def open(cls, source: Union[str, Path, BinaryIO]) -> 'PageBuffer':
+        """Decode an encoded page straight into the buffer."""
+        with Image.open(source) as img:
+            if img.mode != 'RGB':
+                img = img.convert('RGB')
+            return cls(np.array(img))
+
+    @classmethod
+    def from_pil(cls, image: Image.Image) -> 'PageBuffer':
+        """Copy a PIL image into a new buffer (the PIL image is left untouched)."""
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        return cls(np.array(image))
+
+    @property
+    def shape(self) -> tuple:
+        return self.array.shape
+
+    @property
+    def height(self) -> int:
+        return self.array.shape[0]
+
+    @property
+    def width(self) -> int:
+        return self.array.shape[1]
+
+    def clip_box(self, box: Sequence[int]) -> tuple:
+        """Clamp an xyxy box to the page."""
+        x1, y1, x2, y2 = (int(v) for v in box[:4])
+        return (
+            max(0, x1), max(0, y1),
+            min(self.width, x2), min(self.height, y2),
+        )
+
+    def crop(self, box: Sequence[int]) -> np.ndarray:
+        """Writable view of an xyxy region (no copy)."""
+        x1, y1, x2, y2 = self.clip_box(box)
+        return self.array[y1:y2, x1:x2]
+
+    def replace(self, result: Union[np.ndarray, Image.Image]):
+        """
+        Swap in a full-page result from a model (e.g. LaMa). Models that pad
+        their input may return a slightly larger image; it is cropped back.
+        """
+        if isinstance(result, Image.Image):
+            if result.mode != 'RGB':
+                result = result.convert('RGB')
+            result = np.asarray(result)
+        h, w = self.array.shape[:2]
+        np.copyto(self.array, result[:h, :w, :3])
+
+    def to_pil(self) -> Image.Image:
+        """PIL copy of the page (boundary conversion for drawing / encoding)."""
+        return Image.fromarray(self.array, 'RGB')
@@ -0,0 +1,102 @@
+"""
+Page Encoder
+=============
+Encodes translated pages to the job's output format (WebP / AVIF / JPEG /
+optimized PNG) in a small thread pool, so encoding of page N overlaps with
+translating page N+1. PIL releases the GIL while encoding.
+
+AVIF needs Pillow built with libavif or the optional `pillow-avif-plugin`;
+without either, AVIF requests fall back to WebP.
+
+Usage:
+    with PageEncoder('webp') as encoder:
+        future = encoder.submit(image, output_dir / 'page_001')
+        path = future.result()   # '.../page_001.webp'
+"""
+
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor, Future
+from pathlib import Path
+from typing import Dict
+
+from PIL import Image
+
+from .profiles import OUTPUT_FORMATS
+
+logger = logging.getLogger(__name__)
+
+ENCODER_WORKERS = 2
+FALLBACK_FORMAT = 'webp'
+
+
+def format_supported(output_format: str) -> bool:
+    """True if this Pillow build can write `output_format`."""
+    if output_format not in OUTPUT_FORMATS:
+        return False
+    if output_format == 'avif':
+        try:
+            import pillow_avif  # noqa: F401  (registers the AVIF plugin)
+        except ImportError:
+            pass
+    Image.init()
+    return OUTPUT_FORMATS[output_format][0] in Image.SAVE
+
+
+def choose_output_format(output_format: str) -> str:
+    """`output_format` if it can be written here, otherwise FALLBACK_FORMAT."""
+    if format_supported(output_format):
+        return output_format
+    logger.warning(f"Output format '{output_format}' not available, using {FALLBACK_FORMAT}")
+    return FALLBACK_FORMAT
+
+
+def save_kwargs(output_format: str) -> Dict:
+    """Encoder options for a format, with the settings quality override applied."""
+    kwargs = dict(OUTPUT_FORMATS[output_format][2])
+    try:
+        from django.conf import settings
+        quality = getattr(settings, 'TRANSLATION_OUTPUT_QUALITY', {}).get(output_format)
+    except Exception:
+        quality = None
+    if quality is not None:
+        kwargs['quality'] = int(quality)
+    return kwargs
+
+
+def encode_page(image: Image.Image, output_format: str) -> bytes:
+    """Encode a page to bytes."""
+    buf = io.BytesIO()
+    image.save(buf, format=OUTPUT_FORMATS[output_format][0], **save_kwargs(output_format))
+    return buf.getvalue()
+
+
+class PageEncoder:
+    """Thread pool writing translated pages to disk in one output format."""
+
+    def __init__(self, output_format: str, max_workers: int = ENCODER_WORKERS):
+        self.output_format = choose_output_format(output_format)
+        self.pil_format, self.extension, _ = OUTPUT_FORMATS[self.output_format]
+        self.kwargs = save_kwargs(self.output_format)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='page-encoder')
+
+    def submit(self, image: Image.Image, output_stem: Path) -> Future:
+        """
+        Queue `image` for encoding to `output_stem` + the format's extension.
+        The future resolves to the written file path.
+        """
+        target = Path(output_stem).with_suffix(self.extension)
+        return self._executor.submit(self._write, image, target)
+
+    def _write(self, image: Image.Image, target: Path) -> str:
+        image.save(str(target), format=self.pil_format, **self.kwargs)
+        return str(target)
+
+    def close(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+    def __enter__(self) -> 'PageEncoder':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
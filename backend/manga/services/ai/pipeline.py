@@ -13,22 +13,31 @@ Main orchestrator that chains all 5 AI models to translate manga pages:
 Usage:
     pipeline = MangaTranslationPipeline.get_instance()
     translated_images = pipeline.translate_chapter('/path/to/chapter.zip', '/output/dir')
+
+    # Speed/quality preset (see profiles.py)
+    pipeline.translate_chapter('/path/to/chapter.zip', '/output/dir', profile='fast')
 """
 
 import os
+import time
 import zipfile
 import shutil
 import logging
 import numpy as np
 from pathlib import Path
-from typing import List, Dict, Optional, Callable, Tuple
+from typing import List, Dict, Optional, Callable, Tuple, Iterable, Union
 from PIL import Image
 
+from ..archive_ingest import chapter_image_members
+from .profiles import get_profile, resolve_output_format
+from .page_encoder import PageEncoder
+from .page_buffer import PageBuffer
+
 logger = logging.getLogger(__name__)
 
 # Pipeline constants (from Colab config)
 CROP_PADDING = 4
-SOURCE_LANG = "ja"
+SOURCE_LANG = "ja"  # default when the job does not name a source language
 TARGET_LANG = "ar"
 
 
@@ -118,20 +127,33 @@ class MangaTranslationPipeline:
     # Single Page Translation
     # --------------------------------------------------------
 
-    def translate_page(self, image: Image.Image) -> Tuple[Image.Image, Dict]:
+    def translate_page(
+        self,
+        image: Union[Image.Image, PageBuffer],
+        profile: Optional[str] = None,
+        boxes: Optional[np.ndarray] = None,
+        source_lang: str = SOURCE_LANG
+    ) -> Tuple[Image.Image, Dict]:
         """
         Translate a single manga page through the full pipeline.
 
         Args:
-            image: PIL Image (RGB) of the manga page.
+            image: PIL Image (RGB) of the manga page, or a PageBuffer.
+                   A PageBuffer is inpainted in place; a PIL image is
+                   copied into a new buffer once and left untouched.
+            profile: Pipeline profile name (default: BASELINE_PROFILE).
+            boxes: Bubble boxes already detected (full-resolution xyxy),
+                   e.g. by BubbleDetector.detect_file. Skips step 1.
 
         Returns:
             (translated_image, page_info) tuple.
             page_info contains: bubbles_found, texts_extracted, translations, sentiments.
         """
-        from .text_renderer import render_translated_text
+        from .text_renderer import draw_translated_text
 
-        img_cv = np.array(image)
+        preset = get_profile(profile)
+        page = image if isinstance(image, PageBuffer) else PageBuffer.from_pil(image)
+        img_cv = page.array
         page_info = {
             'bubbles_found': 0,
             'texts_extracted': 0,
@@ -140,10 +162,15 @@ class MangaTranslationPipeline:
         }
 
         # Step 1: Detect speech bubbles
-        boxes = self.bubble_detector.detect(img_cv, confidence=0.25)
+        if boxes is None:
+            boxes = self.bubble_detector.detect(
+                img_cv, confidence=0.25, max_side=preset['detection_max_side']
+            )
         page_info['bubbles_found'] = len(boxes)
 
         if len(boxes) == 0:
+            if isinstance(image, PageBuffer):
+                return page.to_pil(), page_info
             return image.copy(), page_info
 
         # Step 2-4: For each bubble → OCR → Sentiment → Translate
@@ -151,6 +178,9 @@ class MangaTranslationPipeline:
         sentiments = {}
         text_regions_per_box = {}
 
+        # Bubbles of a page are submitted together so the batching
+        # dispatchers can run them (and other jobs' bubbles) in one pass
+        crops = []
         for i, box in enumerate(boxes):
             x1, y1, x2, y2 = box
 
@@ -165,23 +195,35 @@ class MangaTranslationPipeline:
             # Skip tiny bubbles
             if bubble_crop.shape[0] < 20 or bubble_crop.shape[1] < 20:
                 continue
+            crops.append((i, bubble_crop, [px1, py1, px2, py2]))
 
-            # Step 2: OCR — extract text
-            source_text = self.ocr.extract_text(bubble_crop, SOURCE_LANG)
+        # Step 2: OCR — extract text
+        source_texts = self.ocr.extract_texts([crop for _, crop, _ in crops], source_lang)
 
-            if not self.ocr.is_valid_source_text(source_text, SOURCE_LANG):
+        bubbles = []
+        for (i, bubble_crop, padded_box), source_text in zip(crops, source_texts):
+            if not self.ocr.is_valid_source_text(source_text, source_lang):
                 logger.debug(f"Bubble {i+1}: skipped (invalid text: {source_text})")
                 continue
+            bubbles.append((i, bubble_crop, padded_box, source_text))
 
-            # Step 4: Translate
-            target_text = self.translator.translate(source_text)
-            if "[Translation Error]" in target_text:
-                continue
+        # Step 4: Translate
+        target_texts = self.translator.translate_many(
+            [source_text for *_, source_text in bubbles], num_beams=preset['num_beams']
+        )
+        bubbles = [
+            (bubble, target_text) for bubble, target_text in zip(bubbles, target_texts)
+            if "[Translation Error]" not in target_text
+        ]
 
-            translations[i] = target_text
+        # Step 3: Sentiment analysis (on translated text)
+        if preset['run_sentiment']:
+            bubble_sentiments = self.sentiment.analyze_many([target_text for _, target_text in bubbles])
+        else:
+            bubble_sentiments = ["neutral"] * len(bubbles)
 
-            # Step 3: Sentiment analysis (on translated text)
-            bubble_sentiment = self.sentiment.analyze(target_text)
+        for ((i, bubble_crop, padded_box, source_text), target_text), bubble_sentiment in zip(bubbles, bubble_sentiments):
+            translations[i] = target_text
             sentiments[i] = bubble_sentiment
 
             page_info['texts_extracted'] += 1
@@ -191,7 +233,7 @@ class MangaTranslationPipeline:
             )
 
             # Get text mask regions for inpainting
-            detections = self.ocr.get_text_mask_regions(bubble_crop)
+            detections = self.ocr.get_text_mask_regions(bubble_crop, source_lang)
             if detections:
                 # Store with bubble index for global mask building
                 # Need to remap coordinates to use the padded crop offsets
@@ -200,7 +242,7 @@ class MangaTranslationPipeline:
                     remapped.append((bbox_pts, text))
                 text_regions_per_box[i] = remapped
                 # Adjust box reference to padded coords
-                boxes[i] = [px1, py1, px2, py2]
+                boxes[i] = padded_box
 
         page_info['translations'] = translations
         page_info['sentiments'] = sentiments
@@ -210,12 +252,15 @@ class MangaTranslationPipeline:
         global_mask = InpainterService.build_text_mask(
             img_cv.shape, boxes, text_regions_per_box
         )
-        cleaned_img = self.inpainter.inpaint(image, global_mask, boxes=boxes)
+        self.inpainter.inpaint_buffer(
+            page, global_mask, boxes=boxes, use_lama=preset['use_lama']
+        )
 
         # Step 6: Render translated text
-        # Reset boxes to original (non-padded) for text rendering
-        final_img = render_translated_text(
-            cleaned_img, boxes, translations, sentiments, TARGET_LANG
+        # One PIL copy of the cleaned page; text is drawn on it in place
+        final_img = page.to_pil()
+        draw_translated_text(
+            final_img, boxes, translations, sentiments, TARGET_LANG
         )
 
         return final_img, page_info
@@ -228,7 +273,13 @@ class MangaTranslationPipeline:
         self,
         input_zip_path: str,
         output_dir: str,
-        on_progress: Optional[Callable[[int, int], None]] = None
+        on_progress: Optional[Callable[[int, int], None]] = None,
+        profile: Optional[str] = None,
+        pass_through_pages: Optional[Iterable[int]] = None,
+        on_page: Optional[Callable[[int, Dict], None]] = None,
+        done_pages: Optional[Iterable[int]] = None,
+        output_format: Optional[str] = None,
+        source_lang: str = SOURCE_LANG
     ) -> List[str]:
         """
         Translate an entire chapter from a ZIP/CBZ file.
@@ -237,50 +288,70 @@ class MangaTranslationPipeline:
             input_zip_path: Path to ZIP/CBZ containing manga page images.
             output_dir: Directory to save translated page images.
             on_progress: Optional callback(current_page, total_pages).
+            profile: Pipeline profile name (default: BASELINE_PROFILE).
+            pass_through_pages: 1-based page numbers with no text (from the
+                pre-scan). They are copied byte-for-byte, not decoded.
+            on_page: Optional callback(page_number, result) called once per
+                page with result = {status: completed|skipped|failed,
+                output_path, bubbles_found, duration_ms, error}.
+            done_pages: Page numbers finished by an earlier run; they are
+                neither processed nor written again (resume / retry).
+            output_format: Format of translated pages (default: the profile's).
+                Pages are encoded in a thread pool while the next page is
+                being translated.
+            source_lang: Source language code of the chapter ('ja', 'zh',
+                'ko', 'en').
 
         Returns:
-            List of file paths to translated page images (sorted).
+            List of file paths to the page images written by this run (sorted).
         """
+        preset = get_profile(profile)
+        pass_through = set(pass_through_pages or ())
+        done = set(done_pages or ())
+        output_format = resolve_output_format(preset['name'], output_format)
+
         if self.modal_client:
-            logger.info("Using Modal.com for chapter translation")
-            # Handle possible language overrides from environment/settings if desired
+            logger.info(f"Using Modal.com for chapter translation (profile: {preset['name']})")
             return self.modal_client.translate_chapter(
                 input_zip_path, 
                 output_dir, 
                 on_progress=on_progress,
-                source_lang=SOURCE_LANG,
-                target_lang=TARGET_LANG
+                source_lang=source_lang,
+                target_lang=TARGET_LANG,
+                profile=preset['name'],
+                pass_through_pages=pass_through,
+                on_page=on_page,
+                done_pages=done,
+                output_format=output_format
             )
 
         logger.info(f"=== Starting local chapter translation ===")
         logger.info(f"Input: {input_zip_path}")
         logger.info(f"Output: {output_dir}")
+        logger.info(f"Profile: {preset['name']}")
+        logger.info(f"Source language: {source_lang}")
 
         output_path = Path(output_dir)
         output_path.mkdir(parents=True, exist_ok=True)
 
-        # Extract images from ZIP
-        image_extensions = ('.jpg', '.jpeg', '.png', '.webp', '.gif', '.bmp')
+        # Extract images from ZIP (pages finished earlier are left in the archive)
         extracted_images = []
 
         with zipfile.ZipFile(input_zip_path, 'r') as zip_ref:
-            image_files = sorted([
-                f for f in zip_ref.namelist()
-                if f.lower().endswith(image_extensions)
-                and not f.startswith('__MACOSX')
-                and not f.startswith('.')
-            ])
+            image_files = chapter_image_members(zip_ref)
 
             # Extract to temp dir
             temp_dir = output_path / 'temp_extract'
             temp_dir.mkdir(parents=True, exist_ok=True)
 
-            for filename in image_files:
+            for idx, filename in enumerate(image_files, 1):
+                if idx in done:
+                    continue
                 zip_ref.extract(filename, temp_dir)
-                extracted_images.append(str(temp_dir / filename))
+                extracted_images.append((idx, str(temp_dir / filename)))
 
-        total_pages = len(extracted_images)
-        logger.info(f"Extracted {total_pages} images from ZIP.")
+        total_pages = len(image_files)
+        logger.info(f"Extracted {len(extracted_images)} of {total_pages} images from ZIP.")
 
         if total_pages == 0:
             logger.warning("No images found in ZIP file.")
@@ -288,37 +359,98 @@ class MangaTranslationPipeline:
 
         # Process each page through the pipeline
         translated_paths = []
+        encoding = []  # (page_number, img_path, future, started, page_info)
 
-        for idx, img_path in enumerate(extracted_images, 1):
-            try:
-                image_pil = Image.open(img_path).convert("RGB")
-                translated_img, page_info = self.translate_page(image_pil)
-
-                # Save translated image
-                file_ext = Path(img_path).suffix
-                output_file = output_path / f'page_{idx:03d}{file_ext}'
-                translated_img.save(str(output_file))
+        def report(idx, page_status, output_file, started, page_info, error=''):
+            if output_file is not None:
                 translated_paths.append(str(output_file))
+            if on_page:
+                on_page(idx, {
+                    'status': page_status,
+                    'output_path': str(output_file) if output_file is not None else '',
+                    'bubbles_found': page_info['bubbles_found'],
+                    'duration_ms': int((time.monotonic() - started) * 1000),
+                    'error': error,
+                })
+
+        def copy_original(idx, img_path):
+            # On error, copy original image as fallback
+            try:
+                output_file = output_path / f'page_{idx:03d}{Path(img_path).suffix}'
+                shutil.copy2(img_path, str(output_file))
+                return output_file
+            except Exception:
+                return None
+
+        def collect_encoded(block: bool):
+            for item in list(encoding):
+                idx, img_path, future, started, page_info = item
+                if not block and not future.done():
+                    continue
+                encoding.remove(item)
+                try:
+                    report(idx, 'completed', future.result(), started, page_info)
+                except Exception as e:
+                    logger.error(f"Error encoding page {idx}: {e}")
+                    report(idx, 'failed', copy_original(idx, img_path), started, page_info, str(e))
 
-                logger.info(
-                    f"✓ Page {idx}/{total_pages}: "
-                    f"{page_info['bubbles_found']} bubbles, "
-                    f"{page_info['texts_extracted']} translated"
-                )
-
-                if on_progress:
-                    on_progress(idx, total_pages)
+        with PageEncoder(output_format) as encoder:
+            for idx, img_path in extracted_images:
+                started = time.monotonic()
+                page_info = {'bubbles_found': 0, 'texts_extracted': 0}
 
-            except Exception as e:
-                logger.error(f"Error processing page {idx}: {e}")
-                # On error, copy original image as fallback
                 try:
-                    file_ext = Path(img_path).suffix
-                    output_file = output_path / f'page_{idx:03d}{file_ext}'
-                    shutil.copy2(img_path, str(output_file))
-                    translated_paths.append(str(output_file))
-                except Exception:
-                    pass
+                    if idx in pass_through:
+                        # Text-free page: keep the original bytes
+                        output_file = output_path / f'page_{idx:03d}{Path(img_path).suffix}'
+                        shutil.copy2(img_path, str(output_file))
+                        report(idx, 'skipped', output_file, started, page_info)
+                        logger.info(f"✓ Page {idx}/{total_pages}: pass-through (no text)")
+                    else:
+                        # Detect on a reduced-scale decode; full resolution is only
+                        # decoded for pages that actually have bubbles.
+                        boxes = None
+                        if preset['detection_max_side']:
+                            boxes = self.bubble_detector.detect_file(
+                                img_path, confidence=0.25, max_side=preset['detection_max_side']
+                            )
+
+                        if boxes is not None and len(boxes) == 0:
+                            translated_img = None
+                        else:
+                            translated_img, page_info = self.translate_page(
+                                PageBuffer.open(img_path), profile=preset['name'], boxes=boxes,
+                                source_lang=source_lang
+                            )
+
+                        if page_info['bubbles_found'] == 0:
+                            # Nothing was drawn; avoid a lossy re-encode
+                            output_file = output_path / f'page_{idx:03d}{Path(img_path).suffix}'
+                            shutil.copy2(img_path, str(output_file))
+                            report(idx, 'skipped', output_file, started, page_info)
+                        else:
+                            # Encoded in the background; reported once written
+                            future = encoder.submit(translated_img, output_path / f'page_{idx:03d}')
+                            encoding.append((idx, img_path, future, started, page_info))
+
+                        logger.info(
+                            f"✓ Page {idx}/{total_pages}: "
+                            f"{page_info['bubbles_found']} bubbles, "
+                            f"{page_info['texts_extracted']} translated"
+                        )
+
+                    if on_progress:
+                        on_progress(idx, total_pages)
+
+                except Exception as e:
+                    logger.error(f"Error processing page {idx}: {e}")
+                    report(idx, 'failed', copy_original(idx, img_path), started, page_info, str(e))
+
+                collect_encoded(block=False)
+
+            collect_encoded(block=True)
+
+        translated_paths.sort()
 
         # Cleanup temp extraction directory
         temp_dir = output_path / 'temp_extract'
@@ -343,7 +475,7 @@ class MangaTranslationPipeline:
 
         model_tests = [
             ('bubble_detector', lambda: self.bubble_detector),
-            ('ocr', lambda: self.ocr),
+            ('ocr', lambda: self.ocr.easyocr_reader(SOURCE_LANG)),
             ('sentiment', lambda: self.sentiment),
             ('translator', lambda: self.translator),
             ('inpainter', lambda: self.inpainter),
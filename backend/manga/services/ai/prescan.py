@@ -0,0 +1,104 @@
+"""
+Chapter Pre-Scan
+=================
+Cheap first pass over a chapter archive: runs only bubble detection on a
+reduced-scale decode of every page and reports which pages contain text.
+
+Pages with zero detections are marked as pass-through; the main pipeline
+copies them byte-for-byte instead of decoding, translating and re-encoding
+them, and they are not charged for (see profiles.quote_cost).
+
+Usage:
+    summary = prescan_archive('/path/to/chapter.zip')
+    summary['pass_through_pages']  # [1, 7, 18]
+"""
+
+import io
+import zipfile
+import logging
+from typing import Dict, Optional
+
+from ..archive_ingest import chapter_image_members
+
+logger = logging.getLogger(__name__)
+
+# Longest side (px) used for pre-scan detection
+PRESCAN_MAX_SIDE = 640
+PRESCAN_CONFIDENCE = 0.25
+
+def prescan_enabled() -> bool:
+    try:
+        from django.conf import settings
+        return bool(getattr(settings, 'TRANSLATION_PRESCAN_ENABLED', True))
+    except Exception:
+        return True
+
+
+def prescan_archive(
+    archive_path: str,
+    max_side: int = PRESCAN_MAX_SIDE,
+    confidence: float = PRESCAN_CONFIDENCE
+) -> Dict:
+    """
+    Run downscaled bubble detection over every page of a ZIP/CBZ.
+
+    Args:
+        archive_path: Path to the chapter archive.
+        max_side: Longest side of the detection image.
+        confidence: Minimum detection confidence.
+
+    Returns:
+        Dict with total_pages, text_pages, total_bubbles,
+        pass_through_pages (1-based page numbers) and per-page counts.
+    """
+    from .bubble_detector import BubbleDetector
+    detector = BubbleDetector.get_instance()
+
+    pages = []
+    with zipfile.ZipFile(archive_path, 'r') as zf:
+        for page_number, name in enumerate(chapter_image_members(zf), 1):
+            try:
+                boxes = detector.detect_file(
+                    io.BytesIO(zf.read(name)), confidence=confidence, max_side=max_side
+                )
+                bubbles = len(boxes)
+            except Exception as e:
+                # Unknown pages go through the full pipeline
+                logger.warning(f"Pre-scan failed for {name}: {e}")
+                bubbles = None
+
+            pages.append({
+                'page_number': page_number,
+                'filename': name,
+                'bubbles': bubbles,
+            })
+
+    pass_through = [p['page_number'] for p in pages if p['bubbles'] == 0]
+    summary = {
+        'total_pages': len(pages),
+        'text_pages': len(pages) - len(pass_through),
+        'total_bubbles': sum(p['bubbles'] or 0 for p in pages),
+        'pass_through_pages': pass_through,
+        'max_side': max_side,
+        'pages': pages,
+    }
+    logger.info(
+        f"Pre-scan: {summary['text_pages']}/{summary['total_pages']} pages with text, "
+        f"{summary['total_bubbles']} bubbles"
+    )
+    return summary
+
+
+def try_prescan(archive_path: str) -> Optional[Dict]:
+    """
+    Pre-scan if enabled and the detector is available locally.
+    Returns None otherwise; callers then translate every page and charge
+    the full profile cost.
+    """
+    if not prescan_enabled():
+        return None
+    try:
+        return prescan_archive(archive_path)
+    except Exception as e:
+        logger.warning(f"Pre-scan unavailable: {e}")
+        return None
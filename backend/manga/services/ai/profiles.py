@@ -0,0 +1,153 @@
+"""
+Pipeline Profiles
+==================
+Named speed/quality presets for the translation pipeline.
+
+Each profile controls:
+  - num_beams:          1 = greedy decoding, >1 = beam search
+  - run_sentiment:      run the sentiment model (otherwise every bubble is 'neutral')
+  - use_lama:           LaMa inpainting vs. the CV fallback (fallback_inpaint_page)
+  - detection_max_side: longest side fed to YOLO (None = full resolution)
+  - output_format:      default format of the translated pages (see OUTPUT_FORMATS);
+                        a job may override it
+  - cost:               points charged per chapter
+  - premium_only:       only premium / subscribed users may select it
+
+The Modal app keeps its own copy of the pipeline knobs (it cannot import
+Django code); keep `PROFILES` in ml_pipeline/modal_app.py in sync.
+"""
+
+import math
+from typing import Dict, Optional
+
+PIPELINE_PROFILES: Dict[str, Dict] = {
+    'fast': {
+        'label': 'سريع',
+        'num_beams': 1,
+        'run_sentiment': False,
+        'use_lama': False,
+        'detection_max_side': 1024,
+        'output_format': 'jpeg',
+        'cost': 10,
+        'premium_only': False,
+    },
+    'balanced': {
+        'label': 'متوازن',
+        'num_beams': 3,
+        'run_sentiment': True,
+        'use_lama': True,
+        'detection_max_side': 1600,
+        'output_format': 'webp',
+        'cost': 20,
+        'premium_only': False,
+    },
+    'best': {
+        'label': 'أفضل جودة',
+        'num_beams': 5,
+        'run_sentiment': True,
+        'use_lama': True,
+        'detection_max_side': None,
+        'output_format': 'png',
+        'cost': 35,
+        'premium_only': True,
+    },
+}
+
+DEFAULT_PROFILE = 'balanced'
+FREE_DEFAULT_PROFILE = 'fast'
+# Calls that pass no profile keep the pipeline's original behaviour (5 beams,
+# full-resolution detection, PNG); DEFAULT_PROFILE in modal_app.py matches
+BASELINE_PROFILE = 'best'
+
+# output_format → (PIL format, file extension, save kwargs)
+# Quality can be overridden per format with settings.TRANSLATION_OUTPUT_QUALITY.
+OUTPUT_FORMATS = {
+    'png': ('PNG', '.png', {'optimize': True}),
+    'webp': ('WEBP', '.webp', {'quality': 85, 'method': 4}),
+    'avif': ('AVIF', '.avif', {'quality': 60}),
+    'jpeg': ('JPEG', '.jpg', {'quality': 85, 'optimize': True, 'progressive': True}),
+}
+
+OUTPUT_MEDIA_TYPES = {
+    'png': 'image/png',
+    'webp': 'image/webp',
+    'avif': 'image/avif',
+    'jpeg': 'image/jpeg',
+}
+
+# Job source_language → OCR / pipeline language code
+SOURCE_LANGUAGES = {
+    'japanese': 'ja',
+    'chinese': 'zh',
+    'korean': 'ko',
+    'english': 'en',
+}
+DEFAULT_SOURCE_LANGUAGE = 'japanese'
+
+PROFILE_CHOICES = [(name, name) for name in PIPELINE_PROFILES]
+OUTPUT_FORMAT_CHOICES = [(name, name) for name in OUTPUT_FORMATS]
+
+
+def get_profile(name: str = None) -> Dict:
+    """
+    Return the settings dict for a profile (with its 'name' included);
+    no name gives BASELINE_PROFILE.
+
+    Raises:
+        ValueError: If the profile name is unknown.
+    """
+    name = name or BASELINE_PROFILE
+    if name not in PIPELINE_PROFILES:
+        raise ValueError(
+            f"Unknown pipeline profile '{name}'. "
+            f"Available: {', '.join(PIPELINE_PROFILES)}"
+        )
+    return {'name': name, **PIPELINE_PROFILES[name]}
+
+
+def is_premium_user(user) -> bool:
+    return bool(getattr(user, 'is_premium', False) or getattr(user, 'subscription_plan_id', None))
+
+
+def default_profile_for(user) -> str:
+    """Free users get the cheap path by default."""
+    return DEFAULT_PROFILE if is_premium_user(user) else FREE_DEFAULT_PROFILE
+
+
+def can_use_profile(user, name: str) -> bool:
+    return not PIPELINE_PROFILES[name]['premium_only'] or is_premium_user(user)
+
+
+def quote_cost(name: str, prescan: Optional[Dict] = None) -> int:
+    """
+    Points for translating a chapter with profile `name`.
+    With a pre-scan summary only pages containing text are charged:
+    ceil(cost * text_pages / total_pages).
+    """
+    cost = PIPELINE_PROFILES[name]['cost']
+    if not prescan or not prescan.get('total_pages'):
+        return cost
+    return math.ceil(cost * prescan['text_pages'] / prescan['total_pages'])
+
+
+def output_extension(output_format: str) -> str:
+    return OUTPUT_FORMATS.get(output_format, OUTPUT_FORMATS['png'])[1]
+
+
+def resolve_output_format(profile: Optional[str] = None, output_format: Optional[str] = None) -> str:
+    """Explicit output format if given, else the profile's default."""
+    return output_format or get_profile(profile)['output_format']
+
+
+def source_lang_code(source_language: Optional[str]) -> str:
+    """Pipeline language code for a job's source_language (unknown → Japanese)."""
+    return SOURCE_LANGUAGES.get(source_language or DEFAULT_SOURCE_LANGUAGE, SOURCE_LANGUAGES[DEFAULT_SOURCE_LANGUAGE])
+
+
+def extension_for_media_type(media_type: Optional[str], default: str) -> str:
+    """File extension for a response Content-Type (e.g. 'image/webp' → '.webp')."""
+    media_type = (media_type or '').split(';')[0].strip().lower()
+    for name, candidate in OUTPUT_MEDIA_TYPES.items():
+        if candidate == media_type:
+            return OUTPUT_FORMATS[name][1]
+    return default
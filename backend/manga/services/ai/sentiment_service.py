@@ -5,14 +5,18 @@ Analyzes the sentiment/tone of text using a BERT model.
 Used to select appropriate fonts and colors for translated text.
 
 Model source (checked in order):
-  1. Local fine-tuned model in 'weights/sentiment_model/'
-  2. HuggingFace model ID from Django settings (AI_TRANSLATION_PIPELINE.SENTIMENT_MODEL)
-  3. Default fallback: cardiffnlp/twitter-xlm-roberta-base-sentiment
+  1. Model bundle built by `manage.py prepare_models` (offline, memory-mapped safetensors)
+  2. Local fine-tuned model in 'weights/sentiment_model/'
+  3. HuggingFace model ID from Django settings (AI_TRANSLATION_PIPELINE.SENTIMENT_MODEL)
+  4. Default fallback: cardiffnlp/twitter-xlm-roberta-base-sentiment
 """
 
 import logging
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional, Tuple
+
+from .batching import BatchDispatcher
+from .model_bundle import bundled_model_path
 
 logger = logging.getLogger(__name__)
 
@@ -22,11 +26,10 @@ LOCAL_MODEL_PATH = WEIGHTS_DIR / 'sentiment_model'
 FALLBACK_MODEL = "cardiffnlp/twitter-xlm-roberta-base-sentiment"
 
 
-def _resolve_model_path() -> str:
-    """Resolve model: local weights → settings → fallback."""
+def configured_model() -> str:
+    """Configured model source: local weights → settings → fallback."""
     # 1. Local weights directory
     if LOCAL_MODEL_PATH.exists() and any(LOCAL_MODEL_PATH.iterdir()):
-        logger.info(f"Using local sentiment model: {LOCAL_MODEL_PATH}")
         return str(LOCAL_MODEL_PATH)
 
     # 2. HuggingFace ID from Django settings
@@ -34,16 +37,26 @@ def _resolve_model_path() -> str:
         from django.conf import settings
         hf_model = getattr(settings, 'AI_TRANSLATION_PIPELINE', {}).get('SENTIMENT_MODEL', '')
         if hf_model:
-            logger.info(f"Using HuggingFace sentiment model: {hf_model}")
             return hf_model
     except Exception:
         pass
 
     # 3. Default fallback
-    logger.info(f"Using default sentiment model: {FALLBACK_MODEL}")
     return FALLBACK_MODEL
 
 
+def _resolve_model_path() -> Tuple[str, bool]:
+    """Resolve (model path, is_bundled): the prepared bundle first, then the configured source."""
+    source = configured_model()
+    bundled = bundled_model_path('sentiment', source)
+    if bundled:
+        logger.info(f"Using bundled sentiment model: {bundled}")
+        return bundled, True
+
+    logger.info(f"Using sentiment model: {source}")
+    return source, False
+
+
 class SentimentService:
     """Analyzes text sentiment using a BERT model (local, HuggingFace, or default)."""
 
@@ -54,14 +67,20 @@ class SentimentService:
         from transformers import pipeline as hf_pipeline
 
         device = 0 if torch.cuda.is_available() else -1
-        model_path = _resolve_model_path()
+        model_path, bundled = _resolve_model_path()
+        # Bundled models never touch the network; safetensors are memory-mapped
+        model_kwargs = {'low_cpu_mem_usage': True}
+        if bundled:
+            model_kwargs.update(local_files_only=True, use_safetensors=True)
 
         logger.info(f"Loading sentiment model: {model_path}...")
         self.analyzer = hf_pipeline(
             "sentiment-analysis",
             model=model_path,
-            device=device
+            device=device,
+            model_kwargs=model_kwargs
         )
+        self._dispatcher = BatchDispatcher('sentiment', lambda _key, texts: self.analyze_batch(texts))
         logger.info("✅ Sentiment analysis model loaded.")
 
     @classmethod
@@ -74,18 +93,29 @@ class SentimentService:
         """
         Analyze sentiment of text.
 
+        Concurrent calls are batched into one forward pass.
+
         Args:
             text: Input text (any language supported by the model).
 
         Returns:
             Sentiment label: 'positive', 'negative', or 'neutral'.
         """
+        return self._dispatcher(text)
+
+    def analyze_many(self, texts: List[str]) -> List[str]:
+        """Sentiment labels for several texts, queued together so they share batches."""
+        futures = [self._dispatcher.submit(text) for text in texts]
+        return [future.result() for future in futures]
+
+    def analyze_batch(self, texts: List[str]) -> List[str]:
+        """Sentiment labels for several texts ('neutral' for texts that fail)."""
         try:
             # Model has 512 token limit
-            result = self.analyzer(text[:512])[0]
-            label = result['label'].lower()
-            return label
+            results = self.analyzer([text[:512] for text in texts], batch_size=len(texts))
+            return [result['label'].lower() for result in results]
         except Exception as e:
+            if len(texts) > 1:
+                return [self.analyze_batch([text])[0] for text in texts]
             logger.warning(f"Sentiment analysis failed: {e}")
-            return "neutral"
-
+            return ["neutral"]
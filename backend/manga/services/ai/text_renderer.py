@@ -180,13 +180,42 @@ def render_translated_text(
     Returns:
         PIL Image with translated text rendered inside bubbles.
     """
+    result = cleaned_img.copy() if cleaned_img.mode == "RGB" else cleaned_img.convert("RGB")
+    draw_translated_text(result, boxes, translations, sentiments, language)
+    return result
+
+
+def draw_translated_text(
+    image: Image.Image,
+    boxes: np.ndarray,
+    translations: Dict[int, str],
+    sentiments: Dict[int, str],
+    language: str = 'ar'
+) -> None:
+    """
+    Draw translated text directly onto an RGB image (modified in place).
+
+    All fills are opaque, so drawing straight onto the page gives the same
+    result as compositing an RGBA overlay, without the extra page copies.
+    """
     ensure_fonts_downloaded()
 
-    result = cleaned_img.copy().convert("RGBA")
-    overlay = Image.new("RGBA", result.size, (255, 255, 255, 0))
-    draw = ImageDraw.Draw(overlay)
-    cleaned_cv = np.array(cleaned_img.convert("L"))
+    draw = ImageDraw.Draw(image)
     direction = 'rtl' if language == 'ar' else 'ltr'
+    W, H = image.size
+
+    # Background brightness is measured on the cleaned page before any text
+    # is drawn (overlapping bubbles must not see each other's text).
+    lightness = {}
+    for i, box in enumerate(boxes):
+        if i not in translations:
+            continue
+        x1, y1, x2, y2 = int(box[0]), int(box[1]), int(box[2]), int(box[3])
+        crop_box = (max(0, x1), max(0, y1), min(W, x2), min(H, y2))
+        if crop_box[2] > crop_box[0] and crop_box[3] > crop_box[1]:
+            lightness[i] = np.median(np.asarray(image.crop(crop_box).convert("L")))
+        else:
+            lightness[i] = 255
 
     for i, box in enumerate(boxes):
         if i not in translations:
@@ -200,25 +229,21 @@ def render_translated_text(
         font_path = get_font_path(sentiment, language)
 
         # Detect bubble background brightness for text color selection
-        bubble_crop = cleaned_cv[
-            max(0, y1):min(cleaned_cv.shape[0], y2),
-            max(0, x1):min(cleaned_cv.shape[1], x2)
-        ]
-        median_lightness = np.median(bubble_crop) if bubble_crop.size > 0 else 255
+        median_lightness = lightness[i]
 
         # Scanlator standard colors based on background + sentiment
         if median_lightness < 127:
             # Dark background: white text, black outline
-            text_color = (255, 255, 255, 255)
-            outline_color = (0, 0, 0, 255)
+            text_color = (255, 255, 255)
+            outline_color = (0, 0, 0)
             if sentiment == "negative":
-                text_color = (255, 150, 150, 255)  # Pale red
+                text_color = (255, 150, 150)  # Pale red
         else:
             # Light background: near-black text, white outline
-            text_color = (15, 15, 15, 255)
-            outline_color = (255, 255, 255, 255)
+            text_color = (15, 15, 15)
+            outline_color = (255, 255, 255)
             if sentiment == "negative":
-                text_color = (139, 0, 0, 255)  # Deep blood red
+                text_color = (139, 0, 0)  # Deep blood red
 
         font, lines, line_spacing = get_fitted_font(
             target_text, font_path, box_w, box_h, draw, language
@@ -265,5 +290,3 @@ def render_translated_text(
                 direction=direction, language=language
             )
             cur_y += lh + line_spacing
-
-    return Image.alpha_composite(result, overlay).convert("RGB")
@@ -4,15 +4,19 @@ Translator Service
 Translates text using a Seq2Seq model (AutoModelForSeq2SeqLM).
 
 Model source (checked in order):
-  1. Local weights in 'weights/translation_model/'
-  2. HuggingFace model ID from Django settings (AI_TRANSLATION_PIPELINE.TRANSLATION_MODEL)
+  1. Model bundle built by `manage.py prepare_models` (offline, memory-mapped safetensors)
+  2. Local weights in 'weights/translation_model/'
+  3. HuggingFace model ID from Django settings (AI_TRANSLATION_PIPELINE.TRANSLATION_MODEL)
 
 HuggingFace models are auto-downloaded and cached by transformers.
 """
 
 import logging
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional, Tuple
+
+from .batching import BatchDispatcher
+from .model_bundle import bundled_model_path
 
 logger = logging.getLogger(__name__)
 
@@ -20,11 +24,10 @@ WEIGHTS_DIR = Path(__file__).parent / 'weights'
 LOCAL_MODEL_PATH = WEIGHTS_DIR / 'translation_model'
 
 
-def _resolve_model_path() -> str:
-    """Resolve model path: local weights first, then settings, then error."""
+def configured_model() -> str:
+    """Configured model source: local weights first, then settings, then error."""
     # 1. Local weights directory
     if LOCAL_MODEL_PATH.exists() and any(LOCAL_MODEL_PATH.iterdir()):
-        logger.info(f"Using local translation model: {LOCAL_MODEL_PATH}")
         return str(LOCAL_MODEL_PATH)
 
     # 2. HuggingFace ID from Django settings
@@ -32,7 +35,6 @@ def _resolve_model_path() -> str:
         from django.conf import settings
         hf_model = getattr(settings, 'AI_TRANSLATION_PIPELINE', {}).get('TRANSLATION_MODEL', '')
         if hf_model:
-            logger.info(f"Using HuggingFace translation model: {hf_model}")
             return hf_model
     except Exception:
         pass
@@ -45,6 +47,18 @@ def _resolve_model_path() -> str:
     )
 
 
+def _resolve_model_path() -> Tuple[str, bool]:
+    """Resolve (model path, is_bundled): the prepared bundle first, then the configured source."""
+    source = configured_model()
+    bundled = bundled_model_path('translation', source)
+    if bundled:
+        logger.info(f"Using bundled translation model: {bundled}")
+        return bundled, True
+
+    logger.info(f"Using translation model: {source}")
+    return source, False
+
+
 class TranslatorService:
     """Translates text using a Seq2Seq model (local or HuggingFace)."""
 
@@ -55,11 +69,18 @@ class TranslatorService:
         from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
 
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        model_path = _resolve_model_path()
+        model_path, bundled = _resolve_model_path()
+        # Bundled models never touch the network; safetensors are memory-mapped
+        load_kwargs = {'local_files_only': True, 'use_safetensors': True} if bundled else {}
 
         logger.info(f"Loading translation model: {model_path}...")
-        self.tokenizer = AutoTokenizer.from_pretrained(model_path)
-        self.model = AutoModelForSeq2SeqLM.from_pretrained(model_path).to(self.device)
+        self.tokenizer = AutoTokenizer.from_pretrained(model_path, **load_kwargs)
+        self.model = AutoModelForSeq2SeqLM.from_pretrained(
+            model_path, low_cpu_mem_usage=True, **load_kwargs
+        ).to(self.device)
+        self._dispatcher = BatchDispatcher(
+            'translation', lambda num_beams, texts: self.translate_batch(texts, num_beams)
+        )
         logger.info(f"✅ Translation model loaded on {self.device.upper()}.")
 
     @classmethod
@@ -68,36 +89,62 @@ class TranslatorService:
             cls._instance = cls()
         return cls._instance
 
-    def translate(self, text: str) -> str:
+    def translate(self, text: str, num_beams: Optional[int] = None) -> str:
         """
         Translate source text to target language.
 
+        Concurrent calls (e.g. from several jobs) with the same num_beams
+        are batched into one generate() call.
+
         Args:
             text: Source language text.
+            num_beams: 1 = greedy decoding, >1 = beam search.
+                       None = model's generation config default.
 
         Returns:
             Translated text string, or '[Translation Error]' on failure.
         """
+        return self._dispatcher(text, key=num_beams)
+
+    def translate_many(self, texts: List[str], num_beams: Optional[int] = None) -> List[str]:
+        """Translate several texts; they are queued together so they share batches."""
+        futures = [self._dispatcher.submit(text, key=num_beams) for text in texts]
+        return [future.result() for future in futures]
+
+    def translate_batch(self, texts: List[str], num_beams: Optional[int] = None) -> List[str]:
+        """
+        Translate several texts in one padded forward pass.
+
+        Returns:
+            One translation per input, '[Translation Error]' for inputs
+            that fail. A failed batch is retried one text at a time so one
+            bad input does not fail other jobs' texts.
+        """
         import torch
 
         try:
             inputs = self.tokenizer(
-                text,
+                texts,
                 return_tensors="pt",
                 padding=True,
                 truncation=True
             ).to(self.device)
 
+            generate_kwargs = {}
+            if num_beams is not None:
+                generate_kwargs['num_beams'] = num_beams
+
             with torch.no_grad():
-                translated_tokens = self.model.generate(**inputs)
+                translated_tokens = self.model.generate(**inputs, **generate_kwargs)
 
-            translated_text = self.tokenizer.decode(
-                translated_tokens[0],
+            return self.tokenizer.batch_decode(
+                translated_tokens,
                 skip_special_tokens=True
             )
-            return translated_text
 
         except Exception as e:
+            if len(texts) > 1:
+                logger.warning(f"Batched translation failed ({e}), retrying per text")
+                return [self.translate_batch([text], num_beams)[0] for text in texts]
             logger.error(f"Translation error: {e}")
-            return "[Translation Error]"
-
+            return ["[Translation Error]"]
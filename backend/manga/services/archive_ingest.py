@@ -0,0 +1,110 @@
+"""
+Archive Ingestion
+=================
+Helpers for taking a chapter ZIP/CBZ from an upload to the publisher
+without holding the pages in memory.
+
+- `store_upload` moves Django's temp file into place (uploads larger than
+  FILE_UPLOAD_MAX_MEMORY_SIZE are already on disk) or streams the chunks.
+- `chapter_image_members` lists the page members from the ZIP directory.
+  It is the one definition of which members are pages and in which order
+  (IMAGE_EXTENSIONS, sorted by name): uploads, staging, translation
+  extraction, pre-scan and the pipelines all number pages from it.
+- `archive_pages` returns lazy page dicts for ChapterPublisher: each page
+  names its archive member and is read by the upload thread that sends it,
+  so memory is bounded by concurrency × page size.
+- `StoredFile` presents an archive already on disk (resumable upload,
+  staged archive) as an UploadedFile, so the upload views handle it like a
+  multipart file and `store_upload` moves it.
+"""
+
+import os
+import shutil
+import zipfile
+import logging
+from pathlib import Path
+from typing import Container, Dict, List, Optional
+
+from django.core.files.uploadedfile import UploadedFile
+
+logger = logging.getLogger(__name__)
+
+# Page image types accepted everywhere (manga/ml_pipeline/modal_app.py keeps a copy)
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.gif')
+
+
+def is_page_image(name: str) -> bool:
+    """Whether an archive member name is a page (not a folder, macOS metadata or hidden file)."""
+    return (
+        name.lower().endswith(IMAGE_EXTENSIONS)
+        and not name.startswith('__MACOSX')
+        and not os.path.basename(name).startswith('.')
+    )
+
+
+class StoredFile(UploadedFile):
+    """An archive on local disk as an UploadedFile; store_upload() moves it."""
+
+    def __init__(self, path, name: str, size: Optional[int] = None, staged: Optional[Dict] = None):
+        self.path = Path(path)
+        # Staging metadata (archive_staging) when the file is a staged archive
+        self.staged = staged
+        if size is None:
+            size = self.path.stat().st_size
+        super().__init__(open(self.path, 'rb'), name, 'application/zip', size)
+
+    def temporary_file_path(self):
+        return str(self.path)
+
+
+def store_upload(uploaded_file, destination) -> Path:
+    """Write an UploadedFile to `destination` without reading it into memory."""
+    destination = Path(destination)
+    destination.parent.mkdir(parents=True, exist_ok=True)
+
+    if hasattr(uploaded_file, 'temporary_file_path'):
+        # TemporaryUploadedFile: already streamed to disk by Django, just move
+        # it (Django ignores the missing temp file when the request closes)
+        uploaded_file.file.flush()
+        shutil.move(uploaded_file.temporary_file_path(), destination)
+    else:
+        with open(destination, 'wb') as target:
+            for chunk in uploaded_file.chunks():
+                target.write(chunk)
+    return destination
+
+
+def chapter_image_members(zip_file: zipfile.ZipFile, max_file_size: Optional[int] = None) -> List[str]:
+    """Image members of a chapter archive in page order (reads only the directory)."""
+    members = sorted(
+        info.filename for info in zip_file.infolist()
+        if not info.is_dir()
+        and is_page_image(info.filename)
+        and (max_file_size is None or info.file_size <= max_file_size)
+    )
+    return members
+
+
+def archive_pages(
+    zip_file: zipfile.ZipFile,
+    page_name,
+    skip: Container[int] = (),
+    max_file_size: Optional[int] = None
+) -> List[Dict]:
+    """
+    Lazy ChapterPublisher pages for the images of an open archive.
+
+    `page_name(page_number)` gives the ImgBB title; pages in `skip` (already
+    published) are left out. The archive must stay open while publishing.
+    """
+    return [
+        {
+            'archive': zip_file,
+            'member': member,
+            'filename': os.path.basename(member),
+            'page_number': page_number,
+            'name': page_name(page_number),
+        }
+        for page_number, member in enumerate(chapter_image_members(zip_file, max_file_size), 1)
+        if page_number not in skip
+    ]
@@ -0,0 +1,236 @@
+"""
+Archive Staging
+===============
+Upload a chapter archive once, analyze it once, and let later actions refer
+to it by `staging_id` instead of sending the file again.
+
+`stage_upload()` moves the upload to `<MEDIA_ROOT>/staging/<id>/` and reads
+every image member once: the CRC is checked while decompressing, the image
+header gives the dimensions and the image is verified. Nothing is
+decompressed before the ZIP directory passed the caller's size limits
+(zip bombs): chapter uploads by default, the translation limits for
+translation quotes. Members are streamed rather than read into memory. The analysis (page count, dimensions, sizes, validation
+result) is kept with the staging metadata in the cache for
+ARCHIVE_STAGING_TTL seconds (default 6 hours).
+
+Endpoints take the archive from `resolve_upload(request)`, which accepts a
+multipart `file`, a finalized resumable upload (`upload_id`) or a staged
+archive (`staging_id`). A staged archive comes back as a StoredFile with
+`.staged` set, so callers can use its analysis instead of parsing the
+archive again; store_upload() moves it out of the staging area.
+
+Usage:
+    staged = stage_upload(uploaded_file, request.user.id)
+    staged['id'], staged['analysis']['image_count']
+"""
+
+import os
+import time
+import uuid
+import shutil
+import zipfile
+import logging
+from pathlib import Path
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .archive_ingest import StoredFile, chapter_image_members, store_upload
+from .resumable_upload import finalized_file
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STAGING_TTL = 6 * 3600
+READ_SIZE = 64 * 1024
+ALLOWED_EXTENSIONS = ('.zip', '.cbz')
+# Same per-page cap as the synchronous chapter upload (views.upload_chapter)
+CHAPTER_MAX_IMAGE_SIZE = 50 * 1024 * 1024
+
+
+def staging_dir() -> Path:
+    return Path(settings.MEDIA_ROOT) / 'staging'
+
+
+def staging_ttl() -> int:
+    return int(getattr(settings, 'ARCHIVE_STAGING_TTL', DEFAULT_STAGING_TTL))
+
+
+def _key(staging_id) -> str:
+    return f'staged_archive_{staging_id}'
+
+
+def _path(staged: Dict) -> Path:
+    return staging_dir() / staged['id'] / staged['filename']
+
+
+def chapter_max_total_size() -> int:
+    return settings.DATA_UPLOAD_MAX_MEMORY_SIZE
+
+
+def _limit_error(zip_file: zipfile.ZipFile, members, max_total_size: int, max_image_size: int) -> str:
+    """Why the ZIP directory exceeds the size limits ('' if it does not)."""
+    if sum(info.file_size for info in zip_file.infolist()) > max_total_size:
+        return "حجم الملفات بعد الاستخراج كبير جداً"
+    for member in members:
+        if zip_file.getinfo(member).file_size > max_image_size:
+            return f"الصورة {member} كبيرة جداً"
+    return ''
+
+
+def analyze_archive(path, max_total_size: Optional[int] = None, max_image_size: Optional[int] = None) -> Dict:
+    """
+    Read each image member of an archive once.
+
+    The limits (uncompressed total, per image) default to the chapter
+    upload limits.
+
+    Returns:
+        dict: valid, error, image_count, total_uncompressed_size,
+              largest_image_size, pages [{page_number, filename, width, height, size}]
+    """
+    from PIL import Image
+
+    if max_total_size is None:
+        max_total_size = chapter_max_total_size()
+    if max_image_size is None:
+        max_image_size = CHAPTER_MAX_IMAGE_SIZE
+
+    analysis = {
+        'valid': True,
+        'error': '',
+        'image_count': 0,
+        'total_uncompressed_size': 0,
+        'largest_image_size': 0,
+        'pages': [],
+    }
+
+    try:
+        with zipfile.ZipFile(path, 'r') as zip_file:
+            analysis['total_uncompressed_size'] = sum(info.file_size for info in zip_file.infolist())
+            members = chapter_image_members(zip_file)
+
+            # Sizes come from the directory; reject before decompressing anything
+            analysis['error'] = _limit_error(zip_file, members, max_total_size, max_image_size)
+            if analysis['error']:
+                analysis['valid'] = False
+                members = []
+
+            for page_number, member in enumerate(members, 1):
+                info = zip_file.getinfo(member)
+                try:
+                    with zip_file.open(member) as f:
+                        with Image.open(f) as img:
+                            width, height = img.size
+                            img.verify()
+                        # Reading to the end checks the CRC
+                        while f.read(READ_SIZE):
+                            pass
+                except Exception:
+                    analysis['valid'] = False
+                    analysis['error'] = f"الملف {member} ليس صورة صالحة"
+                    break
+
+                analysis['pages'].append({
+                    'page_number': page_number,
+                    'filename': os.path.basename(member),
+                    'width': width,
+                    'height': height,
+                    'size': info.file_size,
+                })
+                analysis['largest_image_size'] = max(analysis['largest_image_size'], info.file_size)
+    except zipfile.BadZipFile:
+        analysis['valid'] = False
+        analysis['error'] = 'الملف ليس ملف ZIP/CBZ صالح'
+    except Exception as e:
+        logger.warning(f"Archive analysis of {path} failed: {e}")
+        analysis['valid'] = False
+        analysis['error'] = 'ملف تالف داخلياً'
+
+    analysis['image_count'] = len(analysis['pages'])
+    if analysis['valid'] and not analysis['image_count']:
+        analysis['valid'] = False
+        analysis['error'] = 'لا توجد صور في الملف'
+    return analysis
+
+
+def stage_upload(uploaded_file, user_id, max_total_size: Optional[int] = None,
+                 max_image_size: Optional[int] = None) -> Dict:
+    """Store an upload in the staging area and analyze it (limits as analyze_archive)."""
+    if getattr(uploaded_file, 'staged', None):
+        return uploaded_file.staged
+
+    purge_stale()
+
+    staged = {
+        'id': str(uuid.uuid4()),
+        'user_id': user_id,
+        'filename': os.path.basename(uploaded_file.name),
+        'size': uploaded_file.size,
+    }
+    path = store_upload(uploaded_file, _path(staged))
+    staged['analysis'] = analyze_archive(path, max_total_size, max_image_size)
+    cache.set(_key(staged['id']), staged, timeout=staging_ttl())
+    logger.info(f"Staged archive {staged['id']} ({staged['analysis']['image_count']} images)")
+    return staged
+
+
+def get_staged(staging_id, user_id) -> Optional[Dict]:
+    staged = cache.get(_key(staging_id))
+    if not staged or staged['user_id'] != user_id:
+        return None
+    if not _path(staged).exists():
+        # Consumed by an upload endpoint, or cleaned up
+        discard(staged)
+        return None
+    return staged
+
+
+def update_staged(staged: Dict, **fields):
+    """Keep more results with the staged archive (e.g. the translation pre-scan)."""
+    staged.update(fields)
+    cache.set(_key(staged['id']), staged, timeout=staging_ttl())
+
+
+def staged_path(staged: Dict) -> Path:
+    return _path(staged)
+
+
+def discard(staged: Dict):
+    shutil.rmtree(staging_dir() / staged['id'], ignore_errors=True)
+    cache.delete(_key(staged['id']))
+
+
+def purge_stale():
+    """Remove staged archives older than the staging TTL."""
+    directory = staging_dir()
+    if not directory.exists():
+        return
+    cutoff = time.time() - staging_ttl()
+    for path in directory.iterdir():
+        try:
+            if path.stat().st_mtime < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+        except OSError:
+            pass
+
+
+def resolve_upload(request):
+    """
+    The archive of an upload request: multipart `file`, finalized resumable
+    upload `upload_id`, or staged archive `staging_id`. None if missing.
+    """
+    uploaded_file = request.FILES.get('file')
+    if uploaded_file:
+        return uploaded_file
+
+    upload_id = request.data.get('upload_id')
+    if upload_id:
+        return finalized_file(upload_id, request.user.id)
+
+    staging_id = request.data.get('staging_id')
+    if staging_id:
+        staged = get_staged(staging_id, request.user.id)
+        if staged:
+            return StoredFile(_path(staged), staged['filename'], staged['size'], staged=staged)
+    return None
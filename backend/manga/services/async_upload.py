@@ -2,173 +2,186 @@
 Async Upload Service using Threading
 ====================================
 
-يوفر خدمة رفع غير متزامنة للصور إلى ImgBB باستخدام Python threading
+يوفر خدمة رفع متوازية للصور إلى ImgBB باستخدام Python threading
+
+One executor per process with a global limit of UPLOAD_MAX_CONCURRENCY
+uploads (default 8), however many chapters are being published at once.
+Work is queued per job and the worker threads take one item from each job
+in turn (round robin), so a 300-page chapter does not hold up a 10-page
+one. Cancelling a job drops its queued uploads; only the uploads already
+in flight finish.
+
+Job state lives in the cache, so any gunicorn worker can report or cancel
+a job that runs in a Celery worker: progress under `upload_job_<id>`, the
+cancel flag in its own key `upload_job_<id>:cancel` so that a progress
+update written at the same time cannot erase it.
+
+Usage:
+    future = async_upload_service.submit(job_id, upload_page, page)
+    async_upload_service.cancel_job(job_id)
 """
 
 import threading
-import queue
-from typing import Callable, Optional, Dict, Any
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional
 import logging
 
+from django.conf import settings
+from django.core.cache import cache
+
 logger = logging.getLogger(__name__)
 
+DEFAULT_MAX_WORKERS = 8
+JOB_TIMEOUT = 3600  # 1 hour
+
 
 class AsyncUploadService:
     """
-    خدمة رفع غير متزامنة مع تتبع التقدم
-    
+    خدمة رفع مشتركة بحد أقصى عام للتوازي
+
     Features:
-    - Multi-threaded image uploads
-    - Real-time progress tracking
-    - Error handling per image
-    - Cancellable operations
+    - Global concurrency limit per process
+    - Round-robin scheduling across jobs
+    - Cancelling a job drops its pending uploads
+    - Job state in the cache (shared across processes)
     """
-    
-    def __init__(self, max_workers: int = 5):
-        """
-        Args:
-            max_workers: Maximum number of concurrent uploads
-        """
-        self.max_workers = max_workers
-        self.active_jobs: Dict[str, Dict[str, Any]] = {}
-        self._lock = threading.Lock()
-    
-    def upload_images_async(
-        self,
-        job_id: str,
-        images: list,
-        upload_function: Callable,
-        on_progress: Optional[Callable] = None,
-        on_complete: Optional[Callable] = None,
-        on_error: Optional[Callable] = None
-    ):
+
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS):
         """
-        رفع مجموعة من الصور بشكل غير متزامن
-        
         Args:
-            job_id: معرف فريد للعملية
-            images: قائمة الصور للرفع
-            upload_function: دالة الرفع (تأخذ صورة وتعيد النتيجة)
-            on_progress: callback للتقدم (current, total, result)
-            on_complete: callback عند الانتهاء (results)
-            on_error: callback عند الخطأ (error)
+            max_workers: Maximum number of concurrent uploads in this process
         """
-        # Initialize job tracking
-        with self._lock:
-            self.active_jobs[job_id] = {
-                'total': len(images),
-                'completed': 0,
-                'failed': 0,
-                'results': [],
-                'errors': [],
-                'cancelled': False
-            }
-        
-        def worker_thread():
+        self.max_workers = max(1, max_workers)
+        # job_id -> deque of (future, fn, args); order is the round-robin order
+        self._queues: 'OrderedDict[str, deque]' = OrderedDict()
+        self._cond = threading.Condition()
+        self._threads = []
+
+    # ------------------------------------------------------------------
+    # Executor
+    # ------------------------------------------------------------------
+
+    def submit(self, job_id: str, fn: Callable, *args) -> Future:
+        """Queue fn(*args) as part of job_id; the future resolves to its result."""
+        future = Future()
+        with self._cond:
+            self._queues.setdefault(str(job_id), deque()).append((future, fn, args))
+            self._threads = [t for t in self._threads if t.is_alive()]
+            if len(self._threads) < self.max_workers:
+                thread = threading.Thread(
+                    target=self._worker, daemon=True, name=f'upload-{len(self._threads)}'
+                )
+                thread.start()
+                self._threads.append(thread)
+            self._cond.notify()
+        return future
+
+    def _next_item(self):
+        with self._cond:
+            while not self._queues:
+                self._cond.wait()
+            # Take from the job at the head, then move it to the back
+            job_id, queue = self._queues.popitem(last=False)
+            item = queue.popleft()
+            if queue:
+                self._queues[job_id] = queue
+            return item
+
+    def _worker(self):
+        while True:
+            future, fn, args = self._next_item()
+            if not future.set_running_or_notify_cancel():
+                continue
             try:
-                logger.info(f"Worker thread started for job {job_id}")
-                results = []
-                
-                with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-                    # Submit all upload tasks
-                    future_to_image = {
-                        executor.submit(upload_function, img): img 
-                        for img in images
-                    }
-                    
-                    # Process completed uploads as they finish
-                    for future in as_completed(future_to_image):
-                        # Check if cancelled
-                        with self._lock:
-                            if self.active_jobs[job_id]['cancelled']:
-                                logger.info(f"Job {job_id} cancelled")
-                                if on_error:
-                                    on_error({'error': 'تم إلغاء العملية'})
-                                return
-                        
-                        image = future_to_image[future]
-                        
-                        try:
-                            # Get upload result
-                            result = future.result()
-                            results.append(result)
-                            
-                            # Update progress
-                            with self._lock:
-                                self.active_jobs[job_id]['completed'] += 1
-                                self.active_jobs[job_id]['results'].append(result)
-                            
-                            # Call progress callback
-                            if on_progress:
-                                current = self.active_jobs[job_id]['completed']
-                                total = self.active_jobs[job_id]['total']
-                                on_progress(current, total, result)
-                            
-                            logger.info(f"Image uploaded successfully: {result.get('url', 'unknown')}")
-                            
-                        except Exception as e:
-                            # Handle upload error
-                            error_info = {
-                                'image': image,
-                                'error': str(e)
-                            }
-                            
-                            with self._lock:
-                                self.active_jobs[job_id]['failed'] += 1
-                                self.active_jobs[job_id]['errors'].append(error_info)
-                            
-                            logger.error(f"Failed to upload image: {e}")
-                
-                # All uploads completed
-                with self._lock:
-                    job_data = self.active_jobs[job_id]
-                
-                if on_complete:
-                    on_complete({
-                        'total': job_data['total'],
-                        'completed': job_data['completed'],
-                        'failed': job_data['failed'],
-                        'results': job_data['results'],
-                        'errors': job_data['errors']
-                    })
-                
-                logger.info(f"Job {job_id} completed: {job_data['completed']}/{job_data['total']} successful")
-                
-            except Exception as e:
-                logger.error(f"Worker thread error for job {job_id}: {e}")
-                if on_error:
-                    on_error({'error': str(e)})
-            finally:
-                # Cleanup job
-                with self._lock:
-                    if job_id in self.active_jobs:
-                        del self.active_jobs[job_id]
-        
-        # Start worker thread
-        thread = threading.Thread(target=worker_thread, daemon=True)
-        thread.start()
-        
-        return job_id
-    
+                result = fn(*args)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+    def cancel_pending(self, job_id: str) -> int:
+        """Drop the queued (not yet started) uploads of a job in this process."""
+        with self._cond:
+            queue = self._queues.pop(str(job_id), ())
+        for future, _, _ in queue:
+            future.cancel()
+        if queue:
+            logger.info(f"Job {job_id}: dropped {len(queue)} pending uploads")
+        return len(queue)
+
+    def pending_count(self, job_id: Optional[str] = None) -> int:
+        with self._cond:
+            if job_id is not None:
+                return len(self._queues.get(str(job_id), ()))
+            return sum(len(q) for q in self._queues.values())
+
+    # ------------------------------------------------------------------
+    # Job state (cache)
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def job_key(job_id: str) -> str:
+        return f'upload_job_{job_id}'
+
+    @classmethod
+    def cancel_key(cls, job_id: str) -> str:
+        return f'{cls.job_key(job_id)}:cancel'
+
+    def create_job(self, job_id: str, **data):
+        """تسجيل عملية رفع جديدة"""
+        job_data = {
+            'status': 'started',
+            'total': 0,
+            'completed': 0,
+            'failed': 0,
+            'results': [],
+            'errors': [],
+        }
+        job_data.update(data)
+        cache.set(self.job_key(job_id), job_data, timeout=JOB_TIMEOUT)
+
     def get_job_status(self, job_id: str) -> Optional[Dict[str, Any]]:
         """الحصول على حالة عملية الرفع"""
-        with self._lock:
-            return self.active_jobs.get(job_id, None)
-    
+        job_data = cache.get(self.job_key(job_id))
+        if job_data and self.is_cancelled(job_id):
+            job_data['status'] = 'cancelled'
+        return job_data
+
+    def update_job(self, job_id: str, **fields):
+        job_data = cache.get(self.job_key(job_id))
+        if job_data:
+            job_data.update(fields)
+            cache.set(self.job_key(job_id), job_data, timeout=JOB_TIMEOUT)
+
+    def is_cancelled(self, job_id: str) -> bool:
+        return bool(cache.get(self.cancel_key(job_id)))
+
     def cancel_job(self, job_id: str) -> bool:
-        """إلغاء عملية رفع"""
-        with self._lock:
-            if job_id in self.active_jobs:
-                self.active_jobs[job_id]['cancelled'] = True
-                return True
-            return False
-    
+        """
+        إلغاء عملية رفع
+
+        Sets the job's cancel flag in the cache (the process running it
+        stops at its next upload) and drops pending uploads queued here.
+        """
+        job_data = cache.get(self.job_key(job_id))
+        if job_data:
+            cache.set(self.cancel_key(job_id), 1, timeout=JOB_TIMEOUT)
+        dropped = self.cancel_pending(job_id)
+        return bool(job_data) or bool(dropped)
+
     def get_active_jobs(self) -> list:
-        """الحصول على قائمة العمليات النشطة"""
-        with self._lock:
-            return list(self.active_jobs.keys())
+        """الحصول على قائمة العمليات التي لها رفع في الانتظار في هذه العملية"""
+        with self._cond:
+            return list(self._queues.keys())
+
+
+def _configured_max_workers() -> int:
+    try:
+        return int(getattr(settings, 'UPLOAD_MAX_CONCURRENCY', DEFAULT_MAX_WORKERS))
+    except Exception:
+        return DEFAULT_MAX_WORKERS
 
 
 # Global instance
-async_upload_service = AsyncUploadService(max_workers=5)
+async_upload_service = AsyncUploadService(max_workers=_configured_max_workers())
@@ -8,7 +8,12 @@ import requests
 from io import BytesIO
 
 class CBZService:
-    """Service for creating CBZ files from translated images"""
+    """
+    Service for creating CBZ files from translated images.
+    
+    Pages are already compressed (WebP/AVIF/JPEG/optimized PNG), so they are
+    stored as-is (ZIP_STORED) instead of being deflated a second time.
+    """
     
     @staticmethod
     def create_cbz_from_urls(image_urls, output_path, job_id):
@@ -30,7 +35,7 @@ class CBZService:
         cbz_path = Path(output_path) / f"translated_{job_id}.cbz"
         cbz_path.parent.mkdir(parents=True, exist_ok=True)
         
-        with zipfile.ZipFile(cbz_path, 'w', zipfile.ZIP_DEFLATED) as cbz:
+        with zipfile.ZipFile(cbz_path, 'w', zipfile.ZIP_STORED) as cbz:
             for idx, img_data in enumerate(sorted_images, 1):
                 url = img_data.get('translated_url')
                 if not url:
@@ -77,7 +82,7 @@ class CBZService:
         # Sort image paths
         sorted_paths = sorted(image_paths)
         
-        with zipfile.ZipFile(cbz_path, 'w', zipfile.ZIP_DEFLATED) as cbz:
+        with zipfile.ZipFile(cbz_path, 'w', zipfile.ZIP_STORED) as cbz:
             for idx, img_path in enumerate(sorted_paths, 1):
                 if not os.path.exists(img_path):
                     continue
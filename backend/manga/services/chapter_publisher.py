@@ -0,0 +1,173 @@
+"""
+Chapter Publisher
+=================
+Uploads the pages of one chapter to the image storage (ImgBB by default,
+see image_storage.py) with bounded concurrency and records them as
+ChapterImage rows.
+
+- Uploads run on the process-wide upload executor (async_upload.py): at
+  most UPLOAD_MAX_CONCURRENCY at once across all chapters, shared fairly
+  between the chapters being published.
+- Finished pages are inserted with bulk_create in batches of
+  CHAPTER_PUBLISH_BATCH_SIZE (default 20) instead of one INSERT per page.
+- `on_progress(n)` is called once per inserted batch with the number of
+  new rows, so callers can bump their progress counter with a single F()
+  update.
+- Pages whose bytes are already stored (by SHA-256) reuse the stored URL
+  and are not uploaded again.
+
+A page is a dict with page_number, filename, name (the ImgBB title) and
+one of `data` (bytes), `local_path`, or `archive` + `member` (an open
+ZipFile; the member is read by the upload thread, see archive_ingest.py).
+
+Usage:
+    publisher = ChapterPublisher(chapter, job_id=job_id, on_progress=lambda n: ...)
+    result = publisher.publish(pages)   # {'completed', 'failed', 'errors', ...}
+"""
+
+import logging
+from concurrent.futures import as_completed
+from typing import Callable, Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.db import connection
+
+from ..models import Chapter, ChapterImage
+from .async_upload import async_upload_service
+from .image_storage import store_image
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 20
+
+
+def page_name(chapter: Chapter, page_number: int) -> str:
+    """ImgBB title of a chapter page."""
+    return f"{chapter.manga.title}_ch{int(float(chapter.number)):03d}_p{page_number:03d}"
+
+
+class ChapterPublisher:
+    """Parallel page upload + batched ChapterImage inserts for one chapter."""
+
+    def __init__(
+        self,
+        chapter: Chapter,
+        job_id: Optional[str] = None,
+        on_progress: Optional[Callable[[int], None]] = None,
+        should_cancel: Optional[Callable[[], bool]] = None,
+        batch_size: Optional[int] = None
+    ):
+        self.chapter = chapter
+        # Fairness unit of the upload executor
+        self.job_id = str(job_id or chapter.id)
+        self.on_progress = on_progress
+        self.should_cancel = should_cancel
+        self.batch_size = max(1, batch_size or getattr(settings, 'CHAPTER_PUBLISH_BATCH_SIZE', DEFAULT_BATCH_SIZE))
+
+    @staticmethod
+    def upload_page(page: Dict) -> Dict:
+        """Store one page; returns the store_image result or raises."""
+        if 'archive' in page:
+            # ZipFile reads are safe across threads; only this page is in memory
+            data = page['archive'].read(page['member'])
+        elif 'data' in page:
+            data = page['data']
+        else:
+            with open(page['local_path'], 'rb') as f:
+                data = f.read()
+
+        try:
+            return store_image(data, name=page['name'], filename=page['filename'])
+        finally:
+            # Upload threads own their DB connection (StoredImage lookups)
+            connection.close()
+
+    def publish(self, pages: Iterable[Dict]) -> Dict:
+        """
+        Upload every page and insert its ChapterImage.
+
+        Returns:
+            dict: total, completed, failed, errors, cancelled
+        """
+        pages = list(pages)
+        pending: List[ChapterImage] = []
+        completed = 0
+        deduplicated = 0
+        errors = []
+        cancelled = False
+
+        futures = {
+            async_upload_service.submit(self.job_id, self.upload_page, page): page
+            for page in pages
+        }
+        handled = set()
+
+        def collect(future):
+            nonlocal deduplicated
+            handled.add(future)
+            page = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                errors.append({'image': page['filename'], 'error': str(e)})
+                logger.error(f"Failed to upload page {page['page_number']} of chapter {self.chapter.id}: {e}")
+                return
+            deduplicated += bool(result.get('deduplicated'))
+            pending.append(ChapterImage(
+                chapter=self.chapter,
+                page_number=page['page_number'],
+                image_url=result['url'],
+                width=result.get('width'),
+                height=result.get('height'),
+                original_filename=page['filename'],
+                content_hash=result.get('content_hash', '')
+            ))
+
+        for future in as_completed(futures):
+            collect(future)
+            if len(pending) >= self.batch_size:
+                completed += self._flush(pending)
+
+            if self.should_cancel and self.should_cancel():
+                cancelled = True
+                async_upload_service.cancel_pending(self.job_id)
+                # Uploads already in flight still finish; record them
+                for other in futures:
+                    if other not in handled and not other.cancelled():
+                        collect(other)
+                break
+
+        # Pages uploaded before a cancel are still recorded
+        completed += self._flush(pending)
+
+        logger.info(
+            f"Chapter {self.chapter.id}: published {completed}/{len(pages)} pages "
+            f"({deduplicated} reused, {len(errors)} failed{', cancelled' if cancelled else ''})"
+        )
+        return {
+            'total': len(pages),
+            'completed': completed,
+            'failed': len(errors),
+            'deduplicated': deduplicated,
+            'errors': errors,
+            'cancelled': cancelled,
+        }
+
+    def _flush(self, pending: List[ChapterImage]) -> int:
+        if not pending:
+            return 0
+        # A redelivered task may publish a page that is already recorded;
+        # only the rows actually inserted count as progress
+        existing = set(
+            ChapterImage.objects.filter(
+                chapter=self.chapter,
+                page_number__in=[image.page_number for image in pending]
+            ).values_list('page_number', flat=True)
+        )
+        new = [image for image in pending if image.page_number not in existing]
+        ChapterImage.objects.bulk_create(new, ignore_conflicts=True)
+        count = len(new)
+        pending.clear()
+        if self.on_progress and count:
+            self.on_progress(count)
+        return count
@@ -13,7 +13,6 @@ Custom Translation Service - User Implementation Template
 from typing import List, Dict, Callable, Optional
 from pathlib import Path
 import logging
-import threading
 from .ai.pipeline import MangaTranslationPipeline
 
 logger = logging.getLogger(__name__)
@@ -26,53 +25,39 @@ class CustomTranslator:
     """
     
     @classmethod
-    def translate_chapter(cls, input_zip_path: str, output_dir: str) -> List[str]:
+    def translate_chapter(
+        cls,
+        input_zip_path: str,
+        output_dir: str,
+        profile: Optional[str] = None,
+        pass_through_pages: Optional[List[int]] = None,
+        on_page: Optional[Callable[[int, Dict], None]] = None,
+        done_pages: Optional[List[int]] = None,
+        output_format: Optional[str] = None,
+        source_lang: str = 'ja'
+    ) -> List[str]:
         """
         Translate a chapter using the AI Pipeline.
         
         Args:
             input_zip_path: Path to original ZIP/CBZ
             output_dir: Directory for translated images
+            profile: Pipeline profile name (fast / balanced / best)
+            pass_through_pages: Text-free pages (from the pre-scan) copied as-is
+            on_page: Per-page result callback(page_number, result)
+            done_pages: Pages finished by an earlier run (resume / retry)
+            output_format: png / webp / avif / jpeg (default: the profile's)
+            source_lang: OCR source language code (ja / zh / ko / en)
             
         Returns:
             List of translated image paths
         """
         pipeline = MangaTranslationPipeline.get_instance()
-        return pipeline.translate_chapter(input_zip_path, output_dir)
-
-    @classmethod
-    def translate_chapter_async(
-        cls,
-        input_zip_path: str,
-        output_dir: str,
-        on_progress: Optional[Callable[[int, int], None]] = None,
-        on_complete: Optional[Callable[[List[str]], None]] = None,
-        on_error: Optional[Callable[[str], None]] = None
-    ) -> threading.Thread:
-        """
-        Asynchronous translation with progress callbacks.
-        """
-        
-        def worker():
-            try:
-                pipeline = MangaTranslationPipeline.get_instance()
-                result = pipeline.translate_chapter(
-                    input_zip_path, 
-                    output_dir, 
-                    on_progress=on_progress
-                )
-                
-                if on_complete:
-                    on_complete(result)
-                    
-            except Exception as e:
-                logger.error(f"Async translation error: {e}")
-                if on_error:
-                    on_error(str(e))
-        
-        thread = threading.Thread(target=worker, daemon=True)
-        thread.start()
-        return thread
+        return pipeline.translate_chapter(
+            input_zip_path, output_dir, profile=profile, pass_through_pages=pass_through_pages,
+            on_page=on_page, done_pages=done_pages, output_format=output_format,
+            source_lang=source_lang
+        )
 
     @classmethod
     def test_model(cls) -> Dict:
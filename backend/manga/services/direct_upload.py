@@ -0,0 +1,101 @@
+"""
+Direct Uploads
+==============
+Chapter archives uploaded by the client straight to the S3-compatible store
+(MinIO locally), so large ZIPs never pass through the gunicorn workers.
+
+1. The API issues a presigned POST for `uploads/<job_id>.zip`. The storage
+   enforces the size limit and the link expires after DIRECT_UPLOAD_EXPIRES
+   seconds.
+2. The client POSTs the file to that URL.
+3. The client notifies the API, which checks the object exists and queues
+   the upload worker; the worker downloads the archive from storage.
+
+Settings: the S3_* settings of image_storage, plus S3_PRESIGN_ENDPOINT_URL
+when clients reach the store under another address than the backend (e.g.
+http://localhost:9000 vs http://minio:9000 in docker-compose).
+
+Usage:
+    target = create_upload_target(job_id)   # {'url', 'fields', 'key', ...}
+    size = uploaded_size(target['key'])     # None until the client is done
+    fetch_upload(target['key'], path)       # in the worker
+"""
+
+import logging
+from pathlib import Path
+from typing import Dict, Optional
+
+from django.conf import settings
+
+from .image_storage import s3_client
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EXPIRES = 3600
+KEY_PREFIX = 'uploads/'
+
+
+def is_enabled() -> bool:
+    return bool(getattr(settings, 'S3_BUCKET', None)) and bool(getattr(settings, 'S3_ACCESS_KEY_ID', None))
+
+
+def max_upload_size() -> int:
+    return int(getattr(settings, 'DIRECT_UPLOAD_MAX_SIZE', settings.DATA_UPLOAD_MAX_MEMORY_SIZE))
+
+
+def upload_key(job_id: str) -> str:
+    return f'{KEY_PREFIX}{job_id}.zip'
+
+
+def create_upload_target(job_id: str) -> Dict:
+    """Presigned POST the client uses to upload the archive of `job_id`."""
+    expires = int(getattr(settings, 'DIRECT_UPLOAD_EXPIRES', DEFAULT_EXPIRES))
+    key = upload_key(job_id)
+    presign_endpoint = getattr(settings, 'S3_PRESIGN_ENDPOINT_URL', None)
+    client = s3_client(endpoint_url=presign_endpoint)
+
+    post = client.generate_presigned_post(
+        Bucket=settings.S3_BUCKET,
+        Key=key,
+        Fields={'Content-Type': 'application/zip'},
+        Conditions=[
+            {'Content-Type': 'application/zip'},
+            ['content-length-range', 1, max_upload_size()],
+        ],
+        ExpiresIn=expires,
+    )
+    return {
+        'url': post['url'],
+        'fields': post['fields'],
+        'key': key,
+        'max_size': max_upload_size(),
+        'expires_in': expires,
+    }
+
+
+def uploaded_size(key: str) -> Optional[int]:
+    """Size of the uploaded object, or None if it does not exist (yet)."""
+    from botocore.exceptions import ClientError
+
+    try:
+        head = s3_client().head_object(Bucket=settings.S3_BUCKET, Key=key)
+    except ClientError:
+        return None
+    return head['ContentLength']
+
+
+def fetch_upload(key: str, destination) -> Path:
+    """Download an uploaded archive to local disk (multipart, streamed)."""
+    destination = Path(destination)
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = destination.with_name(destination.name + '.part')
+    s3_client().download_file(settings.S3_BUCKET, key, str(tmp_path))
+    tmp_path.replace(destination)
+    return destination
+
+
+def delete_upload(key: str):
+    try:
+        s3_client().delete_object(Bucket=settings.S3_BUCKET, Key=key)
+    except Exception as e:
+        logger.warning(f"Failed to delete uploaded archive {key}: {e}")
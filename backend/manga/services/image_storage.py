@@ -0,0 +1,221 @@
+"""
+Image Storage
+=============
+Pluggable storage for chapter pages, keyed by the SHA-256 of the content.
+
+Backends (settings.IMAGE_STORAGE_BACKEND):
+- imgbb  (default) - ImgBBService
+- local            - files under IMAGE_STORAGE_LOCAL_DIR served from
+                     IMAGE_STORAGE_LOCAL_URL
+- s3               - any S3-compatible store (AWS, MinIO, moto) via boto3:
+                     S3_ENDPOINT_URL, S3_BUCKET, S3_ACCESS_KEY_ID,
+                     S3_SECRET_ACCESS_KEY, S3_REGION, S3_PUBLIC_URL
+
+`store_image()` hashes the bytes and looks the hash up in StoredImage
+first: a page already stored in the active backend (re-publish, the same
+credits page in every chapter) reuses its URL without any network call.
+
+Usage:
+    result = store_image(data, name='one_piece_ch001_p001', filename='001.jpg')
+    result['url'], result['content_hash'], result['deduplicated']
+"""
+
+import io
+import os
+import hashlib
+from abc import ABC, abstractmethod
+import logging
+import importlib.util
+import mimetypes
+from pathlib import Path
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.db import IntegrityError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BACKEND = 'imgbb'
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _image_size(data: bytes):
+    try:
+        from PIL import Image
+        with Image.open(io.BytesIO(data)) as img:
+            return img.size
+    except Exception:
+        return None, None
+
+
+def _extension(filename: Optional[str], data: bytes) -> str:
+    ext = Path(filename or '').suffix.lower()
+    if ext in ('.jpg', '.jpeg', '.png', '.webp', '.gif', '.avif'):
+        return '.jpg' if ext == '.jpeg' else ext
+    try:
+        from PIL import Image
+        with Image.open(io.BytesIO(data)) as img:
+            return '.' + (img.format or 'bin').lower().replace('jpeg', 'jpg')
+    except Exception:
+        return '.bin'
+
+
+class ImageStorageBackend(ABC):
+    """Stores bytes under a content key and returns a public URL."""
+
+    name = ''
+
+    @abstractmethod
+    def put(self, key: str, data: bytes, filename: Optional[str] = None, name: Optional[str] = None) -> Dict:
+        """Store `data`; returns {'url', 'width', 'height'}. Raises on failure."""
+
+    @staticmethod
+    def object_key(key: str, ext: str) -> str:
+        # Two-level fan-out keeps directories / prefixes small
+        return f"{key[:2]}/{key[2:4]}/{key}{ext}"
+
+
+class ImgBBStorage(ImageStorageBackend):
+    name = 'imgbb'
+
+    def put(self, key, data, filename=None, name=None):
+        from .imgbb import ImgBBService
+
+        image_file = io.BytesIO(data)
+        image_file.name = filename or f'{key}.jpg'
+        result = ImgBBService.upload_image(image_file, name)
+        if not result:
+            raise Exception(f"فشل رفع الصورة {filename or key}")
+        return {'url': result['url'], 'width': result.get('width'), 'height': result.get('height')}
+
+
+class LocalStorage(ImageStorageBackend):
+    name = 'local'
+
+    def __init__(self):
+        default_dir = Path(settings.MEDIA_ROOT or settings.BASE_DIR / 'media') / 'images'
+        self.root = Path(getattr(settings, 'IMAGE_STORAGE_LOCAL_DIR', '') or default_dir)
+        self.base_url = getattr(settings, 'IMAGE_STORAGE_LOCAL_URL', '/media/images/')
+
+    def put(self, key, data, filename=None, name=None):
+        relative = self.object_key(key, _extension(filename, data))
+        path = self.root / relative
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(path.name + '.tmp')
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+        width, height = _image_size(data)
+        return {'url': self.base_url.rstrip('/') + '/' + relative, 'width': width, 'height': height}
+
+
+class S3Storage(ImageStorageBackend):
+    name = 's3'
+
+    def __init__(self):
+        if importlib.util.find_spec('boto3') is None:
+            raise ImportError("IMAGE_STORAGE_BACKEND='s3' requires boto3 (pip install boto3)")
+
+        self.bucket = settings.S3_BUCKET
+        self.client = s3_client()
+        endpoint = getattr(settings, 'S3_ENDPOINT_URL', None)
+        default_public = f"{endpoint.rstrip('/')}/{self.bucket}" if endpoint else f"https://{self.bucket}.s3.amazonaws.com"
+        self.public_url = (getattr(settings, 'S3_PUBLIC_URL', None) or default_public).rstrip('/')
+
+    def put(self, key, data, filename=None, name=None):
+        from botocore.exceptions import ClientError
+
+        object_key = 'pages/' + self.object_key(key, _extension(filename, data))
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=object_key)
+        except ClientError as e:
+            # Only a missing object is uploaded; auth/throttling errors propagate
+            if e.response.get('Error', {}).get('Code') not in ('404', 'NoSuchKey', 'NotFound'):
+                raise
+            content_type = mimetypes.guess_type(object_key)[0] or 'application/octet-stream'
+            self.client.put_object(
+                Bucket=self.bucket,
+                Key=object_key,
+                Body=data,
+                ContentType=content_type,
+                # Content-addressed objects never change
+                CacheControl='public, max-age=31536000, immutable',
+            )
+        width, height = _image_size(data)
+        return {'url': f"{self.public_url}/{object_key}", 'width': width, 'height': height}
+
+
+def s3_client(endpoint_url: Optional[str] = None):
+    """boto3 S3 client for the configured (or the given) S3-compatible endpoint."""
+    import boto3
+    from botocore.config import Config
+
+    return boto3.client(
+        's3',
+        endpoint_url=endpoint_url or getattr(settings, 'S3_ENDPOINT_URL', None) or None,
+        aws_access_key_id=getattr(settings, 'S3_ACCESS_KEY_ID', None),
+        aws_secret_access_key=getattr(settings, 'S3_SECRET_ACCESS_KEY', None),
+        region_name=getattr(settings, 'S3_REGION', None) or 'us-east-1',
+        config=Config(signature_version='s3v4', s3={'addressing_style': 'path'}),
+    )
+
+
+BACKENDS = {
+    'imgbb': ImgBBStorage,
+    'local': LocalStorage,
+    's3': S3Storage,
+}
+
+_backend: Optional[ImageStorageBackend] = None
+
+
+def get_storage() -> ImageStorageBackend:
+    global _backend
+    name = getattr(settings, 'IMAGE_STORAGE_BACKEND', DEFAULT_BACKEND) or DEFAULT_BACKEND
+    if _backend is None or _backend.name != name:
+        if name not in BACKENDS:
+            raise ValueError(f"Unknown IMAGE_STORAGE_BACKEND '{name}'. Available: {', '.join(BACKENDS)}")
+        _backend = BACKENDS[name]()
+    return _backend
+
+
+def store_image(data: bytes, name: Optional[str] = None, filename: Optional[str] = None) -> Dict:
+    """
+    Store page bytes in the active backend, reusing an identical stored image.
+
+    Returns:
+        dict: url, width, height, content_hash, deduplicated
+    """
+    from ..models import StoredImage
+
+    key = content_hash(data)
+    storage = get_storage()
+
+    existing = StoredImage.objects.filter(content_hash=key, backend=storage.name).first()
+    if existing:
+        return {
+            'url': existing.url,
+            'width': existing.width,
+            'height': existing.height,
+            'content_hash': key,
+            'deduplicated': True,
+        }
+
+    result = storage.put(key, data, filename=filename, name=name)
+    try:
+        StoredImage.objects.create(
+            content_hash=key,
+            backend=storage.name,
+            url=result['url'],
+            width=result.get('width'),
+            height=result.get('height'),
+            size=len(data),
+        )
+    except IntegrityError:
+        # The same bytes were stored concurrently; either URL is valid
+        pass
+
+    return {**result, 'content_hash': key, 'deduplicated': False}
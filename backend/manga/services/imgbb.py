@@ -1,86 +1,211 @@
-import requests
-from typing import Optional, Dict, List
+"""
+ImgBB Client
+============
+Uploads images to ImgBB over one pooled keep-alive `requests.Session` per
+process.
+
+- Connection pool sized by IMGBB_POOL_SIZE (default 16, at least the
+  upload executor's concurrency).
+- A token bucket shared by all workers through the Redis cache keeps us
+  under ImgBB's limits (IMGBB_RATE_LIMIT uploads/second, burst
+  IMGBB_RATE_BURST).
+- 429 / 5xx responses and connection errors are retried with jittered
+  exponential backoff (IMGBB_MAX_RETRIES), honouring Retry-After.
+- Latency and bytes of every upload are logged and aggregated in
+  `ImgBBService.metrics()`.
+"""
+
 import os
+import time
+import random
+import logging
+import threading
+from typing import Optional, Dict, List
+
+import requests
+from requests.adapters import HTTPAdapter
 from django.conf import settings
 
+from .imgbb_usage import record_upload
+from .rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = 16
+DEFAULT_CONNECT_TIMEOUT = 10
+DEFAULT_READ_TIMEOUT = 120
+DEFAULT_MAX_RETRIES = 4
+DEFAULT_RATE_LIMIT = 5.0
+DEFAULT_RATE_BURST = 10
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 30.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
 class ImgBBService:
     """Service for uploading images to ImgBB API using Multipart Upload"""
     
     API_URL = "https://api.imgbb.com/1/upload"
     API_KEY = settings.IMGBB_API_KEY
     
+    _session: Optional[requests.Session] = None
+    _session_pid: Optional[int] = None
+    _session_lock = threading.Lock()
+    _bucket: Optional[TokenBucket] = None
+    
+    _metrics_lock = threading.Lock()
+    _metrics = {
+        'uploads': 0,
+        'failures': 0,
+        'retries': 0,
+        'bytes': 0,
+        'seconds': 0.0,
+        'max_seconds': 0.0,
+    }
+    
+    @classmethod
+    def session(cls) -> requests.Session:
+        """Pooled session of this process (recreated after a fork)."""
+        pid = os.getpid()
+        if cls._session is None or cls._session_pid != pid:
+            with cls._session_lock:
+                if cls._session is None or cls._session_pid != pid:
+                    pool_size = int(getattr(settings, 'IMGBB_POOL_SIZE', DEFAULT_POOL_SIZE))
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    cls._session = session
+                    cls._session_pid = pid
+        return cls._session
+    
+    @classmethod
+    def rate_limiter(cls) -> TokenBucket:
+        if cls._bucket is None:
+            cls._bucket = TokenBucket(
+                'imgbb',
+                rate=float(getattr(settings, 'IMGBB_RATE_LIMIT', DEFAULT_RATE_LIMIT)),
+                capacity=float(getattr(settings, 'IMGBB_RATE_BURST', DEFAULT_RATE_BURST))
+            )
+        return cls._bucket
+    
+    @classmethod
+    def metrics(cls) -> Dict:
+        """Upload counters of this process."""
+        with cls._metrics_lock:
+            m = dict(cls._metrics)
+        done = m['uploads'] + m['failures']
+        m['avg_seconds'] = round(m['seconds'] / done, 3) if done else 0.0
+        m['seconds'] = round(m['seconds'], 3)
+        m['max_seconds'] = round(m['max_seconds'], 3)
+        return m
+    
+    @classmethod
+    def _record(cls, ok: bool, seconds: float, size: int, retries: int):
+        with cls._metrics_lock:
+            cls._metrics['uploads' if ok else 'failures'] += 1
+            cls._metrics['retries'] += retries
+            cls._metrics['seconds'] += seconds
+            cls._metrics['max_seconds'] = max(cls._metrics['max_seconds'], seconds)
+            if ok:
+                cls._metrics['bytes'] += size
+    
+    @staticmethod
+    def _file_size(image_file) -> int:
+        try:
+            if isinstance(image_file, str):
+                return os.path.getsize(image_file)
+            if hasattr(image_file, 'getbuffer'):
+                return image_file.getbuffer().nbytes
+            if hasattr(image_file, 'size') and image_file.size is not None:
+                return int(image_file.size)
+        except (OSError, TypeError, ValueError):
+            pass
+        return 0
+    
+    @staticmethod
+    def _backoff(attempt: int, response: Optional[requests.Response] = None) -> float:
+        if response is not None:
+            retry_after = response.headers.get('Retry-After')
+            if retry_after and retry_after.isdigit():
+                return min(float(retry_after), BACKOFF_MAX)
+        # Full jitter: spreads the retries of concurrent uploads
+        return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+    
+    @classmethod
+    def _post(cls, image_file, data: Dict) -> requests.Response:
+        connect_timeout = getattr(settings, 'IMGBB_CONNECT_TIMEOUT', DEFAULT_CONNECT_TIMEOUT)
+        read_timeout = getattr(settings, 'IMGBB_READ_TIMEOUT', DEFAULT_READ_TIMEOUT)
+        
+        # التعامل مع الملف سواء كان مساراً (string) أو ملفاً مفتوحاً
+        if isinstance(image_file, str):
+            # نفتح الملف في وضع القراءة الثنائية (Binary)
+            with open(image_file, 'rb') as f:
+                return cls.session().post(
+                    cls.API_URL, data=data, files={'image': f}, timeout=(connect_timeout, read_timeout)
+                )
+        
+        # إذا كان كائناً بالفعل (مثل InMemoryUploadedFile أو BytesIO)
+        # تأكد من أن المؤشر في البداية
+        if hasattr(image_file, 'seek'):
+            image_file.seek(0)
+        return cls.session().post(
+            cls.API_URL, data=data, files={'image': image_file}, timeout=(connect_timeout, read_timeout)
+        )
+    
     @classmethod
     def upload_image(cls, image_file, name: str = None) -> Optional[Dict]:
         """
         Upload a single image to ImgBB using standard file upload (Binary)
         This prevents corrupted images caused by Base64 encoding errors.
+        
+        Returns None if the upload failed after all retries.
         """
-        try:
-            # Validate API key
-            if not cls.API_KEY:
-                print("Error: IMGBB_API_KEY is not set in settings")
-                return None
-            
-            # Prepare file for upload
-            files = {}
-            
-            # التعامل مع الملف سواء كان مساراً (string) أو ملفاً مفتوحاً
-            if isinstance(image_file, str):
-                if not os.path.exists(image_file):
-                    print(f"File not found: {image_file}")
-                    return None
-                # نفتح الملف في وضع القراءة الثنائية (Binary)
-                files = {'image': open(image_file, 'rb')}
-            else:
-                # إذا كان كائناً بالفعل (مثل InMemoryUploadedFile أو BytesIO)
-                # تأكد من أن المؤشر في البداية
-                if hasattr(image_file, 'seek'):
-                    image_file.seek(0)
-                files = {'image': image_file}
-            
-            # إعداد البيانات - فقط key (لا name في data)
-            data = {
-                'key': cls.API_KEY,
-            }
-            
-            # أضف name كمعامل منفصل إذا كان موجوداً
-            if name:
-                data['name'] = name
-            
-            # عملية الرفع
-            response = requests.post(
-                cls.API_URL, 
-                data=data, 
-                files=files, 
-                timeout=300
-            )
-            
-            # إغلاق الملف إذا قمنا بفتحه
-            if isinstance(image_file, str) and 'image' in files:
-                files['image'].close()
-
-            # Check response
-            if response.status_code != 200:
-                error_detail = response.text[:200] if response.text else 'No error details'
-                print(f"ImgBB API Error {response.status_code}: {error_detail}")
-                response.raise_for_status()
-            
-            result = response.json()
-            
-            if result.get('success'):
-                data = result['data']
+        # Validate API key
+        if not cls.API_KEY:
+            logger.error("IMGBB_API_KEY is not set in settings")
+            return None
+        
+        if isinstance(image_file, str) and not os.path.exists(image_file):
+            logger.error(f"File not found: {image_file}")
+            return None
+        
+        # إعداد البيانات - فقط key (لا name في data)
+        data = {
+            'key': cls.API_KEY,
+        }
+        
+        # أضف name كمعامل منفصل إذا كان موجوداً
+        if name:
+            data['name'] = name
+        
+        size = cls._file_size(image_file)
+        max_retries = int(getattr(settings, 'IMGBB_MAX_RETRIES', DEFAULT_MAX_RETRIES))
+        started = time.monotonic()
+        attempt = 0
+        
+        while True:
+            cls.rate_limiter().acquire()
+            response = None
+            try:
+                response = cls._post(image_file, data)
+                if response.status_code in RETRY_STATUSES:
+                    raise requests.HTTPError(f"HTTP {response.status_code}", response=response)
+                if response.status_code != 200:
+                    error_detail = response.text[:200] if response.text else 'No error details'
+                    logger.error(f"ImgBB API Error {response.status_code}: {error_detail}")
+                    break
+                result = response.json()
+                if not result.get('success'):
+                    logger.error(f"ImgBB upload failed: {result.get('error', {}).get('message', 'Unknown error')}")
+                    break
                 
-                # Track backend ImgBB upload usage
-                try:
-                    from django.utils import timezone
-                    from ..models import ImgBBUploadStats
-                    today = timezone.localtime().date()
-                    stats, _ = ImgBBUploadStats.objects.get_or_create(date=today)
-                    stats.count += 1
-                    stats.save()
-                except Exception as e:
-                    print(f"Failed to track ImgBB upload: {e}")
-                    
+                elapsed = time.monotonic() - started
+                cls._record(True, elapsed, size, attempt)
+                logger.info(f"ImgBB upload {name or ''}: {size} bytes in {elapsed:.2f}s ({attempt} retries)")
+                
+                data = result['data']
+                cls._track_upload()
                 return {
                     'url': data['url'],
                     'display_url': data['display_url'],
@@ -90,13 +215,28 @@ class ImgBBService:
                     'size': data.get('size'),
                     'title': data.get('title', name)
                 }
-            else:
-                print(f"ImgBB upload failed: {result.get('error', {}).get('message', 'Unknown error')}")
-                return None
-            
+            except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+                if attempt >= max_retries:
+                    logger.error(f"Error uploading image to ImgBB after {attempt + 1} attempts: {e}")
+                    break
+                delay = cls._backoff(attempt, response)
+                logger.warning(f"ImgBB upload {name or ''} failed ({e}), retrying in {delay:.1f}s")
+                attempt += 1
+                time.sleep(delay)
+            except Exception as e:
+                logger.error(f"Error uploading image to ImgBB: {e}")
+                break
+        
+        cls._record(False, time.monotonic() - started, size, attempt)
+        return None
+    
+    @staticmethod
+    def _track_upload():
+        """Track backend ImgBB upload usage (write-behind, no DB access here)"""
+        try:
+            record_upload()
         except Exception as e:
-            print(f"Error uploading image to ImgBB: {e}")
-            return None
+            logger.error(f"Failed to track ImgBB upload: {e}")
     
     @classmethod
     def upload_cover_image(cls, manga_title: str, image_file) -> Optional[Dict]:
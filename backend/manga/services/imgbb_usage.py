@@ -0,0 +1,142 @@
+"""
+ImgBB Usage Counters
+====================
+Write-behind daily upload counters for ImgBBUploadStats.
+
+Uploads only increment a per-day counter in the cache (atomic INCR with
+the Redis cache, so every process shares it); a background thread in each
+process flushes the pending counts every IMGBB_STATS_FLUSH_SECONDS
+(default 30) with one `count = F('count') + n` update per day. Readers use
+`daily_counts()`, which adds the pending counts to the stored ones.
+
+With the local-memory cache (development) pending counts are per process
+and at most one flush interval is lost if the process dies.
+
+Usage:
+    record_upload()              # hot path, no database access
+    daily_counts([today, ...])   # {date: count}
+"""
+
+import time
+import atexit
+import logging
+import threading
+from datetime import date, timedelta
+from typing import Dict, Iterable
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FLUSH_SECONDS = 30
+# Days checked for pending counts on flush (covers a flush missed at midnight)
+FLUSH_DAYS = 3
+PENDING_TIMEOUT = 7 * 24 * 3600
+LOCK_KEY = 'imgbb_uploads:flush_lock'
+
+_flusher_lock = threading.Lock()
+_flusher = None
+
+
+def _pending_key(day: date) -> str:
+    return f'imgbb_uploads:pending:{day.isoformat()}'
+
+
+def record_upload(count: int = 1):
+    """Count `count` ImgBB uploads for today."""
+    if count <= 0:
+        return
+    key = _pending_key(timezone.localdate())
+    cache.add(key, 0, timeout=PENDING_TIMEOUT)
+    try:
+        cache.incr(key, count)
+    except ValueError:
+        # Expired between add and incr
+        cache.add(key, count, timeout=PENDING_TIMEOUT)
+    _ensure_flusher()
+
+
+def pending_count(day: date) -> int:
+    return cache.get(_pending_key(day)) or 0
+
+
+def flush() -> int:
+    """Move pending counts into ImgBBUploadStats. Returns how many were moved."""
+    from ..models import ImgBBUploadStats
+
+    # One flusher at a time across processes
+    if not cache.add(LOCK_KEY, 1, timeout=60):
+        return 0
+
+    moved = 0
+    try:
+        today = timezone.localdate()
+        for offset in range(FLUSH_DAYS):
+            day = today - timedelta(days=offset)
+            n = pending_count(day)
+            if n <= 0:
+                continue
+
+            if not ImgBBUploadStats.objects.filter(date=day).update(count=F('count') + n):
+                try:
+                    with transaction.atomic():
+                        ImgBBUploadStats.objects.create(date=day, count=n)
+                except IntegrityError:
+                    # Created concurrently (e.g. by an older worker)
+                    ImgBBUploadStats.objects.filter(date=day).update(count=F('count') + n)
+
+            # Increments made since the read stay pending
+            cache.decr(_pending_key(day), n)
+            moved += n
+    except Exception as e:
+        logger.error(f"Failed to flush ImgBB usage counters: {e}")
+    finally:
+        cache.delete(LOCK_KEY)
+    return moved
+
+
+def daily_counts(days: Iterable[date]) -> Dict[date, int]:
+    """Stored plus pending upload counts per day."""
+    from ..models import ImgBBUploadStats
+
+    days = list(days)
+    counts = {day: 0 for day in days}
+    for day, count in ImgBBUploadStats.objects.filter(date__in=days).values_list('date', 'count'):
+        counts[day] = count
+    for day in days:
+        counts[day] += pending_count(day)
+    return counts
+
+
+def _ensure_flusher():
+    global _flusher
+    if _flusher is not None and _flusher.is_alive():
+        return
+    with _flusher_lock:
+        if _flusher is not None and _flusher.is_alive():
+            return
+        interval = getattr(settings, 'IMGBB_STATS_FLUSH_SECONDS', DEFAULT_FLUSH_SECONDS)
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    flush()
+                finally:
+                    connection.close()
+
+        _flusher = threading.Thread(target=run, daemon=True, name='imgbb-usage-flush')
+        _flusher.start()
+
+
+@atexit.register
+def _flush_on_exit():
+    if _flusher is not None:
+        try:
+            flush()
+        except Exception:
+            pass
@@ -0,0 +1,107 @@
+"""
+Token Bucket Rate Limiter
+=========================
+Limits calls to an external API across every process of the deployment.
+
+With the Redis cache backend (REDIS_URL) the bucket lives in Redis and is
+updated by one Lua script per acquire, so gunicorn and Celery workers share
+the same budget. With any other cache backend (local development) the
+bucket is kept per process.
+
+Usage:
+    bucket = TokenBucket('imgbb', rate=2.0, capacity=10)
+    bucket.acquire()        # blocks until a token is available
+"""
+
+import time
+import logging
+import threading
+from typing import Optional
+
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# Returns the seconds to wait before the tokens are available (0 = taken)
+_REDIS_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= requested then
+    tokens = tokens - requested
+else
+    wait = (requested - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 60)
+return tostring(wait)
+"""
+
+
+class TokenBucket:
+    """`rate` tokens per second, bursts of up to `capacity`."""
+
+    def __init__(self, name: str, rate: float, capacity: Optional[float] = None):
+        self.name = name
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1.0, rate))
+        self._lock = threading.Lock()
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._script = None
+
+    def acquire(self, tokens: float = 1.0, timeout: Optional[float] = None) -> bool:
+        """Wait for `tokens`; False if that would take longer than `timeout`."""
+        if self.rate <= 0:
+            return True
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self._try_take(tokens)
+            if wait <= 0:
+                return True
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    def _try_take(self, tokens: float) -> float:
+        try:
+            return self._try_take_redis(tokens)
+        except _NoSharedBackend:
+            pass
+        except Exception as e:
+            logger.warning(f"Rate limiter {self.name}: shared bucket unavailable, using local one ({e})")
+        return self._try_take_local(tokens)
+
+    def _try_take_redis(self, tokens: float) -> float:
+        from django.core.cache.backends.redis import RedisCache
+
+        if not isinstance(cache, RedisCache):
+            raise _NoSharedBackend()
+
+        key = cache.make_and_validate_key(f'rate_limit:{self.name}')
+        client = cache._cache.get_client(key, write=True)
+        if self._script is None:
+            self._script = client.register_script(_REDIS_SCRIPT)
+        return float(self._script(keys=[key], args=[self.rate, self.capacity, tokens], client=client))
+
+    def _try_take_local(self, tokens: float) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+
+class _NoSharedBackend(Exception):
+    pass
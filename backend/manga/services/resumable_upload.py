@@ -0,0 +1,236 @@
+"""
+Resumable Uploads
+=================
+Chunked upload sessions for large chapter archives, so a dropped connection
+resumes from the last stored byte instead of starting over.
+
+Protocol (upload_session_views):
+    POST   /api/uploads/                     {filename, size, sha256?} -> upload_id
+    PUT    /api/uploads/<id>/                Content-Range: bytes start-end/size
+                                             X-Chunk-SHA256: <hex> (optional)
+    GET    /api/uploads/<id>/                -> {offset, size, status}
+    POST   /api/uploads/<id>/finalize/       -> checks size and sha256
+    DELETE /api/uploads/<id>/
+
+Chunks are streamed to `<MEDIA_ROOT>/upload_sessions/<id>.part` at the
+session offset. A chunk whose length or checksum does not match is cut off
+again, and every PUT first truncates the file to the stored offset, so a
+write interrupted by a crash never counts. Session state lives in the cache
+(shared by the web workers) for UPLOAD_SESSION_TTL seconds.
+
+A finalized upload is passed to the upload endpoints as `upload_id` instead
+of `file`; `finalized_file()` returns it as an UploadedFile whose data is
+moved, not copied, by store_upload().
+"""
+
+import os
+import time
+import uuid
+import hashlib
+import logging
+from pathlib import Path
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .archive_ingest import StoredFile
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SESSION_TTL = 24 * 3600
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+READ_SIZE = 64 * 1024
+ALLOWED_EXTENSIONS = ('.zip', '.cbz')
+
+
+class UploadSessionError(Exception):
+    """Rejected chunk or finalize; `status` is the HTTP status to answer with."""
+
+    def __init__(self, message: str, status: int = 400, offset: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+        self.offset = offset
+
+
+def sessions_dir() -> Path:
+    return Path(settings.MEDIA_ROOT) / 'upload_sessions'
+
+
+def session_ttl() -> int:
+    return int(getattr(settings, 'UPLOAD_SESSION_TTL', DEFAULT_SESSION_TTL))
+
+
+def max_chunk_size() -> int:
+    return int(getattr(settings, 'UPLOAD_CHUNK_MAX_SIZE', DEFAULT_CHUNK_SIZE))
+
+
+def _key(upload_id) -> str:
+    return f'upload_session_{upload_id}'
+
+
+def _part_path(upload_id) -> Path:
+    return sessions_dir() / f'{upload_id}.part'
+
+
+def _save(session: Dict):
+    cache.set(_key(session['id']), session, timeout=session_ttl())
+
+
+def create_session(user_id, filename: str, size: int, sha256: str = '') -> Dict:
+    filename = os.path.basename(filename or '')
+    if not filename.lower().endswith(ALLOWED_EXTENSIONS):
+        raise UploadSessionError('الملف يجب أن يكون ZIP أو CBZ')
+    if size <= 0 or size > settings.DATA_UPLOAD_MAX_MEMORY_SIZE:
+        raise UploadSessionError(
+            f"حجم الملف غير مسموح. الحد الأقصى: {settings.DATA_UPLOAD_MAX_MEMORY_SIZE // (1024 * 1024)}MB"
+        )
+
+    purge_stale_parts()
+
+    session = {
+        'id': str(uuid.uuid4()),
+        'user_id': user_id,
+        'filename': filename,
+        'size': size,
+        'sha256': (sha256 or '').lower(),
+        'offset': 0,
+        'status': 'uploading',
+    }
+    sessions_dir().mkdir(parents=True, exist_ok=True)
+    _part_path(session['id']).touch()
+    _save(session)
+    return session
+
+
+def get_session(upload_id, user_id) -> Optional[Dict]:
+    session = cache.get(_key(upload_id))
+    if not session or session['user_id'] != user_id:
+        return None
+    if not _part_path(upload_id).exists():
+        # Consumed by an upload endpoint, or cleaned up
+        cache.delete(_key(upload_id))
+        return None
+    return session
+
+
+def _already_stored(session: Dict, start: int, end: int) -> bool:
+    """True for a retried chunk below the offset; raises if the chunk does not fit."""
+    if session['status'] != 'uploading':
+        raise UploadSessionError('تم إنهاء هذا الرفع بالفعل', status=409, offset=session['offset'])
+    if end < session['offset']:
+        return True
+    if start != session['offset']:
+        raise UploadSessionError('الجزء لا يبدأ من الموضع الحالي', status=409, offset=session['offset'])
+    return False
+
+
+def write_chunk(session: Dict, start: int, end: int, total: int, stream, checksum: str = '') -> Dict:
+    """
+    Append bytes start..end (inclusive) read from `stream` to the session.
+
+    The chunk must start at the current offset; a retried chunk that was
+    already stored is acknowledged without writing.
+    """
+    if total != session['size'] or start < 0 or end < start or end >= total:
+        raise UploadSessionError('Content-Range غير صالح', status=416, offset=session['offset'])
+
+    length = end - start + 1
+    if length > max_chunk_size():
+        raise UploadSessionError(f"الجزء كبير جداً. الحد الأقصى: {max_chunk_size()} بايت", status=413)
+    if _already_stored(session, start, end):
+        return session
+
+    # One writer per session
+    lock_key = _key(session['id']) + ':lock'
+    if not cache.add(lock_key, 1, timeout=300):
+        raise UploadSessionError('جزء آخر قيد الرفع لهذه الجلسة', status=409, offset=session['offset'])
+
+    try:
+        # Another writer may have moved the offset before the lock was taken
+        session = cache.get(_key(session['id']))
+        if not session:
+            raise UploadSessionError('جلسة الرفع غير موجودة أو انتهت صلاحيتها', status=404)
+        if _already_stored(session, start, end):
+            return session
+
+        digest = hashlib.sha256()
+        received = 0
+        with open(_part_path(session['id']), 'r+b') as part:
+            part.truncate(start)
+            part.seek(start)
+            while received < length:
+                data = stream.read(min(READ_SIZE, length - received))
+                if not data:
+                    break
+                part.write(data)
+                digest.update(data)
+                received += len(data)
+
+            valid = received == length and (not checksum or digest.hexdigest() == checksum.lower())
+            if not valid:
+                part.truncate(start)
+            else:
+                part.flush()
+                os.fsync(part.fileno())
+
+        if received != length:
+            raise UploadSessionError('انقطع الاتصال قبل اكتمال الجزء', offset=start)
+        if not valid:
+            raise UploadSessionError('فشل التحقق من سلامة الجزء', status=422, offset=start)
+
+        session['offset'] = end + 1
+        _save(session)
+        return session
+    finally:
+        cache.delete(lock_key)
+
+
+def finalize_session(session: Dict) -> Dict:
+    """Check the complete file against the declared size and checksum."""
+    if session['status'] == 'complete':
+        return session
+    if session['offset'] != session['size']:
+        raise UploadSessionError('الرفع لم يكتمل بعد', status=409, offset=session['offset'])
+
+    path = _part_path(session['id'])
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+
+    if path.stat().st_size != session['size'] or (session['sha256'] and digest.hexdigest() != session['sha256']):
+        abort_session(session)
+        raise UploadSessionError('فشل التحقق من سلامة الملف، يرجى إعادة الرفع', status=422)
+
+    session['sha256'] = digest.hexdigest()
+    session['status'] = 'complete'
+    _save(session)
+    return session
+
+
+def abort_session(session: Dict):
+    _part_path(session['id']).unlink(missing_ok=True)
+    cache.delete(_key(session['id']))
+
+
+def purge_stale_parts():
+    """Remove session files older than the session TTL (abandoned uploads)."""
+    directory = sessions_dir()
+    if not directory.exists():
+        return
+    cutoff = time.time() - session_ttl()
+    for path in directory.glob('*.part'):
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+        except OSError:
+            pass
+
+
+def finalized_file(upload_id, user_id) -> Optional[StoredFile]:
+    """The file of a finalized session of `user_id`, or None."""
+    session = get_session(upload_id, user_id)
+    if not session or session['status'] != 'complete':
+        return None
+    return StoredFile(_part_path(session['id']), session['filename'], session['size'])
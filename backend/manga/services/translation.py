@@ -3,17 +3,27 @@ Translation Service for handling file uploads, extraction, and cleanup
 Supports ZIP and CBZ files only
 """
 import os
+import hashlib
 import zipfile
 import io
 import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from django.conf import settings
 from PIL import Image
 
+from .archive_ingest import chapter_image_members, is_page_image, store_upload
+
 # Security Constants
 MAX_IMAGE_SIZE = 20 * 1024 * 1024  # 20 MB per image
 MAX_TOTAL_UNCOMPRESSED_SIZE = 300 * 1024 * 1024  # 300 MB per chapter ZIP
-ALLOWED_IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp', '.gif'}
+MAX_ARCHIVE_SIZE = 150 * 1024 * 1024  # 150 MB per uploaded archive
+DEFAULT_EXTRACT_WORKERS = 8
+
+
+class ArchiveValidationError(Exception):
+    """The archive failed a security check; the message is shown to the user."""
 
 
 class TranslationService:
@@ -21,7 +31,6 @@ class TranslationService:
     
     UPLOAD_DIR = Path(settings.MEDIA_ROOT) / 'translation_temp'
     ALLOWED_ARCHIVES = {'.zip', '.cbz'}
-    ALLOWED_IMAGES = {'.jpg', '.jpeg', '.png', '.webp', '.gif'}
     
     @staticmethod
     def save_uploaded_file(file, job_id):
@@ -37,59 +46,124 @@ class TranslationService:
         job_dir.mkdir(parents=True, exist_ok=True)
         
         file_path = job_dir / file.name
-        with open(file_path, 'wb+') as destination:
-            for chunk in file.chunks():
-                destination.write(chunk)
+        # Moves Django's temp file into place instead of copying it in memory
+        store_upload(file, file_path)
         
         return str(file_path)
     
     @staticmethod
     def extract_archive(archive_path, job_id):
         """
-        فك ضغط ملف ZIP/CBZ واستخراج الصور بأمان
+        فك ضغط ملف ZIP/CBZ واستخراج الصور بأمان (لملف تم التحقق منه مسبقاً)
+        Args:
+            archive_path: Path to archive file
+            job_id: UUID of the translation job
+        Returns:
+            list: Page dicts in page order (see validate_and_extract)
+        """
+        return TranslationService.validate_and_extract(archive_path, job_id, verify=False)
+    
+    @staticmethod
+    def validate_and_extract(archive_path, job_id, verify=True):
+        """
+        التحقق من الملف واستخراج الصور في مرور واحد
+        
+        Size limits are checked on the ZIP directory before anything is
+        decompressed; zipfile never inflates a member past its declared size
+        and checks its CRC, so the same limits bound the real output. Each
+        image is then decompressed once by a thread pool, verified, hashed
+        and written to disk; the first failure stops the remaining members.
+        
+        Pages follow chapter_image_members, the order the pipeline
+        translates in, and every image member is a page: files are written
+        as `<page>_<name>` so equal names in two folders don't collide.
+        
         Args:
             archive_path: Path to archive file
             job_id: UUID of the translation job
+            verify: verify every image (False for an archive already checked)
         Returns:
-            list: Sorted list of image file paths
+            list: One dict per page in page order, with page_number, member,
+                  filename (member basename), path and sha256
+        Raises:
+            ArchiveValidationError: the archive failed a check
         """
         extract_dir = TranslationService.UPLOAD_DIR / str(job_id) / 'extracted'
         extract_dir.mkdir(parents=True, exist_ok=True)
         
-        # فك الضغط بأمان
-        images = []
         try:
-            with zipfile.ZipFile(archive_path, 'r') as zip_ref:
-                # جمع ملفات الصور التي سنستخرجها
-                image_files = [
-                    f for f in zip_ref.namelist()
-                    if Path(f).suffix.lower() in TranslationService.ALLOWED_IMAGES
-                    and not f.startswith('__MACOSX')
-                    and not f.startswith('.')
-                ]
-                
-                for img_file in image_files:
+            try:
+                zip_ref = zipfile.ZipFile(archive_path, 'r')
+            except zipfile.BadZipFile:
+                raise ArchiveValidationError("الملف ليس ملف ZIP/CBZ صالح")
+            
+            with zip_ref:
+                pages = []
+                for page_number, zinfo in enumerate(TranslationService._check_archive_directory(zip_ref), 1):
                     # 🛡️ الحماية من ZipSlip: استخراج السطح فقط (basename)
-                    filename = os.path.basename(img_file)
-                    if not filename: continue
-                    
-                    target_path = extract_dir / filename
-                    
-                    # استخراج الملف يدوياً لضمان عدم وجود تلاعب في المسارات
-                    with zip_ref.open(img_file) as source, open(target_path, 'wb') as target:
-                        shutil.copyfileobj(source, target)
-                    
-                    images.append(str(target_path))
-        except Exception as e:
+                    filename = os.path.basename(zinfo.filename)
+                    pages.append({
+                        'page_number': page_number,
+                        'member': zinfo.filename,
+                        'filename': filename,
+                        'path': str(extract_dir / f"{page_number:04d}_{filename}"),
+                        'zinfo': zinfo,
+                    })
+                
+                abort = threading.Event()
+                
+                def extract(page):
+                    if abort.is_set():
+                        return
+                    try:
+                        data = zip_ref.read(page['zinfo'])
+                    except zipfile.BadZipFile:
+                        raise ArchiveValidationError("ملف تالف داخلياً")
+                    if verify and not TranslationService._is_valid_image(data):
+                        raise ArchiveValidationError(f"الملف {page['member']} ليس صورة صالحة")
+                    page['sha256'] = hashlib.sha256(data).hexdigest()
+                    Path(page['path']).write_bytes(data)
+                
+                workers = int(getattr(settings, 'ARCHIVE_EXTRACT_WORKERS', DEFAULT_EXTRACT_WORKERS))
+                with ThreadPoolExecutor(max_workers=max(1, min(workers, len(pages))), thread_name_prefix='extract') as pool:
+                    futures = [pool.submit(extract, page) for page in pages]
+                    try:
+                        for future in as_completed(futures):
+                            future.result()
+                    except BaseException:
+                        abort.set()
+                        for future in futures:
+                            future.cancel()
+                        raise
+        except Exception:
             # تنظيف المخلفات في حال الفشل
             if extract_dir.exists():
                 shutil.rmtree(extract_dir)
-            raise e
+            raise
         
-        # ترتيب الصور حسب الاسم
-        images.sort()
+        for page in pages:
+            del page['zinfo']
+        return pages
+    
+    @staticmethod
+    def _check_archive_directory(zip_ref):
+        """
+        فحص دليل الـ ZIP فقط (بدون فك الضغط): الحماية من قنابل الضغط
+        Returns:
+            list: ZipInfo of the page images, in page order
+        """
+        infos = zip_ref.infolist()
+        if sum(zinfo.file_size for zinfo in infos) > MAX_TOTAL_UNCOMPRESSED_SIZE:
+            raise ArchiveValidationError("حجم الملفات بعد الاستخراج كبير جداً")
+        
+        members = [zip_ref.getinfo(name) for name in chapter_image_members(zip_ref)]
+        for zinfo in members:
+            if zinfo.file_size > MAX_IMAGE_SIZE:
+                raise ArchiveValidationError(f"الصورة {zinfo.filename} كبيرة جداً")
         
-        return images
+        if not members:
+            raise ArchiveValidationError("لا توجد صور في الملف")
+        return members
     
     @staticmethod
     def cleanup_job(job_id):
@@ -119,12 +193,49 @@ class TranslationService:
         
         archive_path = result_dir / f'translated_manga_{job_id}.cbz'
         
-        with zipfile.ZipFile(archive_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        # Images are already compressed; store them without deflating again
+        with zipfile.ZipFile(archive_path, 'w', zipfile.ZIP_STORED) as zipf:
             for img_path in image_paths:
                 zipf.write(img_path, arcname=os.path.basename(img_path))
                 
         return str(archive_path)
     
+    @staticmethod
+    def check_upload(name, size):
+        """
+        فحص الامتداد والحجم فقط (قبل حفظ الملف)
+        Returns:
+            tuple: (is_valid: bool, error_message: str)
+        """
+        ext = Path(name).suffix.lower()
+        if ext not in TranslationService.ALLOWED_ARCHIVES:
+            return False, f"نوع الملف غير مدعوم. الأنواع المسموحة: {', '.join(TranslationService.ALLOWED_ARCHIVES)}"
+        
+        if size > MAX_ARCHIVE_SIZE:
+            return False, f"حجم الملف كبير جداً. الحد الأقصى: {MAX_ARCHIVE_SIZE // (1024*1024)}MB"
+        return True, ""
+    
+    @staticmethod
+    def validate_staged(staged):
+        """
+        validate_archive() for a staged archive, from its analysis
+        (services.archive_staging) instead of reading the archive again
+        Returns:
+            tuple: (is_valid: bool, error_message: str)
+        """
+        is_valid, error_msg = TranslationService.check_upload(staged['filename'], staged['size'])
+        if not is_valid:
+            return is_valid, error_msg
+        
+        analysis = staged['analysis']
+        if not analysis['valid']:
+            return False, analysis['error']
+        if analysis['total_uncompressed_size'] > MAX_TOTAL_UNCOMPRESSED_SIZE:
+            return False, "حجم الملفات بعد الاستخراج كبير جداً"
+        if analysis['largest_image_size'] > MAX_IMAGE_SIZE:
+            return False, "توجد صورة كبيرة جداً في الملف"
+        return True, ""
+    
     @staticmethod
     def _is_valid_image(file_data: bytes) -> bool:
         """التحقق من أن البيانات هي فعلاً صورة حقيقية"""
@@ -144,15 +255,10 @@ class TranslationService:
         Returns:
             tuple: (is_valid: bool, error_message: str)
         """
-        # 1. التحقق من الامتداد
-        ext = Path(file.name).suffix.lower()
-        if ext not in TranslationService.ALLOWED_ARCHIVES:
-            return False, f"نوع الملف غير مدعوم. الأنواع المسموحة: {', '.join(TranslationService.ALLOWED_ARCHIVES)}"
-        
-        # 2. التحقق من الحجم (مثلاً 150MB كحد أقصى للترجمة)
-        max_size = 150 * 1024 * 1024
-        if file.size > max_size:
-            return False, f"حجم الملف كبير جداً. الحد الأقصى: {max_size // (1024*1024)}MB"
+        # 1-2. الامتداد والحجم
+        is_valid, error_msg = TranslationService.check_upload(file.name, file.size)
+        if not is_valid:
+            return is_valid, error_msg
         
         # 3. فحص أمني لمحتويات الـ ZIP (بدون استخراج الكل)
         try:
@@ -169,7 +275,7 @@ class TranslationService:
                 # فحص عينة من ملفات الصور
                 found_images = False
                 for zinfo in zip_ref.infolist():
-                    if Path(zinfo.filename).suffix.lower() in TranslationService.ALLOWED_IMAGES:
+                    if is_page_image(zinfo.filename):
                         found_images = True
                         if zinfo.file_size > MAX_IMAGE_SIZE:
                             return False, f"الصورة {zinfo.filename} كبيرة جداً"
@@ -0,0 +1,303 @@
+"""
+Translation Job Runner
+======================
+Runs a TranslationJob with one TranslationPage row per page.
+
+- Each finished page updates its own row plus an F() increment of
+  job.translated_pages; the job row is never rewritten from the worker
+  while pages are being translated.
+- A job interrupted by a worker restart resumes from its unfinished pages
+  (`manage.py resume_translations`).
+- Failed pages of a finished job can be re-run on their own (retry).
+
+Jobs are normally started by TranslationScheduler (translation_scheduler.py),
+which applies the global and per-user concurrency limits; either way they
+run in a Celery worker (manga.tasks.run_translation_job).
+
+Usage:
+    TranslationJobRunner.create_pages(job, pages)      # pages from validate_and_extract
+    TranslationJobRunner.start(job.id)                 # translation worker
+    TranslationJobRunner.start(job.id, pages=[4, 9])   # retry two pages
+"""
+
+import os
+import hashlib
+import logging
+import zipfile
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F
+from django.utils import timezone
+
+from ..models import TranslationJob, TranslationPage, Notification
+from .cbz_service import CBZService
+from .custom_translator import CustomTranslator
+from .archive_ingest import chapter_image_members
+from .ai.profiles import source_lang_code
+
+logger = logging.getLogger(__name__)
+
+# Pages in these states are not translated again on resume
+FINISHED_PAGE_STATUSES = ('completed', 'skipped')
+
+
+class TranslationJobRunner:
+    """Page-level execution, checkpointing and completion of translation jobs."""
+
+    @staticmethod
+    def output_dir(job: TranslationJob) -> Path:
+        return Path(settings.MEDIA_ROOT) / 'translations' / 'temp' / str(job.id) / 'translated'
+
+    @staticmethod
+    def create_pages(job: TranslationJob, pages: List[Dict]) -> int:
+        """
+        Create one pending TranslationPage per image in the archive.
+
+        `pages` are the page dicts of TranslationService.validate_and_extract,
+        which already carry the page order and input hash. A job queued
+        without extraction passes [] and the archive members are hashed here,
+        in the same (pipeline) order.
+        """
+        if not pages:
+            pages = []
+            with zipfile.ZipFile(job.temp_upload_path, 'r') as zf:
+                for page_number, name in enumerate(chapter_image_members(zf), 1):
+                    digest = hashlib.sha256()
+                    with zf.open(name) as member:
+                        for chunk in iter(lambda: member.read(1024 * 1024), b''):
+                            digest.update(chunk)
+                    pages.append({
+                        'page_number': page_number,
+                        'filename': os.path.basename(name),
+                        'path': '',
+                        'sha256': digest.hexdigest(),
+                    })
+
+        rows = [
+            TranslationPage(
+                job=job,
+                page_number=page['page_number'],
+                filename=page['filename'],
+                input_path=page['path'],
+                input_hash=page['sha256'],
+            )
+            for page in pages
+        ]
+
+        TranslationPage.objects.filter(job=job).delete()
+        TranslationPage.objects.bulk_create(rows)
+        return len(rows)
+
+    @classmethod
+    def start(cls, job_id, pages: Optional[Iterable[int]] = None):
+        """Run the job on the translation worker, bypassing the scheduler queue."""
+        from ..tasks import run_translation_job
+
+        TranslationJob.objects.filter(pk=job_id).update(status='translating', updated_at=timezone.now())
+        return run_translation_job.delay(str(job_id), pages=list(pages) if pages is not None else None)
+
+    @classmethod
+    def run(cls, job_id, pages: Optional[Iterable[int]] = None):
+        """
+        Translate every unfinished page of the job (or only `pages`) and
+        complete it. Safe to call again after a crash: finished pages are
+        not redone.
+        """
+        try:
+            cls._run(job_id, pages)
+        except Exception as e:
+            logger.error(f"Translation job {job_id} failed: {e}")
+            try:
+                cls.fail(TranslationJob.objects.get(pk=job_id), str(e))
+            except TranslationJob.DoesNotExist:
+                pass
+        finally:
+            # Workers own their DB connection; don't hold it between tasks
+            connection.close()
+
+    @classmethod
+    def _run(cls, job_id, pages: Optional[Iterable[int]] = None):
+        job = TranslationJob.objects.get(pk=job_id)
+        if not job.pages.exists():
+            # Jobs queued straight from the archive (translation_endpoints)
+            cls.create_pages(job, [])
+
+        todo = job.pages.exclude(status__in=FINISHED_PAGE_STATUSES)
+        if pages is not None:
+            todo = todo.filter(page_number__in=list(pages))
+
+        todo_numbers = set(todo.values_list('page_number', flat=True))
+        done = set(job.pages.values_list('page_number', flat=True)) - todo_numbers
+
+        # Outputs of pages being redone may change extension; drop the old file
+        for output_path in todo.exclude(output_path='').values_list('output_path', flat=True):
+            try:
+                os.unlink(output_path)
+            except OSError:
+                pass
+        todo.update(status='pending', output_path='', error_message='')
+
+        TranslationJob.objects.filter(pk=job.pk).update(
+            status='translating',
+            translated_pages=len(done),
+            updated_at=timezone.now(),
+        )
+        logger.info(f"Job {job.id}: translating {len(todo_numbers)} pages ({len(done)} already done)")
+
+        def on_page(page_number, result):
+            TranslationPage.objects.filter(job_id=job.pk, page_number=page_number).update(
+                status=result['status'],
+                output_path=result['output_path'],
+                bubbles_found=result['bubbles_found'],
+                duration_ms=result['duration_ms'],
+                error_message=result['error'],
+                attempts=F('attempts') + 1,
+                finished_at=timezone.now(),
+            )
+            # updated_at doubles as the heartbeat used by resume_translations
+            TranslationJob.objects.filter(pk=job.pk).update(
+                translated_pages=F('translated_pages') + 1,
+                updated_at=timezone.now(),
+            )
+
+        if todo_numbers:
+            output_dir = cls.output_dir(job)
+            output_dir.mkdir(parents=True, exist_ok=True)
+            CustomTranslator.translate_chapter(
+                job.temp_upload_path,
+                str(output_dir),
+                profile=job.profile,
+                pass_through_pages=job.prescan.get('pass_through_pages') if job.prescan else None,
+                on_page=on_page,
+                done_pages=done,
+                output_format=job.output_format or None,
+                source_lang=source_lang_code(job.source_language),
+            )
+
+        cls.finish(job)
+
+    @classmethod
+    def finish(cls, job: TranslationJob):
+        """Build the CBZ from the page rows and mark the job completed."""
+        job.refresh_from_db()
+        pages = list(job.pages.order_by('page_number'))
+
+        job.translation_results = [
+            {
+                'page_number': page.page_number,
+                'local_path': page.output_path,
+                'filename': os.path.basename(page.output_path),
+            }
+            for page in pages if page.output_path
+        ]
+        job.translated_pages = len(job.translation_results)
+        job.status = 'creating_cbz'
+        job.save(update_fields=['translation_results', 'translated_pages', 'status', 'updated_at'])
+
+        cbz_output_dir = Path(settings.MEDIA_ROOT) / 'translated_cbz'
+        try:
+            job.output_file_path = CBZService.create_cbz_from_local_files(
+                [r['local_path'] for r in job.translation_results],
+                cbz_output_dir,
+                str(job.id)
+            )
+        except Exception as e:
+            if job.source != 'dashboard':
+                raise
+            # Admins can still review and publish the pages
+            logger.error(f"Failed to create Admin CBZ for job {job.id}: {e}")
+
+        failed = [page.page_number for page in pages if page.status == 'failed']
+        job.error_message = f'فشلت ترجمة {len(failed)} من {len(pages)} صفحة' if failed else ''
+        job.status = 'completed'
+        job.completed_at = timezone.now()
+        job.save()
+
+        logger.info(f"Job {job.id} completed ({len(failed)} failed pages)")
+        cls._notify_completed(job)
+
+    @staticmethod
+    def fail(job: TranslationJob, error_msg: str):
+        """
+        Mark the job failed and refund the points charged for it.
+
+        A job that already completed once is a retry of its failed pages: it
+        goes back to completed with the pages of the retry marked failed
+        again, and nothing is refunded for the pages it delivered.
+        """
+        job.refresh_from_db()
+        if job.completed_at:
+            job.pages.exclude(status__in=FINISHED_PAGE_STATUSES).update(status='failed', error_message=error_msg)
+            failed = job.pages.filter(status='failed').count()
+            job.status = 'completed'
+            job.error_message = f'فشلت ترجمة {failed} من {job.pages.count()} صفحة'
+            job.translated_pages = len(job.translation_results)
+            job.save(update_fields=['status', 'error_message', 'translated_pages', 'updated_at'])
+            logger.warning(f"Retry of job {job.id} failed, kept the completed result: {error_msg}")
+            return
+
+        job.status = 'failed'
+        job.error_message = error_msg
+        refund = job.points_charged
+        job.points_charged = 0
+        job.save(update_fields=['status', 'error_message', 'points_charged', 'updated_at'])
+
+        if not refund:
+            return
+
+        try:
+            user = job.user
+            if hasattr(user, 'points'):
+                user.points += refund
+                user.save()
+                logger.info(f"♻️ Refunded {refund} points to user {user.username}")
+
+                try:
+                    Notification.objects.create(
+                        user=user,
+                        title="استرجاع نقاط",
+                        message=f"تم استرجاع {refund} نقطة بسبب فشل الترجمة. رصيدك الحالي: {user.points}",
+                        notification_type='points'
+                    )
+                except Exception as ne:
+                    logger.error(f"Failed to create refund notification: {ne}")
+        except Exception as refund_error:
+            logger.error(f"Failed to refund points: {refund_error}")
+
+    @staticmethod
+    def _notify_completed(job: TranslationJob):
+        try:
+            if job.source == 'dashboard':
+                Notification.objects.create(
+                    user=job.user,
+                    title="اكتملت الترجمة (لوحة التحكم)",
+                    message="تم الانتهاء من ترجمة الفصل بنجاح. يمكنك مراجعته ونشره للعامة أو تحميله الآن.",
+                    link=f"/dashboard/translate?job_id={job.id}",
+                    notification_type='translation'
+                )
+                return
+
+            Notification.objects.create(
+                user=job.user,
+                title="اكتملت الترجمة",
+                message="تم الانتهاء من ترجمة الفصل بنجاح. يمكنك الآن الاطلاع عليه أو تحميله.",
+                link=f"/translate?job_id={job.id}",
+                notification_type='translation'
+            )
+
+            # Notify Admin that a user translation is ready for publishing
+            from django.contrib.auth import get_user_model
+            from ..tasks import notify_users
+            User = get_user_model()
+            notify_users.delay(
+                list(User.objects.filter(is_staff=True).values_list('id', flat=True)),
+                "ترجمة مستخدم جديدة",
+                f"قام المستخدم {job.user.public_display_name} بترجمة فصل جديد. يمكنك مراجعته ونشره الآن.",
+                link=f"/dashboard/translate?job_id={job.id}",
+                notification_type='translation'
+            )
+        except Exception as ne:
+            logger.error(f"Failed to create translation notifications: {ne}")
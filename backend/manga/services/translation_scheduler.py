@@ -0,0 +1,247 @@
+"""
+Translation Scheduler
+=====================
+Central admission control for translation jobs. Upload views enqueue a job
+(status 'queued') instead of starting it; the scheduler starts queued jobs
+while global slots are free.
+
+- Global limit: TRANSLATION_MAX_CONCURRENT_JOBS jobs run at once per
+  deployment (each running job translates one page at a time locally).
+- Per-user limit: TRANSLATION_MAX_JOBS_PER_USER running jobs per user, so
+  one user's batch of uploads cannot hold every slot.
+- Priority: dashboard jobs first, then SubscriptionPlan.translation_priority;
+  inside a priority level users with fewer running jobs go first, then the
+  oldest job.
+
+Slots are job slots: a running job holds one slot whatever its page count
+(pages of a job are translated one at a time), so the page throughput is
+bounded by TRANSLATION_MAX_CONCURRENT_JOBS rather than by a page budget.
+
+State lives in the TranslationJob rows, so any web worker can enqueue,
+dispatch and report queue position. Counting the running jobs and claiming
+a queued one happen under one lock in the shared cache, so two processes
+cannot both see a free slot and fill it twice; the claim itself is a
+conditional update (queued → translating). Claimed jobs run as run_translation_job tasks on the 'translation'
+Celery queue (manga/tasks.py). Dispatch runs on enqueue, whenever a job
+finishes, and on status polls (which also recovers the queue after a
+restart). Running jobs whose
+heartbeat (updated_at) is older than TRANSLATION_STALE_MINUTES no longer
+hold a slot; `manage.py resume_translations` picks them up.
+
+Usage:
+    TranslationScheduler.enqueue(job)
+    TranslationScheduler.queue_info(job)   # {'position', 'eta_seconds', ...}
+"""
+
+import math
+import time
+import logging
+import threading
+from typing import Dict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from ..models import TranslationJob, TranslationPage
+
+logger = logging.getLogger(__name__)
+
+RUNNING_STATUSES = ('translating', 'creating_cbz')
+
+DEFAULT_MAX_CONCURRENT_JOBS = 2
+DEFAULT_MAX_JOBS_PER_USER = 1
+DEFAULT_DASHBOARD_PRIORITY = 100
+DEFAULT_STALE_MINUTES = 15
+
+# Used for ETAs until enough pages have been timed
+DEFAULT_SECONDS_PER_PAGE = 20.0
+ETA_SAMPLE_PAGES = 200
+
+# Serializes count + claim across processes
+CLAIM_LOCK_KEY = 'translation_scheduler_claim'
+CLAIM_LOCK_TIMEOUT = 30
+CLAIM_LOCK_WAIT = 5.0
+
+
+class TranslationScheduler:
+    """Fair-share queue in front of TranslationJobRunner."""
+
+    # Reentrant: with eager tasks (no broker) a finishing job dispatches again
+    _dispatch_lock = threading.RLock()
+
+    # ------------------------------------------------------------------
+    # Settings
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def max_concurrent_jobs() -> int:
+        return max(1, int(getattr(settings, 'TRANSLATION_MAX_CONCURRENT_JOBS', DEFAULT_MAX_CONCURRENT_JOBS)))
+
+    @staticmethod
+    def max_jobs_per_user() -> int:
+        return max(1, int(getattr(settings, 'TRANSLATION_MAX_JOBS_PER_USER', DEFAULT_MAX_JOBS_PER_USER)))
+
+    @staticmethod
+    def stale_threshold():
+        minutes = getattr(settings, 'TRANSLATION_STALE_MINUTES', DEFAULT_STALE_MINUTES)
+        return timezone.now() - timezone.timedelta(minutes=minutes)
+
+    @staticmethod
+    def priority_for(job: TranslationJob) -> int:
+        """Dashboard jobs first, then by the user's subscription plan."""
+        if job.source == 'dashboard':
+            return int(getattr(settings, 'TRANSLATION_DASHBOARD_PRIORITY', DEFAULT_DASHBOARD_PRIORITY))
+        plan = getattr(job.user, 'subscription_plan', None)
+        if plan is not None and plan.is_active:
+            return plan.translation_priority
+        return 0
+
+    # ------------------------------------------------------------------
+    # Queue
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def enqueue(cls, job: TranslationJob) -> Dict:
+        """
+        Queue a job (new, or completed with failed pages to retry) and
+        start it if a slot is free. Returns queue_info for the job.
+        """
+        job.status = 'queued'
+        job.priority = cls.priority_for(job)
+        job.queued_at = timezone.now()
+        job.save(update_fields=['status', 'priority', 'queued_at', 'updated_at'])
+        logger.info(f"Job {job.id} queued (priority {job.priority})")
+
+        cls.dispatch()
+        job.refresh_from_db(fields=['status'])
+        return cls.queue_info(job)
+
+    @classmethod
+    def running_jobs(cls):
+        """Jobs holding a slot (running with a recent heartbeat)."""
+        return TranslationJob.objects.filter(status__in=RUNNING_STATUSES, updated_at__gte=cls.stale_threshold())
+
+    @classmethod
+    def dispatch(cls) -> int:
+        """Start queued jobs while slots are free. Returns how many were started."""
+        from ..tasks import run_translation_job
+
+        started = 0
+        # Serialized within the process; count + claim also take the cross-process claim lock
+        with cls._dispatch_lock:
+            while True:
+                job_id = cls._claim_next()
+                if job_id is None:
+                    break
+                started += 1
+                run_translation_job.delay(str(job_id))
+        return started
+
+    @classmethod
+    def _claim_next(cls):
+        """Claim the next queued job for a free slot; None if there is none."""
+        deadline = time.monotonic() + CLAIM_LOCK_WAIT
+        while not cache.add(CLAIM_LOCK_KEY, 1, timeout=CLAIM_LOCK_TIMEOUT):
+            if time.monotonic() >= deadline:
+                # The process holding the lock keeps claiming until the slots are full
+                return None
+            time.sleep(0.05)
+        try:
+            return cls._claim_next_locked()
+        finally:
+            cache.delete(CLAIM_LOCK_KEY)
+
+    @classmethod
+    def _claim_next_locked(cls):
+        for _attempt in range(5):
+            running = {
+                row['user_id']: row['n']
+                for row in cls.running_jobs().order_by().values('user_id').annotate(n=Count('id'))
+            }
+            if sum(running.values()) >= cls.max_concurrent_jobs():
+                return None
+
+            per_user = cls.max_jobs_per_user()
+            full_users = [user_id for user_id, n in running.items() if n >= per_user]
+            candidates = list(
+                TranslationJob.objects.filter(status='queued')
+                .exclude(user_id__in=full_users)
+                .order_by('-priority', 'queued_at')
+                .values_list('id', 'user_id', 'priority')[:50]
+            )
+            if not candidates:
+                return None
+
+            # Within the top priority level, users with fewer running jobs first
+            top_priority = candidates[0][2]
+            job_id = min(
+                (c for c in candidates if c[2] == top_priority),
+                key=lambda c: running.get(c[1], 0)
+            )[0]
+
+            if TranslationJob.objects.filter(pk=job_id, status='queued').update(
+                status='translating', updated_at=timezone.now()
+            ):
+                logger.info(f"Job {job_id} started by scheduler")
+                return job_id
+            # Another worker claimed it first; look again
+        return None
+
+    # ------------------------------------------------------------------
+    # Position / ETA
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def seconds_per_page() -> float:
+        durations = list(
+            TranslationPage.objects.filter(status='completed', duration_ms__isnull=False)
+            .order_by('-finished_at')
+            .values_list('duration_ms', flat=True)[:ETA_SAMPLE_PAGES]
+        )
+        if not durations:
+            return DEFAULT_SECONDS_PER_PAGE
+        return sum(durations) / len(durations) / 1000.0
+
+    @classmethod
+    def queue_info(cls, job: TranslationJob) -> Dict:
+        """
+        Queue position (1 = next to start) and estimated seconds until the
+        job finishes. Position is None once the job has started.
+        """
+        per_page = cls.seconds_per_page()
+        slots = cls.max_concurrent_jobs()
+
+        if job.status in RUNNING_STATUSES:
+            remaining = max(job.total_pages - job.translated_pages, 0)
+            return {'position': None, 'eta_seconds': int(remaining * per_page), 'slots': slots}
+        if job.status != 'queued':
+            return {'position': None, 'eta_seconds': None, 'slots': slots}
+
+        ahead = TranslationJob.objects.filter(status='queued').filter(
+            Q(priority__gt=job.priority) | Q(priority=job.priority, queued_at__lt=job.queued_at)
+        )
+        ahead_pages = sum(ahead.values_list('total_pages', flat=True))
+        running_pages = sum(
+            max(total - done, 0)
+            for total, done in cls.running_jobs().values_list('total_pages', 'translated_pages')
+        )
+
+        # Work ahead is shared by all slots; then the job's own pages
+        wait = (ahead_pages + running_pages) * per_page / slots
+        return {
+            'position': ahead.count() + 1,
+            'eta_seconds': int(math.ceil(wait + job.total_pages * per_page)),
+            'slots': slots,
+        }
+
+    @classmethod
+    def status_payload(cls, job: TranslationJob) -> Dict:
+        """Queue fields for status endpoints; also nudges the queue along."""
+        # Eager tasks would run the whole job inside the status request
+        if job.status == 'queued' and not settings.CELERY_TASK_ALWAYS_EAGER:
+            cls.dispatch()
+            job.refresh_from_db(fields=['status', 'translated_pages', 'updated_at'])
+        info = cls.queue_info(job)
+        return {'queue_position': info['position'], 'eta_seconds': info['eta_seconds']}
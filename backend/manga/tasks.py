@@ -0,0 +1,327 @@
+"""
+Background Tasks
+================
+Celery tasks for work that must outlive the request that started it. Each
+queue is served by its own worker processes (settings.CELERY_TASK_ROUTES):
+
+- uploads:        upload_chapter_archive
+- translation:    run_translation_job
+- publishing:     publish_translated_chapter
+- notifications:  notify_users, notify_bookmarked_users
+
+Tasks are acks-late, so a task whose worker died is delivered again. Every
+task is safe to run twice: uploads and publishing skip pages that already
+have a ChapterImage, and translation jobs resume from their unfinished
+TranslationPage rows. Pages that failed to upload are retried with backoff
+before the chapter is marked done. A translation task delivered again while
+its job still has a fresh heartbeat (the first copy is still running) waits
+instead of translating the same pages a second time.
+
+Arguments are ids and paths only; archives live on the shared MEDIA_ROOT
+(direct uploads are fetched there from S3 by the upload worker).
+"""
+
+import zipfile
+import logging
+from pathlib import Path
+from typing import List, Optional
+
+from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+
+from .models import Chapter, Notification, TranslationJob, UserBookmark
+from .services import direct_upload
+from .services.archive_ingest import archive_pages, chapter_image_members
+from .services.async_upload import async_upload_service
+from .services.chapter_publisher import ChapterPublisher, page_name
+from .services.translation import TranslationService
+from .services.translation_jobs import TranslationJobRunner
+from .services.translation_scheduler import DEFAULT_STALE_MINUTES, RUNNING_STATUSES, TranslationScheduler
+
+logger = logging.getLogger(__name__)
+
+# Pages that failed to upload are retried this many times (countdown doubles)
+UPLOAD_MAX_RETRIES = 3
+UPLOAD_RETRY_COUNTDOWN = 30
+
+
+def chapter_upload_path(job_id) -> Path:
+    """Where the web process stores an archive for upload_chapter_archive."""
+    return Path(settings.MEDIA_ROOT) / 'chapter_uploads' / f'{job_id}.zip'
+
+
+def _retry_countdown(retries: int) -> int:
+    return UPLOAD_RETRY_COUNTDOWN * (2 ** retries)
+
+
+def _fail_upload(job_id: str, chapter: Chapter, error: str):
+    logger.error(f"Upload job {job_id}: {error}")
+    Chapter.objects.filter(pk=chapter.pk).update(upload_status='failed')
+    async_upload_service.update_job(job_id, status='failed', error=error)
+
+
+# ---------------------------------------------------------------------------
+# Uploads
+# ---------------------------------------------------------------------------
+
+@shared_task(bind=True, max_retries=UPLOAD_MAX_RETRIES)
+def upload_chapter_archive(self, job_id: str, chapter_id: str, uploader_id: Optional[int] = None,
+                           storage_key: Optional[str] = None):
+    """
+    Upload the pages of a stored chapter archive to ImgBB.
+
+    `storage_key` names an archive the client uploaded straight to S3
+    (services.direct_upload); it is downloaded to the shared MEDIA_ROOT first.
+
+    Progress goes to the Chapter counters and the upload job state in the
+    cache (async_upload_service) read by get_upload_progress / cancel_upload.
+    """
+    archive_path = chapter_upload_path(job_id)
+
+    def discard_archive():
+        archive_path.unlink(missing_ok=True)
+        if storage_key:
+            direct_upload.delete_upload(storage_key)
+
+    try:
+        chapter = Chapter.objects.select_related('manga').get(pk=chapter_id)
+    except Chapter.DoesNotExist:
+        logger.warning(f"Upload job {job_id}: chapter {chapter_id} no longer exists")
+        discard_archive()
+        return
+
+    if async_upload_service.is_cancelled(job_id):
+        discard_archive()
+        return
+
+    if storage_key and not archive_path.exists():
+        try:
+            direct_upload.fetch_upload(storage_key, archive_path)
+        except Exception as e:
+            if self.request.retries < self.max_retries:
+                logger.warning(f"Upload job {job_id}: download of {storage_key} failed ({e}), retrying")
+                raise self.retry(countdown=_retry_countdown(self.request.retries))
+            _fail_upload(job_id, chapter, f"تعذر تحميل الملف من التخزين: {e}")
+            return
+
+    manga = chapter.manga
+    done = set(chapter.images.values_list('page_number', flat=True))
+
+    uploaded = [len(done)]
+
+    def on_progress(count):
+        Chapter.objects.filter(pk=chapter.pk).update(uploaded_images_count=F('uploaded_images_count') + count)
+        uploaded[0] += count
+        async_upload_service.update_job(job_id, completed=uploaded[0])
+
+    # Only the ZIP directory is loaded; upload threads read their own page
+    try:
+        zip_file = zipfile.ZipFile(archive_path, 'r')
+    except zipfile.BadZipFile:
+        discard_archive()
+        _fail_upload(job_id, chapter, 'Invalid ZIP/CBZ file')
+        return
+
+    with zip_file:
+        total_images = len(chapter_image_members(zip_file))
+        if not total_images:
+            discard_archive()
+            _fail_upload(job_id, chapter, 'لا توجد صور في الملف')
+            return
+
+        pages = archive_pages(zip_file, lambda n: page_name(chapter, n), skip=done)
+
+        # Counts pages finished by an earlier (crashed or retried) run
+        Chapter.objects.filter(pk=chapter.pk).update(
+            uploaded_images_count=len(done),
+            total_images_count=total_images,
+            upload_status='uploading'
+        )
+        async_upload_service.update_job(job_id, status='uploading', total=total_images, completed=len(done))
+        logger.info(f"Upload job {job_id}: {len(pages)} pages to upload ({len(done)} already done)")
+
+        results = ChapterPublisher(
+            chapter,
+            job_id=job_id,
+            on_progress=on_progress,
+            should_cancel=lambda: async_upload_service.is_cancelled(job_id)
+        ).publish(pages)
+
+    if results['cancelled']:
+        discard_archive()
+        return
+
+    if results['failed'] and self.request.retries < self.max_retries:
+        logger.warning(f"Upload job {job_id}: {results['failed']} pages failed, retrying")
+        async_upload_service.update_job(job_id, failed=results['failed'], errors=results['errors'])
+        raise self.retry(countdown=_retry_countdown(self.request.retries))
+
+    Chapter.objects.filter(pk=chapter.pk).update(upload_status='completed')
+    async_upload_service.update_job(
+        job_id,
+        status='completed',
+        completed=len(done) + results['completed'],
+        failed=results['failed'],
+        errors=results['errors']
+    )
+    discard_archive()
+    logger.info(f"Chapter upload job {job_id} completed")
+
+    chapter_title = f"{manga.title} - Chapter {chapter.number}"
+    if uploader_id:
+        notify_users.delay(
+            [uploader_id],
+            "اكتمل الرفع",
+            f"تم الانتهاء من رفع {chapter_title} بنجاح",
+            link=f"/dashboard/manga/{manga.id}",
+            notification_type='upload'
+        )
+    notify_bookmarked_users.delay(str(manga.id), chapter_title, exclude_user_id=uploader_id)
+
+
+# ---------------------------------------------------------------------------
+# Translation
+# ---------------------------------------------------------------------------
+
+def _stale_seconds() -> int:
+    return int(getattr(settings, 'TRANSLATION_STALE_MINUTES', DEFAULT_STALE_MINUTES)) * 60
+
+
+def _redelivery_window() -> int:
+    """How long a task's first-delivery marker is kept (refreshed on every redelivery)."""
+    return settings.CELERY_BROKER_TRANSPORT_OPTIONS['visibility_timeout'] + _stale_seconds()
+
+
+# No time limit: the translation worker runs a thread pool, which does not
+# enforce them. Redelivery of a long job is handled by the heartbeat check.
+@shared_task(bind=True, max_retries=None)
+def run_translation_job(self, job_id: str, pages: Optional[List[int]] = None):
+    """
+    Run a job claimed by TranslationScheduler, then hand its slot on.
+
+    A redelivered task of a job that already finished is a no-op. One that
+    arrives while the job's heartbeat (updated_at) is fresh is checked again
+    after TRANSLATION_STALE_MINUTES: the first copy is still running, or its
+    worker died moments ago and the job is resumed once the heartbeat stops.
+    """
+    job = TranslationJob.objects.filter(pk=job_id).values('status', 'updated_at').first()
+    status = job['status'] if job else None
+    if status not in RUNNING_STATUSES:
+        logger.info(f"Translation job {job_id} is {status}, nothing to run")
+        return
+
+    # Redeliveries and retries keep the task id; only the first delivery has no marker
+    started_key = f'translation_task_{self.request.id}'
+    if not cache.add(started_key, 1, timeout=_redelivery_window()):
+        if job['updated_at'] >= TranslationScheduler.stale_threshold():
+            logger.info(f"Translation job {job_id} is still running elsewhere, checking again later")
+            cache.set(started_key, 1, timeout=_redelivery_window())
+            raise self.retry(countdown=_stale_seconds())
+        logger.warning(f"Translation job {job_id} stopped sending heartbeats, resuming it")
+
+    try:
+        TranslationJobRunner.run(job_id, pages=pages)
+    finally:
+        TranslationScheduler.dispatch()
+
+
+# ---------------------------------------------------------------------------
+# Publishing
+# ---------------------------------------------------------------------------
+
+@shared_task(bind=True, max_retries=UPLOAD_MAX_RETRIES)
+def publish_translated_chapter(self, job_id: str, chapter_id: str):
+    """Upload the translated pages of a completed job into a chapter."""
+    try:
+        job = TranslationJob.objects.get(pk=job_id)
+        chapter = Chapter.objects.select_related('manga').get(pk=chapter_id)
+    except (TranslationJob.DoesNotExist, Chapter.DoesNotExist):
+        logger.warning(f"Publish of job {job_id}: job or chapter no longer exists")
+        return
+
+    done = set(chapter.images.values_list('page_number', flat=True))
+    pages = [
+        {
+            'page_number': img_data['page_number'],
+            'local_path': img_data['local_path'],
+            'filename': img_data['filename'],
+            'name': page_name(chapter, img_data['page_number']),
+        }
+        for img_data in job.translation_results
+        if img_data['page_number'] not in done
+    ]
+    total_images = len(job.translation_results)
+
+    TranslationJob.objects.filter(pk=job.pk).update(status='publishing', translated_pages=len(done))
+
+    try:
+        results = ChapterPublisher(
+            chapter,
+            job_id=f'publish_{job_id}',
+            on_progress=lambda count: TranslationJob.objects.filter(pk=job.pk).update(
+                translated_pages=F('translated_pages') + count
+            )
+        ).publish(pages)
+    except Exception as e:
+        job.refresh_from_db()
+        job.status = 'failed'
+        job.error_message = str(e)
+        job.save()
+        logger.error(f"Background upload failed: {e}")
+        return
+
+    if results['failed'] and self.request.retries < self.max_retries:
+        logger.warning(f"Publish of job {job_id}: {results['failed']} pages failed, retrying")
+        raise self.retry(countdown=_retry_countdown(self.request.retries))
+
+    # Clean up temporary directory
+    TranslationService.cleanup_job(str(job.id))
+
+    job.refresh_from_db()
+    job.status = 'published'
+    job.error_message = ''
+    if results['failed']:
+        job.error_message = f"فشل رفع {results['failed']} من {total_images} صورة"
+    job.save()
+
+    logger.info(f"Background upload completed: {results['completed']} uploaded, {results['failed']} failed")
+
+
+# ---------------------------------------------------------------------------
+# Notifications
+# ---------------------------------------------------------------------------
+
+@shared_task
+def notify_users(user_ids: List, title: str, message: str, link: Optional[str] = None,
+                 notification_type: str = 'system'):
+    """Create the same notification for every user in one query."""
+    Notification.objects.bulk_create([
+        Notification(
+            user_id=user_id,
+            title=title,
+            message=message,
+            link=link,
+            notification_type=notification_type
+        )
+        for user_id in user_ids
+    ])
+
+
+@shared_task
+def notify_bookmarked_users(manga_id: str, chapter_title: str, exclude_user_id: Optional[int] = None):
+    """Tell everyone who bookmarked the manga about a new chapter."""
+    user_ids = list(
+        UserBookmark.objects.filter(manga_id=manga_id)
+        .exclude(user_id=exclude_user_id)
+        .values_list('user_id', flat=True)
+        .distinct()
+    )
+    notify_users(
+        user_ids,
+        "فصل جديد متاح!",
+        f"يتوفر الآن فصل جديد {chapter_title} من المانجا المفضلة لديك",
+        link=f"/manga/{manga_id}",
+        notification_type='chapter'
+    )
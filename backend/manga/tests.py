@@ -1,3 +1,827 @@
-from django.test import TestCase
+import io
+import shutil
+import hashlib
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from celery.exceptions import Retry
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+import numpy as np
+from PIL import Image
+from rest_framework.test import APIClient
+
+from .models import Chapter, ChapterImage, Manga, StoredImage, TranslationJob, TranslationPage
+from .services import archive_staging, image_storage, resumable_upload
+from .services.ai import fallback_inpainter, profiles
+from .services.ai.batching import BatchDispatcher
+from .services.ai.modal_client import ModalTranslationClient
+from .services.async_upload import AsyncUploadService, async_upload_service
+from .services.chapter_publisher import ChapterPublisher
+from .services.resumable_upload import UploadSessionError
+from .services.translation import ArchiveValidationError, TranslationService
+from .services.translation_jobs import TranslationJobRunner
+from .services.translation_scheduler import TranslationScheduler
+from .tasks import chapter_upload_path, run_translation_job, upload_chapter_archive
+
+User = get_user_model()
+
+
+def png_bytes(size=(4, 3)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, 'white').save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def zip_bytes(members):
+    """A ZIP archive of {name: data}."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+        for name, data in members.items():
+            zip_file.writestr(name, data)
+    return buffer.getvalue()
+
+
+class TempMediaRootMixin:
+    """MEDIA_ROOT in a temporary directory for the test."""
+
+    def use_temp_media_root(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        return media_root
+
+
+@override_settings(TRANSLATION_MAX_CONCURRENT_JOBS=2, TRANSLATION_MAX_JOBS_PER_USER=1)
+class TranslationSchedulerTests(TestCase):
+
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='x')
+        self.bob = User.objects.create_user(username='bob', password='x')
+        patcher = mock.patch('manga.tasks.run_translation_job.delay')
+        self.delay = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def queued_job(self, user, **fields):
+        job = TranslationJob.objects.create(user=user, original_filename='ch.zip', **fields)
+        TranslationScheduler.enqueue(job)
+        job.refresh_from_db()
+        return job
+
+    def started_ids(self):
+        return {call.args[0] for call in self.delay.call_args_list}
+
+    def test_claimed_job_is_started_once(self):
+        job = self.queued_job(self.alice)
+
+        self.assertEqual(job.status, 'translating')
+        self.assertEqual(TranslationScheduler.dispatch(), 0)
+        self.assertEqual(self.started_ids(), {str(job.id)})
+        self.assertEqual(self.delay.call_count, 1)
+
+    def test_job_claimed_by_another_worker_is_not_started(self):
+        with mock.patch.object(TranslationScheduler, 'dispatch'):
+            job = self.queued_job(self.alice)
+        # Another worker wins the queued -> translating update
+        TranslationJob.objects.filter(pk=job.pk, status='queued').update(status='translating')
+
+        self.assertEqual(TranslationScheduler.dispatch(), 0)
+        self.delay.assert_not_called()
+
+    def test_per_user_limit(self):
+        first = self.queued_job(self.alice)
+        second = self.queued_job(self.alice)
+        other = self.queued_job(self.bob)
+
+        self.assertEqual(first.status, 'translating')
+        self.assertEqual(second.status, 'queued')
+        self.assertEqual(other.status, 'translating')
+        self.assertEqual(self.started_ids(), {str(first.id), str(other.id)})
+
+    @override_settings(TRANSLATION_MAX_CONCURRENT_JOBS=1)
+    def test_interleaved_claims_do_not_exceed_the_limit(self):
+        with mock.patch.object(TranslationScheduler, 'dispatch'):
+            first = self.queued_job(self.alice)
+            second = self.queued_job(self.bob)
+
+        # A second process claims between this one's count and its claim
+        nested = []
+        running_jobs = TranslationScheduler.running_jobs.__func__
+
+        def interleaved(cls):
+            if not nested:
+                nested.append(TranslationScheduler._claim_next())
+            return running_jobs(cls)
+
+        with mock.patch('manga.services.translation_scheduler.CLAIM_LOCK_WAIT', 0), \
+                mock.patch.object(TranslationScheduler, 'running_jobs', classmethod(interleaved)):
+            claimed = TranslationScheduler._claim_next()
+
+        self.assertEqual(nested, [None])
+        self.assertIn(claimed, (first.id, second.id))
+        self.assertEqual(TranslationJob.objects.filter(status='translating').count(), 1)
+
+    def test_finished_job_frees_its_slot(self):
+        first = self.queued_job(self.alice)
+        second = self.queued_job(self.alice)
+
+        TranslationJob.objects.filter(pk=first.pk).update(status='completed')
+        TranslationScheduler.dispatch()
+
+        second.refresh_from_db()
+        self.assertEqual(second.status, 'translating')
+        self.assertEqual(self.started_ids(), {str(first.id), str(second.id)})
+
+
+class UploadChapterArchiveTaskTests(TempMediaRootMixin, TestCase):
+
+    def setUp(self):
+        self.use_temp_media_root()
+        patcher = mock.patch('manga.tasks.notify_bookmarked_users.delay')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.chapter = Chapter.objects.create(manga=Manga.objects.create(title='Test'), number=1)
+        self.job_id = 'job-1'
+        archive = chapter_upload_path(self.job_id)
+        archive.parent.mkdir(parents=True)
+        with zipfile.ZipFile(archive, 'w') as zip_file:
+            for n in (1, 2, 3):
+                zip_file.writestr(f'{n:03d}.jpg', b'page')
+        async_upload_service.create_job(self.job_id, status='queued')
+
+    def publish_as(self, outcomes):
+        """Publish stub: each call publishes the pages in the next set of `outcomes`."""
+        calls = []
+
+        def publish(publisher, pages):
+            numbers = [page['page_number'] for page in pages]
+            calls.append(numbers)
+            succeeded = outcomes[len(calls) - 1]
+            for number in succeeded:
+                ChapterImage.objects.create(chapter=self.chapter, page_number=number, image_url='https://i.test/p')
+            publisher.on_progress(len(succeeded))
+            failed = len(numbers) - len(succeeded)
+            return {'completed': len(succeeded), 'failed': failed, 'errors': ['x'] * failed, 'cancelled': False}
+
+        return calls, publish
+
+    def test_redelivery_skips_published_pages(self):
+        ChapterImage.objects.create(chapter=self.chapter, page_number=1, image_url='https://i.test/p')
+        calls, publish = self.publish_as([[2, 3]])
+
+        with mock.patch.object(ChapterPublisher, 'publish', autospec=True, side_effect=publish):
+            upload_chapter_archive.apply(args=[self.job_id, str(self.chapter.id)])
+
+        self.assertEqual(calls, [[2, 3]])
+        self.chapter.refresh_from_db()
+        self.assertEqual(self.chapter.upload_status, 'completed')
+        self.assertEqual(self.chapter.uploaded_images_count, 3)
+        self.assertFalse(chapter_upload_path(self.job_id).exists())
+
+    def test_failed_pages_are_retried(self):
+        calls, publish = self.publish_as([[1, 3], [2]])
+
+        with mock.patch.object(ChapterPublisher, 'publish', autospec=True, side_effect=publish):
+            upload_chapter_archive.apply(args=[self.job_id, str(self.chapter.id)])
+
+        self.assertEqual(calls, [[1, 2, 3], [2]])
+        self.chapter.refresh_from_db()
+        self.assertEqual(self.chapter.upload_status, 'completed')
+        self.assertEqual(async_upload_service.get_job_status(self.job_id)['completed'], 3)
+
+
+
+class AsyncUploadServiceTests(TestCase):
+
+    def setUp(self):
+        self.service = AsyncUploadService(max_workers=1)
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+        started = threading.Event()
+
+        def gate():
+            started.set()
+            self.release.wait(5)
+
+        # Holds the only worker so the queues below fill up first
+        self.service.submit('gate', gate)
+        started.wait(5)
+
+    def test_jobs_are_served_round_robin(self):
+        order = []
+        futures = [self.service.submit('long', order.append, f'long-{n}') for n in (1, 2, 3)]
+        futures.append(self.service.submit('short', order.append, 'short-1'))
+
+        self.release.set()
+        for future in futures:
+            future.result(timeout=5)
+
+        self.assertEqual(order, ['long-1', 'short-1', 'long-2', 'long-3'])
+
+    def test_cancel_pending_drops_only_that_job(self):
+        cancelled = [self.service.submit('a', str, n) for n in range(3)]
+        kept = self.service.submit('b', str, 'b')
+
+        self.assertEqual(self.service.cancel_pending('a'), 3)
+        self.assertEqual(self.service.pending_count(), 1)
+
+        self.release.set()
+        self.assertEqual(kept.result(timeout=5), 'b')
+        self.assertTrue(all(future.cancelled() for future in cancelled))
+
+class ChapterPublisherTests(TestCase):
+
+    def setUp(self):
+        self.chapter = Chapter.objects.create(manga=Manga.objects.create(title='Test'), number=1)
+        patcher = mock.patch.object(ChapterPublisher, 'upload_page', side_effect=self.uploaded)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.progress = []
+
+    @staticmethod
+    def uploaded(page):
+        return {'url': f"https://i.test/{page['page_number']}", 'content_hash': 'h', 'deduplicated': False}
+
+    def publish(self, numbers, **kwargs):
+        publisher = ChapterPublisher(self.chapter, on_progress=self.progress.append, **kwargs)
+        return publisher.publish(
+            [{'page_number': n, 'filename': f'{n:03d}.png', 'name': str(n), 'data': b''} for n in numbers]
+        )
+
+    def test_recorded_pages_are_not_counted_again(self):
+        ChapterImage.objects.create(chapter=self.chapter, page_number=1, image_url='https://i.test/old')
+
+        result = self.publish([1, 2, 3])
+
+        self.assertEqual(result['completed'], 2)
+        self.assertEqual(sum(self.progress), 2)
+        self.assertEqual(self.chapter.images.get(page_number=1).image_url, 'https://i.test/old')
+
+
+@override_settings(TRANSLATION_STALE_MINUTES=15)
+class RunTranslationJobTaskTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create_user(username='alice', password='x')
+        self.job = TranslationJob.objects.create(user=user, original_filename='ch.zip', status='translating')
+        self.run_job = mock.patch('manga.tasks.TranslationJobRunner.run').start()
+        mock.patch('manga.tasks.TranslationScheduler.dispatch').start()
+        self.addCleanup(mock.patch.stopall)
+
+    def deliver(self, task_id='task-1'):
+        with mock.patch.object(run_translation_job, 'retry', return_value=Retry()) as retry:
+            run_translation_job.apply(args=[str(self.job.id)], task_id=task_id)
+        return retry
+
+    def test_first_delivery_runs_the_job(self):
+        self.deliver()
+        self.run_job.assert_called_once_with(str(self.job.id), pages=None)
+
+    def test_redelivery_waits_while_the_job_is_running(self):
+        self.deliver()
+        retry = self.deliver()
+
+        self.run_job.assert_called_once()
+        retry.assert_called_once_with(countdown=15 * 60)
+
+    def test_redelivery_resumes_a_job_without_heartbeat(self):
+        self.deliver()
+        TranslationJob.objects.filter(pk=self.job.pk).update(updated_at=timezone.now() - timezone.timedelta(hours=1))
+        retry = self.deliver()
+
+        self.assertEqual(self.run_job.call_count, 2)
+        retry.assert_not_called()
+
+    def test_finished_job_is_not_run_again(self):
+        TranslationJob.objects.filter(pk=self.job.pk).update(status='completed')
+        self.deliver()
+        self.run_job.assert_not_called()
+
+
+class TranslationJobFailureTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='reader', password='x', points=50)
+
+    def job(self, **fields):
+        job = TranslationJob.objects.create(
+            user=self.user, original_filename='ch.zip', status='translating', points_charged=30, **fields
+        )
+        TranslationPage.objects.create(job=job, page_number=1, filename='001.png', status='completed')
+        TranslationPage.objects.create(job=job, page_number=2, filename='002.png', status='pending')
+        return job
+
+    def test_failed_job_is_refunded(self):
+        job = self.job()
+
+        TranslationJobRunner.fail(job, 'boom')
+
+        job.refresh_from_db()
+        self.user.refresh_from_db()
+        self.assertEqual((job.status, job.points_charged), ('failed', 0))
+        self.assertEqual(self.user.points, 80)
+
+    def test_failed_retry_keeps_the_completed_job(self):
+        job = self.job(completed_at=timezone.now(), translation_results=[{'page_number': 1}])
+
+        TranslationJobRunner.fail(job, 'boom')
+
+        job.refresh_from_db()
+        self.user.refresh_from_db()
+        self.assertEqual((job.status, job.points_charged, job.translated_pages), ('completed', 30, 1))
+        self.assertEqual(job.pages.get(page_number=2).status, 'failed')
+        self.assertEqual(job.pages.get(page_number=1).status, 'completed')
+        self.assertEqual(self.user.points, 50)
+
+
+class ResumableUploadTests(TempMediaRootMixin, TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.use_temp_media_root()
+
+        self.data = bytes(range(256)) * 40
+        self.session = resumable_upload.create_session(
+            1, 'ch.cbz', len(self.data), hashlib.sha256(self.data).hexdigest()
+        )
+
+    def put(self, start, end, body=None, checksum='', session=None):
+        body = self.data[start:end + 1] if body is None else body
+        session = session or resumable_upload.get_session(self.session['id'], 1)
+        return resumable_upload.write_chunk(session, start, end, len(self.data), io.BytesIO(body), checksum=checksum)
+
+    def part_size(self):
+        return resumable_upload._part_path(self.session['id']).stat().st_size
+
+    def test_interrupted_chunk_resumes_from_offset(self):
+        self.put(0, 4095)
+        with self.assertRaises(UploadSessionError) as cm:
+            self.put(4096, 8191, body=self.data[4096:6000])
+        self.assertEqual(cm.exception.offset, 4096)
+        self.assertEqual(self.part_size(), 4096)
+
+        session = resumable_upload.get_session(self.session['id'], 1)
+        self.assertEqual(session['offset'], 4096)
+        # A retried chunk that was already stored is acknowledged
+        self.assertEqual(self.put(0, 4095, session=session)['offset'], 4096)
+
+        self.put(4096, len(self.data) - 1, session=session)
+        session = resumable_upload.finalize_session(resumable_upload.get_session(self.session['id'], 1))
+        self.assertEqual(session['status'], 'complete')
+        self.assertEqual(resumable_upload._part_path(session['id']).read_bytes(), self.data)
+
+    def test_chunk_with_wrong_checksum_is_discarded(self):
+        with self.assertRaises(UploadSessionError) as cm:
+            self.put(0, 4095, checksum='0' * 64)
+        self.assertEqual(cm.exception.status, 422)
+        self.assertEqual(self.part_size(), 0)
+        self.assertEqual(resumable_upload.get_session(self.session['id'], 1)['offset'], 0)
+
+        chunk_sha = hashlib.sha256(self.data[:4096]).hexdigest()
+        self.assertEqual(self.put(0, 4095, checksum=chunk_sha)['offset'], 4096)
+
+    def test_stale_session_does_not_rewrite_stored_bytes(self):
+        stale = dict(self.session)
+        self.put(0, 4095)
+
+        session = self.put(0, 4095, body=b'x' * 4096, session=stale)
+        self.assertEqual(session['offset'], 4096)
+        self.assertEqual(resumable_upload._part_path(self.session['id']).read_bytes(), self.data[:4096])
+
+    def test_finalize_requires_every_byte(self):
+        self.put(0, 4095)
+        with self.assertRaises(UploadSessionError) as cm:
+            resumable_upload.finalize_session(resumable_upload.get_session(self.session['id'], 1))
+        self.assertEqual(cm.exception.status, 409)
+
+    def test_finalize_rejects_a_different_file(self):
+        session = resumable_upload.create_session(1, 'ch.cbz', len(self.data), '0' * 64)
+        self.put(0, len(self.data) - 1, session=session)
+
+        with self.assertRaises(UploadSessionError) as cm:
+            resumable_upload.finalize_session(resumable_upload.get_session(session['id'], 1))
+        self.assertEqual(cm.exception.status, 422)
+        self.assertIsNone(resumable_upload.get_session(session['id'], 1))
+
+
+class ArchiveAnalysisTests(TempMediaRootMixin, TestCase):
+
+    def setUp(self):
+        self.path = f'{self.use_temp_media_root()}/ch.cbz'
+
+    def analyze(self, members, **limits):
+        with open(self.path, 'wb') as f:
+            f.write(zip_bytes(members))
+        return archive_staging.analyze_archive(self.path, **limits)
+
+    def test_pages_are_measured_in_order(self):
+        analysis = self.analyze({'002.png': png_bytes((5, 6)), '001.png': png_bytes((4, 3)), 'notes.txt': b'x'})
+
+        self.assertTrue(analysis['valid'])
+        self.assertEqual(analysis['image_count'], 2)
+        self.assertEqual(
+            [(p['filename'], p['width'], p['height']) for p in analysis['pages']],
+            [('001.png', 4, 3), ('002.png', 5, 6)]
+        )
+
+    def test_total_uncompressed_size_limit(self):
+        analysis = self.analyze({'001.png': png_bytes(), 'big.bin': b'\0' * 10000}, max_total_size=5000)
+
+        self.assertFalse(analysis['valid'])
+        self.assertEqual(analysis['pages'], [])
+
+    def test_image_size_limit(self):
+        page = png_bytes()
+        analysis = self.analyze({'001.png': page}, max_image_size=len(page) - 1)
+
+        self.assertFalse(analysis['valid'])
+        self.assertIn('001.png', analysis['error'])
+
+    @override_settings(DATA_UPLOAD_MAX_MEMORY_SIZE=5000)
+    def test_chapter_total_limit_is_the_default(self):
+        analysis = self.analyze({'001.png': png_bytes(), 'big.bin': b'\0' * 10000})
+        self.assertFalse(analysis['valid'])
+
+    def test_chapter_image_limit_is_the_default(self):
+        page = png_bytes()
+        self.assertTrue(self.analyze({'001.png': page})['valid'])
+        with mock.patch.object(archive_staging, 'CHAPTER_MAX_IMAGE_SIZE', len(page) - 1):
+            self.assertFalse(self.analyze({'001.png': page})['valid'])
+
+    def test_corrupt_page_is_invalid(self):
+        analysis = self.analyze({'001.png': png_bytes(), '002.png': b'not an image'})
+
+        self.assertFalse(analysis['valid'])
+        self.assertIn('002.png', analysis['error'])
+
+
+class AnalyzeZipViewTests(TempMediaRootMixin, TestCase):
+
+    def setUp(self):
+        self.use_temp_media_root()
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser('admin', 'admin@test', 'x'))
+
+    def post(self, members):
+        upload = SimpleUploadedFile('ch.cbz', zip_bytes(members), content_type='application/zip')
+        return self.client.post('/api/chapters/analyze-zip/', {'file': upload}, format='multipart')
+
+    def staged_ids(self):
+        directory = archive_staging.staging_dir()
+        return [path.name for path in directory.iterdir()] if directory.exists() else []
+
+    def test_valid_archive_is_staged(self):
+        response = self.post({'001.png': png_bytes()})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['image_count'], 1)
+        self.assertEqual(self.staged_ids(), [response.data['staging_id']])
+
+    def test_invalid_archive_is_rejected_and_discarded(self):
+        response = self.post({'001.png': b'not an image'})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('001.png', response.data['error'])
+        self.assertEqual(self.staged_ids(), [])
+
+
+
+class QuoteTranslationViewTests(TempMediaRootMixin, TestCase):
+
+    def setUp(self):
+        self.use_temp_media_root()
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='reader', password='x'))
+
+    def post(self, members):
+        upload = SimpleUploadedFile('ch.cbz', zip_bytes(members), content_type='application/zip')
+        return self.client.post('/api/translate/quote/', {'file': upload}, format='multipart')
+
+    def staged_ids(self):
+        directory = archive_staging.staging_dir()
+        return [path.name for path in directory.iterdir()] if directory.exists() else []
+
+    def test_invalid_archive_is_discarded(self):
+        response = self.post({'001.png': b'not an image'})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.staged_ids(), [])
+
+    def test_translation_image_limit_applies(self):
+        page = png_bytes()
+        with mock.patch('manga.user_translation_views.MAX_IMAGE_SIZE', len(page) - 1):
+            response = self.post({'001.png': page})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('001.png', response.data['error'])
+        self.assertEqual(self.staged_ids(), [])
+
+class ArchiveExtractionTests(TempMediaRootMixin, TestCase):
+
+    def setUp(self):
+        media_root = self.use_temp_media_root()
+        patcher = mock.patch.object(TranslationService, 'UPLOAD_DIR', Path(media_root) / 'translation_temp')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.path = f'{media_root}/ch.cbz'
+        self.user = User.objects.create_user(username='reader', password='x')
+
+    def extract(self, members, **kwargs):
+        with open(self.path, 'wb') as f:
+            f.write(zip_bytes(members))
+        return TranslationService.validate_and_extract(self.path, 'job', **kwargs)
+
+    def test_pages_follow_the_pipeline_order(self):
+        first, second = png_bytes((4, 3)), png_bytes((5, 6))
+        pages = self.extract({'b/001.png': second, 'a/001.png': first, '__MACOSX/a/._001.png': b'x'})
+
+        self.assertEqual([p['member'] for p in pages], ['a/001.png', 'b/001.png'])
+        self.assertEqual([p['page_number'] for p in pages], [1, 2])
+        self.assertEqual([Path(p['path']).read_bytes() for p in pages], [first, second])
+        self.assertEqual(pages[1]['sha256'], hashlib.sha256(second).hexdigest())
+
+    def test_oversized_member_is_rejected_before_decompressing(self):
+        with mock.patch('manga.services.translation.MAX_IMAGE_SIZE', 1000), \
+                mock.patch.object(zipfile.ZipFile, 'read') as read:
+            with self.assertRaises(ArchiveValidationError):
+                self.extract({'001.png': png_bytes(), '002.png': b'\0' * 5000})
+        read.assert_not_called()
+
+    def test_total_uncompressed_size_is_limited(self):
+        with mock.patch('manga.services.translation.MAX_TOTAL_UNCOMPRESSED_SIZE', 5000):
+            with self.assertRaises(ArchiveValidationError):
+                self.extract({'001.png': png_bytes(), 'notes.txt': b'\0' * 10000})
+
+    @override_settings(ARCHIVE_EXTRACT_WORKERS=2)
+    def test_first_invalid_page_stops_the_extraction(self):
+        checked = []
+
+        def is_valid(data):
+            checked.append(data)
+            if len(checked) > 1:
+                time.sleep(0.05)
+            return len(checked) > 1
+
+        members = {f'{n:03d}.png': png_bytes() for n in range(1, 21)}
+        with mock.patch.object(TranslationService, '_is_valid_image', side_effect=is_valid):
+            with self.assertRaises(ArchiveValidationError):
+                self.extract(members)
+
+        self.assertLess(len(checked), len(members))
+        self.assertFalse((TranslationService.UPLOAD_DIR / 'job' / 'extracted').exists())
+
+    def test_create_pages_uses_the_extraction_hashes(self):
+        pages = self.extract({'001.png': png_bytes()})
+        job = TranslationJob.objects.create(user=self.user, original_filename='ch.cbz', temp_upload_path=self.path)
+
+        with mock.patch('zipfile.ZipFile') as zip_file:
+            self.assertEqual(TranslationJobRunner.create_pages(job, pages), 1)
+        zip_file.assert_not_called()
+
+        page = job.pages.get()
+        self.assertEqual((page.filename, page.input_path, page.input_hash), ('001.png', pages[0]['path'], pages[0]['sha256']))
+
+    def test_create_pages_without_extraction_reads_the_archive(self):
+        pages = self.extract({'001.png': png_bytes(), '002.png': png_bytes((5, 6))})
+        job = TranslationJob.objects.create(user=self.user, original_filename='ch.cbz', temp_upload_path=self.path)
+
+        TranslationJobRunner.create_pages(job, [])
+
+        self.assertEqual(
+            list(job.pages.order_by('page_number').values_list('input_hash', flat=True)),
+            [p['sha256'] for p in pages]
+        )
+
+
+
+
+class FallbackInpainterTests(TestCase):
+
+    @staticmethod
+    def page_with_text():
+        """White page: a text blob floating in the bubble, a border stroke touching its edge."""
+        page = np.full((100, 100, 3), 255, np.uint8)
+        page[45:55, 40:60] = 0
+        page[20:30, 0:6] = 0
+        return page
+
+    def test_floating_text_is_erased_and_edge_strokes_kept(self):
+        page = self.page_with_text()
+
+        fallback_inpainter.fallback_inpaint_array(page, np.array([[10, 10, 90, 90]]))
+
+        self.assertTrue((page[45:55, 40:60] == 255).all())
+        self.assertTrue((page[20:30, 0:6] == 0).all())
+
+    def test_threads_give_the_same_page(self):
+        boxes = np.array([[10, 10, 90, 90], [40, 40, 95, 95], [150, 10, 190, 60]])
+        serial = np.concatenate([self.page_with_text(), self.page_with_text()], axis=1)
+        threaded = serial.copy()
+
+        fallback_inpainter.fallback_inpaint_array(serial, boxes, max_workers=1)
+        fallback_inpainter.fallback_inpaint_array(threaded, boxes, max_workers=4)
+
+        np.testing.assert_array_equal(serial, threaded)
+
+    def test_overlapping_rois_share_a_group(self):
+        groups = fallback_inpainter._group_overlapping([(0, 0, 10, 10), (50, 50, 60, 60), (5, 5, 20, 20), (15, 15, 30, 30)])
+
+        self.assertEqual(sorted(groups), [[0, 2, 3], [1]])
+
+class BatchDispatcherTests(TestCase):
+
+    def dispatcher(self, batch_fn, **limits):
+        calls = []
+
+        def record(key, items):
+            calls.append((key, list(items)))
+            return batch_fn(key, items)
+
+        return BatchDispatcher(f'test-{self.id()}', record, **limits), calls
+
+    def test_concurrent_requests_share_one_batch(self):
+        dispatcher, calls = self.dispatcher(lambda key, items: [item.upper() for item in items], max_batch_size=3, max_wait_ms=1000)
+
+        futures = [dispatcher.submit(text, key=3) for text in ('a', 'b', 'c')]
+
+        self.assertEqual([future.result(timeout=5) for future in futures], ['A', 'B', 'C'])
+        self.assertEqual(calls, [(3, ['a', 'b', 'c'])])
+        self.assertEqual(dispatcher.stats()['batch_sizes'], {3: 1})
+
+    def test_keys_are_never_mixed(self):
+        dispatcher, calls = self.dispatcher(lambda key, items: items, max_batch_size=4, max_wait_ms=50)
+
+        futures = [dispatcher.submit('greedy', key=1), dispatcher.submit('beam', key=5)]
+        for future in futures:
+            future.result(timeout=5)
+
+        self.assertEqual(sorted(calls), [(1, ['greedy']), (5, ['beam'])])
+
+    def test_failed_batch_fails_every_request(self):
+        def fail(key, items):
+            raise RuntimeError('model crashed')
+
+        dispatcher, _ = self.dispatcher(fail, max_batch_size=2, max_wait_ms=1000)
+        futures = [dispatcher.submit(n) for n in (1, 2)]
+
+        for future in futures:
+            with self.assertRaisesMessage(RuntimeError, 'model crashed'):
+                future.result(timeout=5)
+
+    def test_wrong_number_of_results_is_an_error(self):
+        dispatcher, _ = self.dispatcher(lambda key, items: items[:1], max_batch_size=2, max_wait_ms=1000)
+        futures = [dispatcher.submit(n) for n in (1, 2)]
+
+        with self.assertRaises(RuntimeError):
+            futures[1].result(timeout=5)
+
+@override_settings(MODAL_CHAPTERS_URL='')
+class ChaptersUrlTests(TestCase):
+
+    def test_modal_workspace_url(self):
+        self.assertEqual(
+            ModalTranslationClient._chapters_url('https://me--mangatk-translation-translationpipeline-translate.modal.run'),
+            'https://me--mangatk-chapters.modal.run'
+        )
+
+    def test_local_endpoint_url(self):
+        self.assertEqual(
+            ModalTranslationClient._chapters_url('http://127.0.0.1:8765/translate'),
+            'http://127.0.0.1:8765/chapters'
+        )
+
+    @override_settings(MODAL_CHAPTERS_URL='http://gpu:9000/chapters/')
+    def test_explicit_url_wins(self):
+        self.assertEqual(ModalTranslationClient._chapters_url('http://127.0.0.1:8765/translate'), 'http://gpu:9000/chapters')
+
+
+class S3StorageTests(TestCase):
+
+    def storage(self, head_error_code=None):
+        from botocore.exceptions import ClientError
+
+        storage = image_storage.S3Storage.__new__(image_storage.S3Storage)
+        storage.bucket, storage.public_url = 'pages', 'http://s3/pages'
+        storage.client = mock.Mock()
+        if head_error_code:
+            storage.client.head_object.side_effect = ClientError(
+                {'Error': {'Code': head_error_code}}, 'HeadObject'
+            )
+        return storage
+
+    def test_missing_object_is_uploaded(self):
+        storage = self.storage('404')
+
+        result = storage.put('ab' * 32, png_bytes(), filename='001.png')
+
+        storage.client.put_object.assert_called_once()
+        self.assertTrue(result['url'].endswith('.png'))
+
+    def test_existing_object_is_not_uploaded(self):
+        storage = self.storage()
+        storage.put('ab' * 32, png_bytes(), filename='001.png')
+        storage.client.put_object.assert_not_called()
+
+    def test_other_errors_are_raised(self):
+        from botocore.exceptions import ClientError
+
+        storage = self.storage('AccessDenied')
+        with self.assertRaises(ClientError):
+            storage.put('ab' * 32, png_bytes(), filename='001.png')
+        storage.client.put_object.assert_not_called()
+
+
+class CompleteDirectUploadTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser('admin', 'admin@test', 'x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.job_id = 'direct-job'
+        async_upload_service.create_job(
+            self.job_id,
+            status='awaiting_upload',
+            manga_id=str(uuid.uuid4()),
+            number=1,
+            title='',
+            release_date='',
+            uploader_id=self.admin.id,
+            storage_key='uploads/ch.cbz'
+        )
+
+    @mock.patch('manga.async_chapter_upload.direct_upload')
+    def test_missing_manga_fails_the_job(self, direct_upload):
+        direct_upload.uploaded_size.return_value = 100
+
+        response = self.client.post(f'/api/chapters/direct-upload/{self.job_id}/complete/')
+
+        self.assertEqual(response.status_code, 404)
+        direct_upload.delete_upload.assert_called_once_with('uploads/ch.cbz')
+        self.assertEqual(async_upload_service.get_job_status(self.job_id)['status'], 'failed')
+        self.assertIsNone(cache.get(f'{async_upload_service.job_key(self.job_id)}:started'))
+
+
+class PipelineProfileTests(TestCase):
+
+    def test_no_profile_keeps_the_baseline_settings(self):
+        preset = profiles.get_profile()
+
+        self.assertEqual(preset['name'], profiles.BASELINE_PROFILE)
+        self.assertEqual((preset['num_beams'], preset['detection_max_side'], preset['output_format']), (5, None, 'png'))
+        self.assertEqual(profiles.resolve_output_format(), 'png')
+
+
+class StoreImageTests(TempMediaRootMixin, TestCase):
+
+    def setUp(self):
+        media_root = self.use_temp_media_root()
+        storage = override_settings(IMAGE_STORAGE_BACKEND='local', IMAGE_STORAGE_LOCAL_DIR=f'{media_root}/images')
+        storage.enable()
+        self.addCleanup(storage.disable)
+        patcher = mock.patch.object(image_storage, '_backend', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        put = image_storage.LocalStorage.put
+        patcher = mock.patch.object(image_storage.LocalStorage, 'put', autospec=True, side_effect=put)
+        self.put = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_identical_bytes_are_stored_once(self):
+        page = png_bytes()
+
+        first = image_storage.store_image(page, filename='001.png')
+        second = image_storage.store_image(page, filename='credits.png')
+
+        self.assertFalse(first['deduplicated'])
+        self.assertTrue(second['deduplicated'])
+        self.assertEqual(second['url'], first['url'])
+        self.assertEqual(self.put.call_count, 1)
+        self.assertEqual(StoredImage.objects.count(), 1)
+
+    def test_other_backends_are_not_reused(self):
+        page = png_bytes()
+        StoredImage.objects.create(
+            content_hash=image_storage.content_hash(page), backend='imgbb', url='https://i.ibb.co/x.png', size=len(page)
+        )
+
+        result = image_storage.store_image(page, filename='001.png')
+
+        self.assertFalse(result['deduplicated'])
+        self.assertTrue(result['url'].startswith('/media/images/'))
+        self.assertEqual(self.put.call_count, 1)
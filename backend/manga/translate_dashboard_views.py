@@ -9,18 +9,19 @@ from rest_framework.permissions import IsAdminUser, AllowAny
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.response import Response
 from rest_framework import status
-from django.utils import timezone
-from django.conf import settings
 
-from .models import TranslationJob, Manga, Chapter, ChapterImage
+from .models import TranslationJob, Manga, Chapter
 from .serializers import TranslationJobSerializer
-from .services.translation import TranslationService
-from .services.custom_translator import CustomTranslator
-from .services.imgbb import ImgBBService
+from .services.translation import ArchiveValidationError, TranslationService
+from .services.archive_staging import resolve_upload
+from .services.translation_jobs import TranslationJobRunner
+from .services.translation_scheduler import TranslationScheduler
+from . import tasks
+from .services.ai.profiles import PIPELINE_PROFILES, OUTPUT_FORMATS, SOURCE_LANGUAGES, BASELINE_PROFILE
+from .services.ai.prescan import try_prescan
 
 import os
 import logging
-from pathlib import Path
 from typing import List, Dict
 
 logger = logging.getLogger(__name__)
@@ -36,9 +37,11 @@ def upload_for_preview(request):
     POST /api/translation/upload-for-preview/
     
     Request:
-        - file: ملف ZIP/CBZ
+        - file: ملف ZIP/CBZ (أو upload_id لجلسة رفع مكتملة، أو staging_id لملف تم تحليله)
         - source_language: لغة المصدر (chinese, japanese, korean, english)
         - target_language: لغة الهدف (arabic)
+        - profile: إعداد السرعة/الجودة (fast, balanced, best) - اختياري
+        - output_format: صيغة الصفحات المترجمة (png, webp, avif, jpeg) - اختياري
         
     Response:
         - job_id: معرف العملية
@@ -48,7 +51,8 @@ def upload_for_preview(request):
         - status: حالة الترجمة
     """
     
-    file = request.FILES.get('file')
+    # Multipart file, finalized resumable upload (upload_id) or staged archive (staging_id)
+    file = resolve_upload(request)
     source_language = request.data.get('source_language', '')
     target_language = request.data.get('target_language', 'arabic')  # دائمًا عربي
     
@@ -63,16 +67,33 @@ def upload_for_preview(request):
             'error': 'يجب اختيار لغة المصدر'
         }, status=status.HTTP_400_BAD_REQUEST)
     
-    valid_languages = ['chinese', 'japanese', 'korean', 'english']
-    if source_language not in valid_languages:
+    if source_language not in SOURCE_LANGUAGES:
         return Response({
-            'error': f'لغة غير مدعومة. اللغات المتاحة: {", ".join(valid_languages)}'
+            'error': f'لغة غير مدعومة. اللغات المتاحة: {", ".join(SOURCE_LANGUAGES)}'
         }, status=status.HTTP_400_BAD_REQUEST)
     
-    logger.info(f"Admin translation request: {source_language} -> {target_language}")
+    profile = request.data.get('profile') or BASELINE_PROFILE
+    if profile not in PIPELINE_PROFILES:
+        return Response({
+            'error': f'إعداد غير معروف. الإعدادات المتاحة: {", ".join(PIPELINE_PROFILES)}'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    output_format = request.data.get('output_format', '')
+    if output_format and output_format not in OUTPUT_FORMATS:
+        return Response({
+            'error': f'صيغة غير مدعومة. الصيغ المتاحة: {", ".join(OUTPUT_FORMATS)}'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    logger.info(f"Admin translation request: {source_language} -> {target_language} (profile: {profile})")
     
     # Validate file
-    is_valid, error_msg = TranslationService.validate_archive(file)
+    staged = getattr(file, 'staged', None)
+    if staged:
+        # Analyzed when it was staged; not read again
+        is_valid, error_msg = TranslationService.validate_staged(staged)
+    else:
+        # Contents are checked while extracting (validate_and_extract)
+        is_valid, error_msg = TranslationService.check_upload(file.name, file.size)
     if not is_valid:
         return Response({
             'error': error_msg
@@ -82,7 +103,10 @@ def upload_for_preview(request):
     job = TranslationJob.objects.create(
         user=request.user,
         original_filename=file.name,
-        status='uploading'
+        status='uploading',
+        profile=profile,
+        output_format=output_format,
+        source_language=source_language
     )
     
     try:
@@ -91,101 +115,58 @@ def upload_for_preview(request):
         job.status = 'extracting'
         job.save()
         
-        # 2. Extract original images
-        extracted_images = TranslationService.extract_archive(job.temp_upload_path, job.id)
-        job.total_pages = len(extracted_images)
-        job.status = 'translating'
+        # 2. Validate and extract original images in one pass
+        try:
+            pages = TranslationService.validate_and_extract(
+                job.temp_upload_path, job.id, verify=not staged
+            )
+        except ArchiveValidationError as e:
+            TranslationService.cleanup_job(job.id)
+            job.delete()
+            return Response({
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        job.total_pages = len(pages)
         job.save()
         
-        # 3. Start async translation
-        logger.info(f"Translating {len(extracted_images)} images for job {job.id} asynchronously")
+        # Pre-scan: text-free pages are copied through untouched
+        prescan = staged.get('prescan') if staged else None
+        if prescan is None:
+            prescan = try_prescan(job.temp_upload_path)
+        if prescan:
+            job.prescan = prescan
+            job.save(update_fields=['prescan'])
         
-        # Create output directory for translated images
-        translation_output_dir = Path(settings.MEDIA_ROOT) / 'translations' / 'temp' / str(job.id) / 'translated'
-        translation_output_dir.mkdir(parents=True, exist_ok=True)
+        # 3. Start async translation
+        logger.info(f"Translating {len(pages)} images for job {job.id} asynchronously")
         
         # Store original images paths first
         original_images_data = []
-        for idx, img_path in enumerate(extracted_images, 1):
+        for page in pages:
             original_images_data.append({
-                'page_number': idx,
-                'local_path': str(img_path),
-                'filename': os.path.basename(img_path)
+                'page_number': page['page_number'],
+                'local_path': page['path'],
+                'filename': page['filename']
             })
         
         job.original_images_paths = original_images_data
-        job.status = 'translating'
+        job.source = 'dashboard'
         job.save()
-
-        def on_progress(current, total):
-            """Callback for real-time translation progress tracking"""
-            job.translated_pages = current
-            job.total_pages = total
-            job.save(update_fields=['translated_pages', 'total_pages'])
-
-        def on_complete(translated_paths):
-            logger.info(f"Translation completed for job {job.id}")
-            translated_images_data = []
-            for idx, img_path in enumerate(translated_paths, 1):
-                translated_images_data.append({
-                    'page_number': idx,
-                    'local_path': str(img_path),
-                    'filename': os.path.basename(img_path)
-                })
-            
-            job.translation_results = translated_images_data
-            job.translated_pages = len(translated_paths)
-            job.status = 'completed'
-            job.completed_at = timezone.now()
-            
-            # Create CBZ file for admin
-            try:
-                from .services.cbz_service import CBZService
-                cbz_output_dir = Path(settings.MEDIA_ROOT) / 'translated_cbz'
-                cbz_path = CBZService.create_cbz_from_local_files(
-                    translated_paths,
-                    cbz_output_dir,
-                    str(job.id)
-                )
-                job.output_file_path = cbz_path
-            except Exception as e:
-                logger.error(f"Failed to create Admin CBZ for job {job.id}: {e}")
-                
-            job.save()
-            
-            # Send notification to Admin
-            try:
-                from .models import Notification
-                Notification.objects.create(
-                    user=job.user,
-                    title="اكتملت الترجمة (لوحة التحكم)",
-                    message="تم الانتهاء من ترجمة الفصل بنجاح. يمكنك مراجعته ونشره للعامة أو تحميله الآن.",
-                    link=f"/dashboard/translate?job_id={job.id}",
-                    notification_type='translation'
-                )
-            except Exception as ne:
-                logger.error(f"Failed to create admin notification: {ne}")
-
-        def on_error(error_msg):
-            logger.error(f"Translation error: {error_msg}")
-            job.status = 'failed'
-            job.error_message = error_msg
-            job.save()
-
-        CustomTranslator.translate_chapter_async(
-            job.temp_upload_path,
-            str(translation_output_dir),
-            on_progress=on_progress,
-            on_complete=on_complete,
-            on_error=on_error
-        )
+        
+        # One TranslationPage row per page; progress, resume and retry work per page
+        TranslationJobRunner.create_pages(job, pages)
+        queue = TranslationScheduler.enqueue(job)
         
         # Return immediately for frontend polling
         return Response({
             'job_id': str(job.id),
             'status': job.status,
+            'queue_position': queue['position'],
+            'eta_seconds': queue['eta_seconds'],
             'total_pages': job.total_pages,
             'translated_pages': 0,
+            'profile': profile,
+            'text_pages': prescan['text_pages'] if prescan else job.total_pages,
             'message': 'بدأت عملية الترجمة... الرجاء الانتظار',
         }, status=status.HTTP_202_ACCEPTED)
         
@@ -215,6 +196,8 @@ def check_translation_status(request, job_id):
             'status': job.status,
             'total_pages': job.total_pages,
             'translated_pages': job.translated_pages or 0,
+            'failed_pages': list(job.pages.filter(status='failed').values_list('page_number', flat=True)),
+            **TranslationScheduler.status_payload(job),
             'error_message': job.error_message
         })
     except TranslationJob.DoesNotExist:
@@ -425,9 +408,7 @@ def publish_translated_chapter(request):
         
         logger.info(f"Starting background upload for chapter {chapter_number} of manga {manga.title}")
         
-        # Get images data before thread
-        translated_images_data = job.translation_results
-        total_images = len(translated_images_data)
+        total_images = len(job.translation_results)
         
         # Update job status
         job.status = 'publishing'
@@ -435,80 +416,8 @@ def publish_translated_chapter(request):
         job.total_pages = total_images
         job.save()
         
-        # Define background upload function
-        def upload_in_background():
-            """Upload images to ImgBB in background thread"""
-            import threading
-            from django.db import connection
-            
-            # Close old database connection (thread-safe)
-            connection.close()
-            
-            uploaded_count = 0
-            failed_count = 0
-            
-            try:
-                for img_data in translated_images_data:
-                    try:
-                        page_number = img_data['page_number']
-                        local_path = img_data['local_path']
-                        
-                        # Upload to imgbb
-                        imgbb_name = f"{manga.title}_ch{int(float(chapter_number)):03d}_p{page_number:03d}"
-                        result = ImgBBService.upload_image(local_path, imgbb_name)
-                        
-                        if result:
-                            # Create ChapterImage record
-                            ChapterImage.objects.create(
-                                chapter=chapter,
-                                page_number=page_number,
-                                image_url=result['url'],
-                                width=result.get('width'),
-                                height=result.get('height'),
-                                original_filename=img_data['filename']
-                            )
-                            uploaded_count += 1
-                            
-                            # Update progress - THIS IS NOW VISIBLE!
-                            job.translated_pages = uploaded_count
-                            job.save(update_fields=['translated_pages'])
-                            
-                            logger.info(f"Uploaded page {page_number} to imgbb ({uploaded_count}/{total_images})")
-                        else:
-                            failed_count += 1
-                            logger.error(f"Failed to upload page {page_number} to imgbb")
-                            
-                    except Exception as e:
-                        failed_count += 1
-                        logger.error(f"Error uploading page {img_data.get('page_number', '?')}: {e}")
-                
-                # Clean up temporary directory
-                TranslationService.cleanup_job(str(job.id))
-                
-                # Mark as completed
-                job.status = 'published'
-                job.error_message = ''
-                if failed_count > 0:
-                    job.error_message = f'فشل رفع {failed_count} من {total_images} صورة'
-                job.save()
-                
-                logger.info(f"Background upload completed: {uploaded_count} uploaded, {failed_count} failed")
-                
-            except Exception as e:
-                # Mark as failed
-                job.status = 'failed'
-                job.error_message = str(e)
-                job.save()
-                logger.error(f"Background upload failed: {e}")
-            finally:
-                # Close database connection
-                connection.close()
-        
-        # Start background thread
-        import threading
-        upload_thread = threading.Thread(target=upload_in_background)
-        upload_thread.daemon = True
-        upload_thread.start()
+        # Pages are uploaded by the publishing worker (manga.tasks)
+        tasks.publish_translated_chapter.delay(str(job.id), str(chapter.id))
         
         # Return immediately with 202 Accepted
         return Response({
@@ -3,29 +3,88 @@ Translation API Endpoints
 =========================
 
 REST API endpoints for manga chapter translation workflow
+
+Jobs are TranslationJob rows and run through TranslationScheduler, so the
+endpoints are stateless: any worker can serve any job, and start returns
+as soon as the job is queued.
 """
 
 import os
-import uuid
+import shutil
 import zipfile
 from django.http import FileResponse, JsonResponse
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
+from django.core.exceptions import ValidationError
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
 from rest_framework import status
 from django.core.files.storage import default_storage
-from django.conf import settings
 
-from .models import Manga, Chapter, Notification
+from .models import Manga, Chapter, TranslationJob
 from .translation_service import TranslationService
+from .services.translation import TranslationService as TranslationFileService
+from .services.translation_jobs import TranslationJobRunner
+from .services.translation_scheduler import TranslationScheduler
+from .services.archive_ingest import chapter_image_members
 import logging
 
 logger = logging.getLogger(__name__)
 
-# Store translation jobs in memory (for production, use Redis or database)
-TRANSLATION_JOBS = {}
+# TranslationJob status → progress reported before any page is done
+STATUS_PROGRESS = {
+    'uploaded': 0,
+    'queued': 5,
+    'translating': 10,
+    'creating_cbz': 95,
+    'completed': 100,
+    'failed': 0,
+}
+
+
+def _get_job(job_id):
+    """TranslationJob of this flow, or None (also for malformed ids)."""
+    try:
+        return TranslationJob.objects.select_related('manga').get(id=job_id, manga__isnull=False)
+    except (TranslationJob.DoesNotExist, ValidationError, ValueError):
+        return None
+
+
+def _job_not_found():
+    return Response({
+        'error': 'Job not found'
+    }, status=status.HTTP_404_NOT_FOUND)
+
+
+def _progress(job):
+    if job.status == 'translating' and job.total_pages:
+        return 10 + int(85 * job.translated_pages / job.total_pages)
+    return STATUS_PROGRESS.get(job.status, 0)
+
+
+def _status_message(job):
+    if job.status == 'uploaded':
+        return 'تم رفع الملف بنجاح'
+    if job.status == 'queued':
+        return 'في قائمة الانتظار...'
+    if job.status in ('translating', 'creating_cbz'):
+        return 'جاري الترجمة...'
+    if job.status == 'completed':
+        return f"تمت الترجمة بنجاح - {job.translated_pages} صورة"
+    return f'فشلت الترجمة: {job.error_message}'
+
+
+def _translation_info(job):
+    if job.status != 'completed':
+        return None
+    failed = job.pages.filter(status='failed').count()
+    return {
+        'total_images': job.total_pages,
+        'translated_images': job.translated_pages,
+        'failed_images': failed,
+        'output_path': job.output_file_path,
+    }
 
 
 @api_view(['POST'])
@@ -78,42 +137,36 @@ def upload_for_translation(request):
                 'error': 'الملف يجب أن يكون ZIP أو CBZ'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Create job ID
-        job_id = str(uuid.uuid4())
+        # Create job
+        job = TranslationJob.objects.create(
+            user=request.user,
+            original_filename=uploaded_file.name,
+            status='uploading',
+            source='dashboard',
+            manga=manga,
+            chapter_number=float(chapter_number)
+        )
+        job_id = str(job.id)
         
         # Save uploaded file temporarily
-        temp_dir = os.path.join(settings.MEDIA_ROOT, 'temp_translations')
-        os.makedirs(temp_dir, exist_ok=True)
-        
-        original_filename = f"{job_id}_original.zip"
-        original_path = os.path.join(temp_dir, original_filename)
-        
-        with open(original_path, 'wb+') as destination:
-            for chunk in uploaded_file.chunks():
-                destination.write(chunk)
+        original_path = TranslationFileService.save_uploaded_file(uploaded_file, job.id)
         
         # Validate ZIP
         is_valid, message = TranslationService.validate_zip(original_path)
         if not is_valid:
-            os.remove(original_path)
+            TranslationFileService.cleanup_job(job.id)
+            job.delete()
             return Response({
                 'error': f'ملف غير صحيح: {message}'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Store job info
-        TRANSLATION_JOBS[job_id] = {
-            'status': 'uploaded',
-            'manga_id': manga_id,
-            'manga_title': manga.title,
-            'chapter_number': float(chapter_number),
-            'original_path': original_path,
-            'translated_path': None,
-            'progress': 0,
-            'message': 'تم رفع الملف بنجاح',
-            'error': None,
-            'admin_id': request.user.id,
-            'created_at': str(uuid.uuid1().time)
-        }
+        with zipfile.ZipFile(original_path, 'r') as zf:
+            total_pages = len(chapter_image_members(zf))
+        
+        job.temp_upload_path = original_path
+        job.total_pages = total_pages
+        job.status = 'uploaded'
+        job.save(update_fields=['temp_upload_path', 'total_pages', 'status', 'updated_at'])
         
         logger.info(f"Translation job {job_id} created for manga {manga.title}")
         
@@ -145,69 +198,28 @@ def start_translation(request, job_id):
         - message: رسالة
     """
     try:
-        if job_id not in TRANSLATION_JOBS:
-            return Response({
-                'error': 'Job not found'
-            }, status=status.HTTP_404_NOT_FOUND)
+        job = _get_job(job_id)
+        if job is None:
+            return _job_not_found()
         
-        job = TRANSLATION_JOBS[job_id]
-        
-        if job['status'] != 'uploaded':
+        # Conditional update so a double click cannot queue the job twice
+        if not TranslationJob.objects.filter(pk=job.pk, status='uploaded').update(status='queued'):
+            job.refresh_from_db(fields=['status'])
             return Response({
-                'error': f"Cannot start translation. Current status: {job['status']}"
+                'error': f"Cannot start translation. Current status: {job.status}"
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Update status
-        job['status'] = 'translating'
-        job['progress'] = 10
-        job['message'] = 'جاري الترجمة...'
+        # Pages are translated in the background; poll translation_status
+        queue = TranslationScheduler.enqueue(job)
+        logger.info(f"Translation job {job_id} queued (position: {queue['position']})")
         
-        # Start translation in background (for production, use Celery)
-        # For now, we'll do it synchronously
-        try:
-            temp_dir = os.path.dirname(job['original_path'])
-            translated_path, info = TranslationService.translate_chapter(
-                job['original_path'],
-                output_dir=temp_dir
-            )
-            
-            # Update job
-            job['status'] = 'completed'
-            job['progress'] = 100
-            job['translated_path'] = translated_path
-            job['message'] = f"تمت الترجمة بنجاح - {info['total_images']} صورة"
-            job['translation_info'] = info
-            
-            logger.info(f"Translation job {job_id} completed successfully")
-            
-            # Notify Admin
-            from django.contrib.auth import get_user_model
-            try:
-                Notification.objects.create(
-                    user=request.user,
-                    title="اكتملت الترجمة",
-                    message=f"تم الانتهاء من ترجمة الفصل بنجاح.",
-                    link="/dashboard/translate",
-                    notification_type='translation'
-                )
-            except Exception as e:
-                logger.error(f"Failed to create admin notification: {e}")
-                
-            return Response({
-                'status': 'completed',
-                'message': job['message'],
-                'info': info
-            })
-            
-        except Exception as e:
-            job['status'] = 'failed'
-            job['error'] = str(e)
-            job['message'] = f'فشلت الترجمة: {str(e)}'
-            logger.error(f"Translation job {job_id} failed: {str(e)}")
-            
-            return Response({
-                'error': job['message']
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return Response({
+            'status': job.status,
+            'progress': _progress(job),
+            'message': _status_message(job),
+            'queue_position': queue['position'],
+            'eta_seconds': queue['eta_seconds'],
+        }, status=status.HTTP_202_ACCEPTED)
         
     except Exception as e:
         logger.error(f"Start translation failed: {str(e)}")
@@ -229,22 +241,22 @@ def translation_status(request, job_id):
         - progress: 0-100
         - message: رسالة حالة
     """
-    if job_id not in TRANSLATION_JOBS:
-        return Response({
-            'error': 'Job not found'
-        }, status=status.HTTP_404_NOT_FOUND)
-    
-    job = TRANSLATION_JOBS[job_id]
+    job = _get_job(job_id)
+    if job is None:
+        return _job_not_found()
     
     return Response({
-        'job_id': job_id,
-        'status': job['status'],
-        'progress': job['progress'],
-        'message': job['message'],
-        'error': job.get('error'),
-        'manga_title': job['manga_title'],
-        'chapter_number': job['chapter_number'],
-        'translation_info': job.get('translation_info')
+        'job_id': str(job.id),
+        'status': job.status,
+        'progress': _progress(job),
+        'message': _status_message(job),
+        'error': job.error_message or None,
+        'total_pages': job.total_pages,
+        'translated_pages': job.translated_pages,
+        **TranslationScheduler.status_payload(job),
+        'manga_title': job.manga.title,
+        'chapter_number': job.chapter_number,
+        'translation_info': _translation_info(job)
     })
 
 
@@ -259,27 +271,24 @@ def download_translated(request, job_id):
     Returns:
         FileResponse with translated ZIP
     """
-    if job_id not in TRANSLATION_JOBS:
-        return Response({
-            'error': 'Job not found'
-        }, status=status.HTTP_404_NOT_FOUND)
-    
-    job = TRANSLATION_JOBS[job_id]
+    job = _get_job(job_id)
+    if job is None:
+        return _job_not_found()
     
-    if job['status'] != 'completed':
+    if job.status != 'completed':
         return Response({
-            'error': f"Translation not completed. Status: {job['status']}"
+            'error': f"Translation not completed. Status: {job.status}"
         }, status=status.HTTP_400_BAD_REQUEST)
     
-    if not job['translated_path'] or not os.path.exists(job['translated_path']):
+    if not job.output_file_path or not os.path.exists(job.output_file_path):
         return Response({
             'error': 'Translated file not found'
         }, status=status.HTTP_404_NOT_FOUND)
     
     # Return file
-    filename = f"translated_ch{job['chapter_number']}.zip"
+    filename = f"translated_ch{job.chapter_number}.zip"
     response = FileResponse(
-        open(job['translated_path'], 'rb'),
+        open(job.output_file_path, 'rb'),
         content_type='application/zip'
     )
     response['Content-Disposition'] = f'attachment; filename="{filename}"'
@@ -299,15 +308,13 @@ def get_images_preview(request, job_id):
         - images: قائمة بأسماء الصور
         - total: عدد الصور
     """
-    if job_id not in TRANSLATION_JOBS:
-        return Response({
-            'error': 'Job not found'
-        }, status=status.HTTP_404_NOT_FOUND)
+    job = _get_job(job_id)
+    if job is None:
+        return _job_not_found()
     
-    job = TRANSLATION_JOBS[job_id]
     img_type = request.query_params.get('type', 'original')
     
-    zip_path = job['original_path'] if img_type == 'original' else job.get('translated_path')
+    zip_path = job.temp_upload_path if img_type == 'original' else job.output_file_path
     
     if not zip_path or not os.path.exists(zip_path):
         return Response({
@@ -316,13 +323,7 @@ def get_images_preview(request, job_id):
     
     try:
         with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            image_extensions = ('.jpg', '.jpeg', '.png', '.webp', '.gif')
-            images = [
-                f for f in zip_ref.namelist()
-                if f.lower().endswith(image_extensions)
-                and not f.startswith('__MACOSX')
-            ]
-            images.sort()
+            images = chapter_image_members(zip_ref)
             
             return Response({
                 'images': images,
@@ -352,26 +353,23 @@ def save_translated_chapter(request, job_id):
         - chapter_id: UUID للفصل المحفوظ
         - message: رسالة النجاح
     """
-    if job_id not in TRANSLATION_JOBS:
-        return Response({
-            'error': 'Job not found'
-        }, status=status.HTTP_404_NOT_FOUND)
+    job = _get_job(job_id)
+    if job is None:
+        return _job_not_found()
     
-    job = TRANSLATION_JOBS[job_id]
-    
-    if job['status'] != 'completed':
+    if job.status != 'completed':
         return Response({
             'error': 'Translation not completed yet'
         }, status=status.HTTP_400_BAD_REQUEST)
     
     try:
         # Use the existing chapter upload logic
-        manga = Manga.objects.get(id=job['manga_id'])
+        manga = job.manga
         chapter_title = request.data.get('chapter_title', '')
         release_date = request.data.get('release_date', None)
         
         # Create FormData-like object for upload
-        with open(job['translated_path'], 'rb') as f:
+        with open(job.output_file_path, 'rb') as f:
             from django.core.files.uploadedfile import InMemoryUploadedFile
             from io import BytesIO
             
@@ -379,7 +377,7 @@ def save_translated_chapter(request, job_id):
             file_obj = InMemoryUploadedFile(
                 BytesIO(file_content),
                 'file',
-                os.path.basename(job['translated_path']),
+                os.path.basename(job.output_file_path),
                 'application/zip',
                 len(file_content),
                 None
@@ -393,9 +391,9 @@ def save_translated_chapter(request, job_id):
             # Simulate request data
             class FakeRequest:
                 data = {
-                    'manga': job['manga_id'],
-                    'number': str(job['chapter_number']),
-                    'title': chapter_title or f"{manga.title} - الفصل {job['chapter_number']} (مترجم)",
+                    'manga': str(manga.id),
+                    'number': str(job.chapter_number),
+                    'title': chapter_title or f"{manga.title} - الفصل {job.chapter_number} (مترجم)",
                     'release_date': release_date or ''
                 }
                 FILES = {'file': file_obj}
@@ -407,7 +405,7 @@ def save_translated_chapter(request, job_id):
             
             if response.status_code == 200:
                 # Cleanup
-                _cleanup_translation_job(job_id)
+                _cleanup_translation_job(job)
                 
                 return Response({
                     'chapter_id': response.data.get('chapter_id'),
@@ -432,31 +430,31 @@ def delete_translation_job(request, job_id):
     
     DELETE /api/translation/delete/<job_id>/
     """
-    if job_id not in TRANSLATION_JOBS:
+    job = _get_job(job_id)
+    if job is None:
+        return _job_not_found()
+    
+    if job.status in ('queued', 'translating', 'creating_cbz'):
         return Response({
-            'error': 'Job not found'
-        }, status=status.HTTP_404_NOT_FOUND)
+            'error': f"Cannot delete a running job. Status: {job.status}"
+        }, status=status.HTTP_409_CONFLICT)
     
-    _cleanup_translation_job(job_id)
+    _cleanup_translation_job(job)
     
     return Response({
         'message': 'تم حذف العملية بنجاح'
     })
 
 
-def _cleanup_translation_job(job_id):
+def _cleanup_translation_job(job):
     """تنظيف ملفات عملية الترجمة"""
-    if job_id in TRANSLATION_JOBS:
-        job = TRANSLATION_JOBS[job_id]
-        
-        # Delete files
-        if job.get('original_path') and os.path.exists(job['original_path']):
-            os.remove(job['original_path'])
-        
-        if job.get('translated_path') and os.path.exists(job['translated_path']):
-            os.remove(job['translated_path'])
-        
-        # Remove from dict
-        del TRANSLATION_JOBS[job_id]
-        
-        logger.info(f"Cleaned up translation job {job_id}")
+    # Uploaded archive, translated pages and the result CBZ
+    TranslationFileService.cleanup_job(job.id)
+    shutil.rmtree(TranslationJobRunner.output_dir(job).parent, ignore_errors=True)
+    if job.output_file_path and os.path.exists(job.output_file_path):
+        os.remove(job.output_file_path)
+    
+    job_id = job.id
+    job.delete()
+    
+    logger.info(f"Cleaned up translation job {job_id}")
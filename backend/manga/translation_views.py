@@ -7,14 +7,16 @@ from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.response import Response
 from rest_framework import status
-from django.utils import timezone
-from .models import AITranslationModel, TranslationJob, Manga, Chapter, ChapterImage
+from .models import AITranslationModel, TranslationJob
 from .serializers import AITranslationModelSerializer, TranslationJobSerializer
-from .services.translation import TranslationService
+from .services.translation import ArchiveValidationError, TranslationService
+from .services.translation_jobs import TranslationJobRunner
+from .services.translation_scheduler import TranslationScheduler
 from .services.ai_translator import AITranslator
-from .services.imgbb import ImgBBService
-import base64
 import os
+import logging
+
+logger = logging.getLogger(__name__)
 
 # ==================== AI MODEL MANAGEMENT ====================
 
@@ -89,6 +91,10 @@ def upload_chapter_for_translation(request):
     """
     Upload ZIP/CBZ file for translation
     Returns job_id to track progress and download result
+    
+    The job is queued on TranslationScheduler like the other translation
+    APIs and translated by the translation worker; poll
+    /api/translation/jobs/<job_id>/ for progress.
     """
     file = request.FILES.get('file')
     ai_model_id = request.data.get('ai_model_id')
@@ -96,8 +102,8 @@ def upload_chapter_for_translation(request):
     if not file:
         return Response({'error': 'لم يتم تحديد ملف'}, status=status.HTTP_400_BAD_REQUEST)
     
-    # Validate file
-    is_valid, error_msg = TranslationService.validate_archive(file)
+    # Validate file (contents are checked while extracting)
+    is_valid, error_msg = TranslationService.check_upload(file.name, file.size)
     if not is_valid:
         return Response({'error': error_msg}, status=status.HTTP_400_BAD_REQUEST)
     
@@ -120,7 +126,8 @@ def upload_chapter_for_translation(request):
         user=request.user,
         ai_model=ai_model,
         original_filename=file.name,
-        status='uploading'
+        status='uploading',
+        source='dashboard'
     )
     
     try:
@@ -129,91 +136,34 @@ def upload_chapter_for_translation(request):
         job.status = 'extracting'
         job.save()
         
-        # Extract images
-        extracted_images = TranslationService.extract_archive(job.temp_upload_path, job.id)
-        job.total_pages = len(extracted_images)
-        job.temp_extracted_path = str(extracted_images[0]) if extracted_images else ''
-        job.status = 'translating'
-        job.save()
-        
-        # Start translation
-        translation_results = []
-        
-        for idx, image_path in enumerate(extracted_images):
-            try:
-                # Translate image using AI
-                translated_image_b64 = AITranslator.translate_image(image_path, ai_model)
-                
-                # Decode base64 and save temporarily
-                import tempfile
-                translated_bytes = base64.b64decode(translated_image_b64)
-                temp_translated = tempfile.NamedTemporaryFile(delete=False, suffix='.png')
-                temp_translated.write(translated_bytes)
-                temp_translated.close()
-                
-                # Upload to ImgBB
-                imgbb_result = ImgBBService.upload_image(temp_translated.name, f"translated_{job.id}_page_{idx+1}")
-                
-                # Cleanup temp file
-                os.unlink(temp_translated.name)
-                
-                if imgbb_result:
-                    translation_results.append({
-                        'page_number': idx + 1,
-                        'original_path': image_path,
-                        'translated_url': imgbb_result['url']
-                    })
-                    
-                    job.translated_pages = idx + 1
-                    job.save()
-                
-            except Exception as e:
-                print(f"Error translating page {idx + 1}: {str(e)}")
-                job.error_message += f"\nPage {idx + 1}: {str(e)}"
-                job.save()
-                continue
-        
-        job.translation_results = translation_results
-        
-        if not translation_results:
-            job.status = 'failed'
-            job.save()
-            return Response({
-                'job_id': str(job.id),
-                'status': 'failed',
-                'message': 'فشلت جميع عمليات الترجمة'
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        # Validate and extract images in one pass
+        try:
+            pages = TranslationService.validate_and_extract(job.temp_upload_path, job.id)
+        except ArchiveValidationError as e:
+            TranslationService.cleanup_job(job.id)
+            job.delete()
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Create CBZ file
-        job.status = 'creating_cbz'
+        job.total_pages = len(pages)
+        job.temp_extracted_path = pages[0]['path'] if pages else ''
         job.save()
         
-        from .services.cbz_service import CBZService
-        from pathlib import Path
-        from django.conf import settings
-        
-        output_dir = Path(settings.MEDIA_ROOT) / 'translated_cbz'
-        output_path = CBZService.create_cbz_from_urls(
-            translation_results,
-            output_dir,
-            job.id
-        )
-        
-        job.output_file_path = output_path
-        job.status = 'completed'
-        job.completed_at = timezone.now()
-        job.save()
+        # Queued behind the global and per-user translation slots
+        TranslationJobRunner.create_pages(job, pages)
+        queue = TranslationScheduler.enqueue(job)
         
         return Response({
             'job_id': str(job.id),
             'status': job.status,
+            'queue_position': queue['position'],
+            'eta_seconds': queue['eta_seconds'],
             'total_pages': job.total_pages,
-            'translated_pages': job.translated_pages,
-            'message': 'تمت الترجمة بنجاح! يمكنك الآن تنزيل الملف',
+            'message': 'بدأت عملية الترجمة... الرجاء الانتظار',
             'download_url': f'/api/translation/jobs/{job.id}/download/'
-        })
+        }, status=status.HTTP_202_ACCEPTED)
         
     except Exception as e:
+        logger.error(f"Error starting translation job {job.id}: {e}")
         job.status = 'failed'
         job.error_message = str(e)
         job.save()
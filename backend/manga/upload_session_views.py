@@ -0,0 +1,137 @@
+"""
+Upload Session Views
+====================
+Resumable chunked uploads (services.resumable_upload). A finalized session
+is sent to /api/chapters/upload-async/, /api/translate/upload/ or
+/api/translation/upload-for-preview/ as `upload_id` instead of `file`.
+"""
+
+import re
+import logging
+
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework import status
+
+from .services import resumable_upload
+from .services.resumable_upload import UploadSessionError
+
+logger = logging.getLogger(__name__)
+
+CONTENT_RANGE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+
+def _session_data(session):
+    return {
+        'upload_id': session['id'],
+        'filename': session['filename'],
+        'size': session['size'],
+        'offset': session['offset'],
+        'status': session['status'],
+        'chunk_size': resumable_upload.max_chunk_size(),
+    }
+
+
+def _error_response(error: UploadSessionError):
+    data = {'error': str(error)}
+    if error.offset is not None:
+        data['offset'] = error.offset
+    return Response(data, status=error.status)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def create_upload_session(request):
+    """
+    بدء جلسة رفع قابلة للاستئناف
+
+    POST /api/uploads/
+
+    Body:
+        - filename: اسم ملف ZIP/CBZ
+        - size: حجم الملف بالبايت
+        - sha256: بصمة الملف كاملاً (اختياري، يتم التحقق منها عند الإنهاء)
+    """
+    try:
+        size = int(request.data.get('size', 0))
+    except (TypeError, ValueError):
+        size = 0
+
+    try:
+        session = resumable_upload.create_session(
+            request.user.id,
+            request.data.get('filename', ''),
+            size,
+            request.data.get('sha256', '')
+        )
+    except UploadSessionError as e:
+        return _error_response(e)
+
+    return Response(_session_data(session), status=status.HTTP_201_CREATED)
+
+
+@api_view(['GET', 'PUT', 'DELETE'])
+@permission_classes([IsAuthenticated])
+def upload_session(request, upload_id):
+    """
+    GET    /api/uploads/<upload_id>/  - الموضع الذي وصل إليه الرفع
+    PUT    /api/uploads/<upload_id>/  - رفع جزء (Content-Range: bytes start-end/size)
+    DELETE /api/uploads/<upload_id>/  - إلغاء الرفع
+    """
+    session = resumable_upload.get_session(upload_id, request.user.id)
+    if not session:
+        return Response({
+            'error': 'جلسة الرفع غير موجودة أو انتهت صلاحيتها'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    if request.method == 'GET':
+        return Response(_session_data(session))
+
+    if request.method == 'DELETE':
+        resumable_upload.abort_session(session)
+        return Response({'message': 'تم إلغاء الرفع'})
+
+    match = CONTENT_RANGE.match(request.headers.get('Content-Range', ''))
+    if not match:
+        return Response({
+            'error': 'Content-Range مطلوب بالصيغة bytes start-end/size',
+            'offset': session['offset']
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    start, end, total = (int(g) for g in match.groups())
+    try:
+        # The raw body is streamed to disk; request.data is never parsed
+        session = resumable_upload.write_chunk(
+            session, start, end, total, request._request,
+            checksum=request.headers.get('X-Chunk-SHA256', '')
+        )
+    except UploadSessionError as e:
+        return _error_response(e)
+
+    return Response(_session_data(session))
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def finalize_upload_session(request, upload_id):
+    """
+    إنهاء جلسة الرفع والتحقق من الملف كاملاً
+
+    POST /api/uploads/<upload_id>/finalize/
+    """
+    session = resumable_upload.get_session(upload_id, request.user.id)
+    if not session:
+        return Response({
+            'error': 'جلسة الرفع غير موجودة أو انتهت صلاحيتها'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    try:
+        session = resumable_upload.finalize_session(session)
+    except UploadSessionError as e:
+        return _error_response(e)
+
+    logger.info(f"Upload session {upload_id} finalized ({session['size']} bytes)")
+    data = _session_data(session)
+    data['sha256'] = session['sha256']
+    return Response(data)
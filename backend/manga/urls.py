@@ -10,6 +10,7 @@ from . import user_translation_views
 from . import zip_analysis
 from . import subscription_views
 from . import imgbb_tracking_views
+from . import upload_session_views
 from .views import register_fcm_token
 
 
@@ -34,11 +35,18 @@ app_name = 'manga'
 urlpatterns = [
     # Async Chapter Upload endpoints (must be BEFORE router.urls to avoid conflicts)
     path('chapters/upload-async/', async_chapter_upload.start_async_chapter_upload, name='chapter-upload-async'),
+    path('chapters/direct-upload/', async_chapter_upload.request_direct_upload, name='chapter-direct-upload'),
+    path('chapters/direct-upload/<str:job_id>/complete/', async_chapter_upload.complete_direct_upload, name='chapter-direct-upload-complete'),
     path('chapters/upload-progress/<str:job_id>/', async_chapter_upload.get_upload_progress, name='chapter-upload-progress'),
     path('chapters/cancel-upload/<str:job_id>/', async_chapter_upload.cancel_upload, name='chapter-cancel-upload'),
     path('chapters/<uuid:chapter_id>/upload-status/', async_chapter_upload.get_chapter_upload_progress, name='chapter-upload-status'),
     path('chapters/analyze-zip/', zip_analysis.analyze_zip_file, name='analyze-zip'),
     
+    # Resumable chunked uploads (finalized sessions are passed as upload_id)
+    path('uploads/', upload_session_views.create_upload_session, name='upload-session-create'),
+    path('uploads/<uuid:upload_id>/', upload_session_views.upload_session, name='upload-session'),
+    path('uploads/<uuid:upload_id>/finalize/', upload_session_views.finalize_upload_session, name='upload-session-finalize'),
+    
     # Auth endpoints (JWT)
     path('auth/login/', auth_views.login_view, name='auth-login'),
     path('auth/register/', auth_views.register_view, name='auth-register'),
@@ -72,7 +80,10 @@ urlpatterns = [
     
     # User Translation (Public)
     path('translate/upload/', user_translation_views.upload_for_translation, name='user-translate-upload'),
+    path('translate/profiles/', user_translation_views.get_translation_profiles, name='user-translate-profiles'),
+    path('translate/quote/', user_translation_views.quote_translation, name='user-translate-quote'),
     path('translate/status/<uuid:job_id>/', user_translation_views.get_translation_status, name='user-translate-status'),
+    path('translate/retry/<uuid:job_id>/', user_translation_views.retry_failed_pages, name='user-translate-retry'),
     path('translate/preview/<uuid:job_id>/', user_translation_views.get_translation_preview, name='user-translate-preview'),
     path('translate/preview/<uuid:job_id>/image/<str:image_type>/<int:page_number>/', user_translation_views.serve_preview_image, name='user-translate-image'),
     path('translate/download/<uuid:job_id>/', user_translation_views.download_translated_cbz, name='user-translate-download'),
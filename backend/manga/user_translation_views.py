@@ -9,19 +9,21 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.response import Response
 from rest_framework import status
-from django.utils import timezone
-from django.conf import settings
 from django.http import FileResponse
 
 from .models import TranslationJob, Notification
 from .serializers import TranslationJobSerializer
-from .services.translation import TranslationService
-from .services.custom_translator import CustomTranslator
-from .services.cbz_service import CBZService
+from .services.translation import (
+    MAX_IMAGE_SIZE, MAX_TOTAL_UNCOMPRESSED_SIZE, ArchiveValidationError, TranslationService
+)
+from .services.archive_staging import discard, resolve_upload, stage_upload, staged_path, update_staged
+from .services.translation_jobs import TranslationJobRunner
+from .services.translation_scheduler import TranslationScheduler
+from .services.ai.profiles import PIPELINE_PROFILES, OUTPUT_FORMATS, SOURCE_LANGUAGES, default_profile_for, can_use_profile, is_premium_user, quote_cost
+from .services.ai.prescan import try_prescan
 
 import os
 import logging
-from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
@@ -36,9 +38,11 @@ def upload_for_translation(request):
     POST /api/translate/upload/
     
     Request:
-        - file: ملف ZIP/CBZ
+        - file: ملف ZIP/CBZ (أو upload_id لجلسة رفع مكتملة، أو staging_id لملف تم تحليله)
         - source_language: لغة المصدر (chinese, japanese, korean, english)
         - target_language: لغة الهدف (arabic)
+        - profile: إعداد السرعة/الجودة (fast, balanced, best) - اختياري
+        - output_format: صيغة الصفحات المترجمة (png, webp, avif, jpeg) - اختياري
         
     Response:
         - job_id: معرف العملية
@@ -46,10 +50,8 @@ def upload_for_translation(request):
         - message: رسالة
     """
     
-    # Constants
-    TRANSLATION_COST = 20  # نقاط مطلوبة للترجمة
-    
-    file = request.FILES.get('file')
+    # Multipart file, finalized resumable upload (upload_id) or staged archive (staging_id)
+    file = resolve_upload(request)
     source_language = request.data.get('source_language', '')
     target_language = request.data.get('target_language', 'arabic')  # دائمًا عربي
     
@@ -64,13 +66,30 @@ def upload_for_translation(request):
             'error': 'يجب اختيار لغة المصدر'
         }, status=status.HTTP_400_BAD_REQUEST)
     
-    valid_languages = ['chinese', 'japanese', 'korean', 'english']
-    if source_language not in valid_languages:
+    if source_language not in SOURCE_LANGUAGES:
+        return Response({
+            'error': f'لغة غير مدعومة. اللغات المتاحة: {", ".join(SOURCE_LANGUAGES)}'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    # Pipeline profile (free users default to the cheap path)
+    profile = request.data.get('profile') or default_profile_for(request.user)
+    if profile not in PIPELINE_PROFILES:
+        return Response({
+            'error': f'إعداد غير معروف. الإعدادات المتاحة: {", ".join(PIPELINE_PROFILES)}'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    output_format = request.data.get('output_format', '')
+    if output_format and output_format not in OUTPUT_FORMATS:
         return Response({
-            'error': f'لغة غير مدعومة. اللغات المتاحة: {", ".join(valid_languages)}'
+            'error': f'صيغة غير مدعومة. الصيغ المتاحة: {", ".join(OUTPUT_FORMATS)}'
         }, status=status.HTTP_400_BAD_REQUEST)
     
-    logger.info(f"Translation request: {source_language} -> {target_language}")
+    if not can_use_profile(request.user, profile):
+        return Response({
+            'error': 'هذا الإعداد متاح للمشتركين فقط'
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    logger.info(f"Translation request: {source_language} -> {target_language} (profile: {profile})")
     
     # Check user points (but don't deduct yet!)
     try:
@@ -86,15 +105,14 @@ def upload_for_translation(request):
         logger.error(f"Error getting user points: {e}")
         current_points = 0
     
-    if current_points < TRANSLATION_COST:
-        return Response({
-            'error': f'نقاط غير كافية! تحتاج إلى {TRANSLATION_COST} نقطة للترجمة. رصيدك الحالي: {current_points} نقطة',
-            'required_points': TRANSLATION_COST,
-            'current_points': current_points
-        }, status=status.HTTP_402_PAYMENT_REQUIRED)
-    
     # Validate file (before deducting points!)
-    is_valid, error_msg = TranslationService.validate_archive(file)
+    staged = getattr(file, 'staged', None)
+    if staged:
+        # Analyzed when it was staged; not read again
+        is_valid, error_msg = TranslationService.validate_staged(staged)
+    else:
+        # Contents are checked while extracting (validate_and_extract)
+        is_valid, error_msg = TranslationService.check_upload(file.name, file.size)
     if not is_valid:
         # No refund needed - we haven't deducted yet
         return Response({
@@ -105,36 +123,67 @@ def upload_for_translation(request):
     job = TranslationJob.objects.create(
         user=request.user,
         original_filename=file.name,
-        status='uploading'
+        status='uploading',
+        profile=profile,
+        output_format=output_format,
+        source_language=source_language
     )
     
+    points_deducted = False
+    
     try:
         # 1. Save uploaded file
         job.temp_upload_path = TranslationService.save_uploaded_file(file, job.id)
         job.status = 'extracting'
         job.save()
         
-        # 2. Extract original images
-        extracted_images = TranslationService.extract_archive(job.temp_upload_path, job.id)
-        job.total_pages = len(extracted_images)
+        # 2. Validate and extract original images in one pass
+        try:
+            pages = TranslationService.validate_and_extract(
+                job.temp_upload_path, job.id, verify=not staged
+            )
+        except ArchiveValidationError as e:
+            TranslationService.cleanup_job(job.id)
+            job.delete()
+            return Response({
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        job.total_pages = len(pages)
         job.save()
         
+        # Pre-scan: text-free pages are passed through and not charged
+        prescan = staged.get('prescan') if staged else None
+        if prescan is None:
+            prescan = try_prescan(job.temp_upload_path)
+        if prescan:
+            job.prescan = prescan
+            job.save(update_fields=['prescan'])
+        
+        TRANSLATION_COST = quote_cost(profile, prescan)  # نقاط مطلوبة للترجمة
+        
+        if current_points < TRANSLATION_COST:
+            TranslationService.cleanup_job(job.id)
+            job.delete()
+            return Response({
+                'error': f'نقاط غير كافية! تحتاج إلى {TRANSLATION_COST} نقطة للترجمة. رصيدك الحالي: {current_points} نقطة',
+                'required_points': TRANSLATION_COST,
+                'current_points': current_points
+            }, status=status.HTTP_402_PAYMENT_REQUIRED)
+        
         # Store original images paths
         original_images_data = []
-        for idx, img_path in enumerate(extracted_images, 1):
+        for page in pages:
             original_images_data.append({
-                'page_number': idx,
-                'local_path': str(img_path),
-                'filename': os.path.basename(img_path)
+                'page_number': page['page_number'],
+                'local_path': page['path'],
+                'filename': page['filename']
             })
         job.original_images_paths = original_images_data
-        job.status = 'translating'
         job.save()
         
         # ====================================================================
         # NOW deduct points - translation is actually starting
         # ====================================================================
-        points_deducted = False
         current_balance = current_points
         
         try:
@@ -162,146 +211,25 @@ def upload_for_translation(request):
             # Continue anyway - don't fail translation due to points
             points_deducted = False
         
-        # 3. Start async translation
-        logger.info(f"Starting async translation for job {job.id}")
-        
-        translation_output_dir = Path(settings.MEDIA_ROOT) / 'translations' /'temp' / str(job.id) / 'translated'
-        translation_output_dir.mkdir(parents=True, exist_ok=True)
+        # 3. Queue the translation (one TranslationPage row per page)
+        job.source = 'user'
+        job.points_charged = TRANSLATION_COST if points_deducted else 0
+        job.save(update_fields=['source', 'points_charged'])
         
-        def on_progress(current, total):
-            """Callback for real-time translation progress tracking"""
-            job.translated_pages = current
-            job.total_pages = total
-            job.save(update_fields=['translated_pages', 'total_pages'])
-        
-        def on_complete(translated_paths):
-            """Callback when translation completes"""
-            try:
-                logger.info(f"Translation completed for job {job.id}: {len(translated_paths)} pages")
-                
-                # Store translated images data
-                translated_images_data = []
-                for idx, img_path in enumerate(translated_paths, 1):
-                    translated_images_data.append({
-                        'page_number': idx,
-                        'local_path': str(img_path),
-                        'filename': os.path.basename(img_path)
-                    })
-                
-                job.translation_results = translated_images_data
-                job.translated_pages = len(translated_paths)
-                
-                # Create CBZ file
-                job.status = 'creating_cbz'
-                job.save()
-                
-                cbz_output_dir = Path(settings.MEDIA_ROOT) / 'translated_cbz'
-                cbz_path = CBZService.create_cbz_from_local_files(
-                    translated_paths,
-                    cbz_output_dir,
-                    str(job.id)
-                )
-                
-                job.output_file_path = cbz_path
-                job.status = 'completed'
-                job.completed_at = timezone.now()
-                job.save()
-                
-                logger.info(f"Job {job.id} completed successfully")
-                
-                try:
-                    Notification.objects.create(
-                        user=job.user,
-                        title="اكتملت الترجمة",
-                        message=f"تم الانتهاء من ترجمة الفصل بنجاح. يمكنك الآن الاطلاع عليه أو تحميله.",
-                        link=f"/translate?job_id={job.id}",
-                        notification_type='translation'
-                    )
-                    
-                    # Notify Admin that a user translation is ready for publishing
-                    from django.contrib.auth import get_user_model
-                    User = get_user_model()
-                    admins = User.objects.filter(is_staff=True)
-                    for admin in admins:
-                        Notification.objects.create(
-                            user=admin,
-                            title="ترجمة مستخدم جديدة",
-                            message=f"قام المستخدم {job.user.public_display_name} بترجمة فصل جديد. يمكنك مراجعته ونشره الآن.",
-                            link=f"/dashboard/translate?job_id={job.id}", # Updated link for admin viewing
-                            notification_type='translation'
-                        )
-                except Exception as ne:
-                    logger.error(f"Failed to create translation notifications: {ne}")
-                
-            except Exception as e:
-                logger.error(f"Error in completion callback for job {job.id}: {e}")
-                job.status = 'failed'
-                job.error_message = str(e)
-                job.save()
-                
-                # Refund points on failure (only if they were deducted)
-                if points_deducted:
-                    try:
-                        user = job.user
-                        if hasattr(user, 'points'):
-                            user.points += TRANSLATION_COST
-                            user.save()
-                            logger.info(f"♻️ Refunded {TRANSLATION_COST} points to user {user.username}")
-                            
-                            try:
-                                Notification.objects.create(
-                                    user=user,
-                                    title="استرجاع نقاط",
-                                    message=f"تم استرجاع {TRANSLATION_COST} نقطة بسبب فشل الترجمة. رصيدك الحالي: {user.points}",
-                                    notification_type='points'
-                                )
-                            except Exception as ne:
-                                logger.error(f"Failed to create refund notification: {ne}")
-                    except Exception as refund_error:
-                        logger.error(f"Failed to refund points: {refund_error}")
-        
-        def on_error(error_msg):
-            """Callback when translation fails"""
-            logger.error(f"Translation failed for job {job.id}: {error_msg}")
-            job.status = 'failed'
-            job.error_message = error_msg
-            job.save()
-            
-            # Refund points on error (only if they were deducted)
-            if points_deducted:
-                try:
-                    user = job.user
-                    if hasattr(user, 'points'):
-                        user.points += TRANSLATION_COST
-                        user.save()
-                        logger.info(f"♻️ Refunded {TRANSLATION_COST} points to user {user.username}")
-                        
-                        try:
-                            Notification.objects.create(
-                                user=user,
-                                title="استرجاع نقاط",
-                                message=f"تم استرجاع {TRANSLATION_COST} نقطة بسبب فشل الترجمة. رصيدك الحالي: {user.points}",
-                                notification_type='points'
-                            )
-                        except Exception as ne:
-                            logger.error(f"Failed to create refund notification: {ne}")
-                except Exception as refund_error:
-                    logger.error(f"Failed to refund points: {refund_error}")
-        
-        # Start async translation
-        CustomTranslator.translate_chapter_async(
-            job.temp_upload_path,
-            str(translation_output_dir),
-            on_progress=on_progress,
-            on_complete=on_complete,
-            on_error=on_error
-        )
+        TranslationJobRunner.create_pages(job, pages)
+        queue = TranslationScheduler.enqueue(job)
+        logger.info(f"Queued translation job {job.id} (position: {queue['position']})")
         
         # Return immediately
         return Response({
             'job_id': str(job.id),
             'status': job.status,
+            'queue_position': queue['position'],
+            'eta_seconds': queue['eta_seconds'],
             'total_pages': job.total_pages,
+            'profile': profile,
+            'text_pages': prescan['text_pages'] if prescan else job.total_pages,
+            'pass_through_pages': prescan['pass_through_pages'] if prescan else [],
             'points_deducted': TRANSLATION_COST,
             'remaining_points': current_balance,
             'message': f'بدأت عملية الترجمة. تم خصم {TRANSLATION_COST} نقطة. يمكنك التحقق من التقدم باستخدام job_id'
@@ -329,6 +257,96 @@ def upload_for_translation(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@parser_classes([MultiPartParser, FormParser])
+def quote_translation(request):
+    """
+    تقدير تكلفة ترجمة فصل قبل الرفع الفعلي
+    
+    POST /api/translate/quote/
+    
+    Request:
+        - file: ملف ZIP/CBZ (أو upload_id / staging_id)
+        
+    The archive is staged: pass the returned staging_id to
+    /api/translate/upload/ instead of uploading the file again.
+        
+    Response:
+        - staging_id: معرف الملف المحفوظ مؤقتاً
+        - total_pages / text_pages / total_bubbles / pass_through_pages
+        - quotes: التكلفة لكل إعداد
+    """
+    file = resolve_upload(request)
+    if not file:
+        return Response({
+            'error': 'لم يتم تحديد ملف'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    # Extension and size first, so a rejected upload is never staged
+    is_valid, error_msg = TranslationService.check_upload(file.name, file.size)
+    if not is_valid:
+        return Response({
+            'error': error_msg
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    staged = stage_upload(
+        file, request.user.id,
+        max_total_size=MAX_TOTAL_UNCOMPRESSED_SIZE, max_image_size=MAX_IMAGE_SIZE
+    )
+    is_valid, error_msg = TranslationService.validate_staged(staged)
+    if not is_valid:
+        discard(staged)
+        return Response({
+            'error': error_msg
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    # Kept with the staged archive for the upload that follows
+    prescan = staged.get('prescan')
+    if prescan is None:
+        prescan = try_prescan(str(staged_path(staged)))
+        update_staged(staged, prescan=prescan)
+    
+    quotes = {name: quote_cost(name, prescan) for name in PIPELINE_PROFILES}
+    
+    return Response({
+        'staging_id': staged['id'],
+        'prescan_available': prescan is not None,
+        'total_pages': prescan['total_pages'] if prescan else None,
+        'text_pages': prescan['text_pages'] if prescan else None,
+        'total_bubbles': prescan['total_bubbles'] if prescan else None,
+        'pass_through_pages': prescan['pass_through_pages'] if prescan else [],
+        'quotes': quotes,
+        'default': default_profile_for(request.user),
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_translation_profiles(request):
+    """
+    إعدادات السرعة/الجودة المتاحة وتكلفة كل منها
+    
+    GET /api/translate/profiles/
+    """
+    profiles = []
+    for name, preset in PIPELINE_PROFILES.items():
+        profiles.append({
+            'name': name,
+            'label': preset['label'],
+            'cost': preset['cost'],
+            'premium_only': preset['premium_only'],
+            'available': can_use_profile(request.user, name),
+        })
+    
+    return Response({
+        'profiles': profiles,
+        'output_formats': list(OUTPUT_FORMATS),
+        'default': default_profile_for(request.user),
+        'is_premium': is_premium_user(request.user),
+    })
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_translation_status(request, job_id):
@@ -360,6 +378,8 @@ def get_translation_status(request, job_id):
             'total_pages': job.total_pages,
             'translated_pages': job.translated_pages,
             'error_message': job.error_message,
+            'failed_pages': list(job.pages.filter(status='failed').values_list('page_number', flat=True)),
+            **TranslationScheduler.status_payload(job),
             'original_filename': job.original_filename,
             'created_at': job.created_at.isoformat(),
             'completed_at': job.completed_at.isoformat() if job.completed_at else None
@@ -371,6 +391,66 @@ def get_translation_status(request, job_id):
         }, status=status.HTTP_404_NOT_FOUND)
 
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def retry_failed_pages(request, job_id):
+    """
+    إعادة ترجمة الصفحات الفاشلة فقط
+    
+    POST /api/translate/retry/<job_id>/
+    
+    Response:
+        - job_id
+        - retried_pages: أرقام الصفحات التي ستعاد ترجمتها
+    """
+    
+    try:
+        job = TranslationJob.objects.get(id=job_id)
+    except TranslationJob.DoesNotExist:
+        return Response({
+            'error': 'المهمة غير موجودة'
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    if job.user != request.user and not request.user.is_staff:
+        return Response({
+            'error': 'غير مصرح'
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    if job.status != 'completed':
+        return Response({
+            'error': f'لا يمكن إعادة المحاولة الآن. الحالة: {job.status}'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    failed_pages = list(job.pages.filter(status='failed').values_list('page_number', flat=True))
+    if not failed_pages:
+        return Response({
+            'error': 'لا توجد صفحات فاشلة'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    if not job.temp_upload_path or not os.path.exists(job.temp_upload_path):
+        return Response({
+            'error': 'الملف الأصلي لم يعد متاحاً'
+        }, status=status.HTTP_410_GONE)
+    
+    # Conditional update so two concurrent retries cannot both start
+    if not TranslationJob.objects.filter(pk=job.pk, status='completed').update(status='queued'):
+        return Response({
+            'error': 'إعادة المحاولة قيد التنفيذ بالفعل'
+        }, status=status.HTTP_409_CONFLICT)
+    
+    # The runner redoes every unfinished page, i.e. exactly the failed ones
+    queue = TranslationScheduler.enqueue(job)
+    
+    return Response({
+        'job_id': str(job.id),
+        'status': job.status,
+        'queue_position': queue['position'],
+        'eta_seconds': queue['eta_seconds'],
+        'retried_pages': failed_pages,
+        'message': f'بدأت إعادة ترجمة {len(failed_pages)} صفحة'
+    }, status=status.HTTP_202_ACCEPTED)
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_translation_preview(request, job_id):
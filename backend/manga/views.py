@@ -7,7 +7,7 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.db.models import Q, Count, Avg, Prefetch, Max
 from django.db.models.functions import Coalesce
-from .models import Genre, Category, Manga, Chapter, ChapterImage, SubscriptionPlan, Notification
+from .models import Genre, Category, Manga, Chapter, SubscriptionPlan, Notification
 from .serializers import (
     GenreSerializer, CategorySerializer, SubscriptionPlanSerializer,
     MangaListSerializer, MangaDetailSerializer, MangaCreateSerializer,
@@ -234,7 +234,7 @@ class ChapterViewSet(viewsets.ModelViewSet):
 
     def perform_create(self, serializer):
         chapter = serializer.save()
-        from .models import Notification, UserBookmark
+        from .models import Notification
         import logging
         logger = logging.getLogger(__name__)
         
@@ -252,18 +252,13 @@ class ChapterViewSet(viewsets.ModelViewSet):
                     notification_type='upload'
                 )
             
-            # Notify bookmarked users
-            bookmarks = UserBookmark.objects.filter(manga_id=chapter.manga.id)
-            for bookmark in bookmarks:
-                if self.request.user and bookmark.user.id == self.request.user.id:
-                    continue
-                Notification.objects.create(
-                    user=bookmark.user,
-                    title="فصل جديد متاح!",
-                    message=f"يتوفر الآن فصل جديد {chapter_title} من المانجا المفضلة لديك",
-                    link=f"/manga/{chapter.manga.id}",
-                    notification_type='chapter'
-                )
+            # Notify bookmarked users (fan-out runs on the notifications queue)
+            from .tasks import notify_bookmarked_users
+            notify_bookmarked_users.delay(
+                str(chapter.manga.id),
+                chapter_title,
+                exclude_user_id=self.request.user.id if self.request.user.is_authenticated else None
+            )
         except Exception as e:
             logger.error(f"Failed to create chapter notification in ChapterViewSet: {e}")
     
@@ -307,10 +302,9 @@ class ChapterViewSet(viewsets.ModelViewSet):
         POST /api/chapters/upload/
         """
         import zipfile
-        import io
         from datetime import datetime
-        from .services.imgbb import ImgBBService
-        from .models import UserBookmark
+        from .services.archive_ingest import archive_pages
+        from .services.chapter_publisher import ChapterPublisher, page_name
         manga_id = request.data.get('manga')
         number = request.data.get('number')
         title = request.data.get('title', '')
@@ -352,11 +346,6 @@ class ChapterViewSet(viewsets.ModelViewSet):
                 chapter.release_date = release_date
             chapter.save()
         
-        # Extract ZIP/CBZ and upload to imgbb
-        image_extensions = ('.jpg', '.jpeg', '.png', '.webp', '.gif')
-        images_created = 0
-        failed_uploads = 0
-        
         # Security Constants
         MAX_FILES_PER_ZIP = 500  # Prevent infinite file extraction
         MAX_FILE_SIZE_BYTES = 50 * 1024 * 1024  # 50MB per image maximum
@@ -367,50 +356,23 @@ class ChapterViewSet(viewsets.ModelViewSet):
                 if len(zip_file.namelist()) > MAX_FILES_PER_ZIP:
                     return Response({'error': f'معالجة مرفوضة: الملف المضغوط يحتوي على أكثر من {MAX_FILES_PER_ZIP} ملف.'}, status=400)
 
-                # Get list of image files, sorted
-                image_files = sorted([
-                    f for f in zip_file.namelist()
-                    if f.lower().endswith(image_extensions) and not f.startswith('__MACOSX')
-                ])
+                # Security Check 2: Max File Size (maliciously large dummy files are skipped)
+                # Pages are read from the ZIP by the upload threads, not up front
+                pages = archive_pages(
+                    zip_file,
+                    lambda page_num: page_name(chapter, page_num),
+                    max_file_size=MAX_FILE_SIZE_BYTES
+                )
                 
-                for page_num, filename in enumerate(image_files, 1):
-                    # Security Check 2: Max File Size
-                    file_info = zip_file.getinfo(filename)
-                    if file_info.file_size > MAX_FILE_SIZE_BYTES:
-                         continue # Skip maliciously large dummy files
-                         
-                    # Extract file data
-                    file_data = zip_file.read(filename)
-                    
-                    # Create a file-like object for upload
-                    import os
-                    file_obj = io.BytesIO(file_data)
-                    file_obj.name = os.path.basename(filename)
-                    
-                    # Upload to imgbb
-                    result = ImgBBService.upload_image(
-                        file_obj, 
-                        f"{manga.title}_ch{int(float(number)):03d}_p{page_num:03d}"
-                    )
-                    
-                    if result:
-                        # Create ChapterImage record with imgbb URL
-                        ChapterImage.objects.create(
-                            chapter=chapter,
-                            page_number=page_num,
-                            image_url=result['url'],
-                            width=result.get('width'),
-                            height=result.get('height'),
-                            original_filename=os.path.basename(filename)
-                        )
-                        images_created += 1
-                    else:
-                        failed_uploads += 1
-                        print(f"Failed to upload page {page_num} of chapter {number}")
+                # Upload to imgbb in parallel; ChapterImage rows are inserted in batches
+                result = ChapterPublisher(chapter).publish(pages)
                     
         except zipfile.BadZipFile:
             return Response({'error': 'Invalid ZIP/CBZ file'}, status=400)
         
+        images_created = result['completed']
+        failed_uploads = result['failed']
+        
         message = f'تم رفع {images_created} صورة بنجاح إلى imgbb'
         if failed_uploads > 0:
             message += f' (فشل رفع {failed_uploads} صورة)'
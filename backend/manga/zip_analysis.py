@@ -2,16 +2,19 @@
 ZIP File Analysis Endpoint
 ===========================
 
-Endpoint for analyzing ZIP/CBZ files to extract metadata like image count
+Endpoint for analyzing ZIP/CBZ files to extract metadata like image count.
+The archive is staged so the upload that follows does not resend it.
 """
 
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
 from rest_framework import status
-import zipfile
+from django.conf import settings
 import logging
 
+from .services.archive_staging import discard, resolve_upload, stage_upload
+
 logger = logging.getLogger(__name__)
 
 
@@ -23,16 +26,22 @@ def analyze_zip_file(request):
     
     POST /api/chapters/analyze-zip/
     
+    The archive is kept in the staging area: pass the returned staging_id
+    to /api/chapters/upload-async/ instead of uploading the file again.
+    
     Body (multipart/form-data):
-        - file: ZIP/CBZ file
+        - file: ZIP/CBZ file (or upload_id / staging_id)
     
     Returns:
+        - staging_id: id of the staged archive
         - image_count: number of images in the ZIP
         - file_name: original file name
         - file_size: file size in bytes
+        - valid / error: validation result (an invalid archive gets a 400)
+        - pages: page_number, filename, width, height, size per image
     """
     try:
-        uploaded_file = request.FILES.get('file')
+        uploaded_file = resolve_upload(request)
         
         if not uploaded_file:
             return Response({
@@ -40,32 +49,34 @@ def analyze_zip_file(request):
             }, status=status.HTTP_400_BAD_REQUEST)
         
         # Validate ZIP
-        if not uploaded_file.name.endswith(('.zip', '.cbz')):
+        if not uploaded_file.name.lower().endswith(('.zip', '.cbz')):
             return Response({
                 'error': 'الملف يجب أن يكون ZIP أو CBZ'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Extract images from ZIP
-        image_extensions = ('.jpg', '.jpeg', '.png', '.webp', '.gif')
-        image_count = 0
+        if uploaded_file.size > settings.DATA_UPLOAD_MAX_MEMORY_SIZE:
+            return Response({
+                'error': f"حجم الملف غير مسموح. الحد الأقصى: {settings.DATA_UPLOAD_MAX_MEMORY_SIZE // (1024 * 1024)}MB"
+            }, status=status.HTTP_400_BAD_REQUEST)
         
-        try:
-            with zipfile.ZipFile(uploaded_file, 'r') as zip_file:
-                image_files = [
-                    f for f in zip_file.namelist()
-                    if f.lower().endswith(image_extensions) and not f.startswith('__MACOSX')
-                ]
-                image_count = len(image_files)
-                
-        except zipfile.BadZipFile:
+        staged = stage_upload(uploaded_file, request.user.id)
+        analysis = staged['analysis']
+        if not analysis['valid']:
+            # Nothing can be uploaded from it; don't keep it in staging
+            discard(staged)
             return Response({
-                'error': 'Invalid ZIP/CBZ file'
+                'error': analysis['error']
             }, status=status.HTTP_400_BAD_REQUEST)
         
         return Response({
-            'image_count': image_count,
-            'file_name': uploaded_file.name,
-            'file_size': uploaded_file.size
+            'staging_id': staged['id'],
+            'image_count': analysis['image_count'],
+            'file_name': staged['filename'],
+            'file_size': staged['size'],
+            'total_uncompressed_size': analysis['total_uncompressed_size'],
+            'valid': analysis['valid'],
+            'error': analysis['error'],
+            'pages': analysis['pages'],
         })
         
     except Exception as e: